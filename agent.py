@@ -8,11 +8,19 @@ import json
 import time
 from datetime import datetime
 from typing import Dict, List, Optional
-import requests
 from supabase import create_client, Client
 import google.generativeai as genai
 from tavily import TavilyClient
-from openai import OpenAI
+import ai_engine
+from batch_extractor import EXTRACT_BATCH_SIZE, REQUIRED_FIELDS, extract_cases_batch
+from structured_output import CASE_SCHEMA, parse_case
+from llm_cache import print_cache_stats
+from usage_meter import print_usage_report
+from search_cache import cached_search, print_search_cache_stats
+from url_canonical import canonical_or_none, canonical_url, find_existing_cases, insert_case, url_key
+from run_journal import RunJournal
+from budget_planner import BudgetPlanner
+from work_claims import get_work_claimer
 
 # 从环境变量或配置文件读取 API Key
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
@@ -30,63 +38,22 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 # 模型将在 extract_case_info_with_gemini 函数中初始化
 
 
+AI_SYSTEM_PROMPT = "你是一位资深保险反欺诈分析师，擅长从长文中抽取严格结构化信息。"
+
+
 def get_ai_analysis(prompt: str) -> Optional[str]:
     """
     通用AI分析函数：优先使用 Gemini，失败或限额后自动切换到 DeepSeek 备份引擎
     返回纯文本字符串（期望为JSON字符串）；失败返回 None
     """
-    # 1) 尝试 Gemini
-    try:
-        # 选择可用的 Gemini 模型
-        models_to_try = [
-            "models/gemini-2.5-flash",
-            "models/gemini-1.5-pro",
-            "models/gemini-flash-latest",
-        ]
-        last_err = None
-        for model_name in models_to_try:
-            try:
-                print("[Gemini] 正在分析案例...")
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(prompt)
-                text = (response.text or "").strip()
-                if text:
-                    return text
-            except Exception as e:
-                last_err = str(e)
-                # 若是限额/速率等错误，则直接进入备份引擎
-                if any(k in str(e).lower() for k in ["quota", "rate", "429", "exceeded", "limit"]):
-                    print("⚠️ Gemini 限额或速率限制，正在切换至 DeepSeek 备份引擎...")
-                    break
-                # 其他错误，尝试下一个模型
-                continue
-        if last_err and not any(k in last_err.lower() for k in ["quota", "rate", "429", "exceeded", "limit"]):
-            # Gemini 其他错误，仍尝试 DeepSeek
-            print(f"⚠️ Gemini 异常: {last_err[:120]} ... 正在切换至 DeepSeek 备份引擎...")
-    except Exception as e:
-        print(f"⚠️ Gemini 初始化失败: {str(e)}，切换至 DeepSeek 备份引擎...")
-
-    # 2) 尝试 DeepSeek（OpenAI 兼容接口）
-    try:
-        if not DEEPSEEK_API_KEY:
-            print("❌ DeepSeek 备份引擎未配置（缺少 DEEPSEEK_API_KEY）")
-            return None
-        print("[DeepSeek] 正在接管任务...")
-        ds_client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com")
-        completion = ds_client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": "你是一位资深保险反欺诈分析师，擅长从长文中抽取严格结构化信息。"},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.3,
-            max_tokens=2000,
-        )
-        text = (completion.choices[0].message.content or "").strip()
-        return text if text else None
-    except Exception as e:
-        print(f"❌ DeepSeek 备份引擎失败: {str(e)}")
-        return None
+    return ai_engine.get_ai_analysis(
+        prompt,
+        system_prompt=AI_SYSTEM_PROMPT,
+        max_tokens=2000,
+        required_keys=REQUIRED_FIELDS,
+        response_schema=CASE_SCHEMA,
+        stage="extract",
+    )
 
 
 def search_fraud_cases(query: str = "Global insurance fraud case 2025 2026", max_results: int = 10) -> List[Dict]:
@@ -101,7 +68,8 @@ def search_fraud_cases(query: str = "Global insurance fraud case 2025 2026", max
         搜索结果列表，每个结果包含 URL 和内容摘要
     """
     try:
-        response = tavily_client.search(
+        response = cached_search(
+            tavily_client,
             query=query,
             search_depth="advanced",  # 深度搜索模式
             max_results=max_results,
@@ -114,6 +82,7 @@ def search_fraud_cases(query: str = "Global insurance fraud case 2025 2026", max
         for item in response.get('results', []):
             results.append({
                 'url': item.get('url', ''),
+                'canonical_url': canonical_url(item.get('url', '')),
                 'title': item.get('title', ''),
                 'content': item.get('content', ''),
                 'score': item.get('score', 0)
@@ -126,61 +95,8 @@ def search_fraud_cases(query: str = "Global insurance fraud case 2025 2026", max
         return []
 
 
-def get_gemini_model():
-    """
-    获取可用的 Gemini 模型（优先使用 Flash，如果不可用则使用 Pro）
-    使用最新的 Gemini 2.5 或 2.0 模型
-    """
-    # 按优先级顺序尝试模型（使用带 models/ 前缀的完整名称）
-    models_to_try = [
-        'models/gemini-2.5-flash',      # 最新的 Flash 模型
-        'models/gemini-2.0-flash',      # Gemini 2.0 Flash
-        'models/gemini-flash-latest',   # 最新 Flash
-        'models/gemini-2.5-pro',        # 最新的 Pro 模型
-        'models/gemini-pro-latest',     # 最新 Pro
-    ]
-    last_error = None
-    
-    for model_name in models_to_try:
-        try:
-            model = genai.GenerativeModel(model_name)
-            # 简单测试调用以验证模型是否可用
-            model.generate_content("test")
-            print(f"✅ 使用 Gemini 模型: {model_name}")
-            return model
-        except Exception as e:
-            last_error = str(e)
-            continue
-    
-    # 如果所有模型都失败，返回最新的 Flash 作为默认
-    print(f"⚠️ 警告: 无法验证 Gemini 模型，使用默认模型 models/gemini-flash-latest")
-    if last_error:
-        print(f"   最后的错误信息: {last_error[:200]}")
-    return genai.GenerativeModel('models/gemini-flash-latest')
-
-
-def extract_case_info_with_gemini(url: str, title: str, content: str) -> Optional[Dict]:
-    """
-    使用 AI 引擎（Gemini 主引擎 + DeepSeek 备份引擎）从搜索结果中提取结构化的案例信息
-    实现 Failover 机制：当 Gemini 限额或出错时，自动切换到 DeepSeek
-    
-    参数:
-        url: 原始链接
-        title: 标题
-        content: 内容摘要（可以是 Firecrawl 的 Markdown 全文或搜索摘要）
-    
-    返回:
-        结构化字典，包含所有必需字段，如果提取失败则返回 None
-    """
-    prompt = f"""
-你是一位全球寿险与健康险反欺诈专家（SIU 资深调查员）。请从以下网页信息中深度分析保险欺诈案例，并按照专业简报格式输出结构化摘要。
-
-网页标题: {title}
-网页链接: {url}
-网页内容摘要:
-{content}
-
-【分析任务】
+# 单篇与批量提取共用的【分析任务】/【输出要求】说明（含 JSON 格式示例）
+CASE_EXTRACTION_GUIDE = """【分析任务】
 请严格按照以下【简报格式】输出结构化摘要，所有内容必须用中文填写：
 
 1. **Time (时间)**: 事件发生或判决的具体时间（格式：YYYY-MM-DD 或 YYYY年MM月DD日）
@@ -231,14 +147,38 @@ def extract_case_info_with_gemini(url: str, title: str, content: str) -> Optiona
 - 字段名使用英文（Time, Region, Characters, Event, Process, Result）
 
 【JSON 格式示例】
-{{
+{
     "Time": "2025-01-15",
     "Region": "美国纽约",
     "Characters": "John Smith, ABC保险公司, XYZ医疗中心",
     "Event": "医疗保险欺诈",
     "Process": "【风险画像】\\n投保时间：2024年6月\\n保额：50万美元\\n出险间隔：投保后3个月\\n\\n【舞弊手法(MO)】\\n伪造海外医疗收据\\n虚假诊断证明\\n\\n【红旗指标(Red Flags)】\\n医疗记录时间与出入境记录不符\\n理赔金额异常偏高\\n\\n【核查手段建议】\\n医保大数据比对\\n出入境记录核查\\n\\n【核保/风控启示】\\n建立投保后6个月内大额理赔预警机制",
     "Result": "被判有期徒刑5年，罚款50万美元"
-}}
+}"""
+
+
+def extract_case_info_with_gemini(url: str, title: str, content: str) -> Optional[Dict]:
+    """
+    使用 AI 引擎（Gemini 主引擎 + DeepSeek 备份引擎）从搜索结果中提取结构化的案例信息
+    实现 Failover 机制：当 Gemini 限额或出错时，自动切换到 DeepSeek
+    
+    参数:
+        url: 原始链接
+        title: 标题
+        content: 内容摘要（可以是 Firecrawl 的 Markdown 全文或搜索摘要）
+    
+    返回:
+        结构化字典，包含所有必需字段，如果提取失败则返回 None
+    """
+    prompt = f"""
+你是一位全球寿险与健康险反欺诈专家（SIU 资深调查员）。请从以下网页信息中深度分析保险欺诈案例，并按照专业简报格式输出结构化摘要。
+
+网页标题: {title}
+网页链接: {url}
+网页内容摘要:
+{content}
+
+{CASE_EXTRACTION_GUIDE}
 
 现在请开始专业分析：
 """
@@ -249,23 +189,8 @@ def extract_case_info_with_gemini(url: str, title: str, content: str) -> Optiona
         if not text:
             raise ValueError("AI 引擎未返回任何内容")
         
-        # 清理可能的 Markdown 代码块标记
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        text = text.strip()
-        
-        # 解析 JSON
-        case_data = json.loads(text)
-        
-        # 验证必需字段
-        required_fields = ['Time', 'Region', 'Characters', 'Event', 'Process', 'Result']
-        for field in required_fields:
-            if field not in case_data:
-                case_data[field] = "未知"
+        # 解析 JSON（自动修复常见格式问题），并校验必需字段
+        case_data = parse_case(text)
         
         # 添加元数据
         case_data['Source_URL'] = url
@@ -283,6 +208,21 @@ def extract_case_info_with_gemini(url: str, title: str, content: str) -> Optiona
         return None
 
 
+def extract_case_infos(articles: List[Dict]) -> List[Optional[Dict]]:
+    """
+    批量提取案例信息：每 EXTRACT_BATCH_SIZE 篇文章合并为一次 AI 调用（SIU 简报说明只发送一次），
+    批量响应无法解析的文章回退为 extract_case_info_with_gemini 单篇提取
+    
+    参数:
+        articles: 搜索结果列表，每项包含 url、title、content
+    
+    返回:
+        与 articles 等长的列表，提取失败的文章为 None
+    """
+    return extract_cases_batch(articles, CASE_EXTRACTION_GUIDE, extract_case_info_with_gemini,
+                               system_prompt=AI_SYSTEM_PROMPT)
+
+
 def check_duplicate(url: str) -> bool:
     """
     检查数据库中是否已存在该 URL（去重）
@@ -294,8 +234,7 @@ def check_duplicate(url: str) -> bool:
         True 表示已存在（重复），False 表示不存在（新案例）
     """
     try:
-        result = supabase.table('fraud_cases').select('id').eq('source_url', url).execute()
-        return len(result.data) > 0
+        return len(find_existing_cases(supabase, url)) > 0
     except Exception as e:
         print(f"⚠️ 查重失败: {str(e)}")
         return False
@@ -321,11 +260,12 @@ def save_to_supabase(case_data: Dict) -> bool:
             'process': case_data.get('Process', '未知'),
             'result': case_data.get('Result', '未知'),
             'source_url': case_data.get('Source_URL', ''),
+            'canonical_url': canonical_or_none(case_data.get('Source_URL')),
             'created_at': case_data.get('Created_at', datetime.now().isoformat())
         }
         
         # 插入数据库
-        result = supabase.table('fraud_cases').insert(insert_data).execute()
+        result = insert_case(supabase, insert_data)
         
         if result.data:
             print(f"✅ 成功保存到数据库: {insert_data['event']}")
@@ -352,6 +292,9 @@ def main():
     print(f"⏰ 执行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 60)
     
+    # 运行预算从程序启动开始计时（截止时间 RUN_DEADLINE_MINUTES，调用预算 <PROVIDER>_CALL_BUDGET）
+    planner = BudgetPlanner('agent')
+    
     # 验证 API Key
     if not all([TAVILY_API_KEY, GEMINI_API_KEY, SUPABASE_URL, SUPABASE_KEY]):
         print("❌ 错误: 缺少必要的 API Key 或配置")
@@ -360,7 +303,7 @@ def main():
     
     # 步骤1: 搜索案例
     print("\n📡 步骤1: 搜索全球保险欺诈案例...")
-    # 注意：考虑到 Gemini API 限流（每分钟5次），建议 max_results 不超过 5
+    # 注意：Gemini 调用速率由限流器控制，max_results 越大整体耗时越长
     search_results = search_fraud_cases(
         query="Global insurance fraud case 2025 2026",
         max_results=5  # 减少为 5 个，避免限流
@@ -370,44 +313,86 @@ def main():
         print("⚠️ 未搜索到任何结果，程序退出")
         return
     
-    # 步骤2: 提取并保存
-    print(f"\n🔍 步骤2: 开始提取案例信息（共 {len(search_results)} 个）...")
+    # 运行日志：上次运行中断时，已提取的结果直接复用，不再重复调用 AI
+    journal = RunJournal(pipeline='agent')
+    # 认领表：与同时运行的 Living Scout 等其他 Worker 分摊候选 URL，避免重复处理
+    claimer = get_work_claimer(supabase)
+    
+    # 步骤2: 提取并保存（处理数量由预算规划器根据剩余时间和调用预算决定）
+    planned = search_results[:planner.plan(len(search_results))]
+    print(f"\n🔍 步骤2: 开始提取案例信息（共 {len(planned)} 个）...")
     saved_count = 0
     skipped_count = 0
     failed_count = 0
+    cancelled_count = 0
     
-    for i, result in enumerate(search_results, 1):
-        url = result['url']
-        title = result['title']
-        content = result['content']
-        
-        print(f"\n--- 处理第 {i}/{len(search_results)} 个案例 ---")
-        print(f"URL: {url[:80]}...")
+    # 每 EXTRACT_BATCH_SIZE 个案例为一批：先逐个查重和认领，再整批提取（一次 AI 调用），最后逐个保存
+    for batch_start in range(0, len(planned), EXTRACT_BATCH_SIZE):
+        # 截止时间到达或调用预算用完：剩余案例留给下一次运行
+        if planner.should_stop():
+            cancelled_count = len(planned) - batch_start
+            break
         
-        # 检查是否重复
-        if check_duplicate(url):
-            print(f"⏭️  跳过: URL 已存在（去重）")
-            skipped_count += 1
-            continue
+        batch = []
+        started_at = time.monotonic()
+        for i, result in enumerate(planned[batch_start:batch_start + EXTRACT_BATCH_SIZE], batch_start + 1):
+            url = result['url']
+            key = url_key(result)  # 运行日志和认领按规范化 URL 记录
+            print(f"\n--- 处理第 {i}/{len(planned)} 个案例 ---")
+            print(f"URL: {url[:80]}...")
+            
+            # 检查是否重复
+            if journal.is_saved(key) or check_duplicate(url):
+                print(f"⏭️  跳过: URL 已存在（去重）")
+                skipped_count += 1
+                continue
+            
+            if not claimer.try_claim(key):
+                print(f"⏭️  跳过: 已由其他 Worker 认领（或不属于本分片）")
+                skipped_count += 1
+                continue
+            
+            # 提取结果优先从运行日志恢复
+            case_data = journal.stage_data(key, 'analyzed')
+            if case_data:
+                print(f"♻️  从运行日志恢复提取结果，跳过 AI 调用")
+            batch.append((result, case_data))
         
-        # 提取案例信息
-        case_data = extract_case_info_with_gemini(url, title, content)
+        # 提取案例信息（运行日志中没有的文章整批提取）
+        pending = [result for result, case_data in batch if not case_data]
+        extracted = iter(extract_case_infos(pending))
         
-        if not case_data:
-            print(f"❌ 提取失败，跳过")
-            failed_count += 1
-            continue
+        for result, case_data in batch:
+            url = result['url']
+            key = url_key(result)
+            if not case_data:
+                case_data = next(extracted)
+                if not case_data:
+                    print(f"❌ 提取失败，跳过: {url[:80]}")
+                    failed_count += 1
+                    claimer.finish(key, done=False)
+                    continue
+                journal.record(key, 'analyzed', case_data)
+            
+            # 保存到数据库
+            if save_to_supabase(case_data):
+                saved_count += 1
+                journal.record(key, 'saved')
+                claimer.finish(key, done=True)
+            else:
+                failed_count += 1
+                claimer.finish(key, done=False)
         
-        # 保存到数据库
-        if save_to_supabase(case_data):
-            saved_count += 1
-        else:
-            failed_count += 1
+        # 预算规划器按案例记录成本：整批耗时平均分摊到本批的每个案例
+        batch_size = len(planned[batch_start:batch_start + EXTRACT_BATCH_SIZE])
+        elapsed = time.monotonic() - started_at
+        for _ in range(batch_size):
+            planner.record_case(elapsed / batch_size)
         
-        # 避免 API 限流，每处理一个案例后等待15秒
-        # Gemini 免费版限制：每分钟 5 次请求，所以每个案例间隔 15 秒
-        print(f"⏳ 等待 15 秒以避免 API 限流...")
-        time.sleep(15)
+        # API 限流由共享的自适应限流器控制（GEMINI_RPM 等环境变量），无需固定等待
+    
+    planner.finish()
+    claimer.close()
     
     # 输出统计信息
     print("\n" + "=" * 60)
@@ -416,7 +401,12 @@ def main():
     print(f"✅ 成功保存: {saved_count} 个案例")
     print(f"⏭️  跳过（重复）: {skipped_count} 个案例")
     print(f"❌ 失败: {failed_count} 个案例")
+    if len(planned) < len(search_results) or cancelled_count:
+        print(f"⏹️  预算不足推迟: {len(search_results) - len(planned) + cancelled_count} 个案例")
     print(f"📈 总计处理: {len(search_results)} 个搜索结果")
+    print_cache_stats()
+    print_usage_report()
+    print_search_cache_stats()
     print("=" * 60)
 
 
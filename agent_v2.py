@@ -13,7 +13,20 @@ import requests
 from supabase import create_client, Client
 import google.generativeai as genai
 from tavily import TavilyClient
-from openai import OpenAI
+from urllib.parse import urlparse
+from rate_limiter import get_rate_limiter, limited_call
+from llm_cache import get_llm_cache, make_cache_key
+import ai_engine
+from content_reducer import reduce_content
+from structured_output import parse_case, parse_json
+from usage_meter import gemini_usage, openai_usage, print_usage_report, record_usage
+from search_cache import cached_search, print_search_cache_stats
+from url_canonical import canonical_or_none, canonical_url, find_existing_cases, insert_case
+from search_watermark import get_search_watermark, split_new_results
+from query_planner import QUERY_PLANNER_SEARCHES, QueryPlanner, get_query_planner, record_query_yield
+from case_classifier import CaseClassifier, load_classifier, prefilter
+from critic_policy import CriticPolicy
+from http_clients import get_http_session, get_openai_client
 
 # ==================== 环境变量配置 ====================
 
@@ -24,15 +37,40 @@ JINA_API_KEY = os.getenv("JINA_API_KEY")  # 新增：用于 Jina Reader
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
+# Analyst 提示词模板版本：修改 AnalystAgent.analyze 中的提示词时递增，使 LLM 响应缓存失效
+ANALYST_PROMPT_VERSION = "2.0"
+
 # 初始化客户端
 tavily_client = TavilyClient(api_key=TAVILY_API_KEY)
 genai.configure(api_key=GEMINI_API_KEY)
-openai_client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+openai_client = get_openai_client(OPENAI_API_KEY)
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL and SUPABASE_KEY else None
 
 
 # ==================== Agent 1: The Scout (侦察员) ====================
 
+# 专业关键词：确保找到具体案例而非通用文章（查询规划器在构造 ScoutAgent 前也需要）
+CASE_SPECIFIC_KEYWORDS = [
+    'charged with fraud',
+    'convicted of fraud',
+    'fraud case',
+    'fraud scheme',
+    'arrested for insurance fraud',
+    'sentenced for insurance fraud',
+    'court case insurance fraud',
+    'prosecution insurance fraud'
+]
+
+# 保险类型关键词：只关注寿险、健康险、意外险
+INSURANCE_TYPES = [
+    'life insurance fraud',      # 寿险欺诈
+    'health insurance fraud',    # 健康险欺诈
+    'accident insurance fraud',  # 意外险欺诈
+    'medical insurance fraud',   # 医疗保险欺诈（属于健康险）
+    'disability insurance fraud' # 伤残保险欺诈（可能属于意外险）
+]
+
+
 class ScoutAgent:
     """
     侦察员 Agent：负责搜索高质量的保险欺诈案例
@@ -41,31 +79,21 @@ class ScoutAgent:
     2. 添加专业关键词提高搜索质量
     3. 只搜索具体案例（排除通用文章）
     4. 专注于寿险、健康险、意外险
+    5. 本地预分类器丢弃非案例页面（模型由 agent_v3 的深度研究流程训练）
     """
     
-    def __init__(self, tavily_client: TavilyClient):
+    def __init__(self, tavily_client: TavilyClient, classifier: Optional[CaseClassifier] = None,
+                 query_planner: Optional[QueryPlanner] = None):
         self.client = tavily_client
+        self.classifier = classifier
+        # 查询规划器：按历史产出轮换关键词组合（为 None 时使用 build_query() 的固定查询）
+        self.query_planner = query_planner
         
         # 专业关键词：确保找到具体案例而非通用文章
-        self.case_specific_keywords = [
-            'charged with fraud',
-            'convicted of fraud',
-            'fraud case',
-            'fraud scheme',
-            'arrested for insurance fraud',
-            'sentenced for insurance fraud',
-            'court case insurance fraud',
-            'prosecution insurance fraud'
-        ]
+        self.case_specific_keywords = list(CASE_SPECIFIC_KEYWORDS)
         
         # 保险类型关键词：只关注寿险、健康险、意外险
-        self.insurance_types = [
-            'life insurance fraud',      # 寿险欺诈
-            'health insurance fraud',    # 健康险欺诈
-            'accident insurance fraud',  # 意外险欺诈
-            'medical insurance fraud',   # 医疗保险欺诈（属于健康险）
-            'disability insurance fraud' # 伤残保险欺诈（可能属于意外险）
-        ]
+        self.insurance_types = list(INSURANCE_TYPES)
         
         # 排除关键词：排除财产保险
         self.exclude_keywords = [
@@ -121,76 +149,99 @@ class ScoutAgent:
         搜索全球保险欺诈案例（高级模式）
         只搜索具体案例，排除通用文章
         专注于寿险、健康险、意外险
+        启用查询规划器时，按历史产出选择 QUERY_PLANNER_SEARCHES 个查询变体，结果按 URL 合并
         
         参数:
             base_query: 基础搜索关键词（不再使用，保留用于兼容）
             max_results: 最大返回结果数（搜索更多以筛选差异性）
         
         返回:
-            筛选后的搜索结果列表，确保案例差异性和相关性
+            筛选后的搜索结果列表，确保案例差异性和相关性（来自规划器的结果带有 query_variant / query_source）
         """
         try:
-            enhanced_query = self.build_query(base_query)
-            
-            print(f"🔍 [Scout] 搜索关键词: {enhanced_query[:150]}...")
-            print(f"📋 [Scout] 聚焦: 寿险、健康险、意外险具体案例（排除财产保险）")
-            
-            response = self.client.search(
-                query=enhanced_query,
-                search_depth="advanced",  # 深度搜索模式
-                max_results=max_results,
-                include_domains=None,  # 不限制域名
-                include_answer=True,  # 包含答案摘要
-                include_raw_content=False,  # 不包含原始HTML内容
-            )
-            
+            variants = self.query_planner.select(QUERY_PLANNER_SEARCHES) if self.query_planner else [None]
             results = []
-            for item in response.get('results', []):
-                url = item.get('url', '')
-                title = item.get('title', '').lower()
-                content = item.get('content', '').lower()
+            seen_urls = set()
+            for variant in variants:
+                enhanced_query = variant['query'] if variant else self.build_query(base_query)
+                case_keywords = self.case_specific_keywords + (variant['match_keywords'] if variant else [])
                 
-                # 过滤条件：排除通用文章和财产保险
-                should_exclude = False
+                label = f"（查询变体 {variant['id']}）" if variant else ""
+                print(f"🔍 [Scout] 搜索关键词{label}: {enhanced_query[:150]}...")
+                print(f"📋 [Scout] 聚焦: 寿险、健康险、意外险具体案例（排除财产保险）")
                 
-                # 检查是否是通用文章（标题或内容中包含这些词）
-                generic_keywords = [
-                    'market report',
-                    'market size',
-                    'industry outlook',
-                    'global market',
-                    'forecast',
-                    'trends',
-                    'analysis report',
-                    'research report'
-                ]
+                response = cached_search(
+                    self.client,
+                    query=enhanced_query,
+                    search_depth="advanced",  # 深度搜索模式
+                    max_results=max_results,
+                    include_domains=None,  # 不限制域名
+                    include_answer=True,  # 包含答案摘要
+                    include_raw_content=False,  # 不包含原始HTML内容
+                )
                 
-                for keyword in generic_keywords:
-                    if keyword in title or keyword in content:
-                        should_exclude = True
-                        break
+                found = 0
+                for item in response.get('results', []):
+                    url = item.get('url', '')
+                    key = canonical_url(url)  # 本地去重按规范化 URL，抓取和保存使用原始 URL
+                    title = item.get('title', '').lower()
+                    content = item.get('content', '').lower()
+                    
+                    # 过滤条件：排除通用文章和财产保险（以及本次运行其他查询变体已找到的 URL）
+                    should_exclude = key in seen_urls
+                    
+                    # 检查是否是通用文章（标题或内容中包含这些词）
+                    generic_keywords = [
+                        'market report',
+                        'market size',
+                        'industry outlook',
+                        'global market',
+                        'forecast',
+                        'trends',
+                        'analysis report',
+                        'research report'
+                    ]
+                    
+                    for keyword in generic_keywords:
+                        if keyword in title or keyword in content:
+                            should_exclude = True
+                            break
+                    
+                    # 检查是否包含财产保险关键词（如果包含则排除）
+                    for exclude_keyword in self.exclude_keywords:
+                        if exclude_keyword in title or exclude_keyword in content:
+                            should_exclude = True
+                            break
+                    
+                    # 检查是否包含具体案例关键词（必须包含至少一个）
+                    has_case_keyword = False
+                    for case_keyword in case_keywords:
+                        if case_keyword in title or case_keyword in content:
+                            has_case_keyword = True
+                            break
+                    
+                    # 如果满足条件，添加到结果
+                    if not should_exclude and has_case_keyword:
+                        seen_urls.add(key)
+                        found += 1
+                        result = {
+                            'url': url,
+                            'canonical_url': key,
+                            'title': item.get('title', ''),
+                            'content': item.get('content', ''),
+                            'score': item.get('score', 0),
+                            'published_date': item.get('published_date'),
+                        }
+                        if variant:
+                            result['query_variant'] = variant['id']
+                            result['query_source'] = self.query_planner.source
+                        results.append(result)
                 
-                # 检查是否包含财产保险关键词（如果包含则排除）
-                for exclude_keyword in self.exclude_keywords:
-                    if exclude_keyword in title or exclude_keyword in content:
-                        should_exclude = True
-                        break
-                
-                # 检查是否包含具体案例关键词（必须包含至少一个）
-                has_case_keyword = False
-                for case_keyword in self.case_specific_keywords:
-                    if case_keyword in title or case_keyword in content:
-                        has_case_keyword = True
-                        break
-                
-                # 如果满足条件，添加到结果
-                if not should_exclude and has_case_keyword:
-                    results.append({
-                        'url': url,
-                        'title': item.get('title', ''),
-                        'content': item.get('content', ''),
-                        'score': item.get('score', 0)
-                    })
+                if variant:
+                    self.query_planner.record_search(variant['id'], found)
+            
+            # 本地预分类：案例概率过低的页面不再抓取和分析（v2 不记录训练标签，不做抽样放行）
+            results = prefilter(results, self.classifier, explore_rate=0.0)
             
             # 按质量分数排序（从高到低）
             results.sort(key=lambda x: x.get('score', 0), reverse=True)
@@ -243,12 +294,20 @@ class ScraperAgent:
             
             print(f"📥 [Scraper] 正在抓取全文: {url[:80]}...")
             
-            response = requests.get(
+            jina_limiter = get_rate_limiter('jina')
+            jina_limiter.acquire()
+            # 共享会话：同一主机的请求复用 Keep-Alive 连接
+            response = get_http_session().get(
                 f"{self.base_url}/{url}",
                 headers=headers,
                 timeout=30  # 30秒超时
             )
             
+            if response.status_code == 429:
+                jina_limiter.on_throttle()
+            else:
+                jina_limiter.on_success()
+            
             if response.status_code == 200:
                 full_content = response.text
                 print(f"✅ [Scraper] 成功抓取全文 ({len(full_content)} 字符)")
@@ -282,11 +341,15 @@ class ScraperAgent:
         """
         try:
             print(f"📥 [Scraper] 使用备用方法抓取: {url[:80]}...")
-            response = requests.get(url, timeout=30, headers={
+            domain_limiter = get_rate_limiter('web', urlparse(url).netloc.lower())
+            domain_limiter.acquire()
+            response = get_http_session().get(url, timeout=30, headers={
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
                 'Accept-Language': 'en-US,en;q=0.5'
             }, allow_redirects=True)
+            if response.status_code == 429:
+                domain_limiter.on_throttle()
             
             if response.status_code == 200:
                 # 简单的文本提取（去除 HTML 标签）
@@ -335,10 +398,14 @@ class AnalystAgent:
     def __init__(self, gemini_api_key: str):
         genai.configure(api_key=gemini_api_key)
         self.model = None
+        self.model_name = 'models/gemini-1.5-pro'
         self._initialize_model()
     
-    def _initialize_model(self):
-        """初始化 Gemini 模型（优先使用 Pro）"""
+    def _initialize_model(self, refresh: bool = False):
+        """
+        初始化 Gemini 模型（优先使用 Pro）
+        探测结果在有效期内跨运行复用（.gifia/model_discovery.json），模型对象在进程内复用
+        """
         models_to_try = [
             'models/gemini-1.5-pro',  # 优先使用 Pro
             'models/gemini-2.5-flash',
@@ -346,20 +413,11 @@ class AnalystAgent:
             'models/gemini-flash-latest'
         ]
         
-        for model_name in models_to_try:
-            try:
-                model = genai.GenerativeModel(model_name)
-                # 简单测试
-                model.generate_content("test")
-                self.model = model
-                print(f"✅ [Analyst] 使用 Gemini 模型: {model_name}")
-                return
-            except Exception:
-                continue
-        
         # 如果都失败，使用默认模型
-        print(f"⚠️ [Analyst] 使用默认 Gemini 模型")
-        self.model = genai.GenerativeModel('models/gemini-1.5-pro')
+        self.model_name = ai_engine.discover_gemini_model(models_to_try, default='models/gemini-1.5-pro',
+                                                          refresh=refresh)
+        self.model = ai_engine.get_gemini_model(self.model_name)
+        print(f"✅ [Analyst] 使用 Gemini 模型: {self.model_name}")
     
     def analyze(self, url: str, title: str, full_content: str) -> Optional[Dict]:
         """
@@ -373,6 +431,9 @@ class AnalystAgent:
         返回:
             结构化案例数据字典，或 None（如果失败）
         """
+        # 按相关性保留窗口（导航、评论等模板文字优先舍弃），再限制长度避免超出 token 限制
+        full_content = reduce_content(full_content)[:50000]
+        
         prompt = f"""
 你是一位资深的保险反欺诈专家和法务分析师。请从以下网页全文内容中，深度分析保险欺诈案例，并提取结构化信息。
 
@@ -381,7 +442,7 @@ class AnalystAgent:
 链接: {url}
 
 【全文内容】
-{full_content[:50000]}  # 限制长度避免超出 token 限制
+{full_content}
 
 【分析要求】
 请严格按照以下要求进行深度分析：
@@ -435,30 +496,25 @@ class AnalystAgent:
         try:
             print(f"🧠 [Analyst] 正在深度分析案例...")
             
-            response = self.model.generate_content(prompt)
-            text = response.text.strip()
-            
-            # 清理可能的 Markdown 代码块标记
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.startswith("```"):
-                text = text[3:]
-            if text.endswith("```"):
-                text = text[:-3]
-            text = text.strip()
-            
-            # 清理控制字符（可能导致 JSON 解析失败）
-            import re
-            text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)  # 移除控制字符
+            # 相同模型 + 提示词 + 模板版本的响应直接从缓存读取
+            cache = get_llm_cache()
+            cache_key = make_cache_key(self.model_name, prompt, ANALYST_PROMPT_VERSION)
+            raw_text = cache.get(cache_key) if cache else None
+            from_cache = bool(raw_text)
+            if from_cache:
+                print(f"♻️  [Analyst] 命中 LLM 响应缓存，跳过 Gemini 调用")
+            else:
+                response = limited_call('gemini', self.model.generate_content, prompt, model=self.model_name)
+                raw_text = response.text
+                record_usage('gemini', self.model_name, 'analyst', prompt, raw_text, gemini_usage(response))
+            text = raw_text.strip()
             
-            # 解析 JSON
-            case_data = json.loads(text)
+            # 解析 JSON（自动修复常见格式问题），并校验必需字段
+            case_data = parse_case(text)
             
-            # 验证必需字段
-            required_fields = ['Time', 'Region', 'Characters', 'Event', 'Process', 'Result']
-            for field in required_fields:
-                if field not in case_data:
-                    case_data[field] = "未知"
+            # 解析成功的响应才写入缓存
+            if cache and not from_cache:
+                cache.set(cache_key, raw_text, model=self.model_name)
             
             # 验证 Process 字段长度
             if len(case_data.get('Process', '')) < 200:
@@ -477,6 +533,10 @@ class AnalystAgent:
             return None
         except Exception as e:
             print(f"❌ [Analyst] 分析失败: {str(e)}")
+            # 模型下线或无权限：清除探测缓存，下一个案例使用重新探测的模型
+            if ai_engine.is_model_unavailable_error(e):
+                ai_engine.report_model_failure(self.model_name)
+                self._initialize_model(refresh=True)
             return None
 
 
@@ -486,14 +546,16 @@ class CriticAgent:
     """
     质检员 Agent：负责验证提取结果的质量
     使用 GPT-4o-mini 对比原文和提取结果，确保没有虚构成分
+    由质检策略决定是否调用：低分或有风险信号的案例必须质检，高置信度案例按比例抽样
     """
     
-    def __init__(self, openai_api_key: Optional[str] = None):
+    def __init__(self, openai_api_key: Optional[str] = None, policy: Optional[CriticPolicy] = None):
         if openai_api_key:
-            self.client = OpenAI(api_key=openai_api_key)
+            self.client = get_openai_client(openai_api_key)
         else:
             self.client = openai_client
         self.model_name = "gpt-4o-mini"
+        self.policy = policy
     
     def validate(self, extracted_data: Dict, original_content: str, url: str) -> Tuple[bool, Dict]:
         """
@@ -513,7 +575,16 @@ class CriticAgent:
             print(f"⚠️ [Critic] OpenAI API Key 未设置，跳过质检")
             return True, {'skipped': True, 'reason': 'API Key 未设置'}
         
+        decision = self.policy.decide(extracted_data, original_content, url) if self.policy else None
+        if decision and not decision['run']:
+            print(f"⏭️  [Critic] 高置信度案例（质量分数 {decision['quality_score']:.2f}），未抽中质检")
+            self.policy.record(decision, None)
+            return True, {'skipped': True, 'reason': '高置信度，未抽中质检', 'policy': decision['policy']}
+        
         try:
+            if decision:
+                signals = f"，风险信号: {', '.join(decision['signals'])}" if decision['signals'] else ""
+                print(f"🔍 [Critic] 质检策略: {decision['policy']}（质量分数 {decision['quality_score']:.2f}{signals}）")
             print(f"🔍 [Critic] 正在验证提取结果质量...")
             
             # 构建验证 prompt
@@ -548,7 +619,9 @@ class CriticAgent:
 请开始验证：
 """
 
-            response = self.client.chat.completions.create(
+            response = limited_call(
+                'openai',
+                self.client.chat.completions.create,
                 model=self.model_name,
                 messages=[
                     {"role": "system", "content": "你是一位严格的质量检查员，专门验证AI提取信息的准确性。"},
@@ -559,26 +632,21 @@ class CriticAgent:
             )
             
             result_text = response.choices[0].message.content.strip() if response.choices else ""
+            record_usage('openai', self.model_name, 'critic', prompt, result_text, openai_usage(response))
             
             if not result_text:
                 print(f"⚠️ [Critic] 未获取到有效响应")
                 return True, {'skipped': True, 'reason': 'Empty response'}
             
-            # 清理可能的 Markdown 标记
-            if result_text.startswith("```json"):
-                result_text = result_text[7:]
-            if result_text.startswith("```"):
-                result_text = result_text[3:]
-            if result_text.endswith("```"):
-                result_text = result_text[:-3]
-            result_text = result_text.strip()
-            
-            # 解析验证结果
-            validation_result = json.loads(result_text)
+            # 解析验证结果（自动修复常见格式问题）
+            validation_result = parse_json(result_text, expect=dict)
             
             is_valid = validation_result.get('is_valid', False)
             issues = validation_result.get('issues', [])
             confidence = validation_result.get('confidence', 0.5)
+            if decision:
+                self.policy.record(decision, bool(is_valid))
+                validation_result['policy'] = decision['policy']
             
             if is_valid:
                 print(f"✅ [Critic] 验证通过（置信度: {confidence:.2f}）")
@@ -608,8 +676,7 @@ def check_duplicate(url: str) -> bool:
     if not supabase:
         return False
     try:
-        result = supabase.table('fraud_cases').select('id').eq('source_url', url).execute()
-        return len(result.data) > 0
+        return len(find_existing_cases(supabase, url)) > 0
     except Exception as e:
         print(f"⚠️ 查重失败: {str(e)}")
         return False
@@ -640,6 +707,7 @@ def save_to_supabase(case_data: Dict, validation_result: Optional[Dict] = None)
             'process': case_data.get('Process', '未知'),
             'result': case_data.get('Result', '未知'),
             'source_url': case_data.get('Source_URL', ''),
+            'canonical_url': canonical_or_none(case_data.get('Source_URL')),
             'created_at': case_data.get('Created_at', datetime.now().isoformat())
         }
         
@@ -651,7 +719,7 @@ def save_to_supabase(case_data: Dict, validation_result: Optional[Dict] = None)
                 insert_data['process'] += f" [验证置信度: {confidence:.2f}]"
         
         # 插入数据库
-        result = supabase.table('fraud_cases').insert(insert_data).execute()
+        result = insert_case(supabase, insert_data)
         
         if result.data:
             print(f"✅ 成功保存到数据库: {insert_data['event']}")
@@ -698,7 +766,9 @@ def main():
     print("🎯 聚焦: 寿险、健康险、意外险具体欺诈案例（排除财产保险和通用文章）")
     print("=" * 70)
     
-    scout = ScoutAgent(tavily_client)
+    # 查询规划器：按各查询变体的新案例产出轮换关键词组合
+    scout = ScoutAgent(tavily_client, classifier=load_classifier(),
+                       query_planner=get_query_planner('agent_v2', CASE_SPECIFIC_KEYWORDS, INSURANCE_TYPES))
     search_results = scout.search(
         base_query=None,  # 不再使用基础查询
         max_results=15  # 搜索更多以筛选差异性
@@ -708,6 +778,14 @@ def main():
         print("⚠️ 未搜索到任何符合条件的案例，程序退出")
         return
     
+    # 水位线：上次运行已有结论的 URL 不再查重和处理
+    watermark = get_search_watermark('agent_v2')
+    search_results = split_new_results(watermark, search_results)
+    if not search_results:
+        print("✅ 没有新的搜索结果，程序退出")
+        print_search_cache_stats()
+        return
+    
     # ========== 筛选确保案例差异性 ==========
     print(f"\n🔍 [Scout] 筛选确保案例差异性...")
     
@@ -800,7 +878,7 @@ def main():
     
     scraper = ScraperAgent(JINA_API_KEY)
     analyst = AnalystAgent(GEMINI_API_KEY)
-    critic = CriticAgent(OPENAI_API_KEY)
+    critic = CriticAgent(OPENAI_API_KEY, policy=CriticPolicy())
     
     saved_count = 0
     skipped_count = 0
@@ -821,6 +899,8 @@ def main():
         if check_duplicate(url):
             print(f"⏭️  跳过: URL 已存在（去重）")
             skipped_count += 1
+            if watermark:
+                watermark.mark(url, 'duplicate', search_result.get('published_date'))
             continue
         
         # ========== 步骤 2: The Scraper ==========
@@ -874,15 +954,14 @@ def main():
         if save_to_supabase(extracted_data, validation_result):
             saved_count += 1
             print(f"✅ 案例保存成功")
+            record_query_yield(search_result)
+            if watermark:
+                watermark.mark(url, 'saved', search_result.get('published_date'))
         else:
             failed_count += 1
             print(f"❌ 保存失败")
         
-        # 避免 API 限流
-        if i < len(top_links):
-            wait_time = 15
-            print(f"\n⏳ 等待 {wait_time} 秒以避免 API 限流...")
-            time.sleep(wait_time)
+        # API 限流由共享的自适应限流器控制，无需固定等待
     
     # ========== 输出统计信息 ==========
     print("\n" + "=" * 70)
@@ -893,6 +972,11 @@ def main():
     print(f"❌ 失败: {failed_count} 个案例")
     print(f"📈 总计处理: {len(top_links)} 个高质量案例")
     print(f"🔍 Scout 搜索: {len(search_results)} 个结果（选择前{len(top_links)}个）")
+    critic.policy.stats.print_stats()
+    if scout.query_planner:
+        scout.query_planner.print_stats()
+    print_usage_report()
+    print_search_cache_stats()
     print("=" * 70)
 
 
@@ -7,14 +7,31 @@ Global Insurance Fraud Intelligence Agent (GIFIA) v3.0 - 云端情报站
 import os
 import json
 import time
-import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from difflib import SequenceMatcher
 from supabase import create_client, Client
 import google.generativeai as genai
 from tavily import TavilyClient
-from openai import OpenAI
+import ai_engine
+from llm_cache import print_cache_stats
+from usage_meter import print_usage_report
+from rate_limiter import limited_call
+from search_cache import cached_search, print_search_cache_stats
+from url_canonical import canonical_or_none, canonical_url, find_existing_cases, insert_case, url_key
+from pipeline import PipelineStage, StagePipeline
+from run_journal import RunJournal
+from budget_planner import BudgetPlanner
+from content_reducer import reduce_content
+from batch_extractor import REQUIRED_FIELDS
+from structured_output import CASE_SCHEMA, parse_case
+from work_claims import WorkClaimer, get_work_claimer
+from case_classifier import CaseClassifier, prefilter, record_outcome, refresh_classifier
+from case_quality import score_case
+from search_watermark import SearchWatermark, get_search_watermark, split_new_results
+from query_planner import QUERY_PLANNER_SEARCHES, QueryPlanner, get_query_planner, record_query_yield
 
 # 尝试导入 Firecrawl（兼容不同的导入方式）
 try:
@@ -37,6 +54,16 @@ FIRECRAWL_API_KEY = os.getenv("FIRECRAWL_API_KEY")  # 新增：Firecrawl API
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
+# 深度研究并发度（同时处理的 URL 数量）与每次处理案例数量的上限
+# DEEP_RESEARCH_MAX_CASES=0 表示不设上限，由预算规划器根据截止时间和调用预算决定
+DEEP_RESEARCH_CONCURRENCY = int(os.getenv("DEEP_RESEARCH_CONCURRENCY", "3"))
+DEEP_RESEARCH_MAX_CASES = int(os.getenv("DEEP_RESEARCH_MAX_CASES", "3"))
+# 设置为 1 时使用分阶段流水线（各阶段独立线程池 + 有界队列）
+DEEP_RESEARCH_PIPELINE = os.getenv("DEEP_RESEARCH_PIPELINE", "0") == "1"
+
+# Analyst 提示词模板版本：修改 AnalystAgent.analyze 中的提示词时递增，使 LLM 响应缓存失效
+ANALYST_PROMPT_VERSION = "3.0"
+
 # 初始化客户端
 tavily_client = TavilyClient(api_key=TAVILY_API_KEY)
 genai.configure(api_key=GEMINI_API_KEY)
@@ -54,33 +81,44 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL and
 
 # ==================== Agent 1: The Scout (侦察员) ====================
 
+# 专业关键词：确保找到具体案例而非通用文章（查询规划器在构造 ScoutAgent 前也需要）
+CASE_SPECIFIC_KEYWORDS = [
+    'charged with fraud',
+    'convicted of fraud',
+    'fraud case',
+    'fraud scheme',
+    'arrested for insurance fraud',
+    'sentenced for insurance fraud'
+]
+
+# 保险类型关键词：只关注寿险、健康险、意外险
+INSURANCE_TYPES = [
+    'life insurance fraud',
+    'health insurance fraud',
+    'accident insurance fraud',
+    'medical insurance fraud',
+    'disability insurance fraud'
+]
+
+
 class ScoutAgent:
     """
     侦察员 Agent：负责搜索高质量的保险欺诈案例
-    使用 Tavily API 执行高级搜索
+    使用 Tavily API 执行高级搜索，关键词过滤后由本地预分类器丢弃非案例页面
     """
     
-    def __init__(self, tavily_client: TavilyClient):
+    def __init__(self, tavily_client: TavilyClient, classifier: Optional[CaseClassifier] = None,
+                 query_planner: Optional[QueryPlanner] = None):
         self.client = tavily_client
+        self.classifier = classifier
+        # 查询规划器：按历史产出轮换关键词组合（为 None 时使用 build_query() 的固定查询）
+        self.query_planner = query_planner
         
         # 专业关键词：确保找到具体案例而非通用文章
-        self.case_specific_keywords = [
-            'charged with fraud',
-            'convicted of fraud',
-            'fraud case',
-            'fraud scheme',
-            'arrested for insurance fraud',
-            'sentenced for insurance fraud'
-        ]
+        self.case_specific_keywords = list(CASE_SPECIFIC_KEYWORDS)
         
         # 保险类型关键词：只关注寿险、健康险、意外险
-        self.insurance_types = [
-            'life insurance fraud',
-            'health insurance fraud',
-            'accident insurance fraud',
-            'medical insurance fraud',
-            'disability insurance fraud'
-        ]
+        self.insurance_types = list(INSURANCE_TYPES)
         
         # 排除关键词：排除财产保险
         self.exclude_keywords = [
@@ -104,54 +142,76 @@ class ScoutAgent:
     def search(self, max_results: int = 15) -> List[Dict]:
         """
         搜索全球保险欺诈案例（高级模式）
+        启用查询规划器时，按历史产出选择 QUERY_PLANNER_SEARCHES 个查询变体，结果按 URL 合并
         
         返回:
-            搜索结果列表，按质量分数排序
+            搜索结果列表，按质量分数排序（来自规划器的结果带有 query_variant / query_source）
         """
         try:
-            enhanced_query = self.build_query()
-            
-            print(f"🔍 [Scout] 正在执行高级搜索...")
-            print(f"   📋 关键词: {enhanced_query[:120]}...")
-            
-            response = self.client.search(
-                query=enhanced_query,
-                search_depth="advanced",  # 高级搜索模式
-                max_results=max_results,
-                include_domains=None,
-                include_answer=True,
-                include_raw_content=False,
-            )
-            
+            variants = self.query_planner.select(QUERY_PLANNER_SEARCHES) if self.query_planner else [None]
             results = []
-            for item in response.get('results', []):
-                url = item.get('url', '')
-                title = item.get('title', '').lower()
-                content = item.get('content', '').lower()
+            seen_urls = set()
+            for variant in variants:
+                enhanced_query = variant['query'] if variant else self.build_query()
+                case_keywords = self.case_specific_keywords + (variant['match_keywords'] if variant else [])
                 
-                # 过滤通用文章和财产保险
-                should_exclude = False
-                generic_keywords = ['market report', 'market size', 'industry outlook', 'forecast', 'trends']
-                for keyword in generic_keywords:
-                    if keyword in title or keyword in content:
-                        should_exclude = True
-                        break
+                label = f"（查询变体 {variant['id']}）" if variant else ""
+                print(f"🔍 [Scout] 正在执行高级搜索{label}...")
+                print(f"   📋 关键词: {enhanced_query[:120]}...")
                 
-                for exclude_keyword in self.exclude_keywords:
-                    if exclude_keyword in title or exclude_keyword in content:
-                        should_exclude = True
-                        break
+                response = cached_search(
+                    self.client,
+                    query=enhanced_query,
+                    search_depth="advanced",  # 高级搜索模式
+                    max_results=max_results,
+                    include_domains=None,
+                    include_answer=True,
+                    include_raw_content=False,
+                )
                 
-                has_case_keyword = any(kw in title or kw in content for kw in self.case_specific_keywords)
+                found = 0
+                for item in response.get('results', []):
+                    url = item.get('url', '')
+                    key = canonical_url(url)  # 本地去重按规范化 URL，抓取和保存使用原始 URL
+                    title = item.get('title', '').lower()
+                    content = item.get('content', '').lower()
+                    
+                    # 过滤通用文章和财产保险
+                    should_exclude = key in seen_urls
+                    generic_keywords = ['market report', 'market size', 'industry outlook', 'forecast', 'trends']
+                    for keyword in generic_keywords:
+                        if keyword in title or keyword in content:
+                            should_exclude = True
+                            break
+                    
+                    for exclude_keyword in self.exclude_keywords:
+                        if exclude_keyword in title or exclude_keyword in content:
+                            should_exclude = True
+                            break
+                    
+                    has_case_keyword = any(kw in title or kw in content for kw in case_keywords)
+                    
+                    if not should_exclude and has_case_keyword:
+                        seen_urls.add(key)
+                        found += 1
+                        result = {
+                            'url': url,
+                            'canonical_url': key,
+                            'title': item.get('title', ''),
+                            'content': item.get('content', ''),
+                            'score': item.get('score', 0),
+                            'published_date': item.get('published_date'),
+                        }
+                        if variant:
+                            result['query_variant'] = variant['id']
+                            result['query_source'] = self.query_planner.source
+                        results.append(result)
                 
-                if not should_exclude and has_case_keyword:
-                    results.append({
-                        'url': url,
-                        'title': item.get('title', ''),
-                        'content': item.get('content', ''),
-                        'score': item.get('score', 0)
-                    })
+                if variant:
+                    self.query_planner.record_search(variant['id'], found)
             
+            # 本地预分类：案例概率过低的页面不再交给 Firecrawl 和 Gemini（少量低分页面抽样放行，由 Validator 打标签）
+            results = prefilter(results, self.classifier)
             results.sort(key=lambda x: x.get('score', 0), reverse=True)
             
             print(f"✅ [Scout] 搜索完成：找到 {len(results)} 个符合条件的案例")
@@ -193,7 +253,7 @@ class ResearcherAgent:
             
             # 调用 FirecrawlApp 的 scrape 方法
             # Firecrawl 的正确调用方式：app.scrape(url) - 只传 URL
-            result = self.app.scrape(url)
+            result = limited_call('firecrawl', self.app.scrape, url)
             
             # Firecrawl 返回 Document 对象
             if result:
@@ -274,10 +334,18 @@ class AnalystAgent:
     def __init__(self, gemini_api_key: str):
         genai.configure(api_key=gemini_api_key)
         self.model = None
+        self.model_name = 'models/gemini-2.5-flash'
+        self._model_lock = threading.Lock()
         self._initialize_model()
     
-    def _initialize_model(self):
-        """初始化 Gemini 模型（优先使用 Pro，如果不可用则使用 Flash）"""
+    def _initialize_model(self, refresh: bool = False):
+        """
+        初始化 Gemini 模型（优先使用 Pro，如果不可用则使用 Flash）
+        探测结果在有效期内跨运行复用（.gifia/model_discovery.json），模型对象在进程内复用
+        
+        参数:
+            refresh: 当前模型不可用时重新探测
+        """
         models_to_try = [
             'models/gemini-2.5-flash',  # 优先使用最新 Flash（更稳定）
             'models/gemini-2.0-flash',
@@ -285,24 +353,35 @@ class AnalystAgent:
             'models/gemini-flash-latest'
         ]
         
-        last_error = None
-        for model_name in models_to_try:
-            try:
-                model = genai.GenerativeModel(model_name)
-                # 简单测试调用
-                response = model.generate_content("test")
-                self.model = model
-                print(f"✅ [Analyst] 使用 Gemini 模型: {model_name}")
-                return
-            except Exception as e:
-                last_error = str(e)
-                continue
-        
-        # 如果都失败，使用最新 Flash 作为默认（即使可能失败）
-        print(f"⚠️ [Analyst] 无法验证模型，使用默认模型 models/gemini-2.5-flash")
-        if last_error:
-            print(f"   最后的错误: {last_error[:100]}")
-        self.model = genai.GenerativeModel('models/gemini-2.5-flash')
+        # 如果都探测失败，使用最新 Flash 作为默认（即使可能失败）
+        self.model_name = ai_engine.discover_gemini_model(
+            models_to_try, default='models/gemini-2.5-flash', refresh=refresh
+        )
+        self.model = ai_engine.get_gemini_model(self.model_name)
+        print(f"✅ [Analyst] 使用 Gemini 模型: {self.model_name}")
+    
+    def _analysis_options(self) -> Dict:
+        """AI 调用参数（同时决定 LLM 响应缓存键）"""
+        return {
+            'system_prompt': "你是一位资深保险反欺诈分析师，擅长从长文中抽取严格结构化信息。",
+            'max_tokens': 4000,
+            'models': [self.model_name],
+            'prompt_version': ANALYST_PROMPT_VERSION,
+        }
+    
+    def _get_ai_analysis_with_failover(self, prompt: str) -> Optional[str]:
+        """
+        Failover 调用：优先使用已选定的 Gemini 模型，失败或限额后切换到 DeepSeek 备份引擎
+        调用经过共享的自适应限流器，多个线程共享服务商和模型配额；相同提示词直接命中缓存
+        """
+        # 选定的模型已被报告不可用（下线、无权限等）时重新探测
+        with self._model_lock:
+            if ai_engine.model_failed(self.model_name):
+                print(f"🔄 [Analyst] 模型 {self.model_name} 不可用，重新探测...")
+                self._initialize_model(refresh=True)
+        # 流式输出并增量校验：结构错误或缺少必需字段时提前中止，换下一个模型
+        return ai_engine.get_ai_analysis(prompt, required_keys=REQUIRED_FIELDS, response_schema=CASE_SCHEMA,
+                                         stage="analyst", **self._analysis_options())
     
     def analyze(self, url: str, title: str, markdown_content: str) -> Optional[Dict]:
         """
@@ -317,7 +396,8 @@ class AnalystAgent:
         返回:
             结构化案例数据字典
         """
-        # 限制内容长度，避免超出 token 限制
+        # 按相关性保留窗口（导航、评论等模板文字优先舍弃），再限制内容长度，避免超出 token 限制
+        markdown_content = reduce_content(markdown_content)
         max_length = 50000
         if len(markdown_content) > max_length:
             markdown_content = markdown_content[:max_length] + "\n\n[内容已截断...]"
@@ -420,28 +500,8 @@ class AnalystAgent:
                 print(f"❌ AI 分析失败（主引擎和备份引擎都失败）")
                 return None
             
-            text = text.strip()
-            
-            # 清理可能的 Markdown 代码块标记
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.startswith("```"):
-                text = text[3:]
-            if text.endswith("```"):
-                text = text[:-3]
-            text = text.strip()
-            
-            # 清理控制字符
-            text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
-            
-            # 解析 JSON
-            case_data = json.loads(text)
-            
-            # 验证必需字段
-            required_fields = ['Time', 'Region', 'Characters', 'Event', 'Process', 'Result']
-            for field in required_fields:
-                if field not in case_data:
-                    case_data[field] = "未知"
+            # 解析 JSON（自动修复常见格式问题），并校验必需字段
+            case_data = parse_case(text)
             
             # 验证 Process 字段长度
             process = case_data.get('Process', '')
@@ -464,6 +524,8 @@ class AnalystAgent:
         except json.JSONDecodeError as e:
             print(f"❌ [Analyst] JSON 解析失败: {str(e)}")
             print(f"   原始响应前500字符: {text[:500] if 'text' in locals() else 'N/A'}")
+            # 无法解析的响应不保留在缓存中，下次重新调用
+            ai_engine.forget_cached_analysis(prompt, **self._analysis_options())
             return None
         except Exception as e:
             print(f"❌ [Analyst] 分析失败: {str(e)}")
@@ -493,74 +555,12 @@ class ValidatorAgent:
         try:
             print(f"🔍 [Validator] 正在校验提取结果质量...")
             
-            issues = []
-            scores = {}
-            
-            # 检查6个维度
-            required_fields = ['Time', 'Region', 'Characters', 'Event', 'Process', 'Result']
-            
-            for field in required_fields:
-                value = extracted_data.get(field, '')
-                
-                # 检查字段是否存在且非空
-                if not value or value in ['未知', '待补充', '']:
-                    issues.append(f"字段 {field} 缺失或为空")
-                    scores[field] = 0
-                else:
-                    scores[field] = 1
-            
-            # 特别检查 Process 字段的质量
-            process = extracted_data.get('Process', '')
-            process_score = 0
-            process_issues = []
-            
-            if len(process) < 400:
-                process_issues.append(f"Process 字段过短 ({len(process)} 字符，要求至少 400 字符)")
-                process_score = 0.3
-            elif len(process) < 600:
-                process_score = 0.6
-            else:
-                process_score = 1.0
-            
-            # 检查是否包含三个关键部分
-            required_parts = ['作案', '逃避', '破绽']
-            for part in required_parts:
-                if part not in process:
-                    process_issues.append(f"Process 缺少 '{part}' 部分")
-                    process_score = max(0, process_score - 0.2)
-            
-            # 检查破绽细节
-            red_flag_keywords = ['破绽', '发现', '调查', '证据', '异常', 'red flag']
-            has_red_flag = any(keyword in process.lower() for keyword in red_flag_keywords)
-            if not has_red_flag or '信息缺失' in process:
-                process_issues.append("Process 缺少破绽细节 (The Red Flag)")
-                process_score = max(0, process_score - 0.3)
-            
-            if process_issues:
-                issues.extend(process_issues)
-            
-            scores['Process'] = process_score
-            
-            # 计算总体质量分数
-            overall_score = sum(scores.values()) / len(scores)
-            
-            # 判断是否通过验证（总分 >= 0.7 且 Process >= 0.6）
-            is_valid = overall_score >= 0.7 and process_score >= 0.6
-            
-            validation_result = {
-                'is_valid': is_valid,
-                'overall_score': overall_score,
-                'process_score': process_score,
-                'scores': scores,
-                'issues': issues,
-                'suggestions': []
-            }
-            
-            if not is_valid:
-                if process_score < 0.6:
-                    validation_result['suggestions'].append("Process 字段质量不足，建议重试下一个链接")
-                if overall_score < 0.7:
-                    validation_result['suggestions'].append("整体质量不足，建议重新提取")
+            # 6 个维度 + Process 质量的规则评分（与 agent_v2 的 Critic 策略共用）
+            validation_result = score_case(extracted_data)
+            is_valid = validation_result['is_valid']
+            overall_score = validation_result['overall_score']
+            process_score = validation_result['process_score']
+            issues = validation_result['issues']
             
             if is_valid:
                 print(f"✅ [Validator] 验证通过 (质量分数: {overall_score:.2f}, Process: {process_score:.2f})")
@@ -603,8 +603,7 @@ def check_duplicate(url: str, title: str = "") -> Tuple[bool, Optional[str]]:
     
     try:
         # 方法1: 检查 URL 是否完全一致
-        result = supabase.table('fraud_cases').select('id, source_url, event').eq('source_url', url).execute()
-        if result.data and len(result.data) > 0:
+        if find_existing_cases(supabase, url, 'id, source_url, event'):
             return True, "URL 完全匹配"
         
         # 方法2: 如果提供了标题，检查标题相似度
@@ -646,6 +645,7 @@ def save_to_supabase(case_data: Dict, validation_result: Optional[Dict] = None)
             'process': case_data.get('Process', '未知'),
             'result': case_data.get('Result', '未知'),
             'source_url': case_data.get('Source_URL', ''),
+            'canonical_url': canonical_or_none(case_data.get('Source_URL')),
             'created_at': case_data.get('Created_at', datetime.now().isoformat())
         }
         
@@ -655,7 +655,7 @@ def save_to_supabase(case_data: Dict, validation_result: Optional[Dict] = None)
             if overall_score < 1.0:
                 insert_data['process'] += f" [质量分数: {overall_score:.2f}]"
         
-        result = supabase.table('fraud_cases').insert(insert_data).execute()
+        result = insert_case(supabase, insert_data)
         
         if result.data:
             print(f"✅ 成功保存到数据库: {insert_data['event']}")
@@ -671,114 +671,309 @@ def save_to_supabase(case_data: Dict, validation_result: Optional[Dict] = None)
 
 # ==================== 深度研究流程 ====================
 
-def deep_research_flow(search_results: List[Dict], max_cases: int = 3) -> Dict:
+# 各阶段处理函数共用一个上下文字典：
+# {'search_result', 'label', 'journal', 'planner', 'claimer', 'scraped_data', 'extracted_data',
+#  'validation_result', 'status', 'retry'}
+# 阶段返回上下文表示继续下一阶段，返回 None 表示该案例已结束（结果写入 ctx['status']）
+# ctx['journal'] 为运行日志（RunJournal），已完成的阶段直接从日志恢复，不再重复调用外部 API
+# ctx['planner'] 为预算规划器（BudgetPlanner），预算用完后尚未开始的阶段被取消（status 为 'cancelled'）
+# ctx['claimer'] 为任务认领器（WorkClaimer），查重通过后认领 URL，多个 Worker 之间不重复处理
+# ctx['watermark'] 为搜索水位线（SearchWatermark），有结论（保存 / 重复 / 未通过校验）的 URL 下次运行不再处理
+
+def _case_tag(ctx: Dict) -> str:
+    return f"[{ctx['label']}] " if ctx.get('label') else ""
+
+
+def _mark_seen(ctx: Dict, outcome: str):
+    watermark = ctx.get('watermark')
+    if watermark:
+        watermark.mark(ctx['search_result']['url'], outcome, ctx['search_result'].get('published_date'))
+
+
+def stage_dedup(ctx: Dict) -> Optional[Dict]:
+    """阶段 0：查重检查"""
+    url = ctx['search_result']['url']
+    title = ctx['search_result']['title']
+    tag = _case_tag(ctx)
+    
+    print(f"\n{'='*70}")
+    print(f"📦 {tag}处理案例")
+    print(f"{'='*70}")
+    print(f"🔗 {tag}URL: {url[:80]}...")
+    print(f"📄 {tag}标题: {title}")
+    
+    journal = ctx.get('journal')
+    key = url_key(ctx['search_result'])  # 运行日志和认领按规范化 URL 记录
+    if journal and journal.is_saved(key):
+        print(f"⏭️  {tag}跳过: 运行日志显示已保存")
+        ctx['status'] = 'skipped'
+        _mark_seen(ctx, 'saved')
+        return None
+    
+    is_duplicate, reason = check_duplicate(url, title)
+    if is_duplicate:
+        print(f"⏭️  {tag}跳过: 重复案例 ({reason})")
+        ctx['status'] = 'skipped'
+        _mark_seen(ctx, 'duplicate')
+        return None
+    
+    claimer = ctx.get('claimer')
+    if claimer:
+        if not claimer.try_claim(key):
+            print(f"⏭️  {tag}跳过: 已由其他 Worker 认领（或不属于本分片）")
+            ctx['status'] = 'skipped'
+            return None
+        ctx['claimed'] = True
+    return ctx
+
+
+def stage_research(ctx: Dict, researcher: ResearcherAgent) -> Optional[Dict]:
+    """阶段 1：Researcher Agent 深度抓取全文"""
+    tag = _case_tag(ctx)
+    url = ctx['search_result']['url']
+    journal = ctx.get('journal')
+    print(f"\n📥 {tag}[Step 1] Researcher Agent - 深度抓取全文...")
+    
+    scraped_data = journal.stage_data(url_key(ctx['search_result']), 'scraped') if journal else None
+    if scraped_data:
+        print(f"♻️  {tag}从运行日志恢复抓取结果，跳过 Firecrawl 调用")
+    else:
+        scraped_data = researcher.scrape_url(url)
+        if not scraped_data:
+            print(f"❌ {tag}Researcher 失败，跳过此案例")
+            ctx['status'] = 'failed'
+            return None
+        if journal:
+            journal.record(url_key(ctx['search_result']), 'scraped', scraped_data)
+    
+    print(f"✅ {tag}Researcher 完成：获取 {scraped_data['content_length']} 字符 Markdown 全文")
+    ctx['scraped_data'] = scraped_data
+    return ctx
+
+
+def stage_analyze(ctx: Dict, analyst: AnalystAgent) -> Optional[Dict]:
+    """阶段 2：Analyst Agent 深度分析提取信息"""
+    tag = _case_tag(ctx)
+    url = ctx['search_result']['url']
+    journal = ctx.get('journal')
+    print(f"\n🧠 {tag}[Step 2] Analyst Agent - 深度分析提取信息...")
+    
+    extracted_data = journal.stage_data(url_key(ctx['search_result']), 'analyzed') if journal else None
+    if extracted_data:
+        print(f"♻️  {tag}从运行日志恢复分析结果，跳过 AI 调用")
+    else:
+        print(f"   💡 特别关注：破绽细节 (The Red Flag) 挖掘...")
+        extracted_data = analyst.analyze(
+            url,
+            ctx['search_result']['title'],
+            ctx['scraped_data']['markdown_content'],
+        )
+        if not extracted_data:
+            print(f"❌ {tag}Analyst 失败，跳过此案例")
+            ctx['status'] = 'failed'
+            return None
+        if journal:
+            journal.record(url_key(ctx['search_result']), 'analyzed', extracted_data)
+    
+    print(f"✅ {tag}Analyst 完成：成功提取结构化信息")
+    ctx['extracted_data'] = extracted_data
+    return ctx
+
+
+def stage_validate_and_save(ctx: Dict, validator: ValidatorAgent) -> Optional[Dict]:
+    """阶段 3：Validator Agent 校验质量，并保存到数据库"""
+    tag = _case_tag(ctx)
+    key = url_key(ctx['search_result'])
+    journal = ctx.get('journal')
+    print(f"\n🔍 {tag}[Step 3] Validator Agent - 校验提取质量...")
+    is_valid, validation_result = validator.validate(ctx['extracted_data'])
+    ctx['validation_result'] = validation_result
+    if journal:
+        journal.record(key, 'validated', validation_result)
+    
+    if not is_valid:
+        print(f"⚠️ {tag}Validator 未通过验证：质量不足")
+        
+        # 如果是 Process 字段质量不足，标记为重试
+        process_score = validation_result.get('process_score', 0)
+        if process_score < 0.6:
+            print(f"   💡 建议：Process 字段质量不足，可以重试下一个链接")
+            ctx['retry'] = True
+            # 可以选择：1) 跳过此案例 2) 标记保存但标注低质量
+            # 当前策略：标记保存但标注低质量
+            print(f"   📝 标记为低质量案例，但仍保存到数据库")
+        else:
+            ctx['status'] = 'failed'
+            if 'error' not in validation_result:
+                _mark_seen(ctx, 'rejected')
+                # 最终结果作为预分类器的训练样本：拒绝为非案例（Process 不足但仍保存的低质量案例不算）
+                record_outcome(ctx['search_result'], 0, 'validator')
+            return None
+    
+    # ========== 保存到数据库 ==========
+    print(f"\n💾 {tag}保存到数据库...")
+    if save_to_supabase(ctx['extracted_data'], validation_result):
+        print(f"✅ {tag}案例保存成功")
+        ctx['status'] = 'saved'
+        if journal:
+            journal.record(key, 'saved')
+        _mark_seen(ctx, 'saved')
+        record_query_yield(ctx['search_result'])
+        record_outcome(ctx['search_result'], 1, 'validator')
+    else:
+        ctx['status'] = 'failed'
+    return ctx
+
+
+def _finish_case(ctx: Dict):
+    """案例结束：记录耗时到预算规划器，并释放认领（保存成功标记为完成，否则其他 Worker 可以重试）"""
+    planner = ctx.get('planner')
+    if planner:
+        planner.record_case(time.monotonic() - ctx['started_at'])
+    # 只释放本上下文认领的 URL（认领失败时该 URL 可能正由其他上下文处理）
+    claimer = ctx.get('claimer')
+    if claimer and ctx.get('claimed'):
+        claimer.finish(url_key(ctx['search_result']), done=ctx['status'] == 'saved')
+
+
+def tracked(step: Callable[[Dict], Optional[Dict]], last: bool = False) -> Callable[[Dict], Optional[Dict]]:
+    """
+    为阶段函数加上预算检查：预算用完时不再开始新的阶段（已完成的阶段保留在运行日志中，下次运行继续）
+    案例结束（阶段返回 None 或最后一个阶段完成）时调用 _finish_case
+    """
+    def run(ctx: Dict) -> Optional[Dict]:
+        ctx.setdefault('started_at', time.monotonic())
+        planner = ctx.get('planner')
+        if planner and planner.should_stop():
+            print(f"⏹️  {_case_tag(ctx)}预算用完，取消剩余阶段")
+            ctx['status'] = 'cancelled'
+            _finish_case(ctx)
+            return None
+        try:
+            result = step(ctx)
+        except Exception:
+            _finish_case(ctx)
+            raise
+        if result is None or last:
+            _finish_case(ctx)
+        return result
+    return run
+
+
+def process_single_case(ctx: Dict, researcher: ResearcherAgent, analyst: AnalystAgent,
+                        validator: ValidatorAgent) -> Dict:
+    """
+    串行处理单个案例：查重 -> Researcher -> Analyst -> Validator -> 保存
+    
+    返回:
+        处理后的上下文（ctx['status'] 为 'saved' / 'skipped' / 'failed' / 'cancelled'）
+    """
+    steps = [
+        tracked(stage_dedup),
+        tracked(lambda c: stage_research(c, researcher)),
+        tracked(lambda c: stage_analyze(c, analyst)),
+        tracked(lambda c: stage_validate_and_save(c, validator), last=True),
+    ]
+    for step in steps:
+        if step(ctx) is None:
+            break
+    return ctx
+
+
+def deep_research_flow(search_results: List[Dict], max_cases: int = 3,
+                       concurrency: Optional[int] = None, use_pipeline: Optional[bool] = None,
+                       journal: Optional[RunJournal] = None, planner: Optional[BudgetPlanner] = None,
+                       claimer: Optional[WorkClaimer] = None, watermark: Optional[SearchWatermark] = None) -> Dict:
     """
     深度研究流程：串联 Scout -> Researcher -> Analyst -> Validator
+    API 限流由各服务商的共享限流器控制（不再固定等待 15 秒）
+    
+    两种并发模式：
+        - 默认：每个工作线程完整处理一个 URL，最多 concurrency 个 URL 同时进行
+        - 流水线（use_pipeline）：每个阶段独立的线程池和有界队列，
+          抓取第 N+1 个 URL 的同时分析第 N 个 URL
     
     参数:
         search_results: Scout 搜索的结果列表
-        max_cases: 最多处理的案例数量
+        max_cases: 最多处理的案例数量（0 表示不设上限）
+        concurrency: 并发度（默认读取 DEEP_RESEARCH_CONCURRENCY，1 表示串行）
+        use_pipeline: 是否使用分阶段流水线（默认读取 DEEP_RESEARCH_PIPELINE）
+        journal: 运行日志（默认使用 .gifia/run_journal.db），中断后重跑时从已完成阶段继续
+        planner: 预算规划器（可选），根据剩余时间和调用预算缩减处理数量，预算用完时取消剩余工作
+        claimer: 任务认领器（默认按 WORK_CLAIM_BACKEND 创建），多个 Worker 同时运行时不重复处理同一 URL
+        watermark: 搜索水位线（可选），记录有结论的 URL，下次运行在搜索后直接跳过
     
     返回:
         处理结果统计字典
     """
+    if concurrency is None:
+        concurrency = DEEP_RESEARCH_CONCURRENCY
+    concurrency = max(1, concurrency)
+    if use_pipeline is None:
+        use_pipeline = DEEP_RESEARCH_PIPELINE
+    if journal is None:
+        journal = RunJournal(pipeline='deep_research')
+    own_claimer = claimer is None
+    if own_claimer:
+        claimer = get_work_claimer(supabase)
+    
     print("\n" + "=" * 70)
-    print("🔄 开始深度研究流程")
+    print(f"🔄 开始深度研究流程（并发度: {concurrency}{'，流水线模式' if use_pipeline else ''}）")
     print("=" * 70)
     
-    # 初始化各个 Agent
+    # 初始化各个 Agent（所有工作线程共享）
     researcher = ResearcherAgent(firecrawl_app)
     analyst = AnalystAgent(GEMINI_API_KEY)
     validator = ValidatorAgent()
     
-    # 选择前 max_cases 个高质量链接
-    top_links = search_results[:max_cases]
+    # 选择前 max_cases 个高质量链接，再由预算规划器按剩余时间和调用预算缩减
+    top_links = search_results[:max_cases] if max_cases > 0 else list(search_results)
+    if planner:
+        top_links = top_links[:planner.plan(len(top_links), concurrency)]
+    total = len(top_links)
+    contexts = [
+        {'search_result': search_result, 'label': f"{i}/{total}", 'journal': journal, 'planner': planner,
+         'claimer': claimer, 'watermark': watermark, 'status': 'failed', 'retry': False}
+        for i, search_result in enumerate(top_links, 1)
+    ]
     
-    saved_count = 0
-    skipped_count = 0
-    failed_count = 0
-    retry_count = 0
+    if use_pipeline:
+        pipeline = StagePipeline([
+            PipelineStage('dedup', tracked(stage_dedup), workers=1),
+            PipelineStage('researcher', tracked(lambda c: stage_research(c, researcher)), workers=concurrency),
+            PipelineStage('analyst', tracked(lambda c: stage_analyze(c, analyst)), workers=concurrency),
+            PipelineStage('validator', tracked(lambda c: stage_validate_and_save(c, validator), last=True),
+                          workers=1),
+        ])
+        pipeline.run(contexts)
+        pipeline.print_stats()
+    elif concurrency == 1:
+        for ctx in contexts:
+            process_single_case(ctx, researcher, analyst, validator)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(process_single_case, ctx, researcher, analyst, validator)
+                for ctx in contexts
+            ]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"❌ 案例处理异常: {str(e)}")
     
-    for i, search_result in enumerate(top_links, 1):
-        url = search_result['url']
-        title = search_result['title']
-        
-        print(f"\n{'='*70}")
-        print(f"📦 处理案例 {i}/{len(top_links)}")
-        print(f"{'='*70}")
-        print(f"🔗 URL: {url[:80]}...")
-        print(f"📄 标题: {title}")
-        
-        # 查重检查
-        is_duplicate, reason = check_duplicate(url, title)
-        if is_duplicate:
-            print(f"⏭️  跳过: 重复案例 ({reason})")
-            skipped_count += 1
-            continue
-        
-        # ========== Step 1: Researcher Agent ==========
-        print(f"\n📥 [Step 1] Researcher Agent - 深度抓取全文...")
-        scraped_data = researcher.scrape_url(url)
-        
-        if not scraped_data:
-            print(f"❌ Researcher 失败，跳过此案例")
-            failed_count += 1
-            continue
-        
-        markdown_content = scraped_data['markdown_content']
-        print(f"✅ Researcher 完成：获取 {scraped_data['content_length']} 字符 Markdown 全文")
-        
-        # ========== Step 2: Analyst Agent ==========
-        print(f"\n🧠 [Step 2] Analyst Agent - 深度分析提取信息...")
-        print(f"   💡 特别关注：破绽细节 (The Red Flag) 挖掘...")
-        extracted_data = analyst.analyze(url, title, markdown_content)
-        
-        if not extracted_data:
-            print(f"❌ Analyst 失败，跳过此案例")
-            failed_count += 1
-            continue
-        
-        print(f"✅ Analyst 完成：成功提取结构化信息")
-        
-        # ========== Step 3: Validator Agent ==========
-        print(f"\n🔍 [Step 3] Validator Agent - 校验提取质量...")
-        is_valid, validation_result = validator.validate(extracted_data)
-        
-        if not is_valid:
-            print(f"⚠️ Validator 未通过验证：质量不足")
-            
-            # 如果是 Process 字段质量不足，标记为重试
-            process_score = validation_result.get('process_score', 0)
-            if process_score < 0.6:
-                print(f"   💡 建议：Process 字段质量不足，可以重试下一个链接")
-                retry_count += 1
-                # 可以选择：1) 跳过此案例 2) 标记保存但标注低质量
-                # 当前策略：标记保存但标注低质量
-                print(f"   📝 标记为低质量案例，但仍保存到数据库")
-            else:
-                failed_count += 1
-                continue
-        
-        # ========== 保存到数据库 ==========
-        print(f"\n💾 保存到数据库...")
-        if save_to_supabase(extracted_data, validation_result):
-            saved_count += 1
-            print(f"✅ 案例保存成功")
-        else:
-            failed_count += 1
-        
-        # 避免 API 限流
-        if i < len(top_links):
-            wait_time = 15
-            print(f"\n⏳ 等待 {wait_time} 秒以避免 API 限流...")
-            time.sleep(wait_time)
+    if planner:
+        planner.finish()
+    if own_claimer:
+        claimer.close()
     
     return {
-        'saved': saved_count,
-        'skipped': skipped_count,
-        'failed': failed_count,
-        'retry': retry_count,
-        'total_processed': len(top_links)
+        'saved': sum(1 for c in contexts if c['status'] == 'saved'),
+        'skipped': sum(1 for c in contexts if c['status'] == 'skipped'),
+        'failed': sum(1 for c in contexts if c['status'] == 'failed'),
+        'cancelled': sum(1 for c in contexts if c['status'] == 'cancelled'),
+        'retry': sum(1 for c in contexts if c['retry']),
+        'total_processed': total
     }
 
 
@@ -791,6 +986,9 @@ def main():
     print(f"⏰ 执行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 70)
     
+    # 运行预算从程序启动开始计时（截止时间 RUN_DEADLINE_MINUTES，调用预算 <PROVIDER>_CALL_BUDGET）
+    planner = BudgetPlanner('deep_research')
+    
     # 验证必要的 API Key
     if not all([TAVILY_API_KEY, GEMINI_API_KEY, SUPABASE_URL, SUPABASE_KEY]):
         print("❌ 错误: 缺少必要的 API Key 或配置")
@@ -807,18 +1005,31 @@ def main():
     print("📡 Step 1: Scout Agent - 高级搜索")
     print("=" * 70)
     
-    scout = ScoutAgent(tavily_client)
+    # 预分类器：样本有增加或模型过期时重新训练（样本不足时不过滤）
+    classifier = refresh_classifier(supabase)
+    # 查询规划器：按各查询变体的新案例产出轮换关键词组合
+    scout = ScoutAgent(tavily_client, classifier=classifier,
+                       query_planner=get_query_planner('deep_research', CASE_SPECIFIC_KEYWORDS, INSURANCE_TYPES))
     search_results = scout.search(max_results=15)
     
     if not search_results:
         print("⚠️ 未搜索到任何符合条件的案例，程序退出")
         return
     
-    # 选择前3个高质量链接进行深度研究
-    print(f"\n✅ Scout 完成：选择前 3 个高质量案例进行深度研究")
+    # 水位线：上次运行已有结论的 URL 不再查重和处理
+    watermark = get_search_watermark('deep_research')
+    search_results = split_new_results(watermark, search_results)
+    if not search_results:
+        print("✅ 没有新的搜索结果，程序退出")
+        print_search_cache_stats()
+        return
+    
+    # 选择前 N 个高质量链接进行深度研究（N 由预算规划器在上限内决定）
+    print(f"\n✅ Scout 完成：最多选择前 {DEEP_RESEARCH_MAX_CASES or len(search_results)} 个高质量案例进行深度研究")
     
     # ========== Step 2-4: 深度研究流程 ==========
-    results = deep_research_flow(search_results, max_cases=3)
+    results = deep_research_flow(search_results, max_cases=DEEP_RESEARCH_MAX_CASES, planner=planner,
+                                 watermark=watermark)
     
     # ========== 输出统计信息 ==========
     print("\n" + "=" * 70)
@@ -828,8 +1039,15 @@ def main():
     print(f"⏭️  跳过（重复）: {results['skipped']} 个案例")
     print(f"⚠️  低质量重试: {results['retry']} 个案例")
     print(f"❌ 失败: {results['failed']} 个案例")
+    if results['cancelled']:
+        print(f"⏹️  预算用完取消: {results['cancelled']} 个案例（下次运行从运行日志继续）")
     print(f"📈 总计处理: {results['total_processed']} 个高质量案例")
     print(f"🔍 Scout 搜索: {len(search_results)} 个结果")
+    if scout.query_planner:
+        scout.query_planner.print_stats()
+    print_cache_stats()
+    print_usage_report()
+    print_search_cache_stats()
     print("=" * 70)
 
 
@@ -1,20 +1,39 @@
 """
 GIFIA v4.0 - The Living Scout (24/7 全球自动侦察系统)
 递归扫描与热点抓取：自动提取外部引用链接，监控热点案例
+
+运行方式:
+    python3 agent_v4_living_scout.py            # 单次运行（GitHub Actions cron）
+    python3 agent_v4_living_scout.py --daemon   # 常驻模式，进程内按间隔调度各任务
+    python3 agent_v4_living_scout.py --pipeline # 使用分阶段流水线处理候选案例
 """
 
 import os
-import json
 import time
 import re
+from collections import deque
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Set
 from urllib.parse import urlparse
-import requests
 from supabase import create_client, Client
 import google.generativeai as genai
 from tavily import TavilyClient
-from openai import OpenAI
+import ai_engine
+from batch_extractor import EXTRACT_BATCH_SIZE, REQUIRED_FIELDS, extract_cases_batch
+from structured_output import CASE_SCHEMA, parse_case
+from pipeline import PipelineStage, StagePipeline
+from rate_limiter import get_rate_limiter
+from run_journal import RunJournal
+from scheduler import IntervalScheduler
+from work_queue import DEFAULT_SECONDS_PER_ITEM, PriorityWorkQueue, priority_score
+from budget_planner import BudgetPlanner, RunBudget
+from work_claims import WorkClaimer, get_work_claimer
+from usage_meter import print_usage_report
+from search_cache import cached_search, print_search_cache_stats
+from url_canonical import canonical_or_none, canonical_url, find_existing_cases, insert_case, url_key
+from http_clients import close_clients, get_http_session
+from search_fanout import parallel_search
+from search_watermark import SearchWatermark, get_search_watermark, split_new_results
 
 # ==================== 环境变量配置 ====================
 
@@ -24,6 +43,23 @@ DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
+# 流水线模式下提取阶段的并发线程数
+LIVING_SCOUT_CONCURRENCY = int(os.getenv("LIVING_SCOUT_CONCURRENCY", "2"))
+
+# 热点搜索的关键词并发数
+HOTSPOT_SEARCH_CONCURRENCY = int(os.getenv("HOTSPOT_SEARCH_CONCURRENCY", "5"))
+
+# 常驻模式（--daemon）下各任务的执行间隔（分钟）
+HOTSPOT_INTERVAL_MINUTES = float(os.getenv("HOTSPOT_INTERVAL_MINUTES", "30"))
+REGULAR_SEARCH_INTERVAL_MINUTES = float(os.getenv("REGULAR_SEARCH_INTERVAL_MINUTES", "60"))
+EXTERNAL_SCAN_INTERVAL_MINUTES = float(os.getenv("EXTERNAL_SCAN_INTERVAL_MINUTES", "15"))
+DOMAIN_REFRESH_INTERVAL_MINUTES = float(os.getenv("DOMAIN_REFRESH_INTERVAL_MINUTES", "360"))
+
+# 单次运行的时间预算（分钟，从运行开始计时），预算不足时低优先级案例推迟到下一次运行
+LIVING_SCOUT_TIME_BUDGET_MINUTES = float(os.getenv("LIVING_SCOUT_TIME_BUDGET_MINUTES", "20"))
+# 常驻模式下每次处理队列的时间片（分钟），时间片之间新搜索到的热点案例可以插队
+QUEUE_SLICE_MINUTES = float(os.getenv("QUEUE_SLICE_MINUTES", "10"))
+
 # 初始化客户端（延迟初始化，避免导入时验证失败）
 tavily_client = None
 supabase: Client = None
@@ -69,58 +105,24 @@ def init_clients():
 # 监控白名单（.org 和 .gov 域名）
 monitored_domains: Set[str] = set()
 
+# 常驻模式下待扫描外部链接的案例 (content, base_url)，由独立的定时任务处理
+pending_external_scans: deque = deque()
+
 # ==================== AI 分析函数（Failover） ====================
 
+AI_SYSTEM_PROMPT = "你是一位资深保险反欺诈分析师，擅长从长文中抽取严格结构化信息。"
+
+
 def get_ai_analysis(prompt: str) -> Optional[str]:
     """通用AI分析函数：优先使用 Gemini，失败后自动切换到 DeepSeek"""
-    # 1) 尝试 Gemini
-    try:
-        models_to_try = [
-            "models/gemini-2.5-flash",
-            "models/gemini-1.5-pro",
-            "models/gemini-flash-latest",
-        ]
-        last_err = None
-        for model_name in models_to_try:
-            try:
-                print("[Gemini] 正在分析...")
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(prompt)
-                text = (response.text or "").strip()
-                if text:
-                    return text
-            except Exception as e:
-                last_err = str(e)
-                if any(k in str(e).lower() for k in ["quota", "rate", "429", "exceeded", "limit"]):
-                    print("⚠️ Gemini 限额，切换至 DeepSeek...")
-                    break
-                continue
-        if last_err and not any(k in last_err.lower() for k in ["quota", "rate", "429", "exceeded", "limit"]):
-            print(f"⚠️ Gemini 异常: {last_err[:120]}，切换至 DeepSeek...")
-    except Exception as e:
-        print(f"⚠️ Gemini 初始化失败: {str(e)}，切换至 DeepSeek...")
-
-    # 2) 尝试 DeepSeek
-    try:
-        if not DEEPSEEK_API_KEY:
-            print("❌ DeepSeek 未配置")
-            return None
-        print("[DeepSeek] 正在接管任务...")
-        ds_client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com")
-        completion = ds_client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": "你是一位资深保险反欺诈分析师，擅长从长文中抽取严格结构化信息。"},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.3,
-            max_tokens=2000,
-        )
-        text = (completion.choices[0].message.content or "").strip()
-        return text if text else None
-    except Exception as e:
-        print(f"❌ DeepSeek 失败: {str(e)}")
-        return None
+    return ai_engine.get_ai_analysis(
+        prompt,
+        system_prompt=AI_SYSTEM_PROMPT,
+        max_tokens=2000,
+        required_keys=REQUIRED_FIELDS,
+        response_schema=CASE_SCHEMA,
+        stage="extract",
+    )
 
 
 # ==================== 递归扫描：提取外部引用链接 ====================
@@ -201,31 +203,33 @@ def search_hotspot_cases() -> List[Dict]:
             "insurance fraud scandal",
         ]
         
-        all_results = []
+        def search_keyword(keyword: str) -> List[Dict]:
+            response = cached_search(
+                tavily_client,
+                query=keyword,
+                search_depth="news",  # 使用 news 模式
+                max_results=5,
+                include_answer=True,
+            )
+            
+            results = []
+            for item in response.get('results', []):
+                # 检查关注度（基于分数和时间）
+                score = item.get('score', 0)
+                if score > 0.7:  # 高关注度阈值
+                    results.append({
+                        'url': item.get('url', ''),
+                        'canonical_url': canonical_url(item.get('url', '')),
+                        'title': item.get('title', ''),
+                        'content': item.get('content', ''),
+                        'score': score,
+                        'published_date': item.get('published_date'),
+                        'is_hotspot': True,
+                    })
+            return results
         
-        for keyword in hotspot_keywords:
-            try:
-                response = tavily_client.search(
-                    query=keyword,
-                    search_depth="news",  # 使用 news 模式
-                    max_results=5,
-                    include_answer=True,
-                )
-                
-                for item in response.get('results', []):
-                    # 检查关注度（基于分数和时间）
-                    score = item.get('score', 0)
-                    if score > 0.7:  # 高关注度阈值
-                        all_results.append({
-                            'url': item.get('url', ''),
-                            'title': item.get('title', ''),
-                            'content': item.get('content', ''),
-                            'score': score,
-                            'is_hotspot': True,
-                        })
-            except Exception as e:
-                print(f"⚠️ 热点搜索失败 {keyword}: {str(e)}")
-                continue
+        # 关键词并发搜索，同一 URL 只保留分数最高的结果并记录命中的关键词
+        all_results = parallel_search(hotspot_keywords, search_keyword, max_workers=HOTSPOT_SEARCH_CONCURRENCY)
         
         print(f"✅ [Hotspot] 发现 {len(all_results)} 个热点案例")
         return all_results
@@ -243,7 +247,8 @@ def search_fraud_cases(query: str = "Global insurance fraud case 2025 2026", max
         return []
     
     try:
-        response = tavily_client.search(
+        response = cached_search(
+            tavily_client,
             query=query,
             search_depth="advanced",
             max_results=max_results,
@@ -255,9 +260,11 @@ def search_fraud_cases(query: str = "Global insurance fraud case 2025 2026", max
         for item in response.get('results', []):
             results.append({
                 'url': item.get('url', ''),
+                'canonical_url': canonical_url(item.get('url', '')),
                 'title': item.get('title', ''),
                 'content': item.get('content', ''),
                 'score': item.get('score', 0),
+                'published_date': item.get('published_date'),
                 'is_hotspot': False,
             })
         
@@ -270,19 +277,8 @@ def search_fraud_cases(query: str = "Global insurance fraud case 2025 2026", max
 
 # ==================== 案例提取 ====================
 
-def extract_case_info(url: str, title: str, content: str) -> Optional[Dict]:
-    """
-    提取案例信息（使用5维度结构化格式）
-    """
-    prompt = f"""
-你是一位全球寿险与健康险反欺诈专家（SIU 资深调查员）。请从以下网页信息中提取保险欺诈案例，并按照专业简报格式输出。
-
-网页标题: {title}
-网页链接: {url}
-网页内容摘要:
-{content}
-
-【分析任务】
+# 单篇与批量提取共用的【分析任务】/【输出要求】说明
+CASE_EXTRACTION_GUIDE = """【分析任务】
 请严格按照以下【简报格式】输出，所有内容必须用中文填写：
 
 1. **Time (时间)**: 事件发生或判决的具体时间（格式：YYYY-MM-DD）
@@ -312,7 +308,22 @@ def extract_case_info(url: str, title: str, content: str) -> Optional[Dict]:
 【输出要求】
 - 必须以纯 JSON 格式输出
 - Process 字段必须包含5个标题的详细内容，至少 500 字
-- 字段名使用英文（Time, Region, Characters, Event, Process, Result）
+- 字段名使用英文（Time, Region, Characters, Event, Process, Result）"""
+
+
+def extract_case_info(url: str, title: str, content: str) -> Optional[Dict]:
+    """
+    提取案例信息（使用5维度结构化格式）
+    """
+    prompt = f"""
+你是一位全球寿险与健康险反欺诈专家（SIU 资深调查员）。请从以下网页信息中提取保险欺诈案例，并按照专业简报格式输出。
+
+网页标题: {title}
+网页链接: {url}
+网页内容摘要:
+{content}
+
+{CASE_EXTRACTION_GUIDE}
 
 现在请开始分析：
 """
@@ -322,23 +333,8 @@ def extract_case_info(url: str, title: str, content: str) -> Optional[Dict]:
         if not text:
             return None
         
-        # 清理 JSON
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        text = text.strip()
-        text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
-        
-        case_data = json.loads(text)
-        
-        # 验证必需字段
-        required_fields = ['Time', 'Region', 'Characters', 'Event', 'Process', 'Result']
-        for field in required_fields:
-            if field not in case_data:
-                case_data[field] = "未知"
+        # 解析 JSON（自动修复常见格式问题），并校验必需字段
+        case_data = parse_case(text)
         
         # 添加元数据
         case_data['Source_URL'] = url
@@ -351,45 +347,72 @@ def extract_case_info(url: str, title: str, content: str) -> Optional[Dict]:
         return None
 
 
+def extract_case_infos(articles: List[Dict]) -> List[Optional[Dict]]:
+    """
+    批量提取案例信息：每 EXTRACT_BATCH_SIZE 篇文章合并为一次 AI 调用，解析失败的文章回退为单篇提取
+
+    参数:
+        articles: 文章列表，每项包含 url、title、content
+
+    返回:
+        与 articles 等长的列表，提取失败的文章为 None
+    """
+    return extract_cases_batch(articles, CASE_EXTRACTION_GUIDE, extract_case_info, system_prompt=AI_SYSTEM_PROMPT)
+
+
 # ==================== 递归扫描：处理外部链接 ====================
 
 def process_external_links(case_content: str, base_url: str) -> List[Dict]:
     """
     从案例内容中提取外部链接，如果是监控域名则深度抓取
     """
-    external_links = extract_external_links(case_content, base_url)
+    # 按规范化 URL 去重（同一篇文章的 AMP / 移动版 / 带跟踪参数的链接只抓取一次），抓取仍使用原始链接
+    links = extract_external_links(case_content, base_url)
+    external_links = []
+    seen_keys = set()
+    for link in links:
+        key = canonical_url(link)
+        if key not in seen_keys:
+            seen_keys.add(key)
+            external_links.append(link)
     
     if not external_links:
         return []
     
     print(f"🔗 [Recursive] 发现 {len(external_links)} 个外部链接")
     
-    new_cases = []
+    articles = []
     for link in external_links[:5]:  # 限制最多处理5个
         try:
             # 检查是否已存在
             if check_duplicate(link):
                 continue
             
-            # 抓取内容
-            response = requests.get(link, timeout=30, headers={
+            # 抓取内容（按域名限流，避免连续请求同一站点）
+            domain_limiter = get_rate_limiter('web', urlparse(link).netloc.lower())
+            domain_limiter.acquire()
+            response = get_http_session().get(link, timeout=30, headers={
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             })
+            if response.status_code == 429:
+                domain_limiter.on_throttle()
             
             if response.status_code == 200:
                 # 简单提取文本
                 content = response.text[:5000]  # 限制长度
                 title = link.split('/')[-1]
                 
-                # 提取案例信息
-                case_data = extract_case_info(link, title, content)
-                if case_data:
-                    new_cases.append(case_data)
-                    print(f"   ✅ 从外部链接提取案例: {case_data.get('Event', '未知')}")
+                articles.append({'url': link, 'title': title, 'content': content})
         except Exception as e:
             print(f"   ⚠️ 处理外部链接失败 {link}: {str(e)}")
             continue
     
+    # 提取案例信息（批量）
+    new_cases = []
+    for case_data in extract_case_infos(articles):
+        if case_data:
+            new_cases.append(case_data)
+            print(f"   ✅ 从外部链接提取案例: {case_data.get('Event', '未知')}")
     return new_cases
 
 
@@ -400,8 +423,7 @@ def check_duplicate(url: str) -> bool:
     if not supabase:
         return False
     try:
-        result = supabase.table('fraud_cases').select('id').eq('source_url', url).execute()
-        return len(result.data) > 0
+        return len(find_existing_cases(supabase, url)) > 0
     except:
         return False
 
@@ -420,11 +442,12 @@ def save_to_supabase(case_data: Dict, source: str = 'auto_scout') -> bool:
             'process': case_data.get('Process', '未知'),
             'result': case_data.get('Result', '未知'),
             'source_url': case_data.get('Source_URL', ''),
+            'canonical_url': canonical_or_none(case_data.get('Source_URL')),
             'created_at': case_data.get('Created_at', datetime.now().isoformat()),
             'source': source,  # 标记来源
         }
         
-        result = supabase.table('fraud_cases').insert(insert_data).execute()
+        result = insert_case(supabase, insert_data)
         
         if result.data:
             print(f"✅ 保存成功: {insert_data['event']}")
@@ -435,10 +458,378 @@ def save_to_supabase(case_data: Dict, source: str = 'auto_scout') -> bool:
         return False
 
 
+# ==================== 候选案例处理 ====================
+
+# 每个候选案例使用一个上下文字典：
+# {'case': 搜索结果, 'source': 'hotspot' | 'auto_scout', 'journal', 'claimer', 'status', 'saved'}
+# 阶段返回上下文表示继续，返回 None 表示该案例已结束（结果写入 ctx['status']）
+# ctx['journal'] 为运行日志（RunJournal），中断后重跑时已提取的结果直接复用
+# ctx['claimer'] 为任务认领器（WorkClaimer），与 agent.py 等同时运行的 Worker 分摊候选 URL
+# ctx['watermark'] 为搜索水位线（SearchWatermark），已保存或重复的 URL 之后的搜索中直接跳过
+
+def _mark_seen(ctx: Dict, outcome: str):
+    if ctx.get('watermark'):
+        ctx['watermark'].mark(ctx['case']['url'], outcome, ctx['case'].get('published_date'))
+
+
+def stage_check_duplicate(ctx: Dict) -> Optional[Dict]:
+    """阶段 1：查重"""
+    journal = ctx.get('journal')
+    key = url_key(ctx['case'])  # 运行日志和认领按规范化 URL 记录
+    if (journal and journal.is_saved(key)) or check_duplicate(ctx['case']['url']):
+        ctx['status'] = 'skipped'
+        _mark_seen(ctx, 'duplicate')
+        return None
+    claimer = ctx.get('claimer')
+    if claimer:
+        if not claimer.try_claim(key):
+            print(f"⏭️  已由其他 Worker 认领: {ctx['case']['url'][:80]}")
+            ctx['status'] = 'skipped'
+            return None
+        ctx['claimed'] = True
+    return ctx
+
+
+def stage_extract(batch: List[Dict]) -> List[Dict]:
+    """阶段 2：AI 提取案例信息（一批上下文合并为一次 AI 调用），返回提取成功的上下文"""
+    pending = []
+    for ctx in batch:
+        journal = ctx.get('journal')
+        case_data = journal.stage_data(url_key(ctx['case']), 'analyzed') if journal else None
+        if case_data:
+            print(f"♻️  从运行日志恢复提取结果: {ctx['case']['url'][:80]}")
+            ctx['case_data'] = case_data
+        else:
+            pending.append(ctx)
+    
+    for ctx, case_data in zip(pending, extract_case_infos([ctx['case'] for ctx in pending])):
+        if not case_data:
+            ctx['status'] = 'failed'
+            continue
+        if ctx.get('journal'):
+            ctx['journal'].record(url_key(ctx['case']), 'analyzed', case_data)
+        ctx['case_data'] = case_data
+    return [ctx for ctx in batch if ctx.get('case_data')]
+
+
+def stage_save(ctx: Dict) -> Optional[Dict]:
+    """阶段 3：保存到数据库，并递归扫描外部链接（常驻模式下交给独立的定时任务）"""
+    case = ctx['case']
+    if save_to_supabase(ctx['case_data'], source=ctx['source']):
+        ctx['status'] = 'saved'
+        ctx['saved'] += 1
+        if ctx.get('journal'):
+            ctx['journal'].record(url_key(case), 'saved')
+        _mark_seen(ctx, 'saved')
+        
+        if ctx.get('defer_external'):
+            pending_external_scans.append((case['content'], case['url']))
+            return ctx
+        
+        # 递归扫描外部链接
+        ctx['saved'] += scan_external_links(case['content'], case['url'])
+    else:
+        ctx['status'] = 'save_failed'
+    return ctx
+
+
+def scan_external_links(content: str, base_url: str) -> int:
+    """递归扫描外部链接并保存提取到的案例，返回保存数量"""
+    saved = 0
+    for ext_case in process_external_links(content, base_url):
+        if save_to_supabase(ext_case, source='recursive'):
+            saved += 1
+    return saved
+
+
+def new_work_queue(default_seconds: float = DEFAULT_SECONDS_PER_ITEM) -> PriorityWorkQueue:
+    """
+    创建候选案例优先级队列：热点 + Tavily 分数 + 发布时间新鲜度
+
+    参数:
+        default_seconds: 每个案例的初始预估耗时（例如 CostHistory 的历史估计），随实际耗时平滑更新
+    """
+    return PriorityWorkQueue(key=lambda ctx: priority_score(ctx['case']), default_seconds=default_seconds)
+
+
+def process_candidates(work_queue: PriorityWorkQueue, use_pipeline: bool = False,
+                       deadline: Optional[float] = None, planner: Optional[BudgetPlanner] = None,
+                       limit: Optional[int] = None) -> List[Dict]:
+    """
+    按优先级处理候选案例：查重 -> 提取 -> 保存（含递归扫描）
+    每 EXTRACT_BATCH_SIZE 个案例为一批，提取阶段整批合并为一次 AI 调用
+    
+    参数:
+        work_queue: 候选案例上下文的优先级队列
+        use_pipeline: 是否使用分阶段流水线（提取阶段并发，查重/保存与提取重叠执行）
+        deadline: time.monotonic() 截止时间；剩余时间不足时低优先级案例留在队列中
+        planner: 预算规划器（可选），调用预算用完后不再取出新的案例，并记录每个案例的成本
+        limit: 最多处理的案例数（None 表示不限）
+    
+    返回:
+        本次处理过的上下文列表（按出队顺序）
+    """
+    processed = []
+    
+    # 记录每个案例从开始处理到结束的耗时，队列据此估算剩余时间还能处理多少案例
+    def finish(ctx: Dict):
+        work_queue.record_duration(time.monotonic() - ctx['started_at'])
+        if planner:
+            planner.record_case(time.monotonic() - ctx['started_at'])
+        # 只释放本上下文认领的 URL（认领失败时该 URL 可能正由队列中的另一份副本处理）
+        if ctx.get('claimer') and ctx.get('claimed'):
+            ctx['claimer'].finish(url_key(ctx['case']), done=ctx['status'] == 'saved')
+    
+    # 流水线中的每一项是一批上下文（最多 EXTRACT_BATCH_SIZE 个），提取阶段整批调用一次 AI
+    def each(step, last: bool = False):
+        def run(batch: List[Dict]) -> Optional[List[Dict]]:
+            passed = []
+            for ctx in batch:
+                ctx.setdefault('started_at', time.monotonic())
+                try:
+                    result = step(ctx)
+                except Exception as e:
+                    # 单个案例出错不影响同一批的其他案例
+                    print(f"❌ 处理失败 {ctx['case']['url'][:80]}: {str(e)}")
+                    ctx['status'] = 'failed'
+                    result = None
+                if result is None or last:
+                    finish(ctx)
+                if result is not None:
+                    passed.append(result)
+            return passed or None
+        return run
+    
+    def extract(batch: List[Dict]) -> Optional[List[Dict]]:
+        try:
+            passed = stage_extract(batch)
+        except Exception:
+            for ctx in batch:
+                finish(ctx)
+            raise
+        for ctx in batch:
+            if ctx not in passed:
+                finish(ctx)
+        return passed or None
+    
+    def dequeue():
+        batch = []
+        for ctx in work_queue.drain(deadline, parallelism=LIVING_SCOUT_CONCURRENCY if use_pipeline else 1,
+                                    limit=limit):
+            if planner and planner.should_stop():
+                work_queue.push(ctx, ctx.get('priority'))
+                break
+            processed.append(ctx)
+            batch.append(ctx)
+            if len(batch) >= EXTRACT_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    if use_pipeline:
+        # 第一阶段队列有界，流水线按处理进度从优先级队列取案例，新加入的高优先级案例可以插队
+        pipeline = StagePipeline([
+            PipelineStage('dedup', each(stage_check_duplicate), workers=1, queue_size=1),
+            PipelineStage('extract', extract, workers=LIVING_SCOUT_CONCURRENCY,
+                          queue_size=LIVING_SCOUT_CONCURRENCY),
+            PipelineStage('save', each(stage_save, last=True), workers=1),
+        ])
+        pipeline.run(dequeue())
+        pipeline.print_stats()
+        return processed
+    
+    steps = (each(stage_check_duplicate), extract, each(stage_save, last=True))
+    for batch in dequeue():
+        for step in steps:
+            batch = step(batch)
+            if batch is None:
+                break
+    return processed
+
+
+def build_contexts(cases: List[Dict], source: str, journal: Optional[RunJournal],
+                   defer_external: bool = False, claimer: Optional[WorkClaimer] = None,
+                   watermark: Optional[SearchWatermark] = None) -> List[Dict]:
+    """为搜索结果创建候选案例上下文（水位线之前已处理的结果直接跳过）"""
+    return [
+        {'case': case, 'source': source, 'journal': journal, 'claimer': claimer, 'watermark': watermark,
+         'defer_external': defer_external, 'status': 'failed', 'saved': 0}
+        for case in split_new_results(watermark, cases, label=source)
+    ]
+
+
+def enqueue_contexts(work_queue: PriorityWorkQueue, contexts: List[Dict],
+                     claimer: Optional[WorkClaimer] = None) -> List[Dict]:
+    """
+    将候选案例加入优先级队列，按规范化 URL 去重：
+    同一批中重复的（如热点和常规搜索都找到的）、队列中已有的、本 Worker 正在处理的 URL 不再加入
+
+    返回:
+        加入队列的上下文（同一 URL 保留先出现的，调用方应先传入热点结果）
+    """
+    queued = {url_key(ctx['case']) for ctx in work_queue.pending()}
+    added = []
+    for ctx in contexts:
+        key = url_key(ctx['case'])
+        if key in queued or (claimer and claimer.is_held(key)):
+            continue
+        queued.add(key)
+        ctx['priority'] = work_queue.push(ctx)
+        added.append(ctx)
+    if len(added) < len(contexts):
+        print(f"🔁 [Queue] 跳过 {len(contexts) - len(added)} 个已在队列中或正在处理的 URL")
+    return added
+
+
+def print_summary(contexts: List[Dict], title: str = "📊 侦察完成统计"):
+    """输出处理统计"""
+    saved_count = sum(ctx['saved'] for ctx in contexts)
+    skipped_count = sum(1 for ctx in contexts if ctx['status'] == 'skipped')
+    failed_count = sum(1 for ctx in contexts if ctx['status'] == 'failed')
+    deferred_count = sum(1 for ctx in contexts if ctx['status'] == 'deferred')
+    
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70)
+    print(f"✅ 成功保存: {saved_count} 个案例")
+    print(f"⏭️  跳过（重复）: {skipped_count} 个案例")
+    print(f"❌ 失败: {failed_count} 个案例")
+    if deferred_count:
+        print(f"⏱️  推迟（时间预算不足）: {deferred_count} 个案例")
+    print(f"📋 监控域名: {len(monitored_domains)} 个")
+    print("=" * 70)
+
+
 # ==================== 主流程 ====================
 
-def main():
-    """主函数：24/7 自动侦察"""
+def run_once(use_pipeline: bool = False):
+    """单次侦察：热点搜索 + 常规搜索 + 处理候选案例（cron 模式）"""
+    # 运行预算：截止时间 LIVING_SCOUT_TIME_BUDGET_MINUTES，调用预算 <PROVIDER>_CALL_BUDGET
+    planner = BudgetPlanner('living_scout', budget=RunBudget(deadline_minutes=LIVING_SCOUT_TIME_BUDGET_MINUTES))
+    
+    # 1. 热点搜索（每30分钟）
+    print("\n" + "=" * 70)
+    print("🔥 步骤1: 热点案例搜索（News 模式）")
+    print("=" * 70)
+    
+    hotspot_cases = search_hotspot_cases()
+    
+    # 2. 常规搜索
+    print("\n" + "=" * 70)
+    print("📡 步骤2: 常规案例搜索")
+    print("=" * 70)
+    
+    search_results = search_fraud_cases(max_results=5)
+    
+    # 3. 处理候选案例（按优先级：热点 + Tavily 分数 + 新鲜度）
+    print("\n" + "=" * 70)
+    print(f"🔄 步骤3: 处理候选案例{'（流水线模式）' if use_pipeline else ''}")
+    print("=" * 70)
+    
+    journal = RunJournal(pipeline='living_scout')
+    claimer = get_work_claimer(supabase)
+    watermark = get_search_watermark('living_scout')
+    contexts = build_contexts(hotspot_cases, 'hotspot', journal, claimer=claimer, watermark=watermark)
+    contexts += build_contexts(search_results, 'auto_scout', journal, claimer=claimer, watermark=watermark)
+    work_queue = new_work_queue(planner.history.estimate('living_scout')['seconds_per_case'])
+    contexts = enqueue_contexts(work_queue, contexts, claimer)
+    
+    # 先按调用预算和历史成本估计本次能处理的数量，超出部分直接推迟
+    limit = planner.plan(len(work_queue), LIVING_SCOUT_CONCURRENCY if use_pipeline else 1)
+    deadline = planner.budget.deadline - planner.reserve_seconds
+    process_candidates(work_queue, use_pipeline=use_pipeline, deadline=deadline, planner=planner, limit=limit)
+    planner.finish()
+    claimer.close()
+    for ctx in work_queue.pending():
+        ctx['status'] = 'deferred'
+    
+    print_summary(contexts)
+    print_usage_report()
+    print_search_cache_stats()
+
+
+def run_daemon(use_pipeline: bool = False):
+    """
+    常驻模式：客户端、运行日志和监控域名只初始化一次，
+    热点搜索、常规搜索、外部链接扫描按各自的间隔在进程内调度
+    """
+    import signal
+    
+    journal = RunJournal(pipeline='living_scout')
+    claimer = get_work_claimer(supabase)
+    watermark = get_search_watermark('living_scout')
+    scheduler = IntervalScheduler()
+    # 搜索任务只负责入队，处理任务按时间片消费队列；
+    # 时间片之间执行的热点搜索结果会排到尚未处理的常规案例前面
+    work_queue = new_work_queue()
+    
+    def hotspot_job():
+        enqueue_contexts(work_queue, build_contexts(search_hotspot_cases(), 'hotspot', journal, defer_external=True,
+                                                    claimer=claimer, watermark=watermark), claimer)
+        process_queue_job()
+    
+    def regular_job():
+        enqueue_contexts(work_queue, build_contexts(search_fraud_cases(max_results=5), 'auto_scout', journal,
+                                                    defer_external=True, claimer=claimer, watermark=watermark),
+                         claimer)
+    
+    def process_queue_job():
+        if not len(work_queue):
+            return
+        deadline = time.monotonic() + QUEUE_SLICE_MINUTES * 60
+        contexts = process_candidates(work_queue, use_pipeline=use_pipeline, deadline=deadline)
+        print_summary(contexts, f"📊 [Daemon] 候选案例处理统计（队列剩余 {len(work_queue)} 个）")
+    
+    def external_links_job():
+        saved = 0
+        scanned = 0
+        while pending_external_scans:
+            content, base_url = pending_external_scans.popleft()
+            saved += scan_external_links(content, base_url)
+            scanned += 1
+        if scanned:
+            print(f"🔗 [Daemon] 外部链接扫描完成: {scanned} 个案例，新增 {saved} 个")
+    
+    def refresh_domains_job():
+        monitored_domains.update(load_monitored_domains_from_db())
+        print(f"📋 [Daemon] 监控域名已刷新: {len(monitored_domains)} 个")
+    
+    scheduler.add_job('hotspot', HOTSPOT_INTERVAL_MINUTES * 60, hotspot_job)
+    scheduler.add_job('regular', REGULAR_SEARCH_INTERVAL_MINUTES * 60, regular_job)
+    scheduler.add_job('process_queue', 60, process_queue_job)
+    scheduler.add_job('external_links', EXTERNAL_SCAN_INTERVAL_MINUTES * 60, external_links_job, run_immediately=False)
+    scheduler.add_job('refresh_domains', DOMAIN_REFRESH_INTERVAL_MINUTES * 60, refresh_domains_job,
+                      run_immediately=False)
+    
+    def handle_stop(signum, frame):
+        print("\n⚠️ [Daemon] 收到停止信号，当前任务完成后退出...")
+        scheduler.stop()
+    
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+    
+    print(f"\n♾️  [Daemon] 常驻模式启动：热点 {HOTSPOT_INTERVAL_MINUTES} 分钟 / "
+          f"常规 {REGULAR_SEARCH_INTERVAL_MINUTES} 分钟 / 外部链接 {EXTERNAL_SCAN_INTERVAL_MINUTES} 分钟")
+    scheduler.run_forever()
+    claimer.close()
+    close_clients()
+    
+    print("\n📊 [Daemon] 任务运行统计:")
+    for s in scheduler.stats():
+        print(f"   [{s['job']}] 执行 {s['runs']} 次 | 失败 {s['failures']} 次 | 最近耗时 {s['last_duration']}s")
+    print_usage_report()
+    print_search_cache_stats()
+
+
+def main(use_pipeline: bool = False, daemon: bool = False):
+    """
+    主函数：24/7 自动侦察
+    
+    参数:
+        use_pipeline: 是否使用分阶段流水线处理候选案例（命令行 --pipeline）
+        daemon: 是否以常驻模式运行（命令行 --daemon），由进程内调度器代替 cron
+    """
     print("=" * 70)
     print("🌐 GIFIA v4.0 - The Living Scout (24/7 全球自动侦察)")
     print(f"⏰ 执行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -464,83 +855,24 @@ def main():
         sys.exit(1)
     
     # 加载监控域名
-    global monitored_domains
-    monitored_domains = load_monitored_domains_from_db()
+    monitored_domains.update(load_monitored_domains_from_db())
     print(f"📋 已加载 {len(monitored_domains)} 个监控域名")
     
-    saved_count = 0
-    skipped_count = 0
-    failed_count = 0
-    
-    # 1. 热点搜索（每30分钟）
-    print("\n" + "=" * 70)
-    print("🔥 步骤1: 热点案例搜索（News 模式）")
-    print("=" * 70)
-    
-    hotspot_cases = search_hotspot_cases()
-    for case in hotspot_cases:
-        if check_duplicate(case['url']):
-            skipped_count += 1
-            continue
-        
-        case_data = extract_case_info(case['url'], case['title'], case['content'])
-        if case_data:
-            if save_to_supabase(case_data, source='hotspot'):
-                saved_count += 1
-                
-                # 递归扫描外部链接
-                external_cases = process_external_links(case['content'], case['url'])
-                for ext_case in external_cases:
-                    if save_to_supabase(ext_case, source='recursive'):
-                        saved_count += 1
-        else:
-            failed_count += 1
-    
-    # 2. 常规搜索
-    print("\n" + "=" * 70)
-    print("📡 步骤2: 常规案例搜索")
-    print("=" * 70)
-    
-    search_results = search_fraud_cases(max_results=5)
-    for result in search_results:
-        if check_duplicate(result['url']):
-            skipped_count += 1
-            continue
-        
-        case_data = extract_case_info(result['url'], result['title'], result['content'])
-        if case_data:
-            if save_to_supabase(case_data, source='auto_scout'):
-                saved_count += 1
-                
-                # 递归扫描外部链接
-                external_cases = process_external_links(result['content'], result['url'])
-                for ext_case in external_cases:
-                    if save_to_supabase(ext_case, source='recursive'):
-                        saved_count += 1
-        else:
-            failed_count += 1
-    
-    # 输出统计
-    print("\n" + "=" * 70)
-    print("📊 侦察完成统计")
-    print("=" * 70)
-    print(f"✅ 成功保存: {saved_count} 个案例")
-    print(f"⏭️  跳过（重复）: {skipped_count} 个案例")
-    print(f"❌ 失败: {failed_count} 个案例")
-    print(f"📋 监控域名: {len(monitored_domains)} 个")
-    print("=" * 70)
+    if daemon:
+        run_daemon(use_pipeline=use_pipeline)
+    else:
+        run_once(use_pipeline=use_pipeline)
 
 
 if __name__ == "__main__":
+    import sys
     try:
-        main()
+        main(use_pipeline="--pipeline" in sys.argv, daemon="--daemon" in sys.argv)
     except KeyboardInterrupt:
         print("\n⚠️ 用户中断")
-        import sys
         sys.exit(1)
     except Exception as e:
         print(f"\n❌ 未预期的错误: {str(e)}")
         import traceback
         traceback.print_exc()
-        import sys
         sys.exit(1)
@@ -0,0 +1,453 @@
+"""
+GIFIA - 通用 AI 分析引擎（Gemini 主引擎 + DeepSeek 备份引擎）
+agent.py、agent_v4_living_scout.py、user_submission_module.py 等共用的 Failover 调用路径，
+所有调用都经过共享的自适应限流器，响应按 模型 + 提示词 + 提示词版本 缓存在 .gifia/llm_cache.db，
+每次实际调用的 token 用量按 运行 + 阶段 + 模型 记录在 .gifia/llm_usage.db
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from circuit_breaker import get_breaker
+from hedging import LLM_HEDGING, get_hedge_budget, get_latency_tracker, hedged_call
+from gifia_state import state_path
+from http_clients import get_openai_client
+from llm_cache import get_llm_cache, make_cache_key
+from rate_limiter import get_rate_limiter, get_retry_after, is_rate_limit_error, limited_call
+from stream_json import StreamAbort, read_stream
+from usage_meter import gemini_usage, openai_usage, record_usage
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+# ==================== 环境变量配置 ====================
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
+
+if genai and GEMINI_API_KEY:
+    genai.configure(api_key=GEMINI_API_KEY)
+
+# Gemini 模型级联顺序
+DEFAULT_GEMINI_MODELS = [
+    "models/gemini-2.5-flash",
+    "models/gemini-1.5-pro",
+    "models/gemini-flash-latest",
+]
+
+# 模型探测结果的有效期（小时），过期后下次启动重新探测
+MODEL_DISCOVERY_TTL_HOURS = float(os.getenv("MODEL_DISCOVERY_TTL_HOURS", "24"))
+
+# 表示模型本身不可用（而不是临时故障）的错误特征，出现时触发重新探测
+MODEL_UNAVAILABLE_MARKERS = ['404', 'not found', 'not supported', 'deprecated', 'permission denied']
+
+# 调用方指定必需字段时使用流式输出，边生成边校验 JSON，无效输出提前中止并切换到下一个模型
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") == "1"
+# 调用方指定输出格式时使用服务商原生 JSON 输出（Gemini response_mime_type / response_schema，DeepSeek json_object）
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "1") == "1"
+
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+DEEPSEEK_MODEL = "deepseek-chat"
+DEFAULT_SYSTEM_PROMPT = "你是一位资深保险反欺诈分析师，擅长从长文中抽取严格结构化信息。"
+
+
+# ==================== Gemini 模型管理 ====================
+
+_models: Dict[str, object] = {}
+_failed_models = set()
+_models_lock = threading.Lock()
+# 已安装的 google-generativeai 版本不支持 JSON 输出模式时置为 False，之后不再尝试
+_gemini_json_mode = True
+
+
+def get_gemini_model(model_name: str):
+    """返回进程内复用的 GenerativeModel 对象（首次使用时创建）"""
+    with _models_lock:
+        model = _models.get(model_name)
+        if model is None:
+            model = genai.GenerativeModel(model_name)
+            _models[model_name] = model
+        return model
+
+
+def is_model_unavailable_error(error: Exception) -> bool:
+    """判断异常是否表示模型不存在、已下线或无权限"""
+    if is_rate_limit_error(error):
+        return False
+    message = str(error).lower()
+    return any(marker in message for marker in MODEL_UNAVAILABLE_MARKERS)
+
+
+def report_model_failure(model_name: str):
+    """
+    记录模型不可用：丢弃进程内的模型对象，并使选中该模型的探测结果失效，
+    本进程和下一次启动都会重新探测
+    """
+    with _models_lock:
+        _models.pop(model_name, None)
+        _failed_models.add(model_name)
+    discovery = _load_discovery()
+    stale = [key for key, entry in discovery.items() if entry.get('model') == model_name]
+    if stale:
+        for key in stale:
+            discovery.pop(key)
+        _save_discovery(discovery)
+        print(f"⚠️ Gemini {model_name} 不可用，已清除模型探测缓存")
+
+
+def model_failed(model_name: str) -> bool:
+    """模型在本进程中是否已被报告为不可用"""
+    with _models_lock:
+        return model_name in _failed_models
+
+
+def _load_discovery() -> Dict[str, Dict]:
+    try:
+        with open(state_path('model_discovery.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_discovery(discovery: Dict[str, Dict]):
+    try:
+        with open(state_path('model_discovery.json'), 'w', encoding='utf-8') as f:
+            json.dump(discovery, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"⚠️ 模型探测结果写入失败: {str(e)}")
+
+
+def discover_gemini_model(candidates: List[str], default: Optional[str] = None, refresh: bool = False) -> str:
+    """
+    按顺序探测第一个可用的 Gemini 模型，结果持久化到 .gifia/model_discovery.json，
+    有效期内的后续启动直接复用，不再逐个发送测试请求
+
+    参数:
+        candidates: 候选模型（按优先级）
+        default: 全部探测失败时使用的模型（默认第一个候选）
+        refresh: 忽略已保存的探测结果，重新探测
+
+    返回:
+        模型名称
+    """
+    key = ','.join(candidates)
+    discovery = _load_discovery()
+    entry = discovery.get(key)
+    if (not refresh and entry and not model_failed(entry['model'])
+            and time.time() - entry.get('discovered_at', 0) < MODEL_DISCOVERY_TTL_HOURS * 3600):
+        return entry['model']
+
+    if genai is None:
+        return default or candidates[0]
+
+    last_error = None
+    for model_name in candidates:
+        if model_failed(model_name):
+            continue
+        try:
+            model = get_gemini_model(model_name)
+            # 简单测试调用以验证模型是否可用
+            limited_call('gemini', model.generate_content, "test", model=model_name, max_retries=0)
+        except Exception as e:
+            last_error = str(e)
+            continue
+        discovery[key] = {'model': model_name, 'discovered_at': time.time()}
+        _save_discovery(discovery)
+        return model_name
+
+    if last_error:
+        print(f"   最后的错误信息: {last_error[:200]}")
+    return default or candidates[0]
+
+
+# ==================== Gemini 主引擎 ====================
+
+def _gemini_generate(model, model_name: str, prompt: str, stream: bool, response_schema: Optional[Dict]):
+    """
+    调用 generate_content；指定 response_schema 时使用 JSON 输出模式，
+    旧版 SDK 不认识 response_mime_type / response_schema 时自动改为普通输出
+    """
+    global _gemini_json_mode
+    kwargs = {'stream': True} if stream else {}
+    if response_schema is not None and LLM_JSON_MODE and _gemini_json_mode:
+        config = {'response_mime_type': 'application/json'}
+        # 只有声明了字段的 Schema 才传给 Gemini（没有 properties 的对象 Schema 会被拒绝），其余只要求 JSON 输出
+        if response_schema.get('properties') or (response_schema.get('items') or {}).get('properties'):
+            config['response_schema'] = response_schema
+        try:
+            return limited_call('gemini', model.generate_content, prompt, model=model_name, max_retries=0,
+                                generation_config=config, **kwargs)
+        except (TypeError, ValueError, KeyError) as e:
+            _gemini_json_mode = False
+            print(f"⚠️ 当前 google-generativeai 不支持 JSON 输出模式，改为普通输出: {str(e)[:120]}")
+    return limited_call('gemini', model.generate_content, prompt, model=model_name, max_retries=0, **kwargs)
+
+
+def call_gemini(prompt: str, models: Optional[List[str]] = None,
+                required_keys: Optional[Sequence[str]] = None,
+                cancel: Optional[threading.Event] = None,
+                response_schema: Optional[Dict] = None, stage: str = "analysis",
+                partial: Optional[List[str]] = None) -> Optional[str]:
+    """
+    按顺序尝试 Gemini 模型，每个模型有独立的限流配额和熔断器
+    某个模型被限流时，只降低该模型的速率、断开该模型的熔断器并切换到下一个模型；
+    熔断器断开的模型在冷却时间内直接跳过，不再为已知失败的尝试付出延迟
+
+    参数:
+        required_keys: 期望 JSON 输出包含的字段；不为 None 时使用流式输出增量校验，
+                       结构错误或缺少字段时提前中止并尝试下一个模型
+        cancel: 取消事件（对冲请求的备份引擎已经返回），设置后不再尝试后续模型，流式输出在下一个分块处中止
+        response_schema: 输出的 JSON Schema；指定时使用 Gemini 原生 JSON 输出模式
+        stage: 用量计量中的阶段名称
+        partial: 收集只缺少字段的完整 JSON（不算成功，由调用方在备份引擎也失败时使用）
+
+    返回:
+        模型输出文本；全部失败（包括输出都只缺少字段）返回 None
+    """
+    if genai is None:
+        print("⚠️ google-generativeai 未安装，跳过 Gemini")
+        return None
+
+    provider_breaker = get_breaker('gemini')
+    if not provider_breaker.allow():
+        print("⏭️  Gemini 熔断中，直接使用备份引擎")
+        return None
+
+    stream = LLM_STREAMING and required_keys is not None
+    throttled = 0
+    attempted = 0
+    aborted = 0
+    candidates = models or DEFAULT_GEMINI_MODELS
+    for model_name in candidates:
+        if cancel is not None and cancel.is_set():
+            break
+        breaker = get_breaker(f"gemini:{model_name}")
+        if not breaker.allow():
+            continue
+        attempted += 1
+        response = None
+        try:
+            model = get_gemini_model(model_name)
+            response = _gemini_generate(model, model_name, prompt, stream, response_schema)
+            if stream:
+                text = read_stream((chunk.text for chunk in response), required_keys, cancel).strip()
+            else:
+                text = (response.text or "").strip()
+            record_usage('gemini', model_name, stage, prompt, text, gemini_usage(response))
+            if text:
+                breaker.record_success()
+                provider_breaker.record_success()
+                return text
+            breaker.record_failure()
+        except StreamAbort as e:
+            # 模型正常响应，只是这次输出无效：不计入熔断，换下一个模型重试
+            record_usage('gemini', model_name, stage, prompt, e.text or "", gemini_usage(response))
+            aborted += 1
+            breaker.record_success()
+            if cancel is not None and cancel.is_set():
+                break
+            if e.text and partial is not None:
+                partial.append(e.text)
+            print(f"✂️  Gemini {model_name} 输出无效，提前中止: {e.reason}")
+            continue
+        except Exception as e:
+            if is_rate_limit_error(e):
+                throttled += 1
+                breaker.record_failure(trip=True, cooldown=get_retry_after(e))
+                print(f"⚠️ Gemini {model_name} 限额或速率限制，尝试下一个模型...")
+            else:
+                breaker.record_failure()
+                print(f"⚠️ Gemini {model_name} 异常: {str(e)[:120]}")
+                if is_model_unavailable_error(e):
+                    report_model_failure(model_name)
+            continue
+
+    # 所有模型都被限流，说明是服务商级配额，整体降速并断开服务商熔断器
+    failed = attempted - aborted
+    if failed and throttled == failed:
+        get_rate_limiter('gemini').on_throttle()
+        provider_breaker.record_failure(trip=True)
+    elif failed:
+        provider_breaker.record_failure()
+    elif attempted:
+        provider_breaker.record_success()
+    else:
+        # 所有模型都在熔断中：没有实际调用，归还服务商级探测名额
+        provider_breaker.release()
+    return None
+
+
+# ==================== DeepSeek 备份引擎 ====================
+
+def call_deepseek(prompt: str, system_prompt: str = DEFAULT_SYSTEM_PROMPT, max_tokens: int = 2000,
+                  required_keys: Optional[Sequence[str]] = None,
+                  cancel: Optional[threading.Event] = None,
+                  response_schema: Optional[Dict] = None, stage: str = "analysis",
+                  partial: Optional[List[str]] = None) -> Optional[str]:
+    """
+    调用 DeepSeek（OpenAI 兼容接口）
+
+    参数:
+        required_keys: 期望 JSON 输出包含的字段；不为 None 时使用流式输出增量校验，无效输出提前关闭连接
+        cancel: 取消事件（对冲请求的主引擎已经返回），流式输出在下一个分块处关闭连接
+        response_schema: 输出的 JSON Schema；根为对象时使用 DeepSeek 的 json_object 输出模式（不支持数组）
+        stage: 用量计量中的阶段名称
+        partial: 收集只缺少字段的完整 JSON（不算成功）
+
+    返回:
+        模型输出文本；失败（包括输出只缺少字段）返回 None
+    """
+    # 客户端按 API Key 复用，连接池在多次调用之间保持 Keep-Alive
+    ds_client = get_openai_client(DEEPSEEK_API_KEY, DEEPSEEK_BASE_URL)
+    if ds_client is None:
+        print("❌ DeepSeek 备份引擎未配置（缺少 DEEPSEEK_API_KEY 或未安装 openai）")
+        return None
+    breaker = get_breaker('deepseek')
+    if not breaker.allow():
+        print("⏭️  DeepSeek 熔断中，跳过备份引擎")
+        return None
+    try:
+        print("[DeepSeek] 正在接管任务...")
+        stream = LLM_STREAMING and required_keys is not None
+        extra = {}
+        if response_schema is not None and LLM_JSON_MODE and response_schema.get('type') == 'object':
+            extra['response_format'] = {'type': 'json_object'}
+        completion = limited_call(
+            'deepseek',
+            ds_client.chat.completions.create,
+            model=DEEPSEEK_MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.3,
+            max_tokens=max_tokens,
+            stream=stream,
+            **extra,
+        )
+        if stream:
+            try:
+                text = read_stream(
+                    (chunk.choices[0].delta.content or "" for chunk in completion if chunk.choices),
+                    required_keys, cancel,
+                ).strip()
+            finally:
+                # 提前结束时关闭连接，停止生成
+                completion.close()
+        else:
+            text = (completion.choices[0].message.content or "").strip()
+        # 流式输出提前结束时没有服务商用量，按文本估算
+        record_usage('deepseek', DEEPSEEK_MODEL, stage, system_prompt + prompt, text,
+                     None if stream else openai_usage(completion))
+        if not text:
+            breaker.record_failure()
+            return None
+        breaker.record_success()
+        return text
+    except StreamAbort as e:
+        record_usage('deepseek', DEEPSEEK_MODEL, stage, system_prompt + prompt, e.text or "")
+        breaker.record_success()
+        if cancel is not None and cancel.is_set():
+            return None
+        print(f"✂️  DeepSeek 输出无效，提前中止: {e.reason}")
+        if e.text and partial is not None:
+            partial.append(e.text)
+        return None
+    except Exception as e:
+        breaker.record_failure(trip=is_rate_limit_error(e), cooldown=get_retry_after(e))
+        print(f"❌ DeepSeek 备份引擎失败: {str(e)}")
+        return None
+
+
+# ==================== 统一入口 ====================
+
+def _cache_key(prompt: str, system_prompt: str, max_tokens: int, models: Optional[List[str]],
+               prompt_version: str) -> str:
+    """缓存键：Gemini 级联顺序 + DeepSeek 模型 + 提示词版本 + 系统提示词 + max_tokens + 提示词"""
+    model = ','.join(models or DEFAULT_GEMINI_MODELS) + '|' + DEEPSEEK_MODEL
+    return make_cache_key(model, prompt, prompt_version, system_prompt=system_prompt, max_tokens=max_tokens)
+
+
+def get_ai_analysis(prompt: str, system_prompt: str = DEFAULT_SYSTEM_PROMPT, max_tokens: int = 2000,
+                    models: Optional[List[str]] = None, prompt_version: str = "1",
+                    use_cache: bool = True, required_keys: Optional[Sequence[str]] = None,
+                    response_schema: Optional[Dict] = None, stage: str = "analysis") -> Optional[str]:
+    """
+    通用AI分析函数：优先使用 Gemini，失败或限额后自动切换到 DeepSeek 备份引擎
+
+    参数:
+        prompt: 提示词
+        system_prompt: DeepSeek 使用的系统提示词
+        max_tokens: DeepSeek 最大输出 token 数
+        models: Gemini 模型级联顺序（默认 DEFAULT_GEMINI_MODELS）
+        prompt_version: 提示词模板版本（修改模板时递增，旧的缓存响应随之失效）
+        use_cache: 是否使用 LLM 响应缓存
+        required_keys: 期望 JSON 输出包含的字段（不影响缓存键）；指定后流式输出并增量校验，
+                       结构错误或缺少字段的输出提前中止，切换到下一个模型
+        response_schema: 输出的 JSON Schema（不影响缓存键）；指定后使用服务商原生 JSON 输出模式
+        stage: 用量计量中的阶段名称，如 extract、validate、deidentify（不影响缓存键）
+
+    返回:
+        纯文本字符串（期望为JSON字符串）；失败返回 None
+    """
+    cache = get_llm_cache() if use_cache else None
+    key = _cache_key(prompt, system_prompt, max_tokens, models, prompt_version) if cache else None
+    if cache:
+        cached = cache.get(key)
+        if cached:
+            print("♻️  [LLMCache] 命中缓存，跳过 AI 调用")
+            return cached
+
+    # 只缺少字段的输出不算成功（仍切换到备份引擎），两个引擎都失败时才使用，且不写入缓存
+    partial: List[str] = []
+
+    def primary(cancel: Optional[threading.Event] = None) -> Optional[str]:
+        # 记录 Gemini 成功调用的耗时，作为对冲的触发阈值（被取消的调用不计入）
+        started = time.monotonic()
+        result = call_gemini(prompt, models, required_keys=required_keys, cancel=cancel,
+                             response_schema=response_schema, stage=stage, partial=partial)
+        if result and not (cancel is not None and cancel.is_set()):
+            get_latency_tracker().record('gemini', time.monotonic() - started)
+        return result
+
+    def secondary(cancel: Optional[threading.Event] = None) -> Optional[str]:
+        return call_deepseek(prompt, system_prompt=system_prompt, max_tokens=max_tokens,
+                             required_keys=required_keys, cancel=cancel, response_schema=response_schema,
+                             stage=stage, partial=partial)
+
+    print("[Gemini] 正在分析...")
+    hedge_after = get_latency_tracker().percentile('gemini') if LLM_HEDGING and DEEPSEEK_API_KEY else None
+    if hedge_after is not None:
+        # 只有可以对冲的调用积累额度：跳过对冲期间不囤积额度，避免之后第一个慢时段集中对冲
+        hedge_budget = get_hedge_budget()
+        hedge_budget.earn()
+        # Gemini 超过历史 p90 延迟仍未返回时，同时发送给 DeepSeek，采用先返回的有效结果
+        text, _ = hedged_call(primary, secondary, hedge_after, hedge_budget, label="Gemini → DeepSeek")
+    else:
+        text = primary()
+        if not text:
+            print("⚠️ Gemini 不可用，正在切换至 DeepSeek 备份引擎...")
+            text = secondary()
+
+    if not text and partial:
+        # 所有引擎的输出都缺少部分字段：使用第一个完整的 JSON（缺失字段由调用方补为"未知"），下次重新调用
+        print("⚠️ AI 输出缺少部分字段，使用已完成的结果（不写入缓存）")
+        return partial[0]
+
+    # 只缓存看起来包含 JSON 对象的响应，明显无效的输出下次重新调用
+    if cache and text and '{' in text and '}' in text:
+        cache.set(key, text, model=','.join(models or DEFAULT_GEMINI_MODELS))
+    return text
+
+
+def forget_cached_analysis(prompt: str, system_prompt: str = DEFAULT_SYSTEM_PROMPT, max_tokens: int = 2000,
+                           models: Optional[List[str]] = None, prompt_version: str = "1"):
+    """删除某个提示词的缓存响应（调用方发现缓存的响应无法解析时使用，参数与 get_ai_analysis 一致）"""
+    cache = get_llm_cache()
+    if cache:
+        cache.delete(_cache_key(prompt, system_prompt, max_tokens, models, prompt_version))
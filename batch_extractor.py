@@ -0,0 +1,187 @@
+"""
+GIFIA - 批量案例提取
+把多篇候选文章打包进同一个提示词，一次 LLM 调用返回 JSON 数组，再按序号（序号不可靠时按链接）拆回每篇文章的结果：
+- 大段的 SIU 简报说明每批只发送一次，而不是每篇文章重复一次
+- 请求次数减少为约 1/EXTRACT_BATCH_SIZE，在每分钟请求数（RPM）配额下吞吐更高
+
+整批调用失败、响应无法解析，或数组中缺少某篇文章时，对应文章回退为单篇提取
+（与 fetch_news.js 的批量模式一致）
+"""
+
+import os
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import ai_engine
+from structured_output import CASE_FIELDS, CASE_SCHEMA, normalize_case, parse_json
+from url_canonical import canonical_url
+
+# ==================== 批量配置 ====================
+
+# 每次 LLM 调用打包的文章数（1 表示关闭批量模式，逐篇提取）
+EXTRACT_BATCH_SIZE = int(os.getenv("EXTRACT_BATCH_SIZE", "3"))
+# 每篇文章预留的输出 token 数（DeepSeek 的 max_tokens 按文章数放大）
+EXTRACT_TOKENS_PER_ARTICLE = int(os.getenv("EXTRACT_TOKENS_PER_ARTICLE", "2000"))
+
+REQUIRED_FIELDS = CASE_FIELDS
+
+# 批量输出的 JSON Schema：案例对象数组，每个对象额外带文章编号
+BATCH_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'properties': {'index': {'type': 'integer'}, **CASE_SCHEMA['properties']},
+        'required': ['index'] + CASE_FIELDS,
+    },
+}
+
+
+def build_batch_prompt(articles: List[Dict], guide: str) -> str:
+    """
+    构建批量提取提示词
+
+    参数:
+        articles: 文章列表，每项包含 url、title、content
+        guide: 单篇提取使用的【分析任务】/【输出要求】说明（整批只出现一次）
+    """
+    sections = []
+    for index, article in enumerate(articles, 1):
+        sections.append(
+            f"===== 文章 {index} =====\n"
+            f"网页标题: {article.get('title', '')}\n"
+            f"网页链接: {article.get('url', '')}\n"
+            f"网页内容摘要:\n{article.get('content', '')}"
+        )
+    articles_text = "\n\n".join(sections)
+    return f"""
+你是一位全球寿险与健康险反欺诈专家（SIU 资深调查员）。请逐篇分析以下 {len(articles)} 篇网页信息中的保险欺诈案例，并按照专业简报格式输出。
+
+{articles_text}
+
+{guide}
+
+【批量输出要求】
+- 必须输出一个纯 JSON 数组，不要包含任何 Markdown 标记或额外说明
+- 数组中每篇文章对应一个对象，共 {len(articles)} 个，对象格式与上面的单篇要求完全相同
+- 每个对象额外包含 "index" 字段（整数，对应上面的文章编号）
+- 各篇文章独立分析，不要混用其他文章的信息
+
+现在请开始分析：
+"""
+
+
+def _same_url(reported: Optional[str], url: Optional[str]) -> bool:
+    """模型回填的 Source_URL 是否指向同一篇文章（按规范化 URL 比较）"""
+    if not reported or not url:
+        return False
+    return reported.strip() == url or canonical_url(reported) == canonical_url(url)
+
+
+def _parse_index(item: Dict) -> Optional[int]:
+    """读取并移除 index 字段，无法解析时返回 None"""
+    try:
+        return int(item.pop('index'))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def parse_batch_response(text: str, articles: List[Dict]) -> List[Optional[Dict]]:
+    """
+    解析批量响应，按文章顺序返回结果
+
+    对应规则（结果错配会把一篇文章的案例保存到另一篇文章的 source_url 下，宁可回退单篇提取）：
+    - index 恰好是 1..N 且每项的 Source_URL（如有）与该编号的文章一致时，按 index 对应
+    - 否则按 Source_URL 对应，对应不上的文章为 None（回退为单篇提取）
+    - 既没有 index 也没有 Source_URL 且数量一致时，按数组顺序对应
+
+    返回:
+        与 articles 等长的列表，无法对应的文章为 None
+
+    异常:
+        StructuredOutputError: 响应无法解析为 JSON 数组（或包含数组的对象）
+    """
+    items = [item for item in parse_json(text, expect=list) if isinstance(item, dict)]
+    indexes = [_parse_index(item) for item in items]
+    results: List[Optional[Dict]] = [None] * len(articles)
+
+    expected = list(range(1, len(articles) + 1))
+    if sorted(i for i in indexes if i is not None) == expected and None not in indexes:
+        ordered = [None] * len(articles)
+        for index, item in zip(indexes, items):
+            ordered[index - 1] = item
+        if all(not item.get('Source_URL') or _same_url(item['Source_URL'], article.get('url'))
+               for item, article in zip(ordered, articles)):
+            return ordered
+
+    if any(item.get('Source_URL') for item in items):
+        for item in items:
+            matches = [i for i, article in enumerate(articles)
+                       if _same_url(item.get('Source_URL'), article.get('url'))]
+            if len(matches) == 1 and results[matches[0]] is None:
+                results[matches[0]] = item
+        return results
+
+    # 模型没有返回编号和链接：数量一致时按顺序对应
+    if all(index is None for index in indexes) and len(items) == len(articles):
+        return list(items)
+    return results
+
+
+def complete_case_data(case_data: Dict, url: str) -> Dict:
+    """校验必需字段并添加元数据（与单篇提取一致）"""
+    normalize_case(case_data)
+    case_data['Source_URL'] = url
+    case_data['Created_at'] = datetime.now().isoformat()
+    return case_data
+
+
+def extract_cases_batch(articles: List[Dict], guide: str,
+                        extract_single: Callable[[str, str, str], Optional[Dict]],
+                        system_prompt: str = ai_engine.DEFAULT_SYSTEM_PROMPT,
+                        batch_size: int = EXTRACT_BATCH_SIZE) -> List[Optional[Dict]]:
+    """
+    批量提取案例信息
+
+    参数:
+        articles: 文章列表，每项包含 url、title、content
+        guide: 单篇提取使用的【分析任务】/【输出要求】说明
+        extract_single: 单篇提取函数 (url, title, content) -> case_data，用于回退
+        system_prompt: DeepSeek 使用的系统提示词
+        batch_size: 每次调用打包的文章数
+
+    返回:
+        与 articles 等长的列表，提取失败的文章为 None
+    """
+    results: List[Optional[Dict]] = []
+    batch_size = max(1, batch_size)
+    for offset in range(0, len(articles), batch_size):
+        batch = articles[offset:offset + batch_size]
+        batch_results: List[Optional[Dict]] = [None] * len(batch)
+
+        if len(batch) > 1:
+            prompt = build_batch_prompt(batch, guide)
+            max_tokens = EXTRACT_TOKENS_PER_ARTICLE * len(batch)
+            print(f"📦 批量提取 {len(batch)} 篇文章（一次 AI 调用）...")
+            text = ai_engine.get_ai_analysis(prompt, system_prompt=system_prompt, max_tokens=max_tokens,
+                                            required_keys=REQUIRED_FIELDS, response_schema=BATCH_SCHEMA,
+                                            stage="extract_batch")
+            if text:
+                try:
+                    batch_results = parse_batch_response(text, batch)
+                except ValueError as e:
+                    # StructuredOutputError 是 ValueError 的子类
+                    print(f"⚠️ 批量响应解析失败，回退为单篇提取: {str(e)}")
+                    ai_engine.forget_cached_analysis(prompt, system_prompt=system_prompt, max_tokens=max_tokens)
+            else:
+                print("⚠️ 批量提取未返回内容，回退为单篇提取")
+
+        for i, article in enumerate(batch):
+            case_data = batch_results[i]
+            if case_data is not None:
+                batch_results[i] = complete_case_data(case_data, article['url'])
+                continue
+            if len(batch) > 1:
+                print(f"   ↩️  单篇提取: {article['url'][:80]}")
+            batch_results[i] = extract_single(article['url'], article['title'], article['content'])
+        results.extend(batch_results)
+    return results
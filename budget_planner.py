@@ -0,0 +1,230 @@
+"""
+GIFIA - 运行预算规划器
+根据运行截止时间和各服务商的调用预算，结合历史运行中每个案例的平均耗时和调用量，
+决定本次运行处理多少个 URL；截止时间到达或预算用完后，未开始的工作干净地取消，
+保证整个运行落在 GitHub Actions 的 job 超时时间之内
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from gifia_state import state_path
+from rate_limiter import DEFAULT_RPM, get_rate_limiter
+
+# ==================== 预算配置 ====================
+
+# 运行截止时间（分钟），应小于 workflow 的 timeout-minutes，留出保存运行日志的时间
+RUN_DEADLINE_MINUTES = float(os.getenv("RUN_DEADLINE_MINUTES", "45"))
+# 截止前预留的安全时间（秒）：最后一个案例开始后仍需要的收尾时间
+RUN_DEADLINE_RESERVE_SECONDS = float(os.getenv("RUN_DEADLINE_RESERVE_SECONDS", "120"))
+
+# 没有历史数据时的默认估计：每个案例的耗时（秒）和各服务商调用次数
+DEFAULT_SECONDS_PER_CASE = float(os.getenv("ESTIMATED_SECONDS_PER_CASE", "60"))
+DEFAULT_CALLS_PER_CASE = {
+    'firecrawl': 1.0,
+    'gemini': 1.0,
+}
+
+# 历史估计的平滑系数（指数移动平均，越大越偏向最近一次运行）
+HISTORY_ALPHA = 0.3
+
+
+def load_call_budgets() -> Dict[str, int]:
+    """
+    从环境变量读取各服务商的调用预算，如 FIRECRAWL_CALL_BUDGET=10、GEMINI_CALL_BUDGET=40
+    未设置或设置为 0 的服务商不限制
+    """
+    budgets = {}
+    for provider in DEFAULT_RPM:
+        value = int(os.getenv(f"{provider.upper()}_CALL_BUDGET", "0"))
+        if value > 0:
+            budgets[provider] = value
+    return budgets
+
+
+# ==================== 历史成本 ====================
+
+class CostHistory:
+    """
+    每条流水线的历史成本（JSON 文件，存放在 .gifia/ 下）
+
+    {'deep_research': {'seconds_per_case': 75.2, 'calls_per_case': {'firecrawl': 1.0, 'gemini': 1.4}, 'runs': 12}}
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or state_path('cost_history.json')
+        self._lock = threading.Lock()
+        self.data: Dict[str, Dict] = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+
+    def estimate(self, pipeline: str) -> Dict:
+        """返回每个案例的预估耗时和调用量（没有历史数据时使用默认值）"""
+        with self._lock:
+            entry = self.data.get(pipeline) or {}
+            return {
+                'seconds_per_case': entry.get('seconds_per_case', DEFAULT_SECONDS_PER_CASE),
+                'calls_per_case': dict(entry.get('calls_per_case') or DEFAULT_CALLS_PER_CASE),
+                'runs': entry.get('runs', 0),
+            }
+
+    def record(self, pipeline: str, seconds_per_case: float, calls_per_case: Dict[str, float]):
+        """用一次运行的实际成本更新历史估计并写回文件"""
+        with self._lock:
+            entry = self.data.get(pipeline)
+            if not entry:
+                entry = {'seconds_per_case': seconds_per_case, 'calls_per_case': dict(calls_per_case), 'runs': 0}
+            else:
+                entry['seconds_per_case'] = (HISTORY_ALPHA * seconds_per_case
+                                             + (1 - HISTORY_ALPHA) * entry['seconds_per_case'])
+                old_calls = entry.get('calls_per_case') or {}
+                for provider in set(old_calls) | set(calls_per_case):
+                    entry.setdefault('calls_per_case', {})[provider] = round(
+                        HISTORY_ALPHA * calls_per_case.get(provider, 0.0)
+                        + (1 - HISTORY_ALPHA) * old_calls.get(provider, 0.0), 3)
+            entry['runs'] += 1
+            self.data[pipeline] = entry
+            try:
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(self.data, f, ensure_ascii=False, indent=2)
+            except OSError as e:
+                print(f"⚠️ [Budget] 历史成本写入失败: {str(e)}")
+
+
+# ==================== 运行预算 ====================
+
+class RunBudget:
+    """
+    一次运行的预算：截止时间 + 各服务商调用次数上限
+    调用量从共享限流器已发放的令牌数统计，不需要在调用处逐一记账
+    """
+
+    def __init__(self, deadline_minutes: Optional[float] = None, call_budgets: Optional[Dict[str, int]] = None):
+        self.started_at = time.monotonic()
+        minutes = RUN_DEADLINE_MINUTES if deadline_minutes is None else deadline_minutes
+        self.deadline = self.started_at + minutes * 60
+        self.call_budgets = load_call_budgets() if call_budgets is None else dict(call_budgets)
+        self._baseline = self.call_counts()
+
+    @staticmethod
+    def call_counts() -> Dict[str, int]:
+        """各服务商限流器目前已发放的令牌数"""
+        return {provider: get_rate_limiter(provider).granted for provider in DEFAULT_RPM}
+
+    def remaining_seconds(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining_seconds() <= 0
+
+    def calls_used(self, provider: str) -> int:
+        return get_rate_limiter(provider).granted - self._baseline.get(provider, 0)
+
+    def remaining_calls(self, provider: str) -> Optional[int]:
+        """某服务商剩余调用次数，不限制时返回 None"""
+        if provider not in self.call_budgets:
+            return None
+        return self.call_budgets[provider] - self.calls_used(provider)
+
+    def exhausted(self) -> Optional[str]:
+        """预算是否用完，返回原因（未用完返回 None）"""
+        if self.expired():
+            return "已到达运行截止时间"
+        for provider in self.call_budgets:
+            if self.remaining_calls(provider) <= 0:
+                return f"{provider} 调用预算已用完"
+        return None
+
+
+class BudgetPlanner:
+    """
+    预算规划器
+
+    用法:
+        planner = BudgetPlanner('deep_research')         # 在运行开始时创建，开始计时
+        n = planner.plan(len(candidates), concurrency=3)  # 决定处理多少个 URL
+        ...每个案例的每个阶段开始前检查 planner.should_stop()，完成后 planner.record_case(耗时)
+        planner.finish()                                  # 把本次实际成本写入历史
+    """
+
+    def __init__(self, pipeline: str, budget: Optional[RunBudget] = None, history: Optional[CostHistory] = None,
+                 reserve_seconds: float = RUN_DEADLINE_RESERVE_SECONDS):
+        self.pipeline = pipeline
+        self.budget = budget or RunBudget()
+        self.history = history or CostHistory()
+        self.reserve_seconds = reserve_seconds
+        self.case_seconds: List[float] = []
+        self._case_baseline = RunBudget.call_counts()
+        self._lock = threading.Lock()
+        self._stop_reason: Optional[str] = None
+
+    def plan(self, candidates: int, concurrency: int = 1) -> int:
+        """
+        根据剩余时间和调用预算决定处理的案例数
+
+        参数:
+            candidates: 候选 URL 数量
+            concurrency: 同时处理的案例数
+
+        返回:
+            本次应处理的案例数（0 ~ candidates）
+        """
+        estimate = self.history.estimate(self.pipeline)
+        seconds_per_case = max(estimate['seconds_per_case'], 1.0)
+        caps = {'candidates': candidates}
+
+        usable = self.budget.remaining_seconds() - self.reserve_seconds
+        caps['time'] = max(0, math.floor(usable * max(1, concurrency) / seconds_per_case))
+
+        for provider in self.budget.call_budgets:
+            per_case = estimate['calls_per_case'].get(provider, 0)
+            if per_case > 0:
+                caps[provider] = max(0, math.floor(self.budget.remaining_calls(provider) / per_case))
+
+        count = min(caps.values())
+        limiting = min(caps, key=caps.get)
+        # 规划之后的调用才计入案例成本（搜索等前置调用不算）
+        self._case_baseline = RunBudget.call_counts()
+        print(f"🧮 [Budget] 剩余 {max(0, usable):.0f}s，预估每案例 {seconds_per_case:.0f}s "
+              f"（历史 {estimate['runs']} 次运行），计划处理 {count}/{candidates} 个案例（受限于 {limiting}）")
+        return count
+
+    def should_stop(self) -> bool:
+        """截止时间到达或调用预算用完时返回 True（只打印一次原因）"""
+        reason = self.budget.exhausted()
+        if reason:
+            with self._lock:
+                if self._stop_reason is None:
+                    self._stop_reason = reason
+                    print(f"⏹️  [Budget] {reason}，取消尚未开始的工作")
+            return True
+        return False
+
+    def record_case(self, seconds: float):
+        """记录一个已完成处理的案例耗时（线程安全）"""
+        with self._lock:
+            self.case_seconds.append(seconds)
+
+    def finish(self):
+        """把本次运行的平均成本写入历史（没有完成任何案例时不更新）"""
+        with self._lock:
+            cases = len(self.case_seconds)
+            if not cases:
+                return
+            seconds_per_case = sum(self.case_seconds) / cases
+        counts = RunBudget.call_counts()
+        calls_per_case = {
+            provider: (counts[provider] - self._case_baseline.get(provider, 0)) / cases
+            for provider in counts
+            if counts[provider] > self._case_baseline.get(provider, 0)
+        }
+        self.history.record(self.pipeline, seconds_per_case, calls_per_case)
+        print(f"🧮 [Budget] 本次平均每案例 {seconds_per_case:.0f}s，调用量 "
+              f"{', '.join(f'{p}={c:.1f}' for p, c in calls_per_case.items()) or '无'}")
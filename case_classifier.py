@@ -0,0 +1,431 @@
+"""
+GIFIA - 本地案例预分类器（TF-IDF + 逻辑回归）
+Scout 的关键词过滤放过了不少市场报告和评论文章，这些页面到了 Analyst 只能得到全是"未知"的结果。
+在 Firecrawl 抓取和 Gemini 提取之前，用本地线性模型给 标题 + 摘要 + URL 打分，低于阈值的候选直接丢弃
+
+- 训练数据：深度研究流程中每个候选的最终结果（保存为正例，被 Validator 拒绝为负例），
+  以及 fraud_cases 中已入库案例的 URL（冷启动正例），样本保存在 .gifia/case_examples.db
+- fraud_cases 回填样本只有 URL 特征：不参与留出集评估，Validator 正例足够后不再参与训练
+  （否则模型会学到"有标题 / 摘要 → 非案例"）
+- 训练和打分使用同样的特征（标题 + 摘要开头 + URL）；低于阈值的候选按 CASE_CLASSIFIER_EXPLORE_RATE 抽样放行，
+  继续获得被过滤页面的标签，避免模型启用后负例枯竭、留出集指标偏高
+- 模型：纯 Python 实现，不依赖 scikit-learn；保存在 .gifia/case_classifier.json
+- 每次训练在留出集上报告精确率和召回率；样本不足时不启用过滤（全部放行）
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from gifia_state import connect_sqlite, state_path
+
+# ==================== 分类器配置 ====================
+
+CASE_CLASSIFIER_ENABLED = os.getenv("CASE_CLASSIFIER_ENABLED", "1") == "1"
+# 案例概率低于该阈值的候选被丢弃（偏向召回：宁可多抓几篇，也不漏掉真实案例）
+CASE_CLASSIFIER_THRESHOLD = float(os.getenv("CASE_CLASSIFIER_THRESHOLD", "0.3"))
+# 正例和负例都至少有这么多条样本时才训练和启用
+CASE_CLASSIFIER_MIN_EXAMPLES = int(os.getenv("CASE_CLASSIFIER_MIN_EXAMPLES", "20"))
+# 模型超过该时间（小时）或样本数增加后重新训练
+CASE_CLASSIFIER_RETRAIN_HOURS = float(os.getenv("CASE_CLASSIFIER_RETRAIN_HOURS", "24"))
+# 从 fraud_cases 读取的正例上限
+CASE_CLASSIFIER_MAX_DB_CASES = int(os.getenv("CASE_CLASSIFIER_MAX_DB_CASES", "500"))
+# 低于阈值的候选被抽样放行的比例（放行后由 Validator 打标签，作为无偏的训练和评估样本）
+CASE_CLASSIFIER_EXPLORE_RATE = float(os.getenv("CASE_CLASSIFIER_EXPLORE_RATE", "0.1"))
+# 摘要只取开头部分（行数 / 字符数），搜索摘要和抓取全文得到的特征一致
+SNIPPET_LINES = 3
+SNIPPET_CHARS = 500
+
+# 留出集比例（按 URL 哈希划分，每次训练结果稳定）
+HOLDOUT_BUCKETS = 5
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9']+")
+_CJK_RE = re.compile(r"[一-鿿]+")
+_STOPWORDS = {
+    'the', 'and', 'for', 'with', 'that', 'this', 'from', 'was', 'were', 'are', 'has', 'have', 'had',
+    'his', 'her', 'their', 'its', 'who', 'will', 'into', 'over', 'after', 'about', 'more', 'than',
+    'www', 'com', 'html', 'htm', 'php', 'https', 'http', 'news', 'article',
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """分词：英文单词（去停用词）+ 中文字符二元组"""
+    text = (text or "").lower()
+    tokens = [word for word in _WORD_RE.findall(text) if word not in _STOPWORDS]
+    for run in _CJK_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def example_text(title: str = "", snippet: str = "", url: str = "") -> str:
+    """候选的分类文本：标题 + 摘要开头几行 + URL 路径中的单词（新闻稿的 URL 通常就是标题）"""
+    lines = [line.strip() for line in (snippet or "").splitlines() if line.strip()]
+    head = " ".join(lines[:SNIPPET_LINES])[:SNIPPET_CHARS]
+    path = urlparse(url or "").path
+    return " ".join(part for part in (title, head, re.sub(r"[-_/.]+", " ", path).strip()) if part)
+
+
+# ==================== 模型 ====================
+
+class CaseClassifier:
+    """TF-IDF 特征 + L2 正则的逻辑回归（批量梯度下降，按类别频率加权）"""
+
+    def __init__(self, idf: Optional[Dict[str, float]] = None, weights: Optional[Dict[str, float]] = None,
+                 bias: float = 0.0, metrics: Optional[Dict] = None, trained_at: float = 0.0, examples: int = 0):
+        self.idf = idf or {}
+        self.weights = weights or {}
+        self.bias = bias
+        self.metrics = metrics or {}
+        self.trained_at = trained_at
+        self.examples = examples
+
+    def vectorize(self, text: str) -> Dict[str, float]:
+        """L2 归一化的 TF-IDF 向量（只保留训练词表中的词）"""
+        counts: Dict[str, int] = {}
+        for token in tokenize(text):
+            if token in self.idf:
+                counts[token] = counts.get(token, 0) + 1
+        vector = {token: (1 + math.log(count)) * self.idf[token] for token, count in counts.items()}
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        return {token: value / norm for token, value in vector.items()} if norm else {}
+
+    def fit(self, texts: Sequence[str], labels: Sequence[int], epochs: int = 300,
+            learning_rate: float = 1.0, l2: float = 1e-3) -> 'CaseClassifier':
+        """训练模型；labels 中 1 表示具体案例，0 表示非案例"""
+        document_frequency: Dict[str, int] = {}
+        for text in texts:
+            for token in set(tokenize(text)):
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+        n = len(texts)
+        self.idf = {token: math.log((1 + n) / (1 + df)) + 1 for token, df in document_frequency.items()}
+        vectors = [self.vectorize(text) for text in texts]
+
+        positives = sum(labels)
+        negatives = n - positives
+        # 类别加权：正负例数量悬殊时（fraud_cases 正例远多于负例）仍然学习负例
+        class_weight = {1: n / (2 * positives) if positives else 1.0, 0: n / (2 * negatives) if negatives else 1.0}
+
+        # 训练时使用按词表下标存储的稀疏向量和列表权重，避免内层循环的字典查找
+        vocabulary = {token: index for index, token in enumerate(self.idf)}
+        rows = [[(vocabulary[token], value) for token, value in vector.items()] for vector in vectors]
+        weights = [0.0] * len(vocabulary)
+        bias = 0.0
+        for _ in range(epochs):
+            gradient = [0.0] * len(weights)
+            bias_gradient = 0.0
+            for row, label in zip(rows, labels):
+                z = bias + sum(weights[index] * value for index, value in row)
+                proba = 1.0 / (1.0 + math.exp(-z)) if z > -30 else 0.0
+                error = (proba - label) * class_weight[label]
+                bias_gradient += error
+                for index, value in row:
+                    gradient[index] += error * value
+            decay = 1 - learning_rate * l2
+            weights = [weight * decay - learning_rate * grad / n for weight, grad in zip(weights, gradient)]
+            bias -= learning_rate * bias_gradient / n
+        self.weights = {token: weights[index] for token, index in vocabulary.items() if weights[index]}
+        self.bias = bias
+        self.examples = n
+        self.trained_at = time.time()
+        return self
+
+    def _proba(self, vector: Dict[str, float]) -> float:
+        z = self.bias + sum(self.weights.get(token, 0.0) * value for token, value in vector.items())
+        if z < -30:
+            return 0.0
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def predict_proba(self, text: str) -> float:
+        """文本为具体案例的概率"""
+        return self._proba(self.vectorize(text))
+
+    def to_dict(self) -> Dict:
+        return {'idf': self.idf, 'weights': self.weights, 'bias': self.bias, 'metrics': self.metrics,
+                'trained_at': self.trained_at, 'examples': self.examples}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CaseClassifier':
+        return cls(data.get('idf'), data.get('weights'), data.get('bias', 0.0), data.get('metrics'),
+                   data.get('trained_at', 0.0), data.get('examples', 0))
+
+
+def evaluate(classifier: CaseClassifier, texts: Sequence[str], labels: Sequence[int],
+             threshold: float = CASE_CLASSIFIER_THRESHOLD) -> Dict:
+    """
+    评估分类器
+
+    返回:
+        {'precision', 'recall', 'accuracy', 'samples'}：正例为"具体案例"，
+        召回率低表示真实案例被误丢弃，精确率低表示放过了非案例
+    """
+    tp = fp = fn = tn = 0
+    for text, label in zip(texts, labels):
+        predicted = classifier.predict_proba(text) >= threshold
+        if predicted and label:
+            tp += 1
+        elif predicted:
+            fp += 1
+        elif label:
+            fn += 1
+        else:
+            tn += 1
+    return {
+        'precision': round(tp / (tp + fp), 3) if tp + fp else 0.0,
+        'recall': round(tp / (tp + fn), 3) if tp + fn else 0.0,
+        'accuracy': round((tp + tn) / len(labels), 3) if labels else 0.0,
+        'samples': len(labels),
+    }
+
+
+# ==================== 训练样本 ====================
+
+class ExampleStore:
+    """基于 SQLite 的训练样本（每个 URL 一条，最新的结果覆盖旧结果），线程安全"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or state_path('case_examples.db')
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS case_examples (
+                    url TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    label INTEGER NOT NULL,
+                    source TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+
+    def add(self, url: str, text: str, label: int, source: str):
+        """
+        记录一条样本
+
+        参数:
+            label: 1 表示具体案例，0 表示非案例
+            source: 样本来源（fraud_cases / validator）
+        """
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO case_examples (url, text, label, source, created_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    text = excluded.text, label = excluded.label, source = excluded.source,
+                    created_at = excluded.created_at
+                """,
+                (url, text, int(label), source, time.time()),
+            )
+            self._conn.commit()
+
+    def add_many(self, rows: Iterable[Tuple[str, str, int, str]]):
+        """批量记录 (url, text, label, source)；已有的 URL 只在来源相同时更新（运行中记录的结果优先于数据库回填）"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO case_examples (url, text, label, source, created_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET text = excluded.text, label = excluded.label
+                WHERE case_examples.source = excluded.source
+                """,
+                [(url, text, int(label), source, now) for url, text, label, source in rows],
+            )
+            self._conn.commit()
+
+    def examples(self, source: Optional[str] = None) -> List[Tuple[str, str, int]]:
+        """样本 (url, text, label)；指定 source 时只返回该来源的样本"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, text, label FROM case_examples WHERE ? IS NULL OR source = ? ORDER BY url",
+                (source, source),
+            ).fetchall()
+        return [(row['url'], row['text'], row['label']) for row in rows]
+
+    def count(self, source: Optional[str] = None, label: Optional[int] = None) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM case_examples WHERE (? IS NULL OR source = ?) AND (? IS NULL OR label = ?)",
+                (source, source, label, label),
+            ).fetchone()[0]
+
+
+def _is_holdout(url: str) -> bool:
+    return int(hashlib.sha1(url.encode('utf-8')).hexdigest(), 16) % HOLDOUT_BUCKETS == 0
+
+
+def train_classifier(examples: Sequence[Tuple[str, str, int]],
+                     min_examples: int = CASE_CLASSIFIER_MIN_EXAMPLES,
+                     threshold: float = CASE_CLASSIFIER_THRESHOLD,
+                     train_only: Iterable[str] = ()) -> Optional[CaseClassifier]:
+    """
+    训练分类器：先在训练集上训练、在留出集上评估精确率和召回率，再用全部样本训练最终模型
+
+    参数:
+        examples: (url, text, label) 列表
+        min_examples: 正例和负例的最少样本数
+        train_only: 只用于训练、不进入留出集的 URL（特征与打分时不一致的回填样本）
+
+    返回:
+        分类器（metrics 中为留出集指标）；样本不足时返回 None
+    """
+    positives = sum(1 for _, _, label in examples if label)
+    negatives = len(examples) - positives
+    if positives < min_examples or negatives < min_examples:
+        print(f"ℹ️  [Classifier] 样本不足（正例 {positives} / 负例 {negatives}，各需 {min_examples}），暂不启用预分类")
+        return None
+
+    train_only = set(train_only)
+    holdout_urls = {url for url, _, _ in examples if _is_holdout(url) and url not in train_only}
+    train = [(text, label) for url, text, label in examples if url not in holdout_urls]
+    holdout = [(text, label) for url, text, label in examples if url in holdout_urls]
+    metrics = {}
+    if holdout and {label for _, label in train} == {0, 1}:
+        model = CaseClassifier().fit([text for text, _ in train], [label for _, label in train])
+        metrics = evaluate(model, [text for text, _ in holdout], [label for _, label in holdout], threshold)
+
+    classifier = CaseClassifier().fit([text for _, text, _ in examples], [label for _, _, label in examples])
+    classifier.metrics = metrics
+    return classifier
+
+
+def save_classifier(classifier: CaseClassifier, path: Optional[str] = None):
+    try:
+        with open(path or state_path('case_classifier.json'), 'w', encoding='utf-8') as f:
+            json.dump(classifier.to_dict(), f, ensure_ascii=False)
+    except OSError as e:
+        print(f"⚠️ [Classifier] 模型写入失败: {str(e)}")
+
+
+def load_classifier(path: Optional[str] = None) -> Optional[CaseClassifier]:
+    """读取已训练的模型；没有模型或 CASE_CLASSIFIER_ENABLED=0 时返回 None"""
+    if not CASE_CLASSIFIER_ENABLED:
+        return None
+    try:
+        with open(path or state_path('case_classifier.json'), 'r', encoding='utf-8') as f:
+            return CaseClassifier.from_dict(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
+def _db_positive_examples(supabase) -> List[Tuple[str, str, int, str]]:
+    """
+    从 fraud_cases 读取已入库的案例作为正例
+    只使用 URL 路径：event / result 是 AI 生成的中文摘要，与打分时的 标题 + 摘要 特征不一致
+    """
+    try:
+        result = (supabase.table('fraud_cases').select('source_url')
+                  .order('created_at', desc=True).limit(CASE_CLASSIFIER_MAX_DB_CASES).execute())
+    except Exception as e:
+        print(f"⚠️ [Classifier] 读取 fraud_cases 失败: {str(e)}")
+        return []
+    rows = []
+    for case in result.data or []:
+        url = case.get('source_url')
+        text = example_text(url=url) if url else ""
+        if text:
+            rows.append((url, text, 1, 'fraud_cases'))
+    return rows
+
+
+def refresh_classifier(supabase=None, store: Optional[ExampleStore] = None,
+                       path: Optional[str] = None) -> Optional[CaseClassifier]:
+    """
+    返回可用的分类器：模型超过 CASE_CLASSIFIER_RETRAIN_HOURS 或样本数增加时，
+    回填 fraud_cases 正例并重新训练，输出留出集的精确率和召回率
+
+    fraud_cases 回填样本只有 URL 特征，只在 Validator 正例不足 CASE_CLASSIFIER_MIN_EXAMPLES 时参与训练，
+    且从不进入留出集
+
+    返回:
+        分类器；未启用或样本不足时返回 None（Scout 全部放行）
+    """
+    if not CASE_CLASSIFIER_ENABLED:
+        return None
+    classifier = load_classifier(path)
+    store = store or ExampleStore()
+    if supabase is not None:
+        store.add_many(_db_positive_examples(supabase))
+    backfill = {url for url, _, _ in store.examples('fraud_cases')}
+    examples = store.examples()
+    if store.count('validator', label=1) >= CASE_CLASSIFIER_MIN_EXAMPLES:
+        examples = [example for example in examples if example[0] not in backfill]
+    count = len(examples)
+    if (classifier and count == classifier.examples
+            and time.time() - classifier.trained_at < CASE_CLASSIFIER_RETRAIN_HOURS * 3600):
+        return classifier
+
+    trained = train_classifier(examples, train_only=backfill)
+    if trained is None:
+        return classifier
+    save_classifier(trained, path)
+    metrics = trained.metrics
+    if metrics:
+        print(f"🧮 [Classifier] 预分类器已训练：{count} 个样本，留出集精确率 {metrics['precision']:.0%} / "
+              f"召回率 {metrics['recall']:.0%}（{metrics['samples']} 个样本，阈值 {CASE_CLASSIFIER_THRESHOLD}）")
+    else:
+        print(f"🧮 [Classifier] 预分类器已训练：{count} 个样本（留出集样本不足，未评估）")
+    return trained
+
+
+# ==================== Scout 集成 ====================
+
+def prefilter(results: List[Dict], classifier: Optional[CaseClassifier],
+              threshold: float = CASE_CLASSIFIER_THRESHOLD, explore_rate: float = CASE_CLASSIFIER_EXPLORE_RATE,
+              rng: Optional[random.Random] = None) -> List[Dict]:
+    """
+    丢弃案例概率低于阈值的搜索结果（每个保留的结果写入 case_score）；没有分类器时原样返回
+
+    参数:
+        results: Scout 搜索结果（包含 url、title、content）
+        explore_rate: 低于阈值的结果被抽样放行的比例（放行的结果标记 classifier_explore，
+                      由调用方通过 record_outcome 记录标签）；不记录标签的调用方传 0
+    """
+    if classifier is None:
+        return results
+    rng = rng or random
+    kept = []
+    for item in results:
+        score = classifier.predict_proba(example_text(item.get('title', ''), item.get('content', ''),
+                                                      item.get('url', '')))
+        if score >= threshold:
+            item['case_score'] = round(score, 3)
+            kept.append(item)
+        elif explore_rate > 0 and rng.random() < explore_rate:
+            item['case_score'] = round(score, 3)
+            item['classifier_explore'] = True
+            kept.append(item)
+            print(f"🎲 [Classifier] 抽样放行低分页面（{score:.2f}），用于获取训练标签: {item.get('title', '')[:60]}")
+        else:
+            print(f"🧮 [Classifier] 丢弃非案例页面（{score:.2f}）: {item.get('title', '')[:60]}")
+    if len(kept) < len(results):
+        print(f"🧮 [Classifier] 预分类过滤 {len(results) - len(kept)} / {len(results)} 个候选")
+    return kept
+
+
+_store: Optional[ExampleStore] = None
+_store_lock = threading.Lock()
+
+
+def record_outcome(search_result: Dict, label: int, source: str):
+    """记录候选的最终结果作为训练样本（记录失败只输出警告）"""
+    global _store
+    if not CASE_CLASSIFIER_ENABLED:
+        return
+    try:
+        with _store_lock:
+            if _store is None:
+                _store = ExampleStore()
+        url = search_result.get('url', '')
+        _store.add(url, example_text(search_result.get('title', ''), search_result.get('content', ''), url),
+                   label, source)
+    except Exception as e:
+        print(f"⚠️ [Classifier] 训练样本记录失败: {str(e)}")
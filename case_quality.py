@@ -0,0 +1,89 @@
+"""
+GIFIA - 案例质量评分（规则校验）
+agent_v3 的 ValidatorAgent 和 agent_v2 的 Critic 策略共用：
+检查 6 个字段是否完整，Process 是否足够详细并包含作案手法、逃避初审、破绽细节三个部分
+"""
+
+from typing import Dict
+
+from structured_output import CASE_FIELDS
+
+# 视为缺失的字段值
+EMPTY_VALUES = ['未知', '待补充', '']
+# Process 必须包含的部分
+PROCESS_PARTS = ['作案', '逃避', '破绽']
+# 破绽细节的关键词
+RED_FLAG_KEYWORDS = ['破绽', '发现', '调查', '证据', '异常', 'red flag']
+
+
+def score_case(extracted_data: Dict) -> Dict:
+    """
+    按规则给提取结果打分
+
+    参数:
+        extracted_data: Analyst 提取的结构化数据
+
+    返回:
+        {'is_valid', 'overall_score', 'process_score', 'scores', 'issues', 'suggestions'}
+        通过条件为总分 >= 0.7 且 Process >= 0.6
+    """
+    issues = []
+    scores = {}
+
+    # 检查6个维度
+    for field in CASE_FIELDS:
+        value = extracted_data.get(field, '')
+
+        # 检查字段是否存在且非空
+        if not value or value in EMPTY_VALUES:
+            issues.append(f"字段 {field} 缺失或为空")
+            scores[field] = 0
+        else:
+            scores[field] = 1
+
+    # 特别检查 Process 字段的质量
+    process = extracted_data.get('Process', '')
+    process_issues = []
+
+    if len(process) < 400:
+        process_issues.append(f"Process 字段过短 ({len(process)} 字符，要求至少 400 字符)")
+        process_score = 0.3
+    elif len(process) < 600:
+        process_score = 0.6
+    else:
+        process_score = 1.0
+
+    # 检查是否包含三个关键部分
+    for part in PROCESS_PARTS:
+        if part not in process:
+            process_issues.append(f"Process 缺少 '{part}' 部分")
+            process_score = max(0, process_score - 0.2)
+
+    # 检查破绽细节
+    has_red_flag = any(keyword in process.lower() for keyword in RED_FLAG_KEYWORDS)
+    if not has_red_flag or '信息缺失' in process:
+        process_issues.append("Process 缺少破绽细节 (The Red Flag)")
+        process_score = max(0, process_score - 0.3)
+
+    issues.extend(process_issues)
+    scores['Process'] = process_score
+
+    # 计算总体质量分数
+    overall_score = sum(scores.values()) / len(scores)
+    is_valid = overall_score >= 0.7 and process_score >= 0.6
+
+    suggestions = []
+    if not is_valid:
+        if process_score < 0.6:
+            suggestions.append("Process 字段质量不足，建议重试下一个链接")
+        if overall_score < 0.7:
+            suggestions.append("整体质量不足，建议重新提取")
+
+    return {
+        'is_valid': is_valid,
+        'overall_score': overall_score,
+        'process_score': process_score,
+        'scores': scores,
+        'issues': issues,
+        'suggestions': suggestions,
+    }
@@ -0,0 +1,190 @@
+"""
+GIFIA - 熔断器（Circuit Breaker）
+按模型和服务商记录后端健康状态：
+- closed（闭合）：正常调用
+- open（断开）：连续失败或配额耗尽后，在冷却时间内直接跳过该后端
+- half_open（半开）：冷却结束后只放行一个探测请求，成功则闭合，失败则再次断开（冷却时间加倍）
+
+状态在线程之间共享，并保存到 .gifia/circuit_breakers.json，常驻进程重启后继续生效
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from gifia_state import state_path
+
+# ==================== 熔断配置 ====================
+
+# 连续失败多少次后断开（配额/限流错误立即断开）
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+# 断开后的冷却时间（秒），半开探测失败后加倍，不超过最大值
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "300"))
+BREAKER_MAX_COOLDOWN_SECONDS = float(os.getenv("BREAKER_MAX_COOLDOWN_SECONDS", "3600"))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """单个后端（模型或服务商）的熔断器，线程安全"""
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 cooldown_seconds: float = BREAKER_COOLDOWN_SECONDS,
+                 max_cooldown_seconds: float = BREAKER_MAX_COOLDOWN_SECONDS,
+                 on_change=None):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_cooldown = cooldown_seconds
+        self.max_cooldown = max_cooldown_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = cooldown_seconds
+        self.opened_until = 0.0
+        self._probe_in_flight = False
+        self._on_change = on_change
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """是否允许调用；断开状态冷却结束后转为半开，并只放行一个探测请求"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.time() < self.opened_until:
+                    return False
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        print(f"🔌 [Breaker] {self.name} 冷却结束，发送探测请求")
+        return True
+
+    def record_success(self):
+        """调用成功：闭合并重置失败计数"""
+        with self._lock:
+            changed = self.state != CLOSED or self.failures
+            self.state = CLOSED
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self._probe_in_flight = False
+        if changed:
+            self._notify()
+
+    def record_failure(self, trip: bool = False, cooldown: Optional[float] = None):
+        """
+        调用失败
+
+        参数:
+            trip: 立即断开（配额耗尽、限流等短时间内不会恢复的错误）
+            cooldown: 指定冷却秒数（如 Retry-After），None 时使用当前冷却时间
+        """
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                # 探测失败：冷却时间加倍
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                trip = True
+            if not trip and self.failures < self.failure_threshold:
+                return
+            wait = cooldown if cooldown is not None else self.cooldown
+            self.state = OPEN
+            self.opened_until = time.time() + wait
+            self._probe_in_flight = False
+        print(f"🔌 [Breaker] {self.name} 断开，{wait:.0f} 秒内跳过该后端")
+        self._notify()
+
+    def release(self):
+        """放行后未实际调用（例如被其他条件跳过）：归还半开状态的探测名额，不改变状态"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'cooldown': self.cooldown,
+                'opened_until': self.opened_until,
+            }
+
+    def restore(self, data: Dict):
+        """从持久化状态恢复（半开状态按断开恢复，重启后重新探测）"""
+        with self._lock:
+            self.state = OPEN if data.get('state') in (OPEN, HALF_OPEN) else CLOSED
+            self.failures = int(data.get('failures', 0))
+            self.cooldown = float(data.get('cooldown', self.base_cooldown))
+            self.opened_until = float(data.get('opened_until', 0.0))
+
+    def _notify(self):
+        if self._on_change:
+            self._on_change()
+
+
+# ==================== 全局注册表 ====================
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+_save_lock = threading.Lock()
+_saved_state: Optional[Dict[str, Dict]] = None
+
+
+def _state_file() -> str:
+    return state_path('circuit_breakers.json')
+
+
+def _load_saved_state() -> Dict[str, Dict]:
+    """读取持久化的熔断状态（调用方需持有注册表锁）"""
+    global _saved_state
+    if _saved_state is None:
+        try:
+            with open(_state_file(), 'r', encoding='utf-8') as f:
+                _saved_state = json.load(f)
+        except (OSError, ValueError):
+            _saved_state = {}
+    return _saved_state
+
+
+def save_breakers():
+    """把所有熔断器的状态写入 .gifia/circuit_breakers.json"""
+    with _registry_lock:
+        state = dict(_load_saved_state())
+        breakers = list(_breakers.values())
+    for breaker in breakers:
+        state[breaker.name] = breaker.snapshot()
+    with _save_lock:
+        try:
+            with open(_state_file(), 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"⚠️ [Breaker] 熔断状态写入失败: {str(e)}")
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """
+    获取共享的熔断器（首次调用时创建，并恢复上次保存的状态）
+
+    参数:
+        name: 后端名称，如 'gemini'、'gemini:models/gemini-2.5-flash'、'deepseek'
+    """
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, on_change=save_breakers)
+            saved = _load_saved_state().get(name)
+            if saved:
+                breaker.restore(saved)
+            _breakers[name] = breaker
+        return breaker
+
+
+def reset_breakers():
+    """清空进程内的熔断器（测试用，不修改已保存的文件）"""
+    global _saved_state
+    with _registry_lock:
+        _breakers.clear()
+        _saved_state = None
@@ -0,0 +1,153 @@
+"""
+GIFIA - 正文精简（按相关性保留内容窗口）
+Firecrawl 抓取的 Markdown 开头常常是导航、评论和模板文字，直接截断前 50,000 字符时，
+位于页面底部的判决结果反而被截掉。这里把正文切分为段落窗口，按与保险欺诈案例的相关性打分：
+- 欺诈 / 保险 / 理赔等关键词
+- 金额、日期
+- 起诉、认罪、判决等法律术语
+- 链接密集、短行导航、订阅 / Cookie 等模板文字扣分
+
+在 token 预算内保留得分最高的窗口，并按原文顺序拼接；正文未超出预算时原样返回
+"""
+
+import os
+import re
+from typing import List, Tuple
+
+# ==================== 精简配置 ====================
+
+# 送入模型的正文 token 预算（估算值：中日韩字符按 1 token，其他字符按 4 字符 1 token）
+CONTENT_TOKEN_BUDGET = int(os.getenv("CONTENT_TOKEN_BUDGET", "8000"))
+# 单个窗口的最大字符数（在标题和空行处切分）
+CONTENT_WINDOW_CHARS = int(os.getenv("CONTENT_WINDOW_CHARS", "1500"))
+
+OMITTED_MARKER = "[...]"
+
+CASE_KEYWORDS = (
+    'fraud', 'insurance', 'insurer', 'claim', 'policy', 'policyholder', 'beneficiary', 'premium',
+    'life insurance', 'health insurance', 'medicare', 'medicaid', 'hospital', 'clinic', 'physician',
+    'billing', 'kickback', 'staged', 'forged', 'fake', 'false', 'scheme', 'investigation', 'siu',
+    '欺诈', '骗保', '诈骗', '保险', '理赔', '保单', '投保', '受益人', '保费', '医院', '医保', '伪造', '虚假',
+)
+LEGAL_TERMS = (
+    'indicted', 'indictment', 'charged', 'pleaded guilty', 'plea', 'convicted', 'conviction', 'sentenced',
+    'sentence', 'prison', 'jail', 'restitution', 'forfeit', 'court', 'judge', 'jury', 'verdict', 'prosecutor',
+    'attorney', 'defendant', 'arrested', 'fined', 'penalty', 'settlement',
+    '起诉', '认罪', '判决', '判处', '有期徒刑', '罚金', '罚款', '法院', '检察院', '被告', '逮捕', '立案', '退赔',
+)
+BOILERPLATE_TERMS = (
+    'cookie', 'subscribe', 'newsletter', 'sign in', 'log in', 'sign up', 'privacy policy', 'terms of use',
+    'all rights reserved', 'share this', 'follow us', 'advertisement', 'related articles', 'comments',
+    'skip to', 'menu', 'copyright',
+    '订阅', '登录', '注册', '隐私政策', '版权所有', '分享到', '相关阅读', '评论', '广告', '返回顶部',
+)
+
+_CJK_RE = re.compile(r'[぀-ヿ㐀-鿿가-힯]')
+_AMOUNT_RE = re.compile(
+    r'(?:[$€£¥]\s?\d[\d,.]*(?:\s?(?:million|billion|thousand|[mbk]))?'
+    r'|\d[\d,.]*\s?(?:million|billion|dollars|usd|rmb|元|万元|亿元|美元|欧元|英镑))',
+    re.IGNORECASE,
+)
+_DATE_RE = re.compile(
+    r'(?:\b(?:19|20)\d{2}[-/.]\d{1,2}[-/.]\d{1,2}\b'
+    r'|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+\d{1,2},?\s+(?:19|20)\d{2}'
+    r'|(?:19|20)\d{2}年\d{1,2}月(?:\d{1,2}日)?)',
+    re.IGNORECASE,
+)
+_LINK_RE = re.compile(r'\[[^\]]*\]\([^)]*\)')
+_HEADING_RE = re.compile(r'^#{1,6}\s')
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中日韩字符按 1 token，其他字符按 4 字符 1 token"""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def split_windows(markdown: str, window_chars: int = CONTENT_WINDOW_CHARS) -> List[str]:
+    """
+    把 Markdown 切分为窗口：遇到标题时另起窗口，段落累计超过 window_chars 时另起窗口，
+    单个超长段落按 window_chars 硬切
+    """
+    windows: List[str] = []
+    current: List[str] = []
+    size = 0
+    for block in re.split(r'\n\s*\n', markdown):
+        block = block.strip()
+        if not block:
+            continue
+        if current and (_HEADING_RE.match(block) or size + len(block) > window_chars):
+            windows.append("\n\n".join(current))
+            current, size = [], 0
+        while len(block) > window_chars:
+            windows.append(block[:window_chars])
+            block = block[window_chars:]
+        current.append(block)
+        size += len(block) + 2
+    if current:
+        windows.append("\n\n".join(current))
+    return windows
+
+
+def score_window(text: str) -> float:
+    """按保险欺诈案例相关性给窗口打分（按长度归一，避免长窗口天然得分高）"""
+    lower = text.lower()
+    score = 0.0
+    score += sum(lower.count(term) for term in CASE_KEYWORDS) * 1.0
+    score += sum(lower.count(term) for term in LEGAL_TERMS) * 2.0
+    score += len(_AMOUNT_RE.findall(text)) * 2.0
+    score += len(_DATE_RE.findall(text)) * 1.5
+    score -= sum(lower.count(term) for term in BOILERPLATE_TERMS) * 1.5
+
+    # 链接占比高或以短行为主的窗口多半是导航 / 页脚
+    link_chars = sum(len(m) for m in _LINK_RE.findall(text))
+    if text and link_chars / len(text) > 0.5:
+        score -= 5.0
+    lines = [line for line in text.splitlines() if line.strip()]
+    if len(lines) >= 5 and sum(len(line) for line in lines) / len(lines) < 25:
+        score -= 3.0
+
+    return score / (1 + estimate_tokens(text) / 200)
+
+
+def reduce_content(markdown: str, token_budget: int = CONTENT_TOKEN_BUDGET,
+                   window_chars: int = CONTENT_WINDOW_CHARS) -> str:
+    """
+    在 token 预算内保留相关性最高的窗口
+
+    参数:
+        markdown: 正文（Markdown）
+        token_budget: 保留内容的 token 预算
+        window_chars: 单个窗口的最大字符数
+
+    返回:
+        精简后的正文；未超出预算时原样返回，被省略的部分用 [...] 标记
+    """
+    total_tokens = estimate_tokens(markdown)
+    if total_tokens <= token_budget:
+        return markdown
+
+    windows = split_windows(markdown, window_chars)
+    ranked: List[Tuple[float, int]] = sorted(
+        ((score_window(window), index) for index, window in enumerate(windows)),
+        key=lambda item: (-item[0], item[1]),
+    )
+    kept = set()
+    used = 0
+    for _, index in ranked:
+        tokens = estimate_tokens(windows[index])
+        if used + tokens > token_budget:
+            continue
+        kept.add(index)
+        used += tokens
+
+    parts: List[str] = []
+    for index, window in enumerate(windows):
+        if index in kept:
+            parts.append(window)
+        elif not parts or parts[-1] != OMITTED_MARKER:
+            parts.append(OMITTED_MARKER)
+    reduced = "\n\n".join(parts)
+    print(f"✂️  正文精简: 约 {total_tokens} → {estimate_tokens(reduced)} tokens"
+          f"（保留 {len(kept)}/{len(windows)} 个窗口）")
+    return reduced
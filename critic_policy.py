@@ -0,0 +1,195 @@
+"""
+GIFIA - Critic 质检策略
+agent_v2 的 CriticAgent 对每个提取结果都调用一次 gpt-4o-mini，每个案例的 LLM 调用翻倍。
+按策略决定是否质检：
+
+- low_score：规则评分（与 agent_v3 的 ValidatorAgent 相同）低于 CRITIC_SCORE_THRESHOLD，必须质检
+- risk：存在风险信号（金额、年份、人名在原文中找不到，或原文过短），必须质检
+- sample：高置信度案例按 CRITIC_SAMPLE_RATE 抽样质检（按 URL 哈希抽样，重跑时结果一致）
+- skip：高置信度且未抽中，跳过质检
+
+每种策略的质检次数和通过 / 未通过次数累计保存在 .gifia/critic_stats.json，用于调整阈值和抽样率
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Set
+
+from case_quality import score_case
+from gifia_state import state_path
+
+# ==================== 策略配置 ====================
+
+# 规则评分低于该值的案例必须质检
+CRITIC_SCORE_THRESHOLD = float(os.getenv("CRITIC_SCORE_THRESHOLD", "0.85"))
+# 高置信度案例的抽样质检比例（1 表示全部质检，即原来的行为）
+CRITIC_SAMPLE_RATE = float(os.getenv("CRITIC_SAMPLE_RATE", "0.2"))
+# 原文少于该字符数（如抓取失败后使用搜索摘要）视为风险信号
+CRITIC_MIN_SOURCE_CHARS = int(os.getenv("CRITIC_MIN_SOURCE_CHARS", "1500"))
+
+POLICIES = ['low_score', 'risk', 'sample', 'skip']
+
+# 金额：货币符号或货币单位 + 数字 + 数量单位
+_AMOUNT_RE = re.compile(
+    r"(?P<prefix>US\$|\$|€|£|¥|USD\s?|RMB\s?)?"
+    r"(?P<number>\d[\d,]*(?:\.\d+)?)\s*"
+    r"(?P<unit>万|亿|千|million|billion|thousand|bn\b|mn\b|m\b|k\b)?\s*"
+    r"(?P<suffix>美元|元|人民币|英镑|欧元|港币|dollars?|usd|rmb|yuan|euros?|pounds?)?",
+    re.IGNORECASE,
+)
+_UNIT_MULTIPLIERS = {
+    '万': 1e4, '亿': 1e8, '千': 1e3, 'thousand': 1e3, 'k': 1e3,
+    'million': 1e6, 'mn': 1e6, 'm': 1e6, 'billion': 1e9, 'bn': 1e9,
+}
+_YEAR_RE = re.compile(r"(?<!\d)(19\d{2}|20\d{2})(?!\d)")
+# 拉丁字母人名：两个或以上首字母大写的单词
+_NAME_RE = re.compile(r"\b[A-Z][a-z]+(?:\s+[A-Z]\.?)?(?:\s+[A-Z][a-z]+)+\b")
+
+
+def parse_amounts(text: str) -> Set[float]:
+    """提取文本中的金额（统一换算为数值，如 "$1.2 million" 和 "120万美元" 都为 1200000）"""
+    amounts = set()
+    for match in _AMOUNT_RE.finditer(text or ""):
+        if not (match.group('prefix') or match.group('suffix')):
+            continue
+        try:
+            value = float(match.group('number').replace(',', ''))
+        except ValueError:
+            continue
+        unit = (match.group('unit') or '').lower()
+        value *= _UNIT_MULTIPLIERS.get(unit, 1)
+        if value >= 100:
+            amounts.add(value)
+    return amounts
+
+
+def _amount_in(value: float, candidates: Set[float]) -> bool:
+    """允许 1% 的误差（原文和译文的四舍五入不同）"""
+    return any(abs(value - candidate) <= candidate * 0.01 for candidate in candidates)
+
+
+def risk_signals(extracted_data: Dict, source_text: str) -> List[str]:
+    """
+    检查提取结果中容易被虚构的内容
+
+    返回:
+        风险信号列表，如 ['amount_not_in_source']；没有风险时为空列表
+    """
+    signals = []
+    source = source_text or ""
+    if len(source) < CRITIC_MIN_SOURCE_CHARS:
+        signals.append('short_source')
+
+    extracted_text = " ".join(str(extracted_data.get(field, '')) for field in ('Event', 'Process', 'Result'))
+    source_amounts = parse_amounts(source)
+    if any(not _amount_in(value, source_amounts) for value in parse_amounts(extracted_text)):
+        signals.append('amount_not_in_source')
+
+    if any(year not in source for year in _YEAR_RE.findall(str(extracted_data.get('Time', '')))):
+        signals.append('year_not_in_source')
+
+    source_lower = source.lower()
+    names = _NAME_RE.findall(str(extracted_data.get('Characters', '')))
+    if any(name.split()[-1].lower() not in source_lower for name in names):
+        signals.append('name_not_in_source')
+    return signals
+
+
+# ==================== 策略统计 ====================
+
+class CriticStats:
+    """
+    每种策略的累计统计（JSON 文件，存放在 .gifia/ 下），线程安全
+
+    {'low_score': {'checked': 12, 'passed': 7, 'failed': 5}, 'skip': {'skipped': 30}, ...}
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or state_path('critic_stats.json')
+        self._lock = threading.Lock()
+        self.run: Dict[str, Dict[str, int]] = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.total: Dict[str, Dict[str, int]] = json.load(f)
+        except (OSError, ValueError):
+            self.total = {}
+
+    def record(self, policy: str, passed: Optional[bool]):
+        """记录一次决策：passed 为质检结果，None 表示跳过质检"""
+        key = 'skipped' if passed is None else ('passed' if passed else 'failed')
+        with self._lock:
+            for stats in (self.run, self.total):
+                counts = stats.setdefault(policy, {})
+                counts[key] = counts.get(key, 0) + 1
+                if passed is not None:
+                    counts['checked'] = counts.get('checked', 0) + 1
+            try:
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(self.total, f, ensure_ascii=False, indent=2)
+            except OSError as e:
+                print(f"⚠️ [Critic] 策略统计写入失败: {str(e)}")
+
+    def print_stats(self):
+        """输出本次运行各策略的质检次数，以及累计的通过率"""
+        with self._lock:
+            if not self.run:
+                return
+            decisions = sum(sum(v for k, v in counts.items() if k != 'checked') for counts in self.run.values())
+            checked = sum(counts.get('checked', 0) for counts in self.run.values())
+            print(f"🔍 Critic 质检: {checked} / {decisions} 个案例（跳过 {decisions - checked} 次 LLM 调用）")
+            for policy in POLICIES:
+                run = self.run.get(policy)
+                if not run:
+                    continue
+                total = self.total.get(policy, {})
+                if policy == 'skip':
+                    print(f"   [skip] 跳过 {run.get('skipped', 0)} 个（累计 {total.get('skipped', 0)} 个）")
+                    continue
+                total_checked = total.get('checked', 0)
+                pass_rate = total.get('passed', 0) / total_checked if total_checked else 0.0
+                print(f"   [{policy}] 通过 {run.get('passed', 0)} / 未通过 {run.get('failed', 0)}"
+                      f"（累计通过率 {pass_rate:.0%}，共 {total_checked} 次）")
+
+
+# ==================== 策略 ====================
+
+class CriticPolicy:
+    """决定某个提取结果是否需要 Critic 质检，并记录各策略的质检结果"""
+
+    def __init__(self, score_threshold: float = CRITIC_SCORE_THRESHOLD, sample_rate: float = CRITIC_SAMPLE_RATE,
+                 stats: Optional[CriticStats] = None):
+        self.score_threshold = score_threshold
+        self.sample_rate = sample_rate
+        self.stats = stats or CriticStats()
+
+    def sampled(self, url: str) -> bool:
+        """按 URL 哈希抽样（同一个 URL 每次结果相同，重跑时可以命中 LLM 响应缓存）"""
+        bucket = int(hashlib.sha1(url.encode('utf-8')).hexdigest()[:8], 16) / 0xFFFFFFFF
+        return bucket < self.sample_rate
+
+    def decide(self, extracted_data: Dict, source_text: str, url: str) -> Dict:
+        """
+        决定是否质检
+
+        返回:
+            {'policy': 'low_score' / 'risk' / 'sample' / 'skip', 'run': 是否质检,
+             'quality_score': 规则评分, 'signals': 风险信号}
+        """
+        quality = score_case(extracted_data)
+        signals = risk_signals(extracted_data, source_text)
+        if not quality['is_valid'] or quality['overall_score'] < self.score_threshold:
+            policy = 'low_score'
+        elif signals:
+            policy = 'risk'
+        elif self.sampled(url):
+            policy = 'sample'
+        else:
+            policy = 'skip'
+        return {'policy': policy, 'run': policy != 'skip', 'quality_score': round(quality['overall_score'], 3),
+                'signals': signals}
+
+    def record(self, decision: Dict, passed: Optional[bool]):
+        self.stats.record(decision['policy'], passed)
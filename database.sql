@@ -11,6 +11,7 @@ CREATE TABLE IF NOT EXISTS fraud_cases (
     process TEXT NOT NULL,
     result TEXT NOT NULL,
     source_url TEXT NOT NULL UNIQUE,  -- 唯一约束，用于去重
+    canonical_url TEXT,  -- 规范化 URL（见 url_canonical.py），查重按此字段或 source_url 匹配
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
@@ -18,6 +19,7 @@ CREATE TABLE IF NOT EXISTS fraud_cases (
 -- 创建索引以提高查询速度
 CREATE INDEX IF NOT EXISTS idx_fraud_cases_created_at ON fraud_cases(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_fraud_cases_source_url ON fraud_cases(source_url);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_fraud_cases_canonical_url ON fraud_cases(canonical_url) WHERE canonical_url IS NOT NULL;
 CREATE INDEX IF NOT EXISTS idx_fraud_cases_region ON fraud_cases(region);
 
 -- 添加更新时间的触发器函数
@@ -0,0 +1,17 @@
+-- GIFIA - 规范化 URL 字段
+-- source_url 保存原始 URL，canonical_url 保存规范化后的 URL（去掉跟踪参数、AMP、移动版子域名等，规则见 url_canonical.py），
+-- 查重按 canonical_url 或 source_url 匹配（回填时留空 canonical_url 的案例仍按 source_url 查重），唯一索引保证同一篇文章只保存一次
+-- 请将此 SQL 复制到 Supabase SQL Editor 中执行，然后回填已有案例：
+--     python url_canonical.py --backfill --dry-run   # 先查看会更新多少案例、有哪些重复
+--     python url_canonical.py --backfill
+-- 回填时规范化后重复的案例保留最早的一个，其余 canonical_url 为空并输出 id，由人工确认后删除
+
+-- 添加 canonical_url 字段
+ALTER TABLE fraud_cases ADD COLUMN IF NOT EXISTS canonical_url TEXT;
+
+-- 唯一索引（canonical_url 为空的旧案例和用户上传案例不受限制）
+CREATE UNIQUE INDEX IF NOT EXISTS idx_fraud_cases_canonical_url
+    ON fraud_cases(canonical_url) WHERE canonical_url IS NOT NULL;
+
+-- 验证
+SELECT 'fraud_cases.canonical_url 字段创建成功！' AS status;
@@ -0,0 +1,69 @@
+-- GIFIA - 多 Worker 任务认领表（租约 + 过期）
+-- 多个 Scout 进程或机器同时运行时（例如 agent.py 每小时任务与 Living Scout 30 分钟任务重叠），
+-- 每个候选 URL 先认领再处理，避免重复抓取和重复调用 AI
+-- 请将此 SQL 复制到 Supabase SQL Editor 中执行
+
+-- 创建认领表
+CREATE TABLE IF NOT EXISTS work_claims (
+    url TEXT PRIMARY KEY,
+    worker_id TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'claimed',  -- claimed：处理中 / done：已完成
+    claimed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    lease_expires_at TIMESTAMPTZ NOT NULL,   -- 租约到期后其他 Worker 可以重新认领
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_work_claims_status_updated ON work_claims(status, updated_at);
+
+-- 认领：返回本 Worker 成功认领的 URL（未被认领、租约已过期或本来就属于本 Worker 的 URL）
+CREATE OR REPLACE FUNCTION claim_work(p_urls TEXT[], p_worker_id TEXT, p_lease_seconds INTEGER DEFAULT 900)
+RETURNS TABLE (claimed_url TEXT) AS $$
+BEGIN
+    -- 顺便清理 7 天前完成的记录（已保存的案例由 fraud_cases 去重）
+    DELETE FROM work_claims WHERE status = 'done' AND updated_at < NOW() - INTERVAL '7 days';
+
+    RETURN QUERY
+    INSERT INTO work_claims AS wc (url, worker_id, status, claimed_at, lease_expires_at, updated_at)
+    SELECT DISTINCT t.u, p_worker_id, 'claimed', NOW(), NOW() + make_interval(secs => p_lease_seconds), NOW()
+    FROM unnest(p_urls) AS t(u)
+    ON CONFLICT (url) DO UPDATE SET
+        worker_id = EXCLUDED.worker_id,
+        status = 'claimed',
+        claimed_at = EXCLUDED.claimed_at,
+        lease_expires_at = EXCLUDED.lease_expires_at,
+        updated_at = NOW()
+    WHERE wc.status <> 'done'
+      AND (wc.lease_expires_at < NOW() OR wc.worker_id = EXCLUDED.worker_id)
+    RETURNING wc.url;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 续约：延长本 Worker 仍在处理的 URL 的租约
+CREATE OR REPLACE FUNCTION renew_work_claims(p_urls TEXT[], p_worker_id TEXT, p_lease_seconds INTEGER DEFAULT 900)
+RETURNS TABLE (claimed_url TEXT) AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE work_claims AS wc
+    SET lease_expires_at = NOW() + make_interval(secs => p_lease_seconds), updated_at = NOW()
+    WHERE wc.url = ANY(p_urls) AND wc.worker_id = p_worker_id AND wc.status = 'claimed'
+    RETURNING wc.url;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 释放：处理完成时标记为 done（其他 Worker 不再认领），失败时删除认领（其他 Worker 可以重试）
+CREATE OR REPLACE FUNCTION release_work_claims(p_urls TEXT[], p_worker_id TEXT, p_done BOOLEAN DEFAULT FALSE)
+RETURNS VOID AS $$
+BEGIN
+    IF p_done THEN
+        UPDATE work_claims
+        SET status = 'done', lease_expires_at = NOW(), updated_at = NOW()
+        WHERE url = ANY(p_urls) AND worker_id = p_worker_id;
+    ELSE
+        DELETE FROM work_claims
+        WHERE url = ANY(p_urls) AND worker_id = p_worker_id AND status = 'claimed';
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 验证
+SELECT 'work_claims 表创建成功！' AS status;
@@ -0,0 +1,34 @@
+"""
+GIFIA - 本地状态目录
+运行日志、缓存等本地持久化文件统一存放在 GIFIA_STATE_DIR（默认 .gifia/）下，
+GitHub Actions 通过 actions/cache 在多次运行之间保留该目录
+"""
+
+import os
+import sqlite3
+
+STATE_DIR = os.getenv("GIFIA_STATE_DIR", ".gifia")
+
+
+def state_path(filename: str) -> str:
+    """返回状态目录下某个文件的路径（目录不存在时自动创建）"""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    return os.path.join(STATE_DIR, filename)
+
+
+def connect_sqlite(path: str) -> sqlite3.Connection:
+    """
+    打开 SQLite 数据库（允许多线程共享连接，调用方负责加锁）
+
+    参数:
+        path: 数据库文件路径，':memory:' 表示内存数据库（测试用）
+    """
+    if path != ':memory:':
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    if path != ':memory:':
+        conn.execute("PRAGMA journal_mode=WAL")
+    return conn
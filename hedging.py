@@ -0,0 +1,196 @@
+"""
+GIFIA - 对冲请求（Hedged Requests）
+Gemini → DeepSeek 的 Failover 是串行的：Gemini 很慢但最终成功时，整条流水线都在等待。
+主引擎超过历史延迟的 p90 仍未返回时，把同一个提示词同时发给备份引擎，采用先返回的有效结果，
+并取消另一个（流式输出时在下一个分块处中止）
+
+- 延迟统计：最近的成功调用耗时，每 LATENCY_FLUSH_EVERY 个样本及进程退出时写入 .gifia/llm_latency.json，
+  cron 运行之间延续
+- 对冲预算：每次可以对冲的主引擎调用积累 HEDGE_BUDGET_RATIO 次对冲额度，限制对冲带来的额外调用量
+"""
+
+import atexit
+import json
+import math
+import os
+import queue
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from gifia_state import state_path
+
+# ==================== 对冲配置 ====================
+
+LLM_HEDGING = os.getenv("LLM_HEDGING", "1") == "1"
+# 主引擎超过该百分位延迟仍未返回时发送对冲请求
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "90"))
+# 每次主引擎调用积累的对冲额度（0.1 表示对冲请求最多约占主引擎调用的 10%）
+HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", "0.1"))
+# 延迟样本少于该数量时不对冲（百分位不可靠）
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "10"))
+
+# 额度上限：连续多次慢调用时最多连续对冲的次数
+HEDGE_MAX_CREDITS = 3.0
+# 每个后端保留的延迟样本数
+LATENCY_WINDOW = 200
+# 每积累多少个新样本写一次文件（其余在进程退出时写入）
+LATENCY_FLUSH_EVERY = 20
+
+
+class LatencyTracker:
+    """记录各后端最近的成功调用耗时，计算百分位，线程安全"""
+
+    def __init__(self, path: Optional[str] = None, window: int = LATENCY_WINDOW):
+        self.path = path or state_path('llm_latency.json')
+        self.window = window
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.samples: Dict[str, List[float]] = json.load(f)
+        except (OSError, ValueError):
+            self.samples = {}
+
+    def record(self, name: str, seconds: float):
+        """记录一次成功调用的耗时（每 LATENCY_FLUSH_EVERY 个样本写回一次文件）"""
+        with self._lock:
+            samples = self.samples.setdefault(name, [])
+            samples.append(round(seconds, 3))
+            del samples[:-self.window]
+            self._unsaved += 1
+            if self._unsaved >= LATENCY_FLUSH_EVERY:
+                self._save()
+
+    def flush(self):
+        """把尚未保存的样本写回文件"""
+        with self._lock:
+            if self._unsaved:
+                self._save()
+
+    def _save(self):
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.samples, f)
+            self._unsaved = 0
+        except OSError as e:
+            print(f"⚠️ [Hedge] 延迟统计写入失败: {str(e)}")
+
+    def percentile(self, name: str, pct: float = HEDGE_PERCENTILE,
+                   min_samples: int = HEDGE_MIN_SAMPLES) -> Optional[float]:
+        """返回百分位延迟（秒）；样本不足时返回 None"""
+        with self._lock:
+            samples = sorted(self.samples.get(name, []))
+        if not samples or len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(pct / 100 * len(samples)) - 1))
+        return samples[index]
+
+
+class HedgeBudget:
+    """对冲额度：每次可以对冲的主引擎调用积累 ratio 次，对冲一次消耗 1 次，线程安全"""
+
+    def __init__(self, ratio: float = HEDGE_BUDGET_RATIO, max_credits: float = HEDGE_MAX_CREDITS):
+        self.ratio = ratio
+        self.max_credits = max_credits
+        # 启动时允许一次对冲，避免 cron 运行中前几个慢调用只能等待
+        self.credits = min(1.0, max_credits)
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self.credits = min(self.max_credits, self.credits + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.credits < 1.0:
+                return False
+            self.credits -= 1.0
+            self.hedges += 1
+            return True
+
+
+def hedged_call(primary: Callable[[threading.Event], Optional[str]],
+                secondary: Callable[[threading.Event], Optional[str]],
+                hedge_after: Optional[float], budget: Optional[HedgeBudget] = None,
+                label: str = "") -> Tuple[Optional[str], Optional[str]]:
+    """
+    主引擎调用 + 备份引擎（失败时接管，超时时对冲）
+
+    参数:
+        primary / secondary: 接收取消事件的调用函数，返回结果文本或 None；事件被设置时应尽快放弃
+        hedge_after: 主引擎超过多少秒未返回时发送对冲请求（None 表示不对冲，只做失败接管）
+        budget: 对冲额度（None 表示不限）
+        label: 日志中显示的后端名称，如 "Gemini → DeepSeek"
+
+    返回:
+        (结果文本, 'primary' / 'secondary')；都失败时返回 (None, None)
+    """
+    results: queue.Queue = queue.Queue()
+    cancels = {'primary': threading.Event(), 'secondary': threading.Event()}
+    funcs = {'primary': primary, 'secondary': secondary}
+    started = []
+
+    def run(name: str):
+        try:
+            value = funcs[name](cancels[name])
+        except Exception as e:
+            print(f"⚠️ [Hedge] {name} 调用异常: {str(e)[:120]}")
+            value = None
+        results.put((name, value))
+
+    def start(name: str):
+        started.append(name)
+        threading.Thread(target=run, args=(name,), daemon=True).start()
+
+    start('primary')
+    try:
+        name, value = results.get(timeout=hedge_after) if hedge_after is not None else results.get()
+    except queue.Empty:
+        if budget is None or budget.try_spend():
+            print(f"🏁 [Hedge] {label} 主引擎超过 {hedge_after:.1f} 秒未返回，同时发送给备份引擎")
+            start('secondary')
+        name, value = results.get()
+
+    finished = 1
+    while True:
+        if value:
+            for other, event in cancels.items():
+                if other != name:
+                    event.set()
+            if name == 'secondary' and 'primary' in started and finished < len(started):
+                print(f"🏁 [Hedge] 备份引擎先返回，取消主引擎")
+            return value, name
+        # 主引擎失败且尚未对冲：备份引擎接管（与原来的串行 Failover 相同）
+        if 'secondary' not in started:
+            start('secondary')
+        if finished == len(started):
+            return None, None
+        name, value = results.get()
+        finished += 1
+
+
+# ==================== 全局实例 ====================
+
+_tracker: Optional[LatencyTracker] = None
+_budget: Optional[HedgeBudget] = None
+_instances_lock = threading.Lock()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """返回进程内共享的延迟统计（首次使用时从 .gifia/llm_latency.json 加载，进程退出时写回）"""
+    global _tracker
+    with _instances_lock:
+        if _tracker is None:
+            _tracker = LatencyTracker()
+            atexit.register(_tracker.flush)
+        return _tracker
+
+
+def get_hedge_budget() -> HedgeBudget:
+    """返回进程内共享的对冲额度"""
+    global _budget
+    with _instances_lock:
+        if _budget is None:
+            _budget = HedgeBudget()
+        return _budget
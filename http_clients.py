@@ -0,0 +1,134 @@
+"""
+GIFIA - 共享 HTTP 客户端（连接池 + Keep-Alive）
+之前每次 DeepSeek 调用都新建 OpenAI 客户端，Jina 和网页抓取使用裸 requests.get，
+每个请求都要重新建立 TCP + TLS 连接。所有 Agent 改为复用进程内共享的客户端：
+
+- get_http_session()：requests.Session，按主机保持 Keep-Alive 连接池
+- get_openai_client()：按 (api_key, base_url) 缓存的 OpenAI 兼容客户端（OpenAI、DeepSeek），
+  底层 httpx 连接池可调
+- HTTP_HOST_LIMITS：按主机限制同时打开的连接数，超过时等待空闲连接（而不是再建新连接）
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+    HTTPAdapter = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    from openai import OpenAI
+except ImportError:
+    OpenAI = None
+
+# ==================== 连接池配置 ====================
+
+# requests 缓存的主机连接池数量
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "20"))
+# 每个主机保持的 Keep-Alive 连接数
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+# 按主机限制同时打开的连接数，如 "r.jina.ai=4,api.deepseek.com=8"
+HTTP_HOST_LIMITS = os.getenv("HTTP_HOST_LIMITS", "")
+# OpenAI 兼容客户端（httpx）的最大连接数和 Keep-Alive 连接数
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+LLM_HTTP_KEEPALIVE = int(os.getenv("LLM_HTTP_KEEPALIVE", "10"))
+# OpenAI 兼容客户端的请求超时（秒）
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "120"))
+
+
+def parse_host_limits(value: str) -> Dict[str, int]:
+    """解析 "host=limit,host=limit" 格式的主机连接数限制（忽略格式错误的条目）"""
+    limits = {}
+    for item in (value or "").split(','):
+        host, _, limit = item.strip().partition('=')
+        try:
+            if host and int(limit) > 0:
+                limits[host.strip().lower()] = int(limit)
+        except ValueError:
+            print(f"⚠️ HTTP_HOST_LIMITS 条目格式错误，已忽略: {item}")
+    return limits
+
+
+# ==================== 全局实例 ====================
+
+_session = None
+_openai_clients: Dict[Tuple[str, Optional[str]], object] = {}
+_clients_lock = threading.Lock()
+
+
+def _new_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    # 有连接数限制的主机使用独立的连接池，连接用完时阻塞等待（pool_block）
+    for host, limit in parse_host_limits(HTTP_HOST_LIMITS).items():
+        limited = HTTPAdapter(pool_connections=1, pool_maxsize=limit, pool_block=True)
+        session.mount(f'https://{host}/', limited)
+        session.mount(f'http://{host}/', limited)
+    return session
+
+
+def get_http_session():
+    """返回进程内共享的 requests.Session（首次使用时创建）"""
+    global _session
+    if requests is None:
+        raise ImportError("requests 未安装")
+    with _clients_lock:
+        if _session is None:
+            _session = _new_session()
+        return _session
+
+
+def get_openai_client(api_key: Optional[str], base_url: Optional[str] = None):
+    """
+    返回按 (api_key, base_url) 复用的 OpenAI 兼容客户端
+
+    参数:
+        api_key: API Key（为空时返回 None）
+        base_url: 服务地址（DeepSeek 为 https://api.deepseek.com，OpenAI 为 None）
+
+    返回:
+        OpenAI 客户端；未安装 openai 或没有 API Key 时返回 None
+    """
+    if not api_key or OpenAI is None:
+        return None
+    key = (api_key, base_url)
+    with _clients_lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            kwargs = {'api_key': api_key}
+            if base_url:
+                kwargs['base_url'] = base_url
+            if httpx is not None:
+                kwargs['http_client'] = httpx.Client(
+                    limits=httpx.Limits(max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                                        max_keepalive_connections=LLM_HTTP_KEEPALIVE),
+                    timeout=LLM_HTTP_TIMEOUT,
+                )
+            client = OpenAI(**kwargs)
+            _openai_clients[key] = client
+        return client
+
+
+def close_clients():
+    """关闭所有共享客户端的连接（常驻模式退出时调用）"""
+    global _session
+    with _clients_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+        for client in _openai_clients.values():
+            close = getattr(client, 'close', None)
+            if close:
+                close()
+        _openai_clients.clear()
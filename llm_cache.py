@@ -0,0 +1,178 @@
+"""
+GIFIA - LLM 响应缓存（内容寻址，磁盘持久化）
+同一个提示词在多次运行之间经常被重复发送（保存失败的 URL、中断后重跑等），
+按 模型 + 提示词 + 提示词版本 的哈希缓存响应，命中时不再调用 Gemini / DeepSeek
+
+- TTL：超过 LLM_CACHE_TTL_DAYS 的条目视为过期
+- 容量：超过 LLM_CACHE_MAX_ENTRIES 条或 LLM_CACHE_MAX_MB 时按最近访问时间淘汰（LRU）
+- 统计：命中 / 未命中 / 写入 / 淘汰次数
+"""
+
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from gifia_state import connect_sqlite, state_path
+
+# ==================== 缓存配置 ====================
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "7"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "50"))
+
+
+def make_cache_key(model: str, prompt: str, prompt_version: str = "1", **params) -> str:
+    """
+    生成缓存键：sha256(模型 + 提示词版本 + 其他影响输出的参数 + 提示词)
+
+    参数:
+        model: 模型（或模型级联顺序）标识
+        prompt: 提示词全文
+        prompt_version: 提示词模板版本，修改模板时递增，使旧缓存失效
+        params: 其他影响输出的参数，如 system_prompt、max_tokens
+    """
+    digest = hashlib.sha256()
+    for part in (model, prompt_version, *(f"{k}={params[k]}" for k in sorted(params)), prompt):
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class LLMCache:
+    """基于 SQLite 的 LLM 响应缓存，线程安全"""
+
+    def __init__(self, path: Optional[str] = None, ttl_days: float = LLM_CACHE_TTL_DAYS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, max_mb: float = LLM_CACHE_MAX_MB):
+        self.path = path or state_path('llm_cache.db')
+        self.ttl_seconds = ttl_days * 86400
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_access ON llm_responses(last_access)")
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存；未命中或已过期返回 None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row['created_at'] <= self.ttl_seconds:
+                self._conn.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self.hits += 1
+                return row['response']
+            if row:
+                self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._conn.commit()
+            self.misses += 1
+            return None
+
+    def set(self, key: str, response: str, model: str = ""):
+        """写入缓存，并在超出容量时淘汰最久未访问的条目"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO llm_responses (key, model, response, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    model = excluded.model, response = excluded.response, size = excluded.size,
+                    created_at = excluded.created_at, last_access = excluded.last_access
+                """,
+                (key, model, response, len(response.encode('utf-8')), now, now),
+            )
+            self.writes += 1
+            self._evict(now)
+            self._conn.commit()
+
+    def delete(self, key: str):
+        """删除某个条目（例如调用方发现缓存的响应无法解析）"""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """清理过期条目，再按 LRU 淘汰到容量以内（调用方需持有锁）"""
+        cursor = self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        self.evictions += max(cursor.rowcount, 0)
+
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM llm_responses ORDER BY last_access ASC").fetchall()
+        evict = []
+        for row in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            evict.append((row['key'],))
+            count -= 1
+            total -= row['size']
+        self._conn.executemany("DELETE FROM llm_responses WHERE key = ?", evict)
+        self.evictions += len(evict)
+
+    def stats(self) -> Dict:
+        """命中率与容量统计"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'entries': count,
+                'bytes': total,
+            }
+
+
+# ==================== 全局实例 ====================
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """返回进程内共享的缓存实例（LLM_CACHE_ENABLED=0 时返回 None）"""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+def print_cache_stats():
+    """输出本进程的缓存命中统计（未发生查询时不输出）"""
+    cache = _cache
+    if cache is None:
+        return
+    stats = cache.stats()
+    if stats['hits'] + stats['misses'] == 0:
+        return
+    print(f"♻️  LLM 缓存: 命中 {stats['hits']} / 未命中 {stats['misses']}（命中率 {stats['hit_rate']:.0%}），"
+          f"共 {stats['entries']} 条 {stats['bytes'] / 1024:.0f} KB")
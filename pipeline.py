@@ -0,0 +1,186 @@
+"""
+GIFIA - 分阶段流水线引擎 (Producer/Consumer)
+Scout -> Researcher -> Analyst -> Validator 各阶段拥有独立的工作线程池和有界队列，
+上一阶段处理第 N+1 个 URL 时，下一阶段可以同时处理第 N 个 URL
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# 队列结束标记
+_SENTINEL = object()
+
+
+class PipelineStage:
+    """
+    流水线中的一个阶段
+
+    handler(item) 返回值：
+        - 非 None：传递给下一阶段（最后一个阶段则作为结果收集）
+        - None：该条目在本阶段结束（被过滤、失败或已完成）
+    handler 抛出的异常会被计入 errors，不会中断流水线
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any], Any], workers: int = 1, queue_size: int = 0):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        # 输入队列容量，默认为工作线程数的 2 倍；队列满时上游阻塞（背压）
+        self.queue_size = queue_size if queue_size > 0 else self.workers * 2
+
+        # 吞吐量计数器
+        self.received = 0
+        self.passed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str, elapsed: float, queue_depth: int):
+        """记录一次处理结果（线程安全）"""
+        with self._lock:
+            now = time.monotonic()
+            if self.started_at is None:
+                self.started_at = now - elapsed
+            self.finished_at = now
+            self.received += 1
+            self.busy_seconds += elapsed
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+            if outcome == 'passed':
+                self.passed += 1
+            elif outcome == 'dropped':
+                self.dropped += 1
+            else:
+                self.errors += 1
+
+    def stats(self) -> Dict:
+        """返回本阶段的统计信息"""
+        with self._lock:
+            wall = 0.0
+            if self.started_at is not None and self.finished_at is not None:
+                wall = self.finished_at - self.started_at
+            return {
+                'stage': self.name,
+                'workers': self.workers,
+                'received': self.received,
+                'passed': self.passed,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'busy_seconds': round(self.busy_seconds, 2),
+                'avg_seconds': round(self.busy_seconds / self.received, 2) if self.received else 0.0,
+                'throughput_per_min': round(self.received * 60.0 / wall, 2) if wall > 0 else 0.0,
+                'max_queue_depth': self.max_queue_depth,
+            }
+
+
+class StagePipeline:
+    """
+    基于有界队列的多阶段流水线
+
+    用法:
+        pipeline = StagePipeline([
+            PipelineStage('researcher', scrape, workers=3),
+            PipelineStage('analyst', analyze, workers=2),
+            PipelineStage('validator', validate_and_save, workers=1),
+        ])
+        results = pipeline.run(items)
+        pipeline.print_stats()
+    """
+
+    def __init__(self, stages: List[PipelineStage]):
+        if not stages:
+            raise ValueError("流水线至少需要一个阶段")
+        self.stages = stages
+        self.results: List[Any] = []
+        self._results_lock = threading.Lock()
+
+    def _worker(self, index: int, in_queue: queue.Queue, out_queue: Optional[queue.Queue], remaining: List[int],
+                remaining_lock: threading.Lock):
+        stage = self.stages[index]
+        while True:
+            item = in_queue.get()
+            if item is _SENTINEL:
+                break
+
+            depth = in_queue.qsize()
+            start = time.monotonic()
+            try:
+                output = stage.handler(item)
+                outcome = 'passed' if output is not None else 'dropped'
+            except Exception as e:
+                print(f"❌ [Pipeline:{stage.name}] 处理失败: {str(e)}")
+                output = None
+                outcome = 'error'
+            stage.record(outcome, time.monotonic() - start, depth)
+
+            if output is not None:
+                if out_queue is not None:
+                    out_queue.put(output)  # 下游队列满时阻塞，形成背压
+                else:
+                    with self._results_lock:
+                        self.results.append(output)
+
+        # 本阶段最后一个退出的工作线程负责通知下游结束
+        with remaining_lock:
+            remaining[index] -= 1
+            last_worker = remaining[index] == 0
+        if last_worker and out_queue is not None:
+            for _ in range(self.stages[index + 1].workers):
+                out_queue.put(_SENTINEL)
+
+    def run(self, items: Iterable[Any]) -> List[Any]:
+        """
+        运行流水线直到所有条目处理完毕
+
+        参数:
+            items: 输入条目（可以是生成器，生产速度受第一阶段队列背压控制）
+
+        返回:
+            最后一个阶段输出的结果列表
+        """
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        remaining = [stage.workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            out_queue = queues[index + 1] if index + 1 < len(self.stages) else None
+            for n in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(index, queues[index], out_queue, remaining, remaining_lock),
+                    name=f"pipeline-{stage.name}-{n}",
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        # 生产者：向第一阶段投递条目
+        try:
+            for item in items:
+                queues[0].put(item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_SENTINEL)
+
+        for thread in threads:
+            thread.join()
+
+        return self.results
+
+    def stats(self) -> List[Dict]:
+        """返回所有阶段的统计信息"""
+        return [stage.stats() for stage in self.stages]
+
+    def print_stats(self):
+        """打印各阶段吞吐量统计"""
+        print("\n📈 流水线各阶段统计:")
+        for s in self.stats():
+            print(f"   [{s['stage']}] 线程 {s['workers']} | 处理 {s['received']} | 通过 {s['passed']} | "
+                  f"结束 {s['dropped']} | 错误 {s['errors']} | 平均 {s['avg_seconds']}s | "
+                  f"吞吐 {s['throughput_per_min']}/min | 最大排队 {s['max_queue_depth']}")
@@ -0,0 +1,255 @@
+"""
+GIFIA - Scout 查询规划器（按新案例产出轮换关键词组合）
+agent_v2 / agent_v3 的 ScoutAgent 固定使用 case_specific_keywords[:3] 和 insurance_types[:3]，
+每次发送同一个查询，新结果越来越少。规划器把关键词分组、地区和语言组合成一组查询变体，
+记录每个变体每次搜索带来的新保存案例数，按 UCB（上置信界）分配本次运行的搜索次数：
+
+- 产出高的变体优先；搜索次数少的变体有探索加成，从未搜索过的变体优先尝试
+- 历史记录按 QUERY_PLANNER_HALF_LIFE_DAYS 半衰期衰减，产出下降的变体逐渐让位，久未搜索的变体重新被探索
+- 统计存放在 .gifia/query_planner.db，按来源（agent_v2 / deep_research）区分
+"""
+
+import math
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from gifia_state import connect_sqlite, state_path
+
+# ==================== 规划器配置 ====================
+
+QUERY_PLANNER_ENABLED = os.getenv("QUERY_PLANNER_ENABLED", "1") == "1"
+# 每次运行的 Scout 搜索次数（每次一个查询变体，即每次运行的 Tavily 调用数）
+QUERY_PLANNER_SEARCHES = int(os.getenv("QUERY_PLANNER_SEARCHES", "1"))
+# 探索系数：越大越倾向于尝试搜索次数少的变体
+QUERY_PLANNER_EXPLORATION = float(os.getenv("QUERY_PLANNER_EXPLORATION", "1.0"))
+# 历史记录的半衰期（天）
+QUERY_PLANNER_HALF_LIFE_DAYS = float(os.getenv("QUERY_PLANNER_HALF_LIFE_DAYS", "14"))
+
+# Tavily 查询长度上限
+MAX_QUERY_CHARS = 400
+# 英文查询的排除条件（与原来的固定查询相同）
+EXCLUDE_TERMS = "-property insurance -auto insurance"
+
+# 地区变体：(id, 追加到查询中的地区关键词)
+REGIONS = [
+    ('global', ''),
+    ('us', 'United States'),
+    ('uk', 'UK'),
+    ('au', 'Australia'),
+    ('in', 'India'),
+    ('asia', 'Singapore OR Malaysia OR "Hong Kong"'),
+]
+
+# 语言变体：使用本语言的关键词，match_keywords 供 Scout 的关键词过滤使用
+LANGUAGE_VARIANTS = {
+    'zh': {
+        'case_keywords': ['保险诈骗 判刑', '骗保 被捕', '保险欺诈案'],
+        'insurance_types': ['寿险', '健康险', '意外险'],
+        'exclude': '-车险 -财产险',
+        'match_keywords': ['诈骗', '骗保', '欺诈'],
+    },
+    'es': {
+        'case_keywords': ['fraude al seguro condenado', 'estafa a aseguradora detenido'],
+        'insurance_types': ['seguro de vida', 'seguro de salud'],
+        'exclude': '-automóvil',
+        'match_keywords': ['fraude', 'estafa'],
+    },
+}
+
+
+def _chunks(items: Sequence[str], size: int) -> List[List[str]]:
+    return [list(items[i:i + size]) for i in range(0, len(items), size)]
+
+
+def build_variants(case_keywords: Sequence[str], insurance_types: Sequence[str], group_size: int = 3,
+                   year: Optional[int] = None) -> List[Dict]:
+    """
+    生成查询变体：英文关键词分组 × 保险类型分组 × 地区，再加上各语言变体
+
+    参数:
+        case_keywords: 案例关键词（agent_v2 / agent_v3 的 CASE_SPECIFIC_KEYWORDS）
+        insurance_types: 保险类型关键词（agent_v2 / agent_v3 的 INSURANCE_TYPES）
+        group_size: 每组关键词数量（原来的固定查询为前 3 个）
+        year: 当前年份（查询限定为去年和今年）
+
+    返回:
+        [{'id', 'query', 'language', 'region', 'match_keywords'}]，超过 Tavily 长度上限的组合被丢弃
+    """
+    year = year or datetime.now().year
+    years = f"{year - 1} {year}"
+    variants = []
+    for ci, cases in enumerate(_chunks(case_keywords, group_size)):
+        for ti, types in enumerate(_chunks(insurance_types, group_size)):
+            for region_id, region in REGIONS:
+                parts = [" OR ".join(cases), " OR ".join(types), region, EXCLUDE_TERMS, years]
+                variants.append({
+                    'id': f"en-c{ci}-t{ti}-{region_id}",
+                    'query': " ".join(part for part in parts if part),
+                    'language': 'en',
+                    'region': region_id,
+                    'match_keywords': [],
+                })
+    for language, spec in LANGUAGE_VARIANTS.items():
+        parts = [" OR ".join(spec['case_keywords']), " OR ".join(spec['insurance_types']), spec['exclude'], years]
+        variants.append({
+            'id': f"{language}-global",
+            'query': " ".join(part for part in parts if part),
+            'language': language,
+            'region': 'global',
+            'match_keywords': list(spec['match_keywords']),
+        })
+    return [variant for variant in variants if len(variant['query']) <= MAX_QUERY_CHARS]
+
+
+# ==================== 产出统计 ====================
+
+class QueryStats:
+    """
+    查询变体的搜索和产出记录（SQLite，存放在 .gifia/ 下），线程安全
+    每次搜索、每个新保存的案例各记一条，读取时按时间衰减汇总
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or state_path('query_planner.db')
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS query_events (
+                    source TEXT NOT NULL,
+                    variant TEXT NOT NULL,
+                    searches INTEGER NOT NULL DEFAULT 0,
+                    results INTEGER NOT NULL DEFAULT 0,
+                    saved INTEGER NOT NULL DEFAULT 0,
+                    at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_query_events_source ON query_events(source, at)")
+            self._conn.commit()
+
+    def record(self, source: str, variant: str, searches: int = 0, results: int = 0, saved: int = 0):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO query_events (source, variant, searches, results, saved, at) VALUES (?, ?, ?, ?, ?, ?)",
+                (source, variant, searches, results, saved, time.time()),
+            )
+            self._conn.commit()
+
+    def totals(self, source: str, half_life_days: float, now: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """
+        按半衰期衰减后的累计值
+
+        返回:
+            {变体 id: {'searches', 'results', 'saved'}}
+        """
+        now = now or time.time()
+        half_life = half_life_days * 86400
+        with self._lock:
+            # 超过 10 个半衰期的记录权重不到 0.1%，直接清理
+            self._conn.execute("DELETE FROM query_events WHERE at < ?", (now - 10 * half_life,))
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT variant, searches, results, saved, at FROM query_events WHERE source = ?", (source,)
+            ).fetchall()
+        totals: Dict[str, Dict[str, float]] = {}
+        for row in rows:
+            weight = 0.5 ** (max(0.0, now - row['at']) / half_life)
+            counts = totals.setdefault(row['variant'], {'searches': 0.0, 'results': 0.0, 'saved': 0.0})
+            for key in ('searches', 'results', 'saved'):
+                counts[key] += row[key] * weight
+        return totals
+
+
+_stats: Optional[QueryStats] = None
+_stats_lock = threading.Lock()
+
+
+def get_query_stats() -> QueryStats:
+    """返回进程内共享的统计实例"""
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = QueryStats()
+        return _stats
+
+
+# ==================== 规划器 ====================
+
+class QueryPlanner:
+    """按 UCB 选择查询变体，并记录每个变体的搜索次数和新保存案例数"""
+
+    def __init__(self, source: str, variants: List[Dict], stats: Optional[QueryStats] = None,
+                 exploration: float = QUERY_PLANNER_EXPLORATION, half_life_days: float = QUERY_PLANNER_HALF_LIFE_DAYS,
+                 rng: Optional[random.Random] = None):
+        self.source = source
+        self.variants = variants
+        self.stats = stats or get_query_stats()
+        self.exploration = exploration
+        self.half_life_days = half_life_days
+        self.rng = rng or random.Random()
+
+    def scores(self) -> Dict[str, float]:
+        """
+        每个变体的 UCB 分数：平均产出（新保存案例数 / 搜索次数）+ 探索加成
+        从未搜索过（或记录已衰减到接近 0）的变体为无穷大
+        """
+        totals = self.stats.totals(self.source, self.half_life_days)
+        total_searches = sum(counts['searches'] for counts in totals.values())
+        scores = {}
+        for variant in self.variants:
+            counts = totals.get(variant['id'])
+            searches = counts['searches'] if counts else 0.0
+            if searches < 0.05:
+                scores[variant['id']] = math.inf
+                continue
+            mean = counts['saved'] / searches
+            scores[variant['id']] = mean + self.exploration * math.sqrt(math.log(total_searches + 1) / searches)
+        return scores
+
+    def select(self, count: int = QUERY_PLANNER_SEARCHES) -> List[Dict]:
+        """选择本次运行要搜索的变体（分数相同时随机打破平局）"""
+        scores = self.scores()
+        ranked = sorted(self.variants, key=lambda v: (scores[v['id']], self.rng.random()), reverse=True)
+        return ranked[:max(1, count)]
+
+    def record_search(self, variant_id: str, results: int):
+        """记录一次搜索及其通过 Scout 过滤的结果数"""
+        self.stats.record(self.source, variant_id, searches=1, results=results)
+
+    def print_stats(self, top: int = 5):
+        """输出产出最高的几个变体（衰减后的累计值）"""
+        totals = self.stats.totals(self.source, self.half_life_days)
+        if not totals:
+            return
+        queries = {variant['id']: variant['query'] for variant in self.variants}
+        ranked = sorted(totals.items(), key=lambda item: item[1]['saved'] / max(item[1]['searches'], 1e-9),
+                        reverse=True)
+        print(f"🧭 查询规划器（{self.source}）: {len(totals)} / {len(self.variants)} 个变体有搜索记录")
+        for variant_id, counts in ranked[:top]:
+            searches = counts['searches']
+            yield_rate = counts['saved'] / searches if searches else 0.0
+            print(f"   [{variant_id}] 每次搜索新增 {yield_rate:.2f} 个案例（约 {searches:.1f} 次搜索）"
+                  f" {queries.get(variant_id, '')[:60]}")
+
+
+def get_query_planner(source: str, case_keywords: Sequence[str],
+                      insurance_types: Sequence[str]) -> Optional[QueryPlanner]:
+    """创建某个 Scout 的查询规划器（QUERY_PLANNER_ENABLED=0 时返回 None，使用原来的固定查询）"""
+    if not QUERY_PLANNER_ENABLED:
+        return None
+    return QueryPlanner(source, build_variants(case_keywords, insurance_types))
+
+
+def record_query_yield(search_result: Dict):
+    """案例保存成功后，给找到它的查询变体记一次产出（记录失败只输出警告）"""
+    variant_id = search_result.get('query_variant')
+    if not variant_id:
+        return
+    try:
+        get_query_stats().record(search_result.get('query_source', ''), variant_id, saved=1)
+    except Exception as e:
+        print(f"⚠️ [QueryPlanner] 产出记录失败: {str(e)}")
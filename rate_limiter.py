@@ -0,0 +1,246 @@
+"""
+GIFIA - 外部 API 自适应限流器
+按服务商（Tavily / Firecrawl / Jina / Gemini / DeepSeek / OpenAI）及模型分别控制调用速率，
+遇到 429 或 quota 错误时降低速率并暂停，之后随成功调用逐步恢复（AIMD），
+尽量贴近服务商限额运行，而不是把重试次数浪费在被限流的请求上
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# ==================== 默认速率配置（每分钟请求数） ====================
+
+# 可通过环境变量覆盖：服务商级 GEMINI_RPM=5，模型级 GEMINI_2_5_FLASH_RPM=10
+DEFAULT_RPM = {
+    'tavily': 60,
+    'firecrawl': 20,
+    'jina': 20,
+    'gemini': 15,
+    'deepseek': 60,
+    'openai': 60,
+}
+
+# 限流错误特征（错误信息小写后匹配）
+RATE_LIMIT_MARKERS = [
+    '429',
+    'quota',
+    'rate limit',
+    'ratelimit',
+    'rate_limit',
+    'resource exhausted',
+    'resource_exhausted',
+    'too many requests',
+]
+
+# 服务商级（账户 / 项目级）配额错误特征：遇到时服务商级限流器也要降速，而不只是当前模型
+PROVIDER_QUOTA_MARKERS = [
+    'insufficient_quota',
+    'billing',
+    'project',
+    'organization',
+    'account',
+    'credit',
+]
+
+
+class RateLimiter:
+    """
+    自适应令牌桶限流器：每分钟最多发放 rpm 个令牌，允许 burst 个突发请求
+    - on_throttle(): 速率减半（不低于 min_rpm），并暂停发放令牌一段时间
+    - on_success(): 速率按 increase_step 逐步恢复（不高于 max_rpm）
+    线程安全，acquire() 会阻塞直到拿到令牌
+    """
+
+    def __init__(self, name: str, rpm: float, burst: int = 1, min_rpm: Optional[float] = None,
+                 increase_step: Optional[float] = None):
+        self.name = name
+        self.max_rpm = float(rpm)
+        self.rpm = self.max_rpm
+        self.min_rpm = float(min_rpm) if min_rpm is not None else max(self.max_rpm * 0.1, 0.5)
+        # 默认每 20 次成功调用恢复到满速
+        self.increase_step = float(increase_step) if increase_step is not None else max(self.max_rpm * 0.05, 0.05)
+        self.burst = max(1, int(burst))
+        self.throttle_count = 0
+        # 已发放的令牌数（即实际发出的调用次数），供运行预算统计调用量
+        self.granted = 0
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """按流逝时间补充令牌（调用方需持有锁）"""
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rpm / 60.0)
+            self._last_refill = now
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        获取一个令牌
+
+        参数:
+            timeout: 最长等待秒数，None 表示一直等待
+
+        返回:
+            True 表示拿到令牌，False 表示超时
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    wait_time = self._blocked_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.granted += 1
+                        return True
+                    wait_time = (1 - self._tokens) * 60.0 / self.rpm
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait_time = min(wait_time, remaining)
+            time.sleep(wait_time)
+
+    def on_success(self):
+        """调用成功：速率逐步恢复"""
+        with self._lock:
+            self.rpm = min(self.max_rpm, self.rpm + self.increase_step)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """
+        遇到限流：速率减半并暂停发放令牌
+
+        参数:
+            retry_after: 服务商建议的等待秒数（Retry-After），None 时按新速率的一个间隔暂停
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rpm = max(self.min_rpm, self.rpm * 0.5)
+            self._tokens = 0.0
+            pause = retry_after if retry_after is not None else 60.0 / self.rpm
+            self._blocked_until = max(self._blocked_until, now + pause)
+            self.throttle_count += 1
+        print(f"🚦 [RateLimit] {self.name} 被限流，速率降至 {self.rpm:.1f}/min，暂停 {pause:.0f} 秒")
+
+
+# ==================== 全局注册表 ====================
+
+_limiters: Dict[str, RateLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def _env_name(key: str) -> str:
+    """'gemini:models/gemini-2.5-flash' -> 'GEMINI_2_5_FLASH_RPM'"""
+    model = key.split(':', 1)[-1].replace('models/', '')
+    return re.sub(r'[^A-Za-z0-9]+', '_', model).strip('_').upper() + '_RPM'
+
+
+def get_rate_limiter(provider: str, model: Optional[str] = None) -> RateLimiter:
+    """
+    获取某个服务商（或服务商下某个模型）的共享限流器（首次调用时创建）
+
+    参数:
+        provider: 服务商名称，如 'tavily'、'firecrawl'、'gemini'、'deepseek'
+        model: 模型名称（可选），如 'models/gemini-2.5-flash'，每个模型单独计算配额
+
+    返回:
+        RateLimiter 实例
+    """
+    provider = provider.lower()
+    key = f"{provider}:{model}" if model else provider
+    with _registry_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            default = float(os.getenv(f"{provider.upper()}_RPM", DEFAULT_RPM.get(provider, 30)))
+            rpm = float(os.getenv(_env_name(key), default)) if model else default
+            limiter = RateLimiter(key, rpm)
+            _limiters[key] = limiter
+        return limiter
+
+
+# ==================== 限流错误识别 ====================
+
+def is_rate_limit_error(error: Any) -> bool:
+    """判断异常或 HTTP 响应是否属于限流/配额错误"""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is None:
+        status = getattr(error, 'code', None)
+    if str(status) == '429':
+        return True
+    if hasattr(error, 'status_code') and not isinstance(error, Exception):
+        return False  # 普通 HTTP 响应只看状态码
+    message = str(error).lower()
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+def is_provider_quota_error(error: Any) -> bool:
+    """判断限流错误是否针对整个服务商（账户 / 项目级配额），而不只是某个模型"""
+    if not is_rate_limit_error(error):
+        return False
+    message = str(error).lower()
+    return any(marker in message for marker in PROVIDER_QUOTA_MARKERS)
+
+
+def get_retry_after(error: Any) -> Optional[float]:
+    """从异常或 HTTP 响应中读取 Retry-After 秒数"""
+    response = error if hasattr(error, 'headers') else getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        value = headers.get('retry-after') or headers.get('Retry-After')
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def limited_call(provider: str, func: Callable, *args, model: Optional[str] = None, max_retries: int = 1,
+                 **kwargs) -> Any:
+    """
+    在限流器控制下调用外部 API
+
+    - 调用前先获取模型级令牌，再获取服务商级令牌（在模型级限流器上等待时不占用服务商级令牌）
+    - 成功：限流器逐步恢复速率
+    - 限流错误：模型级（没有模型时为服务商级）限流器降速暂停，服务商级配额错误时服务商级限流器也降速；
+      在等待暂停结束后最多重试 max_retries 次，仍失败则抛出
+    - 其他错误：直接抛出，由调用方处理
+
+    参数:
+        provider: 服务商名称
+        func: 实际调用的函数
+        model: 模型名称（可选）
+        max_retries: 限流后的重试次数（Gemini 多模型级联时设为 0，直接切换下一个模型）
+    """
+    limiters = [get_rate_limiter(provider)]
+    if model:
+        limiters.append(get_rate_limiter(provider, model))
+
+    attempt = 0
+    while True:
+        for limiter in reversed(limiters):
+            limiter.acquire()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if is_rate_limit_error(e):
+                retry_after = get_retry_after(e)
+                limiters[-1].on_throttle(retry_after)
+                if len(limiters) > 1 and is_provider_quota_error(e):
+                    limiters[0].on_throttle(retry_after)
+                if attempt < max_retries:
+                    attempt += 1
+                    continue
+            raise
+        for limiter in limiters:
+            limiter.on_success()
+        return result
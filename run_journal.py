@@ -0,0 +1,122 @@
+"""
+GIFIA - 运行日志（Checkpoint / Resume）
+记录每个 URL 在流水线中的进度：scraped -> analyzed -> validated -> saved
+任务超时或被取消后重新运行时，从每个 URL 最后完成的阶段继续，
+不再重复调用 Firecrawl 或 Gemini
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from gifia_state import connect_sqlite, state_path
+
+# 阶段顺序
+STAGES = ['scraped', 'analyzed', 'validated', 'saved']
+
+# 日志保留天数（超过后自动清理）
+JOURNAL_TTL_DAYS = float(os.getenv("GIFIA_JOURNAL_TTL_DAYS", "7"))
+
+
+class RunJournal:
+    """
+    基于 SQLite 的运行日志，线程安全
+
+    每个 (pipeline, url) 一行，记录最后完成的阶段以及各阶段的产出（JSON），
+    例如 scraped 阶段保存 Markdown 全文，analyzed 阶段保存结构化提取结果
+    """
+
+    def __init__(self, path: Optional[str] = None, pipeline: str = 'deep_research'):
+        self.path = path or state_path('run_journal.db')
+        self.pipeline = pipeline
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS url_progress (
+                    pipeline TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    payload TEXT NOT NULL DEFAULT '{}',
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (pipeline, url)
+                )
+            """)
+            self._conn.commit()
+        self.prune()
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        读取某个 URL 的进度
+
+        返回:
+            {'stage': 最后完成的阶段, 'data': {阶段: 产出}}，没有记录时返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stage, payload FROM url_progress WHERE pipeline = ? AND url = ?",
+                (self.pipeline, url),
+            ).fetchone()
+        if not row:
+            return None
+        return {'stage': row['stage'], 'data': json.loads(row['payload'])}
+
+    def stage_data(self, url: str, stage: str) -> Optional[Any]:
+        """如果 URL 已完成 stage 阶段，返回该阶段的产出，否则返回 None"""
+        progress = self.get(url)
+        if not progress or STAGES.index(progress['stage']) < STAGES.index(stage):
+            return None
+        return progress['data'].get(stage)
+
+    def is_saved(self, url: str) -> bool:
+        """URL 是否已经完整处理并保存"""
+        progress = self.get(url)
+        return bool(progress and progress['stage'] == 'saved')
+
+    def record(self, url: str, stage: str, data: Any = None):
+        """
+        记录 URL 完成了某个阶段
+
+        参数:
+            url: 案例 URL
+            stage: STAGES 中的阶段名
+            data: 该阶段的产出（可 JSON 序列化），重跑时用于恢复
+        """
+        if stage not in STAGES:
+            raise ValueError(f"未知阶段: {stage}")
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM url_progress WHERE pipeline = ? AND url = ?",
+                (self.pipeline, url),
+            ).fetchone()
+            payload = json.loads(row['payload']) if row else {}
+            payload[stage] = data
+            self._conn.execute(
+                """
+                INSERT INTO url_progress (pipeline, url, stage, payload, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (pipeline, url) DO UPDATE SET
+                    stage = excluded.stage, payload = excluded.payload, updated_at = excluded.updated_at
+                """,
+                (self.pipeline, url, stage, json.dumps(payload, ensure_ascii=False, default=str), time.time()),
+            )
+            self._conn.commit()
+
+    def prune(self, max_age_days: Optional[float] = None):
+        """清理超过保留期的记录"""
+        max_age_days = JOURNAL_TTL_DAYS if max_age_days is None else max_age_days
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock:
+            self._conn.execute("DELETE FROM url_progress WHERE updated_at < ?", (cutoff,))
+            self._conn.commit()
+
+    def summary(self) -> Dict[str, int]:
+        """各阶段的 URL 数量"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, COUNT(*) AS n FROM url_progress WHERE pipeline = ? GROUP BY stage",
+                (self.pipeline,),
+            ).fetchall()
+        return {row['stage']: row['n'] for row in rows}
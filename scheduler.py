@@ -0,0 +1,97 @@
+"""
+GIFIA - 进程内定时调度器
+常驻（daemon）模式下按各自的间隔执行热点搜索、常规搜索、外部链接扫描等任务，
+客户端和缓存在进程内保持热状态，只在启动时付出一次冷启动开销
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class IntervalJob:
+    """按固定间隔重复执行的任务"""
+
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[], None], run_immediately: bool = True):
+        self.name = name
+        self.interval = float(interval_seconds)
+        self.func = func
+        self.next_run = time.monotonic() if run_immediately else time.monotonic() + self.interval
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = 0.0
+
+    def run(self):
+        """执行一次任务；异常只记录不抛出，避免影响其它任务"""
+        start = time.monotonic()
+        try:
+            self.func()
+        except Exception as e:
+            self.failures += 1
+            print(f"❌ [Scheduler] 任务 {self.name} 执行失败: {str(e)}")
+        finally:
+            self.runs += 1
+            self.last_duration = time.monotonic() - start
+            # 从本次开始时间计算下一次，避免长任务导致间隔漂移累积
+            self.next_run = max(start + self.interval, time.monotonic())
+
+
+class IntervalScheduler:
+    """
+    单线程调度器：依次执行到期的任务，空闲时休眠到最近一个任务到期
+
+    用法:
+        scheduler = IntervalScheduler()
+        scheduler.add_job('hotspot', 30 * 60, run_hotspot)
+        scheduler.add_job('regular', 60 * 60, run_regular)
+        scheduler.run_forever()
+    """
+
+    def __init__(self):
+        self.jobs: List[IntervalJob] = []
+        self._stop_event = threading.Event()
+
+    def add_job(self, name: str, interval_seconds: float, func: Callable[[], None],
+                run_immediately: bool = True) -> IntervalJob:
+        job = IntervalJob(name, interval_seconds, func, run_immediately)
+        self.jobs.append(job)
+        return job
+
+    def run_pending(self) -> int:
+        """执行所有已到期的任务，返回执行的任务数"""
+        now = time.monotonic()
+        due = sorted((job for job in self.jobs if job.next_run <= now), key=lambda job: job.next_run)
+        for job in due:
+            if self._stop_event.is_set():
+                break
+            job.run()
+        return len(due)
+
+    def seconds_until_next(self) -> Optional[float]:
+        """距离最近一个任务到期的秒数"""
+        if not self.jobs:
+            return None
+        return max(0.0, min(job.next_run for job in self.jobs) - time.monotonic())
+
+    def run_forever(self, max_sleep: float = 60.0):
+        """持续运行直到 stop() 被调用"""
+        while not self._stop_event.is_set():
+            self.run_pending()
+            wait = self.seconds_until_next()
+            self._stop_event.wait(max_sleep if wait is None else min(wait, max_sleep))
+
+    def stop(self):
+        """请求停止（当前正在执行的任务会执行完毕）"""
+        self._stop_event.set()
+
+    def stats(self) -> List[Dict]:
+        return [
+            {
+                'job': job.name,
+                'interval': job.interval,
+                'runs': job.runs,
+                'failures': job.failures,
+                'last_duration': round(job.last_duration, 2),
+            }
+            for job in self.jobs
+        ]
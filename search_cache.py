@@ -0,0 +1,191 @@
+"""
+GIFIA - Tavily 搜索结果缓存（按查询指纹，磁盘持久化）
+Scout 每次运行构建的查询基本相同，热点任务每 30 分钟重复同样的关键词，每次都是一次付费的
+advanced / news 搜索。按 规范化查询 + 影响结果的参数（search_depth、max_results、域名等）缓存响应：
+
+- TTL：按搜索模式分别设置（news 结果变化快，TTL 较短）
+- 强制刷新：SEARCH_CACHE_REFRESH=1 或 cached_search(refresh=True) 跳过读取，仍写入新结果
+- 统计：命中 / 未命中 / 强制刷新次数
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from gifia_state import connect_sqlite, state_path
+from rate_limiter import limited_call
+
+# ==================== 缓存配置 ====================
+
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "1") == "1"
+SEARCH_CACHE_REFRESH = os.getenv("SEARCH_CACHE_REFRESH", "0") == "1"
+
+# 各搜索模式的 TTL（分钟）；news 默认短于热点任务间隔，只合并紧挨着的重复运行
+SEARCH_CACHE_TTL_MINUTES = {
+    'news': float(os.getenv("SEARCH_CACHE_TTL_NEWS_MINUTES", "25")),
+    'basic': float(os.getenv("SEARCH_CACHE_TTL_BASIC_MINUTES", "360")),
+    'advanced': float(os.getenv("SEARCH_CACHE_TTL_ADVANCED_MINUTES", "360")),
+}
+# 超过该时间（天）的条目在写入时清理
+SEARCH_CACHE_RETENTION_DAYS = 7
+
+
+def normalize_query(query: str) -> str:
+    """查询规范化：小写、合并空白"""
+    return re.sub(r"\s+", " ", (query or "").strip().lower())
+
+
+def make_search_key(query: str, **params) -> str:
+    """
+    生成搜索缓存键：sha256(规范化查询 + 排序后的参数)
+
+    参数:
+        query: 搜索查询
+        params: 其他搜索参数（search_depth、max_results、include_domains 等），
+                值为 None 的参数忽略，域名列表排序后参与计算
+    """
+    normalized = {}
+    for name, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            value = sorted(str(v).lower() for v in value)
+        normalized[name] = value
+    payload = json.dumps({'query': normalize_query(query), 'params': normalized}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SearchCache:
+    """基于 SQLite 的搜索结果缓存，线程安全"""
+
+    def __init__(self, path: Optional[str] = None, ttl_minutes: Optional[Dict[str, float]] = None):
+        self.path = path or state_path('search_cache.db')
+        self.ttl_minutes = dict(SEARCH_CACHE_TTL_MINUTES, **(ttl_minutes or {}))
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_results (
+                    key TEXT PRIMARY KEY,
+                    mode TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+
+    def ttl_seconds(self, mode: str) -> float:
+        return self.ttl_minutes.get(mode, self.ttl_minutes['advanced']) * 60
+
+    def get(self, key: str, mode: str) -> Optional[Dict]:
+        """读取缓存；未命中或已超过该模式的 TTL 返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM search_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row and time.time() - row['created_at'] <= self.ttl_seconds(mode):
+                self.hits += 1
+                return json.loads(row['response'])
+            self.misses += 1
+            return None
+
+    def set(self, key: str, mode: str, query: str, response: Dict):
+        """写入缓存，并清理超过保留期的条目"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO search_results (key, mode, query, response, created_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET response = excluded.response, created_at = excluded.created_at
+                """,
+                (key, mode, query, json.dumps(response, ensure_ascii=False), now),
+            )
+            self._conn.execute("DELETE FROM search_results WHERE created_at < ?",
+                               (now - SEARCH_CACHE_RETENTION_DAYS * 86400,))
+            self._conn.commit()
+
+    def record_refresh(self):
+        """记录一次强制刷新（跳过读取，不计入命中率）"""
+        with self._lock:
+            self.refreshes += 1
+
+    def stats(self) -> Dict:
+        """命中率统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'refreshes': self.refreshes,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+# ==================== 全局实例 ====================
+
+_cache: Optional[SearchCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """返回进程内共享的缓存实例（SEARCH_CACHE_ENABLED=0 时返回 None）"""
+    global _cache
+    if not SEARCH_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SearchCache()
+        return _cache
+
+
+def cached_search(client: Any, query: str, search_depth: str = "basic", refresh: bool = False, **params) -> Dict:
+    """
+    带缓存的 Tavily 搜索（未命中时在限流器控制下调用 client.search）
+
+    参数:
+        client: TavilyClient
+        query: 搜索查询
+        search_depth: 搜索模式（basic / advanced / news），决定 TTL
+        refresh: 为 True 时跳过缓存读取（SEARCH_CACHE_REFRESH=1 对所有调用生效）
+        params: 传给 client.search 的其他参数
+
+    返回:
+        Tavily 响应（dict）；搜索失败时抛出异常，失败结果不写入缓存
+    """
+    cache = get_search_cache()
+    key = make_search_key(query, search_depth=search_depth, **params)
+    if cache is not None:
+        if refresh or SEARCH_CACHE_REFRESH:
+            cache.record_refresh()
+        else:
+            cached = cache.get(key, search_depth)
+            if cached is not None:
+                return cached
+
+    response = limited_call('tavily', client.search, query=query, search_depth=search_depth, **params)
+    if cache is not None and isinstance(response, dict):
+        try:
+            cache.set(key, search_depth, query, response)
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ 搜索结果缓存写入失败: {str(e)}")
+    return response
+
+
+def print_search_cache_stats():
+    """输出本进程的搜索缓存命中统计（未发生查询时不输出）"""
+    cache = _cache
+    if cache is None:
+        return
+    stats = cache.stats()
+    if stats['hits'] + stats['misses'] + stats['refreshes'] == 0:
+        return
+    refreshed = f"，强制刷新 {stats['refreshes']} 次" if stats['refreshes'] else ""
+    print(f"♻️  搜索缓存: 命中 {stats['hits']} / 未命中 {stats['misses']}（命中率 {stats['hit_rate']:.0%}{refreshed}）")
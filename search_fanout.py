@@ -0,0 +1,64 @@
+"""
+GIFIA - 多关键词并发搜索
+热点搜索的多个关键词之间没有依赖，串行执行时总耗时是所有查询之和。
+parallel_search() 在有上限的线程池中并发执行查询（Tavily 限流仍由 limited_call 控制），
+再按规范化 URL 合并结果：同一 URL 保留分数最高的结果，并记录命中的关键词（matched_keywords）
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from url_canonical import canonical_url
+
+
+def merge_results(results_by_query: Dict[str, List[Dict]]) -> List[Dict]:
+    """
+    按规范化 URL 合并多个查询的结果
+
+    参数:
+        results_by_query: {查询: 结果列表}，结果需包含 'url'，可选 'score'
+
+    返回:
+        合并后的结果（按分数从高到低），每个结果增加 'matched_keywords'（按查询顺序）
+    """
+    merged: Dict[str, Dict] = {}
+    for query, results in results_by_query.items():
+        for item in results:
+            key = canonical_url(item.get('url', ''))
+            if not key:
+                continue
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = dict(item, matched_keywords=[query])
+                continue
+            if query not in existing['matched_keywords']:
+                existing['matched_keywords'].append(query)
+            if item.get('score', 0) > existing.get('score', 0):
+                merged[key] = dict(item, matched_keywords=existing['matched_keywords'])
+    return sorted(merged.values(), key=lambda item: item.get('score', 0), reverse=True)
+
+
+def parallel_search(queries: List[str], search: Callable[[str], List[Dict]], max_workers: int = 5) -> List[Dict]:
+    """
+    并发执行多个查询并合并结果
+
+    参数:
+        queries: 查询列表
+        search: 单个查询的搜索函数，返回结果列表（异常视为该查询没有结果）
+        max_workers: 最大并发数
+
+    返回:
+        按规范化 URL 合并后的结果，见 merge_results()
+    """
+    def run(query: str) -> List[Dict]:
+        try:
+            return search(query) or []
+        except Exception as e:
+            print(f"⚠️ 搜索失败 {query}: {str(e)}")
+            return []
+
+    workers = max(1, min(max_workers, len(queries)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # map 保持查询顺序，matched_keywords 的顺序与结果和线程调度无关
+        results = list(executor.map(run, queries))
+    return merge_results(dict(zip(queries, results)))
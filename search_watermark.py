@@ -0,0 +1,133 @@
+"""
+GIFIA - 搜索水位线（增量处理）
+Scout 每次运行都拿到完整的 Tavily 结果列表，再对每个 URL 调用一次 check_duplicate（数据库往返），
+而大部分 URL 在上一次运行中已经处理过。按来源（流水线）记录已处理的 URL 及其发布时间：
+
+- split()：在任何下游处理之前，把搜索结果分成新结果和已见结果（纯本地查询）
+- mark()：URL 处理有结论（已保存、重复、未通过校验）后记录；失败或被取消的 URL 不记录，下次运行重试
+- 已见 URL 的发布时间比记录的新时（文章更新），重新视为新结果
+- 超过 SEARCH_WATERMARK_TTL_DAYS 的记录过期，之后重新检查一次
+"""
+
+import os
+import threading
+import time
+from datetime import timezone
+from typing import Dict, List, Optional, Tuple
+
+from gifia_state import connect_sqlite, state_path
+from url_canonical import canonical_url
+from work_queue import parse_published_date
+
+SEARCH_WATERMARK_ENABLED = os.getenv("SEARCH_WATERMARK_ENABLED", "1") == "1"
+SEARCH_WATERMARK_TTL_DAYS = float(os.getenv("SEARCH_WATERMARK_TTL_DAYS", "30"))
+
+
+def _published_key(value) -> Optional[str]:
+    """发布时间统一为 UTC ISO 字符串（可直接比较大小），无法解析时返回 None"""
+    parsed = parse_published_date(value)
+    return parsed.astimezone(timezone.utc).isoformat() if parsed else None
+
+
+class SearchWatermark:
+    """基于 SQLite 的已见 URL 记录（按来源区分），线程安全"""
+
+    def __init__(self, source: str, path: Optional[str] = None, ttl_days: float = SEARCH_WATERMARK_TTL_DAYS):
+        self.source = source
+        self.path = path or state_path('search_watermark.db')
+        self.ttl_seconds = ttl_days * 86400
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS seen_urls (
+                    source TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    outcome TEXT NOT NULL,
+                    published_date TEXT,
+                    seen_at REAL NOT NULL,
+                    PRIMARY KEY (source, url)
+                )
+            """)
+            self._conn.execute("DELETE FROM seen_urls WHERE seen_at < ?", (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+
+    def split(self, results: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        把搜索结果分成新结果和已见结果（保持原顺序）
+
+        参数:
+            results: 搜索结果，需包含 'url'，可选 'published_date'
+
+        返回:
+            (新结果, 已见结果)
+        """
+        keys = [canonical_url(item.get('url', '')) for item in results]
+        with self._lock:
+            rows = {}
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows.update({row['url']: row['published_date'] for row in self._conn.execute(
+                    f"SELECT url, published_date FROM seen_urls WHERE source = ? AND url IN ({placeholders})",
+                    (self.source, *chunk),
+                )})
+        new, seen = [], []
+        for item, key in zip(results, keys):
+            if key not in rows:
+                new.append(item)
+                continue
+            # 已见 URL 的发布时间更新（文章更新或转载），重新处理
+            published = _published_key(item.get('published_date'))
+            if published and rows[key] and published > rows[key]:
+                new.append(item)
+            else:
+                seen.append(item)
+        return new, seen
+
+    def mark(self, url: str, outcome: str, published_date: Optional[str] = None):
+        """
+        记录 URL 已处理
+
+        参数:
+            url: 原始 URL（内部按规范化 URL 记录）
+            outcome: 处理结论，如 'saved' / 'duplicate' / 'rejected'
+            published_date: 搜索结果中的发布时间
+        """
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO seen_urls (source, url, outcome, published_date, seen_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (source, url) DO UPDATE SET
+                    outcome = excluded.outcome,
+                    published_date = COALESCE(excluded.published_date, seen_urls.published_date),
+                    seen_at = excluded.seen_at
+                """,
+                (self.source, canonical_url(url), outcome, _published_key(published_date), time.time()),
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen_urls WHERE source = ?", (self.source,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_search_watermark(source: str) -> Optional[SearchWatermark]:
+    """创建某个来源的水位线（SEARCH_WATERMARK_ENABLED=0 时返回 None，即处理全部结果）"""
+    if not SEARCH_WATERMARK_ENABLED:
+        return None
+    return SearchWatermark(source)
+
+
+def split_new_results(watermark: Optional[SearchWatermark], results: List[Dict], label: str = "Scout") -> List[Dict]:
+    """按水位线过滤搜索结果并输出统计，返回新结果（未启用水位线时原样返回）"""
+    if watermark is None or not results:
+        return results
+    new, seen = watermark.split(results)
+    if seen:
+        print(f"🌊 [{label}] 新结果 {len(new)} 个，跳过上次运行已处理的 {len(seen)} 个")
+    return new
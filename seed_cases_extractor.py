@@ -5,13 +5,15 @@ GIFIA - 种子案例库提取器
 
 import os
 import json
-import re
 from datetime import datetime
 from typing import Dict, List, Optional
 from supabase import create_client, Client
 import google.generativeai as genai
 from tavily import TavilyClient
-from openai import OpenAI
+import ai_engine
+from structured_output import parse_json
+from search_cache import cached_search, print_search_cache_stats
+from usage_meter import print_usage_report
 
 # 尝试导入 docx 库
 try:
@@ -125,63 +127,22 @@ def extract_cases_from_reports(report_files: List[str]) -> List[Dict]:
 """
 
     try:
-        # 使用 Gemini 提取（带 Failover）
-        text = None
-        last_error = None
-        
-        # 尝试 Gemini
-        try:
-            print("   [Gemini] 正在分析报告...")
-            model = genai.GenerativeModel('models/gemini-2.5-flash')
-            response = model.generate_content(prompt)
-            text = response.text.strip()
-        except Exception as e:
-            last_error = str(e)
-            error_str = str(e).lower()
-            if any(k in error_str for k in ["quota", "rate", "429", "exceeded", "limit"]):
-                print("   ⚠️ Gemini 限额，切换至 DeepSeek 备份引擎...")
-            else:
-                print(f"   ⚠️ Gemini 异常: {str(e)[:100]}，切换至 DeepSeek...")
-        
-        # 如果 Gemini 失败，尝试 DeepSeek
-        if not text and DEEPSEEK_API_KEY:
-            try:
-                print("   [DeepSeek] 正在接管任务...")
-                ds_client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com")
-                completion = ds_client.chat.completions.create(
-                    model="deepseek-chat",
-                    messages=[
-                        {"role": "system", "content": "你是一位全球寿险与健康险反欺诈专家（SIU 资深调查员），擅长从长文中提取具体案例。"},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.3,
-                    max_tokens=4000,
-                )
-                text = (completion.choices[0].message.content or "").strip()
-            except Exception as e2:
-                print(f"   ❌ DeepSeek 也失败: {str(e2)[:100]}")
-                raise Exception(f"所有 AI 引擎都失败: Gemini={last_error}, DeepSeek={str(e2)}")
+        # 使用 Gemini 提取（带 Failover，经过共享限流器）
+        print("   [Gemini] 正在分析报告...")
+        text = ai_engine.get_ai_analysis(
+            prompt,
+            system_prompt="你是一位全球寿险与健康险反欺诈专家（SIU 资深调查员），擅长从长文中提取具体案例。",
+            max_tokens=4000,
+            models=['models/gemini-2.5-flash'],
+            response_schema={'type': 'array', 'items': {'type': 'object'}},
+            stage="seed_extract",
+        )
         
         if not text:
             raise Exception("AI 引擎未返回任何内容")
         
-        # 清理可能的 Markdown 代码块标记
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        text = text.strip()
-        
-        # 清理控制字符
-        text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
-        
-        # 解析 JSON
-        cases = json.loads(text)
-        
-        if not isinstance(cases, list):
-            cases = [cases]
+        # 解析 JSON 数组（自动修复常见格式问题；根为单个对象时包装为数组）
+        cases = parse_json(text, expect=list)
         
         print(f"✅ 从报告中提取到 {len(cases)} 个案例")
         return cases
@@ -217,7 +178,8 @@ def search_additional_cases(keywords: List[str], target_count: int = 50) -> List
         
         try:
             print(f"\n🔍 搜索关键词: {keyword}")
-            response = tavily_client.search(
+            response = cached_search(
+                tavily_client,
                 query=f"{keyword} insurance fraud case",
                 search_depth="advanced",
                 max_results=10,
@@ -443,6 +405,8 @@ def main():
     print(f"\n📋 案例预览（前10个）:")
     for i, case in enumerate(seed_cases[:10], 1):
         print(f"   {i}. {case.get('Event', '未知')} - {case.get('Region', '未知')}")
+    print_usage_report()
+    print_search_cache_stats()
     
     print(f"\n{'='*70}")
     print("⏸️  请检查预览清单，确认后运行以下命令入库：")
@@ -0,0 +1,170 @@
+"""
+GIFIA - 流式响应的增量 JSON 校验
+LLM 流式输出时逐块检查 JSON 结构，在生成完成之前发现无效输出并中止：
+- 开头不是 JSON（例如"抱歉，我无法…"），收到第一块就中止
+- 括号不匹配、对象的键没有加引号等结构错误
+- 对象结束时缺少必需字段（Time、Region、Process 等）
+- 顶层 JSON 结束后不再等待模型输出多余的说明文字
+
+允许 ```json 代码块标记包裹；根节点为数组时（批量提取），必需字段逐个检查数组中的对象：
+个别对象缺少字段时只记入 incomplete_items，由调用方处理该条结果（不丢弃整批），所有对象都缺少字段时才中止
+"""
+
+import threading
+from typing import Iterable, List, Optional, Sequence
+
+_FENCE = "```json"
+
+
+class StreamAbort(Exception):
+    """流式输出无效，提前中止"""
+
+    def __init__(self, reason: str, text: Optional[str] = None):
+        super().__init__(reason)
+        self.reason = reason
+        # 仅缺少必需字段、但 JSON 本身完整时保留全文，调用方可以在没有更好结果时使用
+        self.text = text
+
+
+class IncrementalJSONValidator:
+    """逐块接收文本并增量校验 JSON 结构（不构建解析结果，只跟踪括号栈、字符串状态和对象的键）"""
+
+    def __init__(self, required_keys: Sequence[str] = ()):
+        self.required_keys = tuple(required_keys)
+        self.complete = False
+        # 根为数组时：已结束的对象数，以及其中缺少必需字段的对象数
+        self.items = 0
+        self.incomplete_items = 0
+        self._parts: List[str] = []
+        self._prefix = ""
+        self._started = False
+        self._stack: List[str] = []
+        self._keys: List[Optional[set]] = []
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._string: List[str] = []
+        self._end = 0
+        self._length = 0
+
+    @property
+    def text(self) -> str:
+        """已接收的文本（顶层 JSON 结束后截止到结束括号）"""
+        text = "".join(self._parts)
+        return text[:self._end] if self.complete else text
+
+    def feed(self, chunk: str):
+        """
+        接收一块输出
+
+        异常:
+            StreamAbort: 输出已经可以判定为无效
+        """
+        if self.complete or not chunk:
+            return
+        self._parts.append(chunk)
+        for char in chunk:
+            self._length += 1
+            if not self._started:
+                self._feed_prefix(char)
+            else:
+                self._feed_char(char)
+            if self.complete:
+                self._end = self._length
+                return
+
+    def finish(self) -> str:
+        """输出结束：返回完整文本；JSON 不完整时抛出 StreamAbort"""
+        if not self.complete:
+            raise StreamAbort("输出在 JSON 结束之前中断")
+        return self.text
+
+    def _feed_prefix(self, char: str):
+        if char in '{[':
+            self._started = True
+            self._feed_char(char)
+            return
+        self._prefix += char
+        prefix = self._prefix.strip().lower()
+        if prefix and not _FENCE.startswith(prefix):
+            raise StreamAbort(f"输出不是 JSON: {self._prefix.strip()[:40]}")
+
+    def _record_depth(self) -> int:
+        """需要检查必需字段的对象深度：根为对象时是根本身，根为数组时是数组中的对象"""
+        return 2 if self._stack and self._stack[0] == '[' else 1
+
+    def _feed_char(self, char: str):
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == '\\':
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._expect_key:
+                    if self._keys[-1] is not None:
+                        self._keys[-1].add("".join(self._string))
+                    self._expect_key = False
+                self._string = []
+                return
+            if self._expect_key:
+                self._string.append(char)
+            return
+
+        if char.isspace():
+            return
+        if self._stack and self._stack[-1] == '{' and self._expect_key and char not in '"}':
+            raise StreamAbort(f"对象的键格式错误: {char!r}")
+
+        if char == '"':
+            self._in_string = True
+        elif char in '{[':
+            self._stack.append(char)
+            tracked = char == '{' and len(self._stack) == self._record_depth() and self.required_keys
+            self._keys.append(set() if tracked else None)
+            self._expect_key = char == '{'
+        elif char in '}]':
+            opening = '{' if char == '}' else '['
+            if not self._stack or self._stack[-1] != opening:
+                raise StreamAbort(f"括号不匹配: {char!r}")
+            keys = self._keys.pop()
+            self._stack.pop()
+            self._expect_key = False
+            if not self._stack:
+                self.complete = True
+            if keys is not None:
+                missing = [key for key in self.required_keys if key not in keys]
+                if self._stack:
+                    # 数组中的对象：只计数，缺少字段的条目由调用方处理（例如回退为单篇提取）
+                    self.items += 1
+                    self.incomplete_items += bool(missing)
+                elif missing:
+                    raise StreamAbort(f"缺少必需字段: {', '.join(missing)}", text=self._complete_text())
+            elif self.complete and self.items and self.incomplete_items == self.items:
+                raise StreamAbort(f"数组中的 {self.items} 个对象都缺少必需字段", text=self._complete_text())
+        elif char == ',':
+            self._expect_key = bool(self._stack) and self._stack[-1] == '{'
+
+    def _complete_text(self) -> str:
+        return "".join(self._parts)[:self._length]
+
+
+def read_stream(chunks: Iterable[str], required_keys: Sequence[str] = (),
+                cancel: Optional[threading.Event] = None) -> str:
+    """
+    逐块读取流式输出并校验，顶层 JSON 结束后立即返回（不再读取剩余输出）
+
+    参数:
+        cancel: 取消事件（对冲请求中另一个后端已经返回），设置后在下一个分块处中止
+
+    异常:
+        StreamAbort: 输出无效或已取消（调用方应关闭流并改用其他模型）
+    """
+    validator = IncrementalJSONValidator(required_keys)
+    for chunk in chunks:
+        if cancel is not None and cancel.is_set():
+            raise StreamAbort("已取消")
+        validator.feed(chunk or "")
+        if validator.complete:
+            break
+    return validator.finish()
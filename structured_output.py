@@ -0,0 +1,221 @@
+"""
+GIFIA - 结构化输出解析
+各模块共用的 LLM JSON 输出解析层，替代各处重复的"去掉代码块标记 + 删除控制字符 + json.loads"：
+- 快速路径：去掉 ```json 代码块标记后直接解析（字符串中的换行等控制字符保留）
+- 修复路径：截取第一个 JSON 值，转义字符串中的控制字符和未转义的引号，删除多余的逗号，
+  补全被截断的字符串和括号，忽略 JSON 之后的说明文字
+- 案例格式校验：6 个字段（Time、Region、Characters、Event、Process、Result）统一补全并转为字符串
+
+解析失败抛出 StructuredOutputError（json.JSONDecodeError 的子类，原有的 except 分支无需修改）
+"""
+
+import json
+from typing import Dict, List, Optional
+
+CASE_FIELDS = ['Time', 'Region', 'Characters', 'Event', 'Process', 'Result']
+
+# 模型偶尔使用的字段别名（小写或中文）
+CASE_FIELD_ALIASES = {
+    'time': 'Time', 'date': 'Time', '时间': 'Time',
+    'region': 'Region', 'location': 'Region', '地区': 'Region',
+    'characters': 'Characters', 'entities': 'Characters', '人物': 'Characters', '人物/实体': 'Characters',
+    'event': 'Event', '事件': 'Event',
+    'process': 'Process', '经过': 'Process',
+    'result': 'Result', 'outcome': 'Result', '结果': 'Result',
+}
+
+# 供服务商原生 JSON Schema 输出模式使用的案例格式
+CASE_SCHEMA = {
+    'type': 'object',
+    'properties': {field: {'type': 'string'} for field in CASE_FIELDS},
+    'required': CASE_FIELDS,
+}
+
+# 只要求输出 JSON 对象（不限定字段）
+JSON_OBJECT_SCHEMA = {'type': 'object'}
+
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+class StructuredOutputError(json.JSONDecodeError):
+    """LLM 输出无法解析为期望的 JSON 结构"""
+
+    def __init__(self, msg: str, doc: str = "", pos: int = 0):
+        super().__init__(msg, doc, pos)
+
+
+def strip_fences(text: str) -> str:
+    """去掉首尾空白和 ```json / ``` 代码块标记"""
+    text = (text or "").strip()
+    if text.startswith("```json") or text.startswith("```JSON"):
+        text = text[7:]
+    elif text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+def _next_significant(text: str, index: int) -> str:
+    while index < len(text) and text[index].isspace():
+        index += 1
+    return text[index] if index < len(text) else ""
+
+
+def repair_json(text: str) -> str:
+    """
+    尽量把 LLM 输出修复为合法 JSON 文本
+
+    - 从第一个 { 或 [ 开始，到与之匹配的括号结束（忽略前后的说明文字）
+    - 字符串中的换行、制表符转义，其他控制字符删除；后面不是 , : } ] 的引号视为字符串内容并转义
+    - 删除 } 和 ] 之前多余的逗号，括号不匹配时按栈补齐
+    - 输出被截断时补全字符串和括号
+    """
+    text = strip_fences(text)
+    starts = [i for i in (text.find('{'), text.find('[')) if i != -1]
+    if not starts:
+        raise StructuredOutputError("输出中没有 JSON 对象或数组", text)
+    text = text[min(starts):]
+
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = False
+    escape = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+                out.append(char)
+            elif char == '\\':
+                escape = True
+                out.append(char)
+            elif char == '"':
+                if _next_significant(text, index + 1) in (',', ':', '}', ']', ''):
+                    in_string = False
+                    out.append(char)
+                else:
+                    out.append('\\"')
+            elif char == '\n':
+                out.append('\\n')
+            elif char == '\t':
+                out.append('\\t')
+            elif char == '\r':
+                out.append('\\r')
+            elif ord(char) < 0x20 or 0x7f <= ord(char) <= 0x9f:
+                continue
+            else:
+                out.append(char)
+            continue
+
+        if char == '"':
+            in_string = True
+            out.append(char)
+        elif char in '{[':
+            stack.append(char)
+            out.append(char)
+        elif char in '}]':
+            _drop_trailing_comma(out)
+            opening = '{' if char == '}' else '['
+            while stack and stack[-1] != opening:
+                out.append(_CLOSERS[stack.pop()])
+            if stack:
+                stack.pop()
+                out.append(char)
+            if not stack:
+                return "".join(out)
+        elif ord(char) < 0x20 or 0x7f <= ord(char) <= 0x9f:
+            out.append(' ')
+        else:
+            out.append(char)
+
+    # 输出被截断：补全字符串和括号
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    _drop_trailing_comma(out)
+    if "".join(out).rstrip().endswith(':'):
+        out.append(' null')
+    while stack:
+        _drop_trailing_comma(out)
+        out.append(_CLOSERS[stack.pop()])
+    return "".join(out)
+
+
+def _drop_trailing_comma(out: List[str]):
+    """删除输出末尾（忽略空白）的逗号"""
+    index = len(out) - 1
+    while index >= 0 and out[index].isspace():
+        index -= 1
+    if index >= 0 and out[index] == ',':
+        del out[index]
+
+
+def parse_json(text: Optional[str], expect: Optional[type] = None):
+    """
+    解析 LLM 输出中的 JSON
+
+    参数:
+        text: LLM 输出
+        expect: 期望的根类型（dict 或 list）；根为只包含一个数组的对象或只有一个对象的数组时自动展开
+
+    返回:
+        解析结果
+
+    异常:
+        StructuredOutputError: 快速路径和修复路径都无法解析，或根类型不符
+    """
+    if not text:
+        raise StructuredOutputError("输出为空")
+    cleaned = strip_fences(text)
+    try:
+        data = json.loads(cleaned, strict=False)
+    except ValueError:
+        repaired = repair_json(cleaned)
+        try:
+            data = json.loads(repaired, strict=False)
+        except ValueError as e:
+            raise StructuredOutputError(f"JSON 修复失败: {str(e)}", cleaned) from e
+        print("🔧 JSON 输出已修复")
+
+    if expect is None or isinstance(data, expect):
+        return data
+    if expect is list and isinstance(data, dict):
+        lists = [value for value in data.values() if isinstance(value, list)]
+        if len(lists) == 1:
+            return lists[0]
+        return [data]
+    if expect is dict and isinstance(data, list) and len(data) == 1 and isinstance(data[0], dict):
+        return data[0]
+    raise StructuredOutputError(f"期望 {expect.__name__}，实际为 {type(data).__name__}", cleaned)
+
+
+def _as_text(value) -> str:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return "\n".join(_as_text(item) for item in value)
+    if isinstance(value, dict):
+        return "\n".join(f"{key}：{_as_text(item)}" for key, item in value.items())
+    return str(value)
+
+
+def normalize_case(data: Dict, fill: str = "未知") -> Dict:
+    """
+    校验并规范 6 字段案例格式：字段别名改为标准字段名，列表 / 对象 / 数字转为字符串，缺失或为空的字段填写 fill
+    """
+    for key in list(data.keys()):
+        field = CASE_FIELD_ALIASES.get(str(key).strip().lower())
+        if field and field not in data:
+            data[field] = data.pop(key)
+    for field in CASE_FIELDS:
+        value = data.get(field)
+        text = _as_text(value) if value is not None else ""
+        data[field] = text or fill
+    return data
+
+
+def parse_case(text: Optional[str], fill: str = "未知") -> Dict:
+    """解析单个案例：JSON 对象 + 6 字段校验"""
+    return normalize_case(parse_json(text, expect=dict), fill=fill)
+
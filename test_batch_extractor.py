@@ -0,0 +1,119 @@
+"""
+测试批量案例提取
+"""
+
+import json
+
+import pytest
+
+import ai_engine
+from batch_extractor import build_batch_prompt, extract_cases_batch, parse_batch_response
+
+ARTICLES = [
+    {'url': f'https://example.com/case{i}', 'title': f'标题{i}', 'content': f'内容{i}'}
+    for i in range(1, 5)
+]
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """替换 AI 调用，记录每次调用的提示词"""
+    state = {'prompts': [], 'responses': [], 'forgotten': []}
+
+    def fake_analysis(prompt, system_prompt=None, max_tokens=2000, **kwargs):
+        state['prompts'].append(prompt)
+        return state['responses'].pop(0) if state['responses'] else None
+
+    monkeypatch.setattr(ai_engine, 'get_ai_analysis', fake_analysis)
+    monkeypatch.setattr(ai_engine, 'forget_cached_analysis',
+                        lambda prompt, **kwargs: state['forgotten'].append(prompt))
+    return state
+
+
+def single(url, title, content):
+    return {'Event': f'单篇:{title}', 'Source_URL': url}
+
+
+def test_prompt_contains_guide_once_and_all_articles():
+    """SIU 说明在批量提示词中只出现一次，每篇文章带编号"""
+    prompt = build_batch_prompt(ARTICLES[:3], '【分析任务】GUIDE')
+    assert prompt.count('GUIDE') == 1
+    for i in range(1, 4):
+        assert f'===== 文章 {i} =====' in prompt
+        assert f'https://example.com/case{i}' in prompt
+
+
+def test_parse_by_index():
+    """index 恰好是 1..N 时按 index 对应"""
+    text = '```json\n' + json.dumps([
+        {'index': 2, 'Event': 'B'},
+        {'index': 1, 'Source_URL': 'https://example.com/case1', 'Event': 'A'},
+    ]) + '\n```'
+    results = parse_batch_response(text, ARTICLES[:2])
+    assert [r['Event'] for r in results] == ['A', 'B']
+    assert 'index' not in results[0]
+
+
+def test_parse_falls_back_to_url_when_index_unreliable():
+    """index 不是 1..N（从 0 编号或跳号）时改按 Source_URL 对应，对应不上的文章为 None"""
+    text = json.dumps([
+        {'index': 0, 'Source_URL': 'https://www.example.com/case2/', 'Event': 'B'},
+        {'index': 1, 'Event': 'A'},
+    ])
+    results = parse_batch_response(text, ARTICLES[:2])
+    assert [r and r['Event'] for r in results] == [None, 'B']
+    assert parse_batch_response(json.dumps([{'index': 2, 'Event': 'B'}, {'index': 3, 'Event': 'C'}]),
+                                ARTICLES[:2]) == [None, None]
+
+
+def test_parse_rejects_index_contradicted_by_url():
+    """index 完整但与 Source_URL 矛盾时以 Source_URL 为准"""
+    text = json.dumps([
+        {'index': 1, 'Source_URL': 'https://example.com/case2', 'Event': 'B'},
+        {'index': 2, 'Source_URL': 'https://example.com/case1', 'Event': 'A'},
+    ])
+    results = parse_batch_response(text, ARTICLES[:2])
+    assert [r['Event'] for r in results] == ['A', 'B']
+
+
+def test_parse_positional_when_no_index():
+    """没有编号且数量一致时按顺序对应"""
+    results = parse_batch_response(json.dumps([{'Event': 'A'}, {'Event': 'B'}]), ARTICLES[:2])
+    assert [r['Event'] for r in results] == ['A', 'B']
+
+
+def test_parse_rejects_non_json():
+    with pytest.raises(ValueError):
+        parse_batch_response('抱歉，无法完成', ARTICLES[:2])
+
+
+def test_parse_unwraps_object_with_array():
+    """根为包含数组的对象时展开"""
+    results = parse_batch_response('{"cases": [{"index": 1, "Source_URL": "https://example.com/case1", "Event": "A"}]}',
+                                   ARTICLES[:2])
+    assert results[0]['Event'] == 'A' and results[1] is None
+
+
+def test_batch_reduces_calls(fake_llm):
+    """4 篇文章、每批 3 篇：第一批一次调用，最后一篇走单篇提取"""
+    fake_llm['responses'].append(json.dumps([{'index': i, 'Event': f'E{i}'} for i in (1, 2, 3)]))
+    results = extract_cases_batch(ARTICLES, 'GUIDE', single, batch_size=3)
+    assert len(fake_llm['prompts']) == 1
+    assert [r['Event'] for r in results] == ['E1', 'E2', 'E3', '单篇:标题4']
+    assert results[0]['Source_URL'] == 'https://example.com/case1'
+    assert results[0]['Region'] == '未知' and 'Created_at' in results[0]
+
+
+def test_missing_items_fall_back_to_single(fake_llm):
+    """数组中缺少的文章回退为单篇提取"""
+    fake_llm['responses'].append(json.dumps([{'index': 1, 'Source_URL': 'https://example.com/case1', 'Event': 'E1'}]))
+    results = extract_cases_batch(ARTICLES[:2], 'GUIDE', single, batch_size=2)
+    assert [r['Event'] for r in results] == ['E1', '单篇:标题2']
+
+
+def test_unparseable_batch_falls_back_and_forgets_cache(fake_llm):
+    """整批无法解析时逐篇提取，并删除缓存的错误响应"""
+    fake_llm['responses'].append('抱歉，无法完成')
+    results = extract_cases_batch(ARTICLES[:2], 'GUIDE', single, batch_size=2)
+    assert [r['Event'] for r in results] == ['单篇:标题1', '单篇:标题2']
+    assert fake_llm['forgotten'] == fake_llm['prompts']
@@ -0,0 +1,84 @@
+"""
+测试运行预算规划器
+"""
+
+import json
+
+from budget_planner import BudgetPlanner, CostHistory, RunBudget
+from rate_limiter import get_rate_limiter
+
+
+def _grant(provider, n):
+    """模拟发出 n 次调用"""
+    limiter = get_rate_limiter(provider)
+    limiter.max_rpm = limiter.rpm = 60000
+    for _ in range(n):
+        limiter.acquire()
+
+
+def test_history_defaults_and_smoothing(tmp_path):
+    """没有历史时使用默认估计；记录后按指数移动平均更新并持久化"""
+    path = str(tmp_path / 'cost.json')
+    history = CostHistory(path)
+    assert history.estimate('x')['runs'] == 0
+
+    history.record('x', 100.0, {'firecrawl': 1.0})
+    history.record('x', 200.0, {'firecrawl': 2.0})
+    estimate = CostHistory(path).estimate('x')
+    assert estimate['runs'] == 2
+    assert 100 < estimate['seconds_per_case'] < 200
+    assert 1.0 < estimate['calls_per_case']['firecrawl'] < 2.0
+    assert json.load(open(path))['x']['runs'] == 2
+
+
+def test_budget_counts_calls_from_limiters():
+    """调用量从限流器已发放的令牌数统计，只计算预算创建之后的调用"""
+    _grant('tavily', 2)
+    budget = RunBudget(deadline_minutes=10, call_budgets={'tavily': 3})
+    assert budget.remaining_calls('tavily') == 3
+    assert budget.remaining_calls('gemini') is None
+    _grant('tavily', 3)
+    assert budget.remaining_calls('tavily') == 0
+    assert 'tavily' in budget.exhausted()
+
+
+def test_plan_limited_by_time(tmp_path):
+    """剩余时间只够处理部分案例时缩减数量，并发时按并发数放大"""
+    history = CostHistory(str(tmp_path / 'cost.json'))
+    history.record('p', 60.0, {})
+    planner = BudgetPlanner('p', budget=RunBudget(deadline_minutes=5, call_budgets={}), history=history,
+                            reserve_seconds=55)
+    assert planner.plan(10) == 4
+    assert planner.plan(10, concurrency=2) == 8
+    assert planner.plan(3, concurrency=2) == 3
+
+
+def test_plan_limited_by_call_budget(tmp_path):
+    """调用预算按历史平均调用量折算成案例数"""
+    history = CostHistory(str(tmp_path / 'cost.json'))
+    history.record('p', 1.0, {'firecrawl': 2.0})
+    planner = BudgetPlanner('p', budget=RunBudget(deadline_minutes=60, call_budgets={'firecrawl': 5}),
+                            history=history, reserve_seconds=0)
+    assert planner.plan(10) == 2
+
+
+def test_should_stop_when_expired(tmp_path):
+    """截止时间已过时取消剩余工作"""
+    planner = BudgetPlanner('p', budget=RunBudget(deadline_minutes=0, call_budgets={}),
+                            history=CostHistory(str(tmp_path / 'cost.json')))
+    assert planner.should_stop()
+    assert planner.plan(5) == 0
+
+
+def test_finish_records_per_case_cost(tmp_path):
+    """运行结束时把平均耗时和每案例调用量写入历史"""
+    history = CostHistory(str(tmp_path / 'cost.json'))
+    planner = BudgetPlanner('p', budget=RunBudget(deadline_minutes=60, call_budgets={}), history=history)
+    planner.plan(2)
+    _grant('firecrawl', 4)
+    planner.record_case(10.0)
+    planner.record_case(30.0)
+    planner.finish()
+    estimate = history.estimate('p')
+    assert estimate['seconds_per_case'] == 20.0
+    assert estimate['calls_per_case'] == {'firecrawl': 2.0}
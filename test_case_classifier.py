@@ -0,0 +1,173 @@
+"""
+测试本地案例预分类器
+"""
+
+import case_classifier
+from case_classifier import (CaseClassifier, ExampleStore, evaluate, example_text, load_classifier, prefilter,
+                             refresh_classifier, tokenize, train_classifier)
+
+CASES = [
+    "Man sentenced to prison for life insurance fraud scheme",
+    "Doctor charged with health insurance fraud over fake claims",
+    "Woman convicted of faking death to collect life insurance payout",
+    "Nurse pleads guilty to medical billing fraud, ordered to pay restitution",
+    "寿险骗保案一审宣判 被告人获刑五年",
+    "Clinic owner indicted in disability insurance fraud conspiracy",
+]
+NON_CASES = [
+    "Insurance fraud detection market size forecast 2030",
+    "Global health insurance market trends and industry outlook",
+    "Opinion: why insurers must invest in AI fraud analytics",
+    "Top 10 fraud detection software vendors report",
+    "保险反欺诈市场规模预测与行业趋势分析",
+    "Webinar: the future of claims automation in insurance",
+]
+
+
+def make_examples(copies=4):
+    """每条文本复制多份（不同 URL），得到足够的训练样本"""
+    examples = []
+    for i in range(copies):
+        examples += [(f"https://news.example.com/case-{i}-{j}", text, 1) for j, text in enumerate(CASES)]
+        examples += [(f"https://blog.example.com/report-{i}-{j}", text, 0) for j, text in enumerate(NON_CASES)]
+    return examples
+
+
+def test_tokenize_english_and_chinese():
+    tokens = tokenize("Man SENTENCED for fraud; 骗保案")
+    assert 'sentenced' in tokens and 'for' not in tokens
+    assert '骗保' in tokens and '保案' in tokens
+
+
+def test_example_text_uses_url_path():
+    text = example_text('标题', '摘要', 'https://www.justice.gov/opa/pr/doctor-sentenced-insurance-fraud')
+    assert 'doctor sentenced insurance fraud' in text
+
+
+def test_fit_separates_cases_from_reports():
+    texts = CASES + NON_CASES
+    labels = [1] * len(CASES) + [0] * len(NON_CASES)
+    model = CaseClassifier().fit(texts, labels)
+    assert model.predict_proba("Pharmacist sentenced for insurance fraud scheme") > 0.5
+    assert model.predict_proba("Fraud analytics market size report and forecast") < 0.5
+    metrics = evaluate(model, texts, labels, threshold=0.5)
+    assert metrics['precision'] == 1.0 and metrics['recall'] == 1.0
+
+
+def test_round_trip():
+    model = CaseClassifier().fit(CASES + NON_CASES, [1] * len(CASES) + [0] * len(NON_CASES))
+    restored = CaseClassifier.from_dict(model.to_dict())
+    assert restored.predict_proba(CASES[0]) == model.predict_proba(CASES[0])
+
+
+def test_train_requires_both_classes():
+    """正例或负例不足时不启用（全部放行）"""
+    examples = [(f"u{i}", CASES[0], 1) for i in range(30)]
+    assert train_classifier(examples, min_examples=5) is None
+
+
+def test_train_reports_holdout_metrics():
+    model = train_classifier(make_examples(), min_examples=5)
+    assert model.examples == len(make_examples())
+    assert set(model.metrics) == {'precision', 'recall', 'accuracy', 'samples'}
+    assert model.metrics['samples'] > 0
+
+
+def test_prefilter_drops_low_scores():
+    model = CaseClassifier().fit(CASES + NON_CASES, [1] * len(CASES) + [0] * len(NON_CASES))
+    results = [
+        {'url': 'https://a.com/1', 'title': 'Man sentenced for insurance fraud', 'content': ''},
+        {'url': 'https://b.com/2', 'title': 'Fraud detection market forecast report', 'content': ''},
+    ]
+    kept = prefilter(results, model, threshold=0.5, explore_rate=0.0)
+    assert [item['url'] for item in kept] == ['https://a.com/1']
+    assert 'case_score' in kept[0]
+    assert prefilter(results, None) == results
+
+
+def test_refresh_trains_once_and_reuses(tmp_path, monkeypatch):
+    """样本足够时训练并保存模型；样本数不变且未过期时直接复用"""
+    monkeypatch.setattr(case_classifier, 'CASE_CLASSIFIER_MIN_EXAMPLES', 5)
+    store = ExampleStore(str(tmp_path / 'examples.db'))
+    path = str(tmp_path / 'model.json')
+    assert refresh_classifier(store=store, path=path) is None
+
+    store.add_many([(url, text, label, 'test') for url, text, label in make_examples()])
+    model = refresh_classifier(store=store, path=path)
+    assert model is not None and load_classifier(path).examples == model.examples
+
+    calls = []
+    monkeypatch.setattr(case_classifier, 'train_classifier', lambda *args, **kwargs: calls.append(1))
+    assert refresh_classifier(store=store, path=path).trained_at == model.trained_at
+    assert calls == []
+
+
+def test_store_keeps_run_outcome_over_backfill(tmp_path):
+    """运行中记录的结果优先于 fraud_cases 回填"""
+    store = ExampleStore(str(tmp_path / 'examples.db'))
+    store.add('https://a.com/1', 'market report', 0, 'validator')
+    store.add_many([('https://a.com/1', 'case', 1, 'fraud_cases')])
+    assert store.examples() == [('https://a.com/1', 'market report', 0)]
+
+
+def test_prefilter_samples_low_scores_for_labels():
+    """低于阈值的结果按比例抽样放行并标记，由 Validator 打标签（避免负例枯竭）"""
+    import random
+
+    model = CaseClassifier().fit(CASES + NON_CASES, [1] * len(CASES) + [0] * len(NON_CASES))
+    results = [{'url': f'https://b.com/{i}', 'title': 'Fraud detection market forecast report', 'content': ''}
+               for i in range(200)]
+    kept = prefilter(results, model, threshold=0.5, explore_rate=0.1, rng=random.Random(0))
+    assert 5 < len(kept) < 40
+    assert all(item['classifier_explore'] and item['case_score'] < 0.5 for item in kept)
+
+
+def test_example_text_uses_snippet_head():
+    """摘要只取开头几行，搜索摘要和全文得到相同的特征"""
+    snippet = "line one\nline two\n\nline three\nline four"
+    assert example_text('t', snippet) == 't line one line two line three'
+
+
+def test_db_positives_use_url_features_and_refresh(tmp_path):
+    """fraud_cases 正例只用 URL 特征；重新回填时更新旧的回填样本，但不覆盖运行中记录的结果"""
+    rows = [{'source_url': 'https://www.justice.gov/opa/pr/doctor-sentenced-insurance-fraud', 'event': '寿险欺诈'}]
+    client = type('Client', (), {})()
+    query = type('Query', (), {})()
+    query.select = query.order = query.limit = lambda *args, **kwargs: query
+    query.execute = lambda: type('Result', (), {'data': rows})()
+    client.table = lambda name: query
+
+    examples = case_classifier._db_positive_examples(client)
+    assert examples == [(rows[0]['source_url'], 'opa pr doctor sentenced insurance fraud', 1, 'fraud_cases')]
+
+    store = ExampleStore(str(tmp_path / 'examples.db'))
+    store.add_many([(rows[0]['source_url'], '寿险欺诈 美国', 1, 'fraud_cases'), ('https://a.com/1', 'x', 0, 'validator')])
+    store.add_many(examples + [('https://a.com/1', 'y', 1, 'fraud_cases')])
+    assert dict((url, text) for url, text, _ in store.examples()) == {
+        rows[0]['source_url']: 'opa pr doctor sentenced insurance fraud', 'https://a.com/1': 'x'}
+
+
+
+def test_backfill_never_in_holdout_and_dropped_with_enough_validator_positives(tmp_path, monkeypatch):
+    """fraud_cases 回填样本只有 URL 特征：不进入留出集，Validator 正例足够后不再参与训练"""
+    monkeypatch.setattr(case_classifier, 'CASE_CLASSIFIER_MIN_EXAMPLES', 10)
+    store = ExampleStore(str(tmp_path / 'examples.db'))
+    backfill = [(f"https://www.justice.gov/opa/pr/case-{i}", f"opa pr case {i}", 1, 'fraud_cases') for i in range(40)]
+    store.add_many(backfill)
+    store.add_many([(url, text, label, 'validator') for url, text, label in make_examples(copies=1)])
+
+    calls = []
+    monkeypatch.setattr(case_classifier, 'train_classifier',
+                        lambda examples, **kwargs: calls.append((len(examples), set(kwargs['train_only']))))
+    refresh_classifier(store=store, path=str(tmp_path / 'model.json'))
+    assert calls[-1] == (52, {url for url, _, _, _ in backfill})
+
+    store.add_many([(url, text, label, 'validator') for url, text, label in make_examples(copies=2)])
+    refresh_classifier(store=store, path=str(tmp_path / 'model.json'))
+    assert calls[-1][0] == len(make_examples(copies=2))
+
+
+def test_train_only_urls_stay_out_of_holdout():
+    examples = make_examples()
+    model = train_classifier(examples, min_examples=5, train_only=[url for url, _, _ in examples])
+    assert model is not None and model.metrics == {}
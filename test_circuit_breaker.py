@@ -0,0 +1,110 @@
+"""
+测试熔断器
+"""
+
+import json
+import os
+import time
+
+import pytest
+
+import ai_engine
+import circuit_breaker
+import gifia_state
+import usage_meter
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, get_breaker
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """每个测试使用独立的状态目录、用量记录和熔断器注册表"""
+    monkeypatch.setattr(gifia_state, 'STATE_DIR', str(tmp_path))
+    monkeypatch.setattr(usage_meter, '_meter', usage_meter.UsageMeter(str(tmp_path / 'llm_usage.db')))
+    circuit_breaker.reset_breakers()
+    yield
+    circuit_breaker.reset_breakers()
+
+
+def test_opens_after_threshold_and_half_opens_after_cooldown():
+    """连续失败达到阈值后断开，冷却结束后只放行一个探测请求"""
+    breaker = CircuitBreaker('m', failure_threshold=2, cooldown_seconds=0.05)
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # 探测进行中，其他调用继续跳过
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_failed_probe_doubles_cooldown():
+    """半开探测失败后再次断开，冷却时间加倍"""
+    breaker = CircuitBreaker('m', cooldown_seconds=0.05, max_cooldown_seconds=0.08)
+    breaker.record_failure(trip=True)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.cooldown == 0.08
+
+
+def test_trip_with_retry_after():
+    """配额错误立即断开，冷却时间使用 Retry-After"""
+    breaker = CircuitBreaker('m', cooldown_seconds=300)
+    breaker.record_failure(trip=True, cooldown=0.01)
+    assert breaker.state == OPEN
+    time.sleep(0.02)
+    assert breaker.allow()
+
+
+def test_state_persisted_across_restarts(tmp_path):
+    """状态保存到 .gifia/circuit_breakers.json，重启后恢复"""
+    get_breaker('gemini:models/x').record_failure(trip=True)
+    saved = json.load(open(os.path.join(str(tmp_path), 'circuit_breakers.json')))
+    assert saved['gemini:models/x']['state'] == OPEN
+
+    circuit_breaker.reset_breakers()
+    restored = get_breaker('gemini:models/x')
+    assert restored.state == OPEN and not restored.allow()
+    assert get_breaker('gemini:models/x') is restored
+
+
+class _QuotaError(Exception):
+    status_code = 429
+
+
+def test_cascade_skips_open_models(monkeypatch):
+    """配额耗尽的模型被断开，后续调用直接使用健康的模型"""
+    calls = []
+
+    class FakeModel:
+        def __init__(self, name):
+            self.name = name
+
+        def generate_content(self, prompt):
+            calls.append(self.name)
+            if self.name == 'a':
+                raise _QuotaError("429 Resource has been exhausted (e.g. check quota).")
+            return type('Response', (), {'text': 'ok'})()
+
+    monkeypatch.setattr(ai_engine, 'genai', type('FakeGenai', (), {'GenerativeModel': staticmethod(FakeModel)}))
+    monkeypatch.setattr(ai_engine, '_models', {})
+    monkeypatch.setattr(ai_engine, 'limited_call',
+                        lambda provider, func, *args, model=None, max_retries=1, **kwargs: func(*args, **kwargs))
+
+    assert ai_engine.call_gemini('p', ['a', 'b']) == 'ok'
+    assert ai_engine.call_gemini('p', ['a', 'b']) == 'ok'
+    assert calls == ['a', 'b', 'b']
+    assert get_breaker('gemini:a').state == OPEN
+
+
+def test_provider_breaker_short_circuits(monkeypatch):
+    """服务商熔断器断开时不再逐个尝试模型"""
+    monkeypatch.setattr(ai_engine, 'genai', object())
+    get_breaker('gemini').record_failure(trip=True)
+    monkeypatch.setattr(ai_engine, 'get_gemini_model', lambda name: pytest.fail("不应调用模型"))
+    assert ai_engine.call_gemini('p', ['a']) is None
@@ -0,0 +1,51 @@
+"""
+测试正文精简
+"""
+
+from content_reducer import OMITTED_MARKER, estimate_tokens, reduce_content, score_window, split_windows
+
+NAV = "\n".join(f"- [Menu item {i}](https://example.com/{i})" for i in range(40))
+FILLER = "\n\n".join(f"Lifestyle story number {i} about gardening and travel tips for the weekend." for i in range(60))
+VERDICT = ("On March 3, 2025 the defendant was sentenced to 5 years in prison and ordered to pay "
+           "$1.2 million in restitution for a life insurance fraud scheme involving forged claims.")
+
+
+def test_short_content_unchanged():
+    """未超出预算时原样返回"""
+    text = "# Title\n\nshort body"
+    assert reduce_content(text, token_budget=100) == text
+
+
+def test_estimate_tokens_counts_cjk():
+    assert estimate_tokens("保险欺诈") == 4
+    assert estimate_tokens("abcdefgh") == 2
+
+
+def test_split_windows_breaks_on_headings_and_size():
+    windows = split_windows("# A\n\npara1\n\n# B\n\n" + "x" * 25, window_chars=10)
+    assert windows[0] == "# A\n\npara1"
+    assert windows[1] == "# B"
+    assert all(len(w) <= 10 for w in windows[2:])
+
+
+def test_relevant_window_scores_higher_than_navigation():
+    assert score_window(VERDICT) > score_window(NAV)
+    assert score_window(VERDICT) > score_window("Subscribe to our newsletter. Cookie settings. Sign in.")
+
+
+def test_verdict_at_bottom_survives():
+    """导航和无关内容占满开头时，页面底部的判决结果仍被保留"""
+    markdown = f"{NAV}\n\n{FILLER}\n\n## Outcome\n\n{VERDICT}"
+    reduced = reduce_content(markdown, token_budget=200, window_chars=400)
+    assert VERDICT in reduced
+    assert "Menu item 10" not in reduced
+    assert OMITTED_MARKER in reduced
+    assert estimate_tokens(reduced) < estimate_tokens(markdown)
+
+
+def test_kept_windows_in_original_order():
+    first = "In 2024 the insurer flagged the claim as fraud after a court filing."
+    second = "The defendant pleaded guilty and was sentenced to prison with $50,000 restitution."
+    markdown = "\n\n".join([first, FILLER, second])
+    reduced = reduce_content(markdown, token_budget=120, window_chars=200)
+    assert reduced.index(first) < reduced.index(second)
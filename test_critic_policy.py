@@ -0,0 +1,71 @@
+"""
+测试 Critic 质检策略
+"""
+
+from case_quality import score_case
+from critic_policy import CriticPolicy, CriticStats, parse_amounts, risk_signals
+
+SOURCE = ("On March 3, 2025 John Smith was sentenced to five years in prison for a life insurance fraud "
+          "scheme and ordered to pay $1.2 million in restitution. Investigators found forged documents. ") * 10
+
+GOOD_CASE = {
+    'Time': '2025-03-03',
+    'Region': '美国纽约',
+    'Characters': 'John Smith, ABC保险公司',
+    'Event': '寿险欺诈',
+    'Process': '【作案手法】伪造死亡证明。【逃避初审】利用海外文件。【破绽细节】调查发现证据异常。' * 15,
+    'Result': '被判有期徒刑5年，赔偿120万美元',
+}
+
+
+def test_parse_amounts_normalizes_units():
+    assert parse_amounts("ordered to pay $1.2 million and $500,000") == {1_200_000, 500_000}
+    assert parse_amounts("赔偿120万美元，罚款50万元") == {1_200_000, 500_000}
+    assert parse_amounts("sentenced to 5 years in 2025") == set()
+
+
+def test_no_risk_when_facts_in_source():
+    assert risk_signals(GOOD_CASE, SOURCE) == []
+
+
+def test_risk_signals():
+    case = dict(GOOD_CASE, Result='赔偿300万美元', Time='2023', Characters='Jane Doe')
+    assert set(risk_signals(case, SOURCE)) == {'amount_not_in_source', 'year_not_in_source', 'name_not_in_source'}
+    assert 'short_source' in risk_signals(GOOD_CASE, SOURCE[:200])
+
+
+def test_score_case():
+    assert score_case(GOOD_CASE)['is_valid']
+    result = score_case(dict(GOOD_CASE, Process='未知', Region='未知'))
+    assert not result['is_valid'] and result['suggestions']
+
+
+def test_decide_policies(tmp_path):
+    """低分和有风险信号的案例必须质检；高置信度案例按抽样率质检"""
+    stats = CriticStats(str(tmp_path / 'critic.json'))
+    never = CriticPolicy(sample_rate=0.0, stats=stats)
+    assert never.decide(GOOD_CASE, SOURCE, 'https://a.com/1')['policy'] == 'skip'
+    assert never.decide(dict(GOOD_CASE, Process='未知'), SOURCE, 'https://a.com/1')['policy'] == 'low_score'
+    assert never.decide(dict(GOOD_CASE, Result='赔偿300万美元'), SOURCE, 'https://a.com/1')['policy'] == 'risk'
+    always = CriticPolicy(sample_rate=1.0, stats=stats)
+    assert always.decide(GOOD_CASE, SOURCE, 'https://a.com/1') == dict(
+        never.decide(GOOD_CASE, SOURCE, 'https://a.com/1'), policy='sample', run=True)
+
+
+def test_sampling_rate_and_stability(tmp_path):
+    policy = CriticPolicy(sample_rate=0.2, stats=CriticStats(str(tmp_path / 'critic.json')))
+    sampled = [policy.sampled(f"https://example.com/{i}") for i in range(2000)]
+    assert 0.15 < sum(sampled) / len(sampled) < 0.25
+    assert sampled == [policy.sampled(f"https://example.com/{i}") for i in range(2000)]
+
+
+def test_stats_persist_per_policy(tmp_path, capsys):
+    path = str(tmp_path / 'critic.json')
+    stats = CriticStats(path)
+    stats.record('risk', True)
+    stats.record('risk', False)
+    stats.record('skip', None)
+    assert CriticStats(path).total == {'risk': {'passed': 1, 'failed': 1, 'checked': 2}, 'skip': {'skipped': 1}}
+    stats.print_stats()
+    out = capsys.readouterr().out
+    assert '2 / 3' in out and '[risk]' in out
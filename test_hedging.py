@@ -0,0 +1,130 @@
+"""
+测试对冲请求
+"""
+
+import threading
+import time
+
+import ai_engine
+from hedging import HedgeBudget, LatencyTracker, hedged_call
+
+
+def slow(value, seconds, calls=None, name=None):
+    """模拟后端：等待 seconds 秒（可被取消）后返回 value"""
+    def call(cancel: threading.Event):
+        if calls is not None:
+            calls.append(name)
+        if cancel.wait(seconds):
+            return None
+        return value
+    return call
+
+
+def test_percentile_and_persistence(tmp_path):
+    """样本不足时不给出阈值；延迟统计保存到文件，下次运行继续使用"""
+    path = str(tmp_path / 'latency.json')
+    tracker = LatencyTracker(path)
+    for seconds in range(1, 11):
+        tracker.record('gemini', seconds)
+    assert tracker.percentile('gemini', 90, min_samples=10) == 9
+    assert tracker.percentile('gemini', 90, min_samples=11) is None
+    tracker.flush()
+    assert LatencyTracker(path).percentile('gemini', 50, min_samples=1) == 5
+
+
+def test_latency_writes_are_batched(tmp_path, monkeypatch):
+    """延迟样本不在每次调用时写文件，积累到 LATENCY_FLUSH_EVERY 个或 flush() 时才写入"""
+    import hedging
+
+    monkeypatch.setattr(hedging, 'LATENCY_FLUSH_EVERY', 3)
+    path = tmp_path / 'latency.json'
+    tracker = LatencyTracker(str(path))
+    tracker.record('gemini', 1)
+    tracker.record('gemini', 2)
+    assert not path.exists()
+    tracker.record('gemini', 3)
+    assert LatencyTracker(str(path)).samples == {'gemini': [1, 2, 3]}
+    tracker.record('gemini', 4)
+    tracker.flush()
+    assert LatencyTracker(str(path)).samples == {'gemini': [1, 2, 3, 4]}
+
+
+def test_budget_earned_only_on_hedge_eligible_calls(tmp_path, monkeypatch):
+    """没有延迟阈值（样本不足或没有 DeepSeek）时不积累对冲额度"""
+    budget = HedgeBudget()
+    tracker = LatencyTracker(str(tmp_path / 'latency.json'))
+    monkeypatch.setattr(ai_engine, 'get_latency_tracker', lambda: tracker)
+    monkeypatch.setattr(ai_engine, 'get_hedge_budget', lambda: budget)
+    monkeypatch.setattr(ai_engine, 'get_llm_cache', lambda: None)
+    monkeypatch.setattr(ai_engine, 'DEEPSEEK_API_KEY', None)
+    monkeypatch.setattr(ai_engine, 'call_gemini', lambda prompt, models=None, **kwargs: '{"ok": 1}')
+    for _ in range(30):
+        ai_engine.get_ai_analysis('p')
+    assert budget.credits == 1.0
+
+
+def test_fast_primary_does_not_hedge():
+    calls = []
+    value, winner = hedged_call(slow('a', 0, calls, 'p'), slow('b', 0, calls, 's'), hedge_after=1.0)
+    assert (value, winner) == ('a', 'primary')
+    assert calls == ['p']
+
+
+def test_slow_primary_hedged_and_cancelled():
+    """主引擎超过阈值未返回时发送对冲请求，备份引擎先返回后取消主引擎"""
+    cancelled = threading.Event()
+
+    def primary(cancel):
+        if cancel.wait(5):
+            cancelled.set()
+        return 'late'
+
+    started = time.monotonic()
+    value, winner = hedged_call(primary, slow('fast', 0.01), hedge_after=0.05)
+    assert (value, winner) == ('fast', 'secondary')
+    assert time.monotonic() - started < 1
+    assert cancelled.wait(1)
+
+
+def test_budget_exhausted_waits_for_primary():
+    """对冲额度用完时不发送对冲请求，等待主引擎"""
+    budget = HedgeBudget(ratio=0.0)
+    budget.try_spend()
+    calls = []
+    value, winner = hedged_call(slow('a', 0.1, calls, 'p'), slow('b', 0, calls, 's'), 0.01, budget)
+    assert (value, winner) == ('a', 'primary')
+    assert calls == ['p']
+
+
+def test_budget_earned_per_call():
+    budget = HedgeBudget(ratio=0.5, max_credits=1.0)
+    assert budget.try_spend() and not budget.try_spend()
+    budget.earn()
+    assert not budget.try_spend()
+    budget.earn()
+    assert budget.try_spend()
+
+
+def test_primary_failure_falls_back():
+    """主引擎失败时备份引擎接管（与串行 Failover 相同）"""
+    assert hedged_call(slow(None, 0), slow('b', 0), hedge_after=1.0) == ('b', 'secondary')
+    assert hedged_call(slow(None, 0), slow(None, 0), hedge_after=1.0) == (None, None)
+
+
+def test_get_ai_analysis_hedges(tmp_path, monkeypatch):
+    """有足够延迟样本时，Gemini 超过 p90 仍未返回则采用 DeepSeek 的结果"""
+    tracker = LatencyTracker(str(tmp_path / 'latency.json'))
+    for _ in range(10):
+        tracker.record('gemini', 0.05)
+
+    def fake_gemini(prompt, models=None, cancel=None, **kwargs):
+        cancel.wait(5)
+        return None
+
+    monkeypatch.setattr(ai_engine, 'get_latency_tracker', lambda: tracker)
+    monkeypatch.setattr(ai_engine, 'get_hedge_budget', lambda: HedgeBudget())
+    monkeypatch.setattr(ai_engine, 'get_llm_cache', lambda: None)
+    monkeypatch.setattr(ai_engine, 'DEEPSEEK_API_KEY', 'test')
+    monkeypatch.setattr(ai_engine, 'call_gemini', fake_gemini)
+    monkeypatch.setattr(ai_engine, 'call_deepseek', lambda prompt, cancel=None, **kwargs: '{"ok": 1}')
+    assert ai_engine.get_ai_analysis('p') == '{"ok": 1}'
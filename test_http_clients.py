@@ -0,0 +1,61 @@
+"""
+测试共享 HTTP 客户端
+"""
+
+import pytest
+
+import http_clients
+
+
+class FakeOpenAI:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    monkeypatch.setattr(http_clients, 'OpenAI', FakeOpenAI)
+    monkeypatch.setattr(http_clients, 'httpx', None)
+    monkeypatch.setattr(http_clients, '_openai_clients', {})
+    monkeypatch.setattr(http_clients, '_session', None)
+
+
+def test_parse_host_limits():
+    assert http_clients.parse_host_limits("r.jina.ai=4, API.deepseek.com=8") == {'r.jina.ai': 4, 'api.deepseek.com': 8}
+    assert http_clients.parse_host_limits("bad, a.com=x, b.com=0, c.com=2") == {'c.com': 2}
+    assert http_clients.parse_host_limits("") == {}
+
+
+def test_openai_client_reused_per_key(fake_openai):
+    """同一个 (api_key, base_url) 返回同一个客户端"""
+    deepseek = http_clients.get_openai_client('key', 'https://api.deepseek.com')
+    assert deepseek is http_clients.get_openai_client('key', 'https://api.deepseek.com')
+    assert deepseek.kwargs == {'api_key': 'key', 'base_url': 'https://api.deepseek.com'}
+    openai = http_clients.get_openai_client('key')
+    assert openai is not deepseek and 'base_url' not in openai.kwargs
+    assert http_clients.get_openai_client(None) is None
+    assert http_clients.get_openai_client('') is None
+
+
+def test_openai_client_without_sdk(monkeypatch):
+    monkeypatch.setattr(http_clients, 'OpenAI', None)
+    assert http_clients.get_openai_client('key') is None
+
+
+def test_close_clients(fake_openai):
+    client = http_clients.get_openai_client('key')
+    http_clients.close_clients()
+    assert client.closed
+    assert http_clients.get_openai_client('key') is not client
+
+
+def test_http_session_shared(fake_openai):
+    pytest.importorskip('requests')
+    session = http_clients.get_http_session()
+    assert session is http_clients.get_http_session()
+    http_clients.close_clients()
+    assert http_clients.get_http_session() is not session
@@ -0,0 +1,121 @@
+"""
+测试 LLM 响应缓存
+"""
+
+import time
+
+import ai_engine
+from hedging import LatencyTracker
+from llm_cache import LLMCache, make_cache_key
+
+
+def test_key_depends_on_model_prompt_and_version():
+    """模型、提示词、提示词版本或其他参数变化时缓存键不同"""
+    key = make_cache_key('gemini-2.5-flash', 'prompt', '1', max_tokens=2000)
+    assert key == make_cache_key('gemini-2.5-flash', 'prompt', '1', max_tokens=2000)
+    assert key != make_cache_key('gemini-1.5-pro', 'prompt', '1', max_tokens=2000)
+    assert key != make_cache_key('gemini-2.5-flash', 'prompt2', '1', max_tokens=2000)
+    assert key != make_cache_key('gemini-2.5-flash', 'prompt', '2', max_tokens=2000)
+    assert key != make_cache_key('gemini-2.5-flash', 'prompt', '1', max_tokens=4000)
+
+
+def test_hit_miss_and_persistence(tmp_path):
+    """命中 / 未命中统计，缓存在新实例（下一次运行）中仍然可用"""
+    path = str(tmp_path / 'llm.db')
+    cache = LLMCache(path)
+    assert cache.get('k') is None
+    cache.set('k', '{"Event": "医疗保险欺诈"}', model='m')
+    assert cache.get('k') == '{"Event": "医疗保险欺诈"}'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+    assert LLMCache(path).get('k') == '{"Event": "医疗保险欺诈"}'
+
+
+def test_ttl_expiry(tmp_path):
+    """超过 TTL 的条目视为未命中并删除"""
+    cache = LLMCache(str(tmp_path / 'llm.db'), ttl_days=0.01 / 86400)
+    cache.set('k', 'v')
+    time.sleep(0.02)
+    assert cache.get('k') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_lru_eviction_by_entries(tmp_path):
+    """超过条目上限时淘汰最久未访问的条目"""
+    cache = LLMCache(str(tmp_path / 'llm.db'), max_entries=2)
+    cache.set('a', '1')
+    time.sleep(0.01)
+    cache.set('b', '2')
+    time.sleep(0.01)
+    cache.get('a')  # a 最近被访问，b 成为最久未访问
+    time.sleep(0.01)
+    cache.set('c', '3')
+    assert cache.get('b') is None
+    assert cache.get('a') == '1' and cache.get('c') == '3'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_eviction_by_size(tmp_path):
+    """超过容量上限（字节）时淘汰"""
+    cache = LLMCache(str(tmp_path / 'llm.db'), max_mb=1.5 / 1024)  # 1536 字节
+    cache.set('a', 'x' * 1000)
+    time.sleep(0.01)
+    cache.set('b', 'y' * 1000)
+    assert cache.get('a') is None
+    assert cache.stats()['bytes'] == 1000
+
+
+def test_get_ai_analysis_uses_cache(tmp_path, monkeypatch):
+    """get_ai_analysis 命中缓存时不再调用模型；修改提示词版本后重新调用"""
+    cache = LLMCache(str(tmp_path / 'llm.db'))
+    calls = []
+
+    def fake_gemini(prompt, models=None, **kwargs):
+        calls.append(prompt)
+        return '{"Event": "寿险欺诈"}'
+
+    monkeypatch.setattr(ai_engine, 'get_llm_cache', lambda: cache)
+    monkeypatch.setattr(ai_engine, 'get_latency_tracker', lambda: LatencyTracker(str(tmp_path / 'latency.json')))
+    monkeypatch.setattr(ai_engine, 'call_gemini', fake_gemini)
+
+    assert ai_engine.get_ai_analysis('p') == '{"Event": "寿险欺诈"}'
+    assert ai_engine.get_ai_analysis('p') == '{"Event": "寿险欺诈"}'
+    assert len(calls) == 1
+    ai_engine.get_ai_analysis('p', prompt_version='2')
+    assert len(calls) == 2
+
+    ai_engine.forget_cached_analysis('p')
+    ai_engine.get_ai_analysis('p')
+    assert len(calls) == 3
+
+
+def test_non_json_response_not_cached(tmp_path, monkeypatch):
+    """明显不是 JSON 的响应不写入缓存"""
+    cache = LLMCache(str(tmp_path / 'llm.db'))
+    monkeypatch.setattr(ai_engine, 'get_llm_cache', lambda: cache)
+    monkeypatch.setattr(ai_engine, 'get_latency_tracker', lambda: LatencyTracker(str(tmp_path / 'latency.json')))
+    monkeypatch.setattr(ai_engine, 'call_gemini', lambda prompt, models=None, **kwargs: "抱歉，我无法完成")
+    ai_engine.get_ai_analysis('p')
+    assert cache.stats()['entries'] == 0
+
+
+def test_incomplete_json_falls_back_to_deepseek_and_is_not_cached(tmp_path, monkeypatch):
+    """Gemini 输出只缺少字段时切换到 DeepSeek；DeepSeek 也失败才使用该输出，且不写入缓存"""
+    cache = LLMCache(str(tmp_path / 'llm.db'))
+
+    def fake_gemini(prompt, models=None, partial=None, **kwargs):
+        partial.append('{"Time": "1"}')
+        return None
+
+    deepseek_outputs = [None, '{"Time": "1", "Event": "2"}']
+    monkeypatch.setattr(ai_engine, 'get_llm_cache', lambda: cache)
+    monkeypatch.setattr(ai_engine, 'get_latency_tracker', lambda: LatencyTracker(str(tmp_path / 'latency.json')))
+    monkeypatch.setattr(ai_engine, 'call_gemini', fake_gemini)
+    monkeypatch.setattr(ai_engine, 'call_deepseek', lambda prompt, **kwargs: deepseek_outputs.pop(0))
+
+    assert ai_engine.get_ai_analysis('p') == '{"Time": "1"}'
+    assert cache.stats()['entries'] == 0
+    assert ai_engine.get_ai_analysis('p') == '{"Time": "1", "Event": "2"}'
+    assert cache.stats()['entries'] == 1
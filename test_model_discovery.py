@@ -0,0 +1,96 @@
+"""
+测试 Gemini 模型探测缓存与模型对象复用
+"""
+
+import json
+import os
+
+import pytest
+
+import ai_engine
+import circuit_breaker
+import gifia_state
+import usage_meter
+
+
+class _FakeModel:
+    def __init__(self, name, registry):
+        self.name = name
+        self.registry = registry
+
+    def generate_content(self, prompt):
+        self.registry['calls'].append(self.name)
+        if self.name in self.registry['broken']:
+            raise Exception(f"404 models/{self.name} is not found for API version v1beta")
+        return type('Response', (), {'text': '{"ok": true}'})()
+
+
+@pytest.fixture
+def fake_genai(tmp_path, monkeypatch):
+    """替换 genai 和状态目录，每个测试使用独立的探测缓存"""
+    registry = {'calls': [], 'created': [], 'broken': set()}
+
+    class FakeGenai:
+        @staticmethod
+        def GenerativeModel(name):
+            registry['created'].append(name)
+            return _FakeModel(name, registry)
+
+    monkeypatch.setattr(ai_engine, 'genai', FakeGenai)
+    # 测试不经过限流器等待
+    monkeypatch.setattr(ai_engine, 'limited_call',
+                        lambda provider, func, *args, model=None, max_retries=1, **kwargs: func(*args, **kwargs))
+    monkeypatch.setattr(ai_engine, '_models', {})
+    monkeypatch.setattr(ai_engine, '_failed_models', set())
+    monkeypatch.setattr(gifia_state, 'STATE_DIR', str(tmp_path))
+    monkeypatch.setattr(usage_meter, '_meter', usage_meter.UsageMeter(str(tmp_path / 'llm_usage.db')))
+    circuit_breaker.reset_breakers()
+    yield registry
+    circuit_breaker.reset_breakers()
+
+
+def test_discovery_persisted_and_reused(fake_genai, tmp_path):
+    """第一次启动探测并保存结果，有效期内的后续启动不再发送测试请求"""
+    fake_genai['broken'].add('m1')
+    assert ai_engine.discover_gemini_model(['m1', 'm2', 'm3']) == 'm2'
+    assert fake_genai['calls'] == ['m1', 'm2']
+    saved = json.load(open(os.path.join(str(tmp_path), 'model_discovery.json')))
+    assert saved['m1,m2,m3']['model'] == 'm2'
+
+    assert ai_engine.discover_gemini_model(['m1', 'm2', 'm3']) == 'm2'
+    assert fake_genai['calls'] == ['m1', 'm2']
+
+
+def test_discovery_expires(fake_genai, monkeypatch):
+    """超过有效期后重新探测"""
+    ai_engine.discover_gemini_model(['m1'])
+    monkeypatch.setattr(ai_engine, 'MODEL_DISCOVERY_TTL_HOURS', 0)
+    ai_engine.discover_gemini_model(['m1'])
+    assert fake_genai['calls'] == ['m1', 'm1']
+
+
+def test_model_objects_reused(fake_genai):
+    """同一模型在进程内只创建一次 GenerativeModel"""
+    assert ai_engine.get_gemini_model('m1') is ai_engine.get_gemini_model('m1')
+    ai_engine.call_gemini('p', ['m1'])
+    assert fake_genai['created'] == ['m1']
+
+
+def test_failure_triggers_rediscovery(fake_genai):
+    """模型不可用时清除探测结果，重新探测时跳过该模型"""
+    assert ai_engine.discover_gemini_model(['m1', 'm2']) == 'm1'
+    fake_genai['broken'].add('m1')
+
+    assert ai_engine.call_gemini('p', ['m1']) is None
+    assert ai_engine.model_failed('m1')
+
+    fake_genai['calls'].clear()
+    assert ai_engine.discover_gemini_model(['m1', 'm2']) == 'm2'
+    assert fake_genai['calls'] == ['m2']
+
+
+def test_transient_errors_do_not_invalidate():
+    """限流和临时故障不视为模型不可用"""
+    assert not ai_engine.is_model_unavailable_error(Exception("429 Resource has been exhausted"))
+    assert not ai_engine.is_model_unavailable_error(Exception("500 Internal error"))
+    assert ai_engine.is_model_unavailable_error(Exception("404 models/gemini-1.5-pro is not found"))
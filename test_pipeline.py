@@ -0,0 +1,85 @@
+"""
+测试分阶段流水线引擎
+"""
+
+import threading
+import time
+
+from pipeline import PipelineStage, StagePipeline
+
+
+def test_items_flow_through_all_stages():
+    """条目依次经过所有阶段，返回 None 的条目在该阶段结束"""
+    pipeline = StagePipeline([
+        PipelineStage('double', lambda x: x * 2, workers=2),
+        PipelineStage('filter', lambda x: x if x % 4 == 0 else None, workers=3),
+        PipelineStage('inc', lambda x: x + 1, workers=1),
+    ])
+    results = pipeline.run(range(10))
+
+    assert sorted(results) == [1, 5, 9, 13, 17]
+    stats = {s['stage']: s for s in pipeline.stats()}
+    assert stats['double']['received'] == 10
+    assert stats['filter']['passed'] == 5
+    assert stats['filter']['dropped'] == 5
+    assert stats['inc']['received'] == 5
+
+
+def test_errors_are_counted_not_raised():
+    """阶段异常计入 errors，不中断其它条目"""
+    def handler(x):
+        if x == 3:
+            raise RuntimeError("boom")
+        return x
+
+    pipeline = StagePipeline([PipelineStage('only', handler, workers=2)])
+    results = pipeline.run(range(5))
+
+    assert sorted(results) == [0, 1, 2, 4]
+    assert pipeline.stats()[0]['errors'] == 1
+
+
+def test_stages_overlap():
+    """下游阶段处理第 N 个条目时，上游阶段可以同时处理第 N+1 个条目"""
+    active = {'a': 0, 'b': 0}
+    overlap = []
+    lock = threading.Lock()
+
+    def make(name, other):
+        def handler(x):
+            with lock:
+                active[name] += 1
+                if active[other]:
+                    overlap.append(x)
+            time.sleep(0.02)
+            with lock:
+                active[name] -= 1
+            return x
+        return handler
+
+    pipeline = StagePipeline([
+        PipelineStage('a', make('a', 'b'), workers=1),
+        PipelineStage('b', make('b', 'a'), workers=1),
+    ])
+    assert len(pipeline.run(range(5))) == 5
+    assert overlap
+
+
+def test_bounded_queue_applies_backpressure():
+    """慢速下游使队列保持有界，生产者不会一次性塞满所有条目"""
+    produced = []
+
+    def source():
+        for i in range(20):
+            produced.append(i)
+            yield i
+
+    def slow(x):
+        time.sleep(0.005)
+        return x
+
+    pipeline = StagePipeline([PipelineStage('slow', slow, workers=1, queue_size=2)])
+    pipeline.run(source())
+
+    assert pipeline.stats()[0]['max_queue_depth'] <= 2
+    assert len(pipeline.results) == 20
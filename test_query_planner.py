@@ -0,0 +1,97 @@
+"""
+测试 Scout 查询规划器
+"""
+
+import random
+
+import query_planner
+from query_planner import QueryPlanner, QueryStats, build_variants, record_query_yield
+
+CASE_KEYWORDS = ['charged with fraud', 'convicted of fraud', 'fraud case', 'fraud scheme', 'arrested for insurance fraud']
+INSURANCE_TYPES = ['life insurance fraud', 'health insurance fraud', 'accident insurance fraud']
+
+
+def test_build_variants():
+    variants = build_variants(CASE_KEYWORDS, INSURANCE_TYPES, year=2026)
+    ids = [variant['id'] for variant in variants]
+    assert len(ids) == len(set(ids)) == 2 * 1 * len(query_planner.REGIONS) + len(query_planner.LANGUAGE_VARIANTS)
+    # 第一个变体与原来的固定查询相同
+    assert variants[0]['query'] == ("charged with fraud OR convicted of fraud OR fraud case "
+                                    "life insurance fraud OR health insurance fraud OR accident insurance fraud "
+                                    "-property insurance -auto insurance 2025 2026")
+    uk = next(variant for variant in variants if variant['id'] == 'en-c1-t0-uk')
+    assert uk['query'].startswith('fraud scheme OR arrested for insurance fraud life insurance fraud')
+    assert ' UK ' in uk['query']
+    zh = next(variant for variant in variants if variant['id'] == 'zh-global')
+    assert '保险诈骗' in zh['query'] and zh['match_keywords']
+    assert all(len(variant['query']) <= query_planner.MAX_QUERY_CHARS for variant in variants)
+
+
+def _planner(tmp_path, variants, **kwargs):
+    return QueryPlanner('test', variants, stats=QueryStats(str(tmp_path / 'planner.db')), rng=random.Random(0),
+                        **kwargs)
+
+
+def test_untried_variants_first(tmp_path):
+    variants = build_variants(CASE_KEYWORDS, INSURANCE_TYPES, year=2026)[:3]
+    planner = _planner(tmp_path, variants)
+    planner.record_search(variants[0]['id'], 5)
+    planner.stats.record('test', variants[0]['id'], saved=3)
+    chosen = planner.select(2)
+    assert variants[0] not in chosen
+    assert len(chosen) == 2
+
+
+def test_exploits_high_yield(tmp_path):
+    """所有变体都搜索过后，产出高的变体优先；探索系数为 0 时只看平均产出"""
+    variants = build_variants(CASE_KEYWORDS, INSURANCE_TYPES, year=2026)[:3]
+    planner = _planner(tmp_path, variants, exploration=0.0)
+    for variant, saved in zip(variants, [0, 2, 1]):
+        for _ in range(4):
+            planner.record_search(variant['id'], 5)
+        planner.stats.record('test', variant['id'], saved=saved)
+    assert [variant['id'] for variant in planner.select(3)] == [variants[1]['id'], variants[2]['id'],
+                                                                 variants[0]['id']]
+
+
+def test_exploration_bonus(tmp_path):
+    """搜索次数少的变体有探索加成"""
+    variants = build_variants(CASE_KEYWORDS, INSURANCE_TYPES, year=2026)[:2]
+    planner = _planner(tmp_path, variants, exploration=1.0)
+    for _ in range(50):
+        planner.record_search(variants[0]['id'], 5)
+    planner.stats.record('test', variants[0]['id'], saved=10)
+    planner.record_search(variants[1]['id'], 5)
+    assert planner.select(1)[0]['id'] == variants[1]['id']
+
+
+def test_decay(tmp_path, monkeypatch):
+    """历史记录按半衰期衰减，很久以前的记录接近于没有"""
+    stats = QueryStats(str(tmp_path / 'planner.db'))
+    now = [1_000_000.0]
+    monkeypatch.setattr(query_planner.time, 'time', lambda: now[0])
+    stats.record('test', 'a', searches=2, saved=1)
+    now[0] += 14 * 86400
+    totals = stats.totals('test', half_life_days=14)
+    assert abs(totals['a']['searches'] - 1.0) < 1e-6 and abs(totals['a']['saved'] - 0.5) < 1e-6
+    assert stats.totals('other', half_life_days=14) == {}
+
+
+def test_record_query_yield(tmp_path, monkeypatch):
+    stats = QueryStats(str(tmp_path / 'planner.db'))
+    monkeypatch.setattr(query_planner, '_stats', stats)
+    record_query_yield({'url': 'https://a.com/1'})
+    record_query_yield({'url': 'https://a.com/2', 'query_variant': 'en-c0-t0-uk', 'query_source': 'deep_research'})
+    assert stats.totals('deep_research', half_life_days=14)['en-c0-t0-uk']['saved'] > 0.99
+
+
+def test_print_stats(tmp_path, capsys):
+    variants = build_variants(CASE_KEYWORDS, INSURANCE_TYPES, year=2026)
+    planner = _planner(tmp_path, variants)
+    planner.print_stats()
+    assert capsys.readouterr().out == ''
+    planner.record_search(variants[0]['id'], 5)
+    planner.stats.record('test', variants[0]['id'], saved=2)
+    planner.print_stats()
+    out = capsys.readouterr().out
+    assert f"1 / {len(variants)} 个变体" in out and '新增 2.00 个案例' in out
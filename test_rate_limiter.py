@@ -0,0 +1,153 @@
+"""
+测试外部 API 限流器
+"""
+
+import threading
+import time
+
+import pytest
+
+from rate_limiter import RateLimiter, get_rate_limiter, is_provider_quota_error, is_rate_limit_error, limited_call
+
+
+def test_burst_then_wait():
+    """令牌用完后 acquire 需要等待补充"""
+    limiter = RateLimiter('test', rpm=600, burst=2)  # 每 0.1 秒补充 1 个令牌
+    start = time.monotonic()
+    assert limiter.acquire()
+    assert limiter.acquire()
+    assert limiter.acquire()
+    assert time.monotonic() - start >= 0.08
+
+
+def test_acquire_timeout():
+    """超时后返回 False"""
+    limiter = RateLimiter('test', rpm=1)
+    assert limiter.acquire()
+    assert limiter.acquire(timeout=0.05) is False
+
+
+def test_shared_between_threads():
+    """多个线程共享同一服务商的限流配额"""
+    limiter = RateLimiter('test', rpm=1200, burst=1)
+    granted = []
+
+    def worker():
+        limiter.acquire()
+        granted.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    granted.sort()
+    assert len(granted) == 4
+    assert granted[-1] - granted[0] >= 0.12
+
+
+def test_registry_reads_env(monkeypatch):
+    """注册表按服务商复用实例，并读取 <PROVIDER>_RPM 环境变量"""
+    monkeypatch.setenv("UNITTESTPROVIDER_RPM", "42")
+    limiter = get_rate_limiter('unittestprovider')
+    assert limiter.rpm == 42
+    assert get_rate_limiter('UnitTestProvider') is limiter
+
+
+def test_throttle_halves_rate_and_success_recovers():
+    """限流时速率减半，成功调用后逐步恢复，但不超过上限"""
+    limiter = RateLimiter('test', rpm=60, increase_step=10)
+    limiter.on_throttle(retry_after=0)
+    assert limiter.rpm == 30
+    limiter.on_success()
+    assert limiter.rpm == 40
+    for _ in range(5):
+        limiter.on_success()
+    assert limiter.rpm == 60
+
+
+def test_throttle_pauses_acquire():
+    """限流后在 Retry-After 时间内不发放令牌"""
+    limiter = RateLimiter('test', rpm=6000, burst=5)
+    limiter.on_throttle(retry_after=0.1)
+    assert limiter.acquire(timeout=0.02) is False
+    assert limiter.acquire(timeout=0.5)
+
+
+def test_model_limiters_are_separate():
+    """同一服务商的不同模型使用独立配额"""
+    a = get_rate_limiter('gemini', 'models/unit-test-a')
+    b = get_rate_limiter('gemini', 'models/unit-test-b')
+    assert a is not b
+    assert get_rate_limiter('gemini', 'models/unit-test-a') is a
+
+
+class _HttpError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_is_rate_limit_error():
+    """识别 429 状态码和 quota / resource exhausted 等错误信息"""
+    assert is_rate_limit_error(_HttpError(429))
+    assert is_rate_limit_error(Exception("429 Resource has been exhausted (e.g. check quota)."))
+    assert is_rate_limit_error(Exception("Rate limit reached for gpt-4o-mini"))
+    assert not is_rate_limit_error(_HttpError(500))
+    assert not is_rate_limit_error(Exception("invalid api key"))
+
+
+def test_limited_call_retries_after_throttle():
+    """限流错误：限流器降速后重试；其他错误直接抛出"""
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise _HttpError(429)
+        return "ok"
+
+    limiter = get_rate_limiter('unittest-retry')
+    limiter.max_rpm = limiter.rpm = 6000
+    limiter.min_rpm = 3000
+    assert limited_call('unittest-retry', flaky) == "ok"
+    assert len(calls) == 2
+    assert limiter.throttle_count == 1
+
+    with pytest.raises(ValueError):
+        limited_call('unittest-retry', lambda: (_ for _ in ()).throw(ValueError("bad")))
+
+
+def test_provider_quota_error_backs_off_provider_limiter():
+    """模型级限流只降低模型级速率；服务商级配额错误同时降低服务商级速率"""
+    provider = get_rate_limiter('unittest-quota')
+    model = get_rate_limiter('unittest-quota', 'm1')
+    for limiter in (provider, model):
+        limiter.max_rpm = limiter.rpm = 6000
+        limiter.min_rpm = 3000
+
+    def model_limited():
+        raise Exception("429 Quota exceeded for metric generate_content_requests, model: m1")
+
+    with pytest.raises(Exception):
+        limited_call('unittest-quota', model_limited, model='m1', max_retries=0)
+    assert (provider.throttle_count, model.throttle_count) == (0, 1)
+
+    error = Exception("429 You exceeded your current quota, please check your plan and billing details")
+    assert is_provider_quota_error(error)
+    assert not is_provider_quota_error(Exception("billing address invalid"))
+    with pytest.raises(Exception):
+        limited_call('unittest-quota', lambda: (_ for _ in ()).throw(error), model='m1', max_retries=0)
+    assert (provider.throttle_count, model.throttle_count) == (1, 2)
+
+
+def test_model_token_acquired_before_provider_token():
+    """先获取模型级令牌：在模型级限流器上等待时不占用服务商级令牌"""
+    order = []
+    provider = get_rate_limiter('unittest-order')
+    model = get_rate_limiter('unittest-order', 'm1')
+    provider.acquire = lambda timeout=None: order.append('provider') or True
+    model.acquire = lambda timeout=None: order.append('model') or True
+    assert limited_call('unittest-order', lambda: 'ok', model='m1') == 'ok'
+    assert order == ['model', 'provider']
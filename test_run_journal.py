@@ -0,0 +1,47 @@
+"""
+测试运行日志（Checkpoint / Resume）
+"""
+
+import os
+
+import pytest
+
+from run_journal import RunJournal
+
+
+def test_resume_from_last_completed_stage(tmp_path):
+    """重新打开日志后可以读取已完成阶段的产出"""
+    path = os.path.join(tmp_path, 'journal.db')
+    journal = RunJournal(path, pipeline='test')
+    journal.record('https://a.example/case', 'scraped', {'markdown_content': '# 全文', 'content_length': 4})
+    journal.record('https://a.example/case', 'analyzed', {'Event': '寿险欺诈'})
+
+    reopened = RunJournal(path, pipeline='test')
+    assert reopened.get('https://a.example/case')['stage'] == 'analyzed'
+    assert reopened.stage_data('https://a.example/case', 'scraped')['markdown_content'] == '# 全文'
+    assert reopened.stage_data('https://a.example/case', 'analyzed') == {'Event': '寿险欺诈'}
+    assert reopened.stage_data('https://a.example/case', 'validated') is None
+    assert not reopened.is_saved('https://a.example/case')
+
+    reopened.record('https://a.example/case', 'validated', {'is_valid': True})
+    reopened.record('https://a.example/case', 'saved')
+    assert reopened.is_saved('https://a.example/case')
+    assert reopened.summary() == {'saved': 1}
+
+
+def test_pipelines_are_isolated(tmp_path):
+    """不同流程（agent / deep_research）的进度互不影响"""
+    path = os.path.join(tmp_path, 'journal.db')
+    RunJournal(path, pipeline='agent').record('https://b.example', 'saved')
+    assert not RunJournal(path, pipeline='deep_research').is_saved('https://b.example')
+
+
+def test_prune_and_unknown_stage(tmp_path):
+    """过期记录被清理；未知阶段报错"""
+    journal = RunJournal(os.path.join(tmp_path, 'journal.db'))
+    journal.record('https://c.example', 'scraped', {})
+    journal.prune(max_age_days=-1)
+    assert journal.get('https://c.example') is None
+
+    with pytest.raises(ValueError):
+        journal.record('https://c.example', 'published')
@@ -0,0 +1,58 @@
+"""
+测试进程内定时调度器
+"""
+
+import threading
+import time
+
+from scheduler import IntervalScheduler
+
+
+def test_jobs_run_on_independent_intervals():
+    """各任务按自己的间隔执行"""
+    scheduler = IntervalScheduler()
+    counts = {'fast': 0, 'slow': 0}
+    scheduler.add_job('fast', 0.02, lambda: counts.__setitem__('fast', counts['fast'] + 1))
+    scheduler.add_job('slow', 10, lambda: counts.__setitem__('slow', counts['slow'] + 1))
+
+    deadline = time.monotonic() + 0.15
+    while time.monotonic() < deadline:
+        scheduler.run_pending()
+        time.sleep(0.005)
+
+    assert counts['fast'] >= 4
+    assert counts['slow'] == 1
+
+
+def test_failing_job_does_not_stop_others():
+    """任务异常被记录，其它任务照常执行"""
+    scheduler = IntervalScheduler()
+    ran = []
+
+    def boom():
+        raise RuntimeError("boom")
+
+    scheduler.add_job('boom', 60, boom)
+    scheduler.add_job('ok', 60, lambda: ran.append(1))
+    assert scheduler.run_pending() == 2
+
+    stats = {s['job']: s for s in scheduler.stats()}
+    assert stats['boom']['failures'] == 1
+    assert ran == [1]
+
+
+def test_delayed_start_and_stop():
+    """run_immediately=False 的任务等待一个间隔；stop() 结束 run_forever"""
+    scheduler = IntervalScheduler()
+    ran = []
+    scheduler.add_job('later', 0.05, lambda: ran.append(time.monotonic()), run_immediately=False)
+
+    start = time.monotonic()
+    thread = threading.Thread(target=scheduler.run_forever, kwargs={'max_sleep': 0.01})
+    thread.start()
+    time.sleep(0.12)
+    scheduler.stop()
+    thread.join(timeout=1)
+
+    assert not thread.is_alive()
+    assert ran and ran[0] - start >= 0.045
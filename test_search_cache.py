@@ -0,0 +1,103 @@
+"""
+测试 Tavily 搜索结果缓存
+"""
+
+import pytest
+
+import search_cache
+from search_cache import SearchCache, cached_search, make_search_key
+
+
+class FakeTavily:
+    def __init__(self):
+        self.calls = []
+
+    def search(self, **kwargs):
+        self.calls.append(kwargs)
+        return {'results': [{'url': f"https://example.com/{len(self.calls)}", 'score': 0.9}]}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = SearchCache(str(tmp_path / 'search.db'))
+    monkeypatch.setattr(search_cache, '_cache', cache)
+    monkeypatch.setattr(search_cache, 'SEARCH_CACHE_ENABLED', True)
+    monkeypatch.setattr(search_cache, 'SEARCH_CACHE_REFRESH', False)
+    monkeypatch.setattr(search_cache, 'limited_call', lambda provider, func, *args, **kwargs: func(*args, **kwargs))
+    return cache
+
+
+def test_search_key_normalization():
+    """查询大小写 / 空白、域名顺序不影响缓存键；影响结果的参数不同则键不同"""
+    base = make_search_key("Insurance  Fraud case", search_depth="advanced", max_results=10,
+                           include_domains=['b.com', 'a.com'])
+    assert base == make_search_key(" insurance fraud CASE ", max_results=10, search_depth="advanced",
+                                   include_domains=['A.com', 'b.com'])
+    assert base != make_search_key("insurance fraud case", search_depth="advanced", max_results=5,
+                                   include_domains=['a.com', 'b.com'])
+    assert base != make_search_key("insurance fraud case", search_depth="news", max_results=10,
+                                   include_domains=['a.com', 'b.com'])
+    assert make_search_key("q", include_domains=None) == make_search_key("q")
+
+
+def test_cached_search_hits(cache):
+    client = FakeTavily()
+    first = cached_search(client, query="fraud", search_depth="advanced", max_results=5)
+    second = cached_search(client, query="FRAUD", search_depth="advanced", max_results=5)
+    assert first == second
+    assert len(client.calls) == 1
+    assert client.calls[0] == {'query': 'fraud', 'search_depth': 'advanced', 'max_results': 5}
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'refreshes': 0, 'hit_rate': 0.5}
+
+
+def test_ttl_per_mode(cache, monkeypatch):
+    """news 结果的 TTL 短于 advanced"""
+    client = FakeTavily()
+    now = [1000.0]
+    monkeypatch.setattr(search_cache.time, 'time', lambda: now[0])
+    cached_search(client, query="q", search_depth="news")
+    cached_search(client, query="q", search_depth="advanced")
+    now[0] += (cache.ttl_minutes['news'] + 1) * 60
+    cached_search(client, query="q", search_depth="news")
+    cached_search(client, query="q", search_depth="advanced")
+    assert [call['search_depth'] for call in client.calls] == ['news', 'advanced', 'news']
+
+
+def test_force_refresh(cache, monkeypatch):
+    client = FakeTavily()
+    cached_search(client, query="q")
+    refreshed = cached_search(client, query="q", refresh=True)
+    assert len(client.calls) == 2
+    # 刷新后的结果写回缓存
+    assert cached_search(client, query="q") == refreshed
+    monkeypatch.setattr(search_cache, 'SEARCH_CACHE_REFRESH', True)
+    cached_search(client, query="q")
+    assert len(client.calls) == 3
+    assert cache.stats()['refreshes'] == 2
+
+
+def test_errors_not_cached(cache):
+    class Failing:
+        def search(self, **kwargs):
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cached_search(Failing(), query="q")
+    client = FakeTavily()
+    cached_search(client, query="q")
+    assert len(client.calls) == 1
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(search_cache, 'SEARCH_CACHE_ENABLED', False)
+    monkeypatch.setattr(search_cache, 'limited_call', lambda provider, func, *args, **kwargs: func(*args, **kwargs))
+    client = FakeTavily()
+    cached_search(client, query="q")
+    cached_search(client, query="q")
+    assert len(client.calls) == 2
+
+
+def test_print_stats(cache, capsys):
+    cached_search(FakeTavily(), query="q")
+    search_cache.print_search_cache_stats()
+    assert '搜索缓存: 命中 0 / 未命中 1' in capsys.readouterr().out
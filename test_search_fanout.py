@@ -0,0 +1,80 @@
+"""
+测试多关键词并发搜索
+"""
+
+import threading
+import time
+
+from search_fanout import merge_results, parallel_search
+
+
+def test_merge_keeps_highest_score_and_keywords():
+    merged = merge_results({
+        'fraud scheme': [{'url': 'https://a.com/x?utm_source=t', 'score': 0.8, 'title': 'A1'},
+                         {'url': 'https://b.com/y', 'score': 0.75}],
+        'fraud scandal': [{'url': 'https://A.com/x/#top', 'score': 0.9, 'title': 'A2'}],
+    })
+    assert [item['url'] for item in merged] == ['https://A.com/x/#top', 'https://b.com/y']
+    assert merged[0]['title'] == 'A2'
+    assert merged[0]['matched_keywords'] == ['fraud scheme', 'fraud scandal']
+    assert merged[1]['matched_keywords'] == ['fraud scheme']
+
+
+def test_merge_lower_score_only_adds_keyword():
+    merged = merge_results({
+        'q1': [{'url': 'https://a.com/x', 'score': 0.9, 'title': 'best'}],
+        'q2': [{'url': 'https://a.com/x', 'score': 0.7, 'title': 'worse'}],
+    })
+    assert len(merged) == 1
+    assert merged[0]['title'] == 'best' and merged[0]['matched_keywords'] == ['q1', 'q2']
+
+
+def test_parallel_search_runs_concurrently():
+    """查询并发执行，总耗时接近单个查询"""
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def search(query):
+        with lock:
+            active.append(query)
+            peak.append(len(active))
+        time.sleep(0.1)
+        with lock:
+            active.remove(query)
+        return [{'url': f'https://example.com/{query}', 'score': 0.8}]
+
+    start = time.monotonic()
+    results = parallel_search([f'q{i}' for i in range(5)], search, max_workers=5)
+    assert time.monotonic() - start < 0.4
+    assert max(peak) > 1
+    assert len(results) == 5
+
+
+def test_parallel_search_respects_max_workers():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def search(query):
+        with lock:
+            active.append(query)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.remove(query)
+        return []
+
+    parallel_search([f'q{i}' for i in range(6)], search, max_workers=2)
+    assert max(peak) <= 2
+
+
+def test_parallel_search_failed_query_is_empty(capsys):
+    def search(query):
+        if query == 'bad':
+            raise RuntimeError('boom')
+        return [{'url': 'https://a.com/1', 'score': 0.8}]
+
+    results = parallel_search(['good', 'bad'], search)
+    assert results[0]['matched_keywords'] == ['good']
+    assert '搜索失败 bad' in capsys.readouterr().out
@@ -0,0 +1,55 @@
+"""
+测试搜索水位线
+"""
+
+import search_watermark
+from search_watermark import SearchWatermark, get_search_watermark, split_new_results
+
+
+def test_split_after_mark(tmp_path):
+    watermark = SearchWatermark('deep_research', str(tmp_path / 'wm.db'))
+    results = [{'url': 'https://a.com/1'}, {'url': 'https://a.com/2'}, {'url': 'https://a.com/3'}]
+    assert watermark.split(results) == (results, [])
+
+    watermark.mark('https://a.com/1?utm_source=x', 'saved')
+    watermark.mark('https://a.com/3/', 'duplicate')
+    new, seen = watermark.split(results)
+    assert new == [{'url': 'https://a.com/2'}]
+    assert seen == [{'url': 'https://a.com/1'}, {'url': 'https://a.com/3'}]
+
+
+def test_sources_are_separate_and_persistent(tmp_path):
+    path = str(tmp_path / 'wm.db')
+    SearchWatermark('living_scout', path).mark('https://a.com/1', 'saved')
+    assert SearchWatermark('living_scout', path).count() == 1
+    assert SearchWatermark('deep_research', path).split([{'url': 'https://a.com/1'}])[1] == []
+
+
+def test_newer_published_date_is_new(tmp_path):
+    """已见 URL 的发布时间更新时重新处理（ISO 和 RFC 2822 格式可以比较）"""
+    watermark = SearchWatermark('living_scout', str(tmp_path / 'wm.db'))
+    watermark.mark('https://a.com/1', 'saved', '2025-03-01T10:00:00Z')
+    same = {'url': 'https://a.com/1', 'published_date': 'Sat, 01 Mar 2025 10:00:00 GMT'}
+    updated = {'url': 'https://a.com/1', 'published_date': 'Mon, 03 Mar 2025 08:00:00 GMT'}
+    assert watermark.split([same]) == ([], [same])
+    assert watermark.split([updated]) == ([updated], [])
+
+
+def test_expired_entries(tmp_path, monkeypatch):
+    path = str(tmp_path / 'wm.db')
+    now = [1000.0]
+    monkeypatch.setattr(search_watermark.time, 'time', lambda: now[0])
+    SearchWatermark('s', path, ttl_days=1).mark('https://a.com/1', 'saved')
+    now[0] += 2 * 86400
+    assert SearchWatermark('s', path, ttl_days=1).split([{'url': 'https://a.com/1'}])[1] == []
+
+
+def test_split_new_results(tmp_path, capsys, monkeypatch):
+    results = [{'url': 'https://a.com/1'}, {'url': 'https://a.com/2'}]
+    assert split_new_results(None, results) == results
+    watermark = SearchWatermark('s', str(tmp_path / 'wm.db'))
+    watermark.mark('https://a.com/1', 'saved')
+    assert split_new_results(watermark, results, label='hotspot') == [{'url': 'https://a.com/2'}]
+    assert '[hotspot] 新结果 1 个' in capsys.readouterr().out
+    monkeypatch.setattr(search_watermark, 'SEARCH_WATERMARK_ENABLED', False)
+    assert get_search_watermark('s') is None
@@ -0,0 +1,137 @@
+"""
+测试流式输出的增量 JSON 校验
+"""
+
+import json
+
+import pytest
+
+import ai_engine
+import circuit_breaker
+import gifia_state
+import usage_meter
+from stream_json import IncrementalJSONValidator, StreamAbort, read_stream
+
+KEYS = ['Time', 'Region', 'Process']
+GOOD = json.dumps({'Time': '2025-01-15', 'Region': '美国{纽约}', 'Process': '【风险画像】\n"引号"'},
+                  ensure_ascii=False)
+
+
+def chunked(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_valid_stream_with_fence():
+    """允许 ```json 代码块，字符串中的括号和转义引号不影响结构判断"""
+    assert read_stream(chunked("```json\n" + GOOD + "\n```"), KEYS) == "```json\n" + GOOD
+
+
+def test_stops_reading_after_top_level_json():
+    """顶层 JSON 结束后不再读取剩余输出"""
+    consumed = []
+
+    def chunks():
+        for chunk in [GOOD, "\n以下是说明……", "更多文字"]:
+            consumed.append(chunk)
+            yield chunk
+
+    assert read_stream(chunks(), KEYS) == GOOD
+    assert len(consumed) == 1
+
+
+def test_prose_aborts_on_first_chunk():
+    with pytest.raises(StreamAbort, match="不是 JSON"):
+        IncrementalJSONValidator(KEYS).feed("抱歉，我无法")
+
+
+@pytest.mark.parametrize('text', ['{"Time": "1"]', '{Time: "1"}', '[{"Time": 1}}'])
+def test_structural_errors(text):
+    with pytest.raises(StreamAbort):
+        read_stream([text])
+
+
+def test_missing_keys_keeps_complete_text():
+    """对象完整但缺少必需字段：中止并保留全文作为备选"""
+    with pytest.raises(StreamAbort) as info:
+        read_stream(['{"Time": "1", "nested": {"Region": "x"}}'], KEYS)
+    assert 'Region' in info.value.reason and 'Process' in info.value.reason
+    assert info.value.text == '{"Time": "1", "nested": {"Region": "x"}}'
+
+
+def test_array_keeps_batch_when_one_record_is_incomplete():
+    """根为数组时逐个检查对象：只有中间的对象缺少字段时不中止整批，由调用方处理该条结果"""
+    records = [dict.fromkeys(KEYS, '1'), {'Time': '2', 'Region': 'x'}, dict.fromkeys(KEYS, '3')]
+    text = json.dumps(records)
+    validator = IncrementalJSONValidator(KEYS)
+    for chunk in chunked(text):
+        validator.feed(chunk)
+    assert validator.finish() == text
+    assert (validator.items, validator.incomplete_items) == (3, 1)
+
+
+def test_array_aborts_when_every_record_is_incomplete():
+    """所有对象都缺少字段时中止，并保留全文作为备选"""
+    text = json.dumps([{'Time': '1'}, {'Region': 'x'}])
+    with pytest.raises(StreamAbort, match="都缺少") as info:
+        read_stream(chunked(text), KEYS)
+    assert info.value.text == text
+
+
+def test_truncated_output():
+    with pytest.raises(StreamAbort, match="中断"):
+        read_stream(['{"Time": "1"'], KEYS)
+
+
+@pytest.fixture
+def fake_stream(tmp_path, monkeypatch):
+    """替换 genai：每个模型按预设的分块流式输出"""
+    outputs = {}
+    calls = []
+
+    class FakeModel:
+        def __init__(self, name):
+            self.name = name
+
+        def generate_content(self, prompt, stream=False):
+            calls.append((self.name, stream))
+            chunks = outputs[self.name]
+            if not stream:
+                return type('Response', (), {'text': ''.join(chunks)})()
+            return (type('Chunk', (), {'text': chunk})() for chunk in chunks)
+
+    monkeypatch.setattr(ai_engine, 'genai', type('FakeGenai', (), {'GenerativeModel': staticmethod(FakeModel)}))
+    monkeypatch.setattr(ai_engine, '_models', {})
+    monkeypatch.setattr(ai_engine, 'limited_call',
+                        lambda provider, func, *args, model=None, max_retries=1, **kwargs: func(*args, **kwargs))
+    monkeypatch.setattr(gifia_state, 'STATE_DIR', str(tmp_path))
+    monkeypatch.setattr(usage_meter, '_meter', usage_meter.UsageMeter(str(tmp_path / 'llm_usage.db')))
+    circuit_breaker.reset_breakers()
+    yield outputs, calls
+    circuit_breaker.reset_breakers()
+
+
+def test_gemini_aborts_bad_stream_and_tries_next_model(fake_stream):
+    """无效输出提前中止并换下一个模型，不计入熔断"""
+    outputs, calls = fake_stream
+    outputs['a'] = ['Sorry, ', 'I cannot ', 'help']
+    outputs['b'] = chunked(GOOD)
+    assert ai_engine.call_gemini('p', ['a', 'b'], required_keys=KEYS) == GOOD
+    assert calls == [('a', True), ('b', True)]
+    assert circuit_breaker.get_breaker('gemini:a').failures == 0
+
+
+def test_gemini_incomplete_json_is_not_success(fake_stream):
+    """所有模型都只缺少字段时返回 None（调用方切换到备份引擎），完整的 JSON 放入 partial"""
+    outputs, _ = fake_stream
+    outputs['a'] = ['{"Time": "1"}']
+    outputs['b'] = ['{"Region": "2"}']
+    partial = []
+    assert ai_engine.call_gemini('p', ['a', 'b'], required_keys=KEYS, partial=partial) is None
+    assert partial == ['{"Time": "1"}', '{"Region": "2"}']
+
+
+def test_no_streaming_without_required_keys(fake_stream):
+    outputs, calls = fake_stream
+    outputs['a'] = ['plain text']
+    assert ai_engine.call_gemini('p', ['a']) == 'plain text'
+    assert calls == [('a', False)]
@@ -0,0 +1,86 @@
+"""
+测试结构化输出解析
+"""
+
+import json
+
+import pytest
+
+import ai_engine
+from structured_output import (CASE_FIELDS, CASE_SCHEMA, StructuredOutputError, normalize_case, parse_case,
+                               parse_json, repair_json)
+
+
+def test_fast_path_keeps_newlines_in_strings():
+    """代码块标记被去掉，字符串中的换行保留（不再整体删除控制字符）"""
+    data = parse_json('```json\n{"Process": "【风险画像】\n投保时间"}\n```')
+    assert data == {'Process': '【风险画像】\n投保时间'}
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('以下是结果：\n{"a": 1}\n希望对你有帮助', {'a': 1}),
+    ('{"a": [1, 2,], "b": 2,}', {'a': [1, 2], 'b': 2}),
+    ('{"a": "他说"你好"", "b": 1}', {'a': '他说"你好"', 'b': 1}),
+    ('{"a": "被截断的内容', {'a': '被截断的内容'}),
+    ('{"a": 1, "b": [{"c": "x"', {'a': 1, 'b': [{'c': 'x'}]}),
+    ('{"a": 1, "b":', {'a': 1, 'b': None}),
+])
+def test_repair_path(text, expected):
+    assert parse_json(text) == expected
+
+
+def test_repair_is_idempotent_on_valid_json():
+    text = json.dumps({'a': [1, {'b': '}'}]})
+    assert json.loads(repair_json(text)) == json.loads(text)
+
+
+def test_expect_root_type():
+    assert parse_json('{"cases": [{"a": 1}]}', expect=list) == [{'a': 1}]
+    assert parse_json('[{"a": 1}]', expect=dict) == {'a': 1}
+    with pytest.raises(StructuredOutputError):
+        parse_json('[1, 2]', expect=dict)
+
+
+def test_failure_is_json_decode_error():
+    """解析失败抛出 json.JSONDecodeError 的子类，原有的 except 分支仍然生效"""
+    with pytest.raises(json.JSONDecodeError):
+        parse_json('抱歉，我无法完成这个任务')
+    with pytest.raises(json.JSONDecodeError):
+        parse_json('')
+
+
+def test_normalize_case():
+    """字段别名、非字符串值和缺失字段统一为 6 字段字符串格式"""
+    case = normalize_case({'time': '2025-01-15', 'Characters': ['张三', 'ABC保险公司'], 'Event': 42,
+                           'Process': {'风险画像': '短期出险'}, 'Result': ''})
+    assert case['Time'] == '2025-01-15'
+    assert case['Characters'] == '张三\nABC保险公司'
+    assert case['Event'] == '42'
+    assert case['Process'] == '风险画像：短期出险'
+    assert case['Region'] == '未知' and case['Result'] == '未知'
+
+
+def test_parse_case():
+    case = parse_case('```json\n{"Time": "2025", "Event": "寿险欺诈",}\n```')
+    assert set(CASE_FIELDS) <= set(case)
+    assert case['Event'] == '寿险欺诈'
+
+
+def test_gemini_json_mode_falls_back_on_old_sdk(monkeypatch):
+    """旧版 SDK 不支持 generation_config 中的 JSON 输出字段时改为普通输出"""
+    calls = []
+
+    class OldModel:
+        def generate_content(self, prompt, **kwargs):
+            calls.append(kwargs)
+            if 'generation_config' in kwargs:
+                raise ValueError("Unknown field for GenerationConfig: response_mime_type")
+            return type('Response', (), {'text': '{"ok": 1}'})()
+
+    monkeypatch.setattr(ai_engine, '_gemini_json_mode', True)
+    monkeypatch.setattr(ai_engine, 'limited_call',
+                        lambda provider, func, *args, model=None, max_retries=1, **kwargs: func(*args, **kwargs))
+    assert ai_engine._gemini_generate(OldModel(), 'm', 'p', False, CASE_SCHEMA).text == '{"ok": 1}'
+    assert calls[0]['generation_config']['response_schema'] == CASE_SCHEMA
+    assert calls[1] == {}
+    assert ai_engine._gemini_json_mode is False
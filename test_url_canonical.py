@@ -0,0 +1,163 @@
+"""
+测试 URL 规范化
+"""
+
+from url_canonical import canonical_url
+
+
+def test_canonical_url_basic():
+    assert canonical_url('HTTPS://Example.COM:443/News/Story/?b=2&utm_source=x&a=1#comments') == \
+        'https://example.com/News/Story?a=1&b=2'
+    assert canonical_url('http://example.com') == 'http://example.com/'
+    assert canonical_url('https://example.com/a?fbclid=1&gclid=2') == 'https://example.com/a'
+    assert canonical_url('http://example.com:8080/a/') == 'http://example.com:8080/a'
+
+
+def test_canonical_url_invalid():
+    assert canonical_url('') == ''
+    assert canonical_url('  not a url ') == 'not a url'
+
+
+def test_mobile_and_amp_variants():
+    canonical = 'https://example.com/news/fraud-case'
+    for variant in [
+        'https://www.example.com/news/fraud-case/',
+        'https://m.example.com/news/fraud-case',
+        'https://amp.example.com/news/fraud-case',
+        'https://example.com/amp/news/fraud-case',
+        'https://example.com/news/fraud-case/amp',
+        'https://example.com/news/fraud-case.amp',
+        'https://example.com/news/fraud-case?amp=1',
+        'https://example.com/news/fraud-case?outputType=amp',
+        'https://www.google.com/amp/s/www.example.com/news/fraud-case',
+        'https://example-com.cdn.ampproject.org/c/s/example.com/news/fraud-case/amp',
+    ]:
+        assert canonical_url(variant) == canonical, variant
+    assert canonical_url('https://www.example.com/news/index.html') == 'https://example.com/news'
+    assert canonical_url('https://www.bbc.co.uk/news/world-1.amp') == 'https://bbc.co.uk/news/world-1'
+
+
+def test_domain_rules():
+    assert canonical_url('https://www.reuters.com/world/fraud-2025-03-01/?taid=abc&foo=1') == \
+        'https://reuters.com/world/fraud-2025-03-01'
+    assert canonical_url('https://www.youtube.com/watch?v=abc&t=30s&feature=share') == 'https://youtube.com/watch?v=abc'
+    rules = {'example.com': {'keep_params': ['id']}, 'news.example.com': {'drop_params': ['session']}}
+    assert canonical_url('https://example.com/a?id=1&page=2', rules) == 'https://example.com/a?id=1'
+    assert canonical_url('https://news.example.com/a?id=1&session=x', rules) == 'https://news.example.com/a?id=1'
+
+
+class _FakeQuery:
+    def __init__(self, table, op, payload=None):
+        self.table, self.op, self.payload = table, op, payload
+        self.start = self.end = None
+
+    def select(self, columns):
+        return self
+
+    def order(self, column):
+        return self
+
+    def range(self, start, end):
+        self.start, self.end = start, end
+        return self
+
+    def update(self, payload):
+        return _FakeQuery(self.table, 'update', payload)
+
+    def eq(self, column, value):
+        self.row_id = value
+        return self
+
+    def execute(self):
+        if self.op == 'update':
+            self.table.updates.append((self.row_id, self.payload['canonical_url']))
+            return type('Result', (), {'data': [{}]})()
+        return type('Result', (), {'data': self.table.rows[self.start:self.end + 1]})()
+
+
+class _FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+        self.updates = []
+
+    def table(self, name):
+        return _FakeQuery(self, 'select')
+
+
+def test_backfill_keeps_oldest_and_reports_duplicates():
+    from url_canonical import backfill_canonical_urls
+
+    client = _FakeSupabase([
+        {'id': 1, 'source_url': 'https://www.example.com/a?utm_source=x', 'canonical_url': None},
+        {'id': 2, 'source_url': 'https://example.com/b', 'canonical_url': 'https://example.com/b'},
+        {'id': 3, 'source_url': 'https://m.example.com/a/', 'canonical_url': None},
+        {'id': 4, 'source_url': '', 'canonical_url': None},
+    ])
+    assert backfill_canonical_urls(client, dry_run=True)['updated'] == 1
+    assert client.updates == []
+
+    stats = backfill_canonical_urls(client, batch_size=2)
+    assert stats == {'rows': 4, 'updated': 1, 'duplicates': [(3, 1, 'https://m.example.com/a/')]}
+    assert client.updates == [(1, 'https://example.com/a')]
+
+
+class _FakeCasesTable:
+    """按 or_ 过滤条件记录查询；has_canonical=False 模拟未执行迁移的数据库"""
+
+    def __init__(self, has_canonical):
+        self.has_canonical = has_canonical
+        self.filters = []
+        self.inserted = []
+        self._filter = self._insert = None
+
+    def table(self, name):
+        return self
+
+    def select(self, columns):
+        return self
+
+    def or_(self, filters):
+        self._filter = filters
+        return self
+
+    def insert(self, payload):
+        self._insert = payload
+        return self
+
+    def execute(self):
+        if self._insert is not None:
+            payload, self._insert = self._insert, None
+            if 'canonical_url' in payload and not self.has_canonical:
+                raise Exception("{'code': 'PGRST204', 'message': \"Could not find the 'canonical_url' column\"}")
+            self.inserted.append(payload)
+            return type('Result', (), {'data': [payload]})()
+        self.filters.append(self._filter)
+        if 'canonical_url' in self._filter and not self.has_canonical:
+            raise Exception("{'code': '42703', 'message': 'column fraud_cases.canonical_url does not exist'}")
+        return type('Result', (), {'data': [{'id': 1}]})()
+
+
+def test_find_existing_cases_matches_canonical_or_source_url(monkeypatch):
+    import url_canonical
+
+    monkeypatch.setattr(url_canonical, '_canonical_column_missing', False)
+    client = _FakeCasesTable(has_canonical=True)
+    assert url_canonical.find_existing_cases(client, 'https://www.example.com/a,b?utm_source=x') == [{'id': 1}]
+    assert client.filters == [
+        'canonical_url.eq."https://example.com/a,b",'
+        'source_url.eq."https://www.example.com/a,b?utm_source=x",'
+        'source_url.eq."https://example.com/a,b"'
+    ]
+
+
+def test_missing_canonical_column_falls_back_to_source_url(monkeypatch):
+    import url_canonical
+
+    monkeypatch.setattr(url_canonical, '_canonical_column_missing', False)
+    client = _FakeCasesTable(has_canonical=False)
+    assert url_canonical.find_existing_cases(client, 'https://example.com/a') == [{'id': 1}]
+    assert client.filters[-1] == 'source_url.eq."https://example.com/a"'
+
+    url_canonical.insert_case(client, {'source_url': 'https://example.com/a', 'canonical_url': 'https://example.com/a'})
+    assert client.inserted == [{'source_url': 'https://example.com/a'}]
+    assert url_canonical._canonical_column_missing is True
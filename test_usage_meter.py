@@ -0,0 +1,87 @@
+"""
+测试 LLM 用量计量
+"""
+
+import pytest
+
+import ai_engine
+import circuit_breaker
+import usage_meter
+from usage_meter import UsageMeter, estimate_cost, gemini_usage, openai_usage
+
+
+@pytest.fixture
+def meter(tmp_path, monkeypatch):
+    """本测试使用独立的用量记录"""
+    meter = UsageMeter(str(tmp_path / 'llm_usage.db'), run_id='run-1')
+    monkeypatch.setattr(usage_meter, '_meter', meter)
+    return meter
+
+
+def test_provider_usage_and_estimate(meter):
+    """优先使用服务商返回的用量，没有时按文本估算并标记"""
+    meter.record('gemini', 'models/gemini-2.5-flash', 'analyst', usage=(1000, 200))
+    entry = meter.record('deepseek', 'deepseek-chat', 'analyst', '保险欺诈' * 10, 'abcd' * 5)
+    assert (entry['prompt_tokens'], entry['completion_tokens'], entry['estimated']) == (40, 5, 1)
+
+    rows = {row['provider']: row for row in meter.summary()}
+    assert rows['gemini']['prompt_tokens'] == 1000 and rows['gemini']['estimated_calls'] == 0
+    assert rows['gemini']['cost_usd'] == pytest.approx((1000 * 0.30 + 200 * 2.50) / 1_000_000)
+
+
+def test_summary_groups_by_run_and_stage(tmp_path):
+    """按 阶段 + 模型 汇总，多个进程使用相同运行 ID 时汇总到一起，其他运行不计入"""
+    path = str(tmp_path / 'llm_usage.db')
+    UsageMeter(path, run_id='run-1').record('openai', 'gpt-4o-mini', 'critic', usage=(100, 10))
+    UsageMeter(path, run_id='run-1').record('openai', 'gpt-4o-mini', 'critic', usage=(100, 10))
+    UsageMeter(path, run_id='run-2').record('openai', 'gpt-4o-mini', 'critic', usage=(100, 10))
+    rows = UsageMeter(path, run_id='run-1').summary()
+    assert len(rows) == 1
+    assert (rows[0]['stage'], rows[0]['calls'], rows[0]['prompt_tokens']) == ('critic', 2, 200)
+
+
+def test_price_overrides(monkeypatch):
+    assert estimate_cost('unknown-model', 1000, 1000) == 0.0
+    monkeypatch.setenv('LLM_PRICES', '{"unknown-model": [1.0, 2.0]}')
+    assert estimate_cost('unknown-model', 1_000_000, 1_000_000, usage_meter.load_prices()) == 3.0
+
+
+def test_usage_parsers():
+    metadata = type('Usage', (), {'prompt_token_count': 12, 'candidates_token_count': 3})()
+    assert gemini_usage(type('Response', (), {'usage_metadata': metadata})()) == (12, 3)
+    usage = type('Usage', (), {'prompt_tokens': 7, 'completion_tokens': 2})()
+    assert openai_usage(type('Completion', (), {'usage': usage})()) == (7, 2)
+    assert gemini_usage(object()) is None and openai_usage(object()) is None
+
+
+def test_call_gemini_records_stage_and_model(meter, monkeypatch):
+    """共享调用路径按阶段和模型记录实际调用，使用服务商返回的用量"""
+    metadata = type('Usage', (), {'prompt_token_count': 50, 'candidates_token_count': 5})()
+
+    class FakeModel:
+        def __init__(self, name):
+            self.name = name
+
+        def generate_content(self, prompt, **kwargs):
+            return type('Response', (), {'text': '{"Time": "1"}', 'usage_metadata': metadata})()
+
+    monkeypatch.setattr(ai_engine, 'genai', type('FakeGenai', (), {'GenerativeModel': staticmethod(FakeModel)}))
+    monkeypatch.setattr(ai_engine, '_models', {})
+    monkeypatch.setattr(ai_engine, 'limited_call',
+                        lambda provider, func, *args, model=None, max_retries=1, **kwargs: func(*args, **kwargs))
+    circuit_breaker.reset_breakers()
+    try:
+        assert ai_engine.call_gemini('p', ['a'], stage='validate') == '{"Time": "1"}'
+    finally:
+        circuit_breaker.reset_breakers()
+
+    rows = meter.summary()
+    assert [(row['stage'], row['model'], row['prompt_tokens']) for row in rows] == [('validate', 'a', 50)]
+
+
+def test_report_silent_without_calls(meter, capsys):
+    usage_meter.print_usage_report()
+    assert capsys.readouterr().out == ''
+    meter.record('gemini', 'models/gemini-2.5-flash', 'extract', usage=(10, 1))
+    usage_meter.print_usage_report()
+    assert '[extract]' in capsys.readouterr().out
@@ -0,0 +1,105 @@
+"""
+测试多 Worker 任务认领（SQLite 认领表）
+"""
+
+import time
+
+from work_claims import SQLiteClaimStore, SupabaseClaimStore, WorkClaimer, in_shard
+
+
+def _claimers(tmp_path, lease_seconds=60):
+    path = str(tmp_path / 'claims.db')
+    # 两个 Worker 各自打开同一个数据库文件，相当于两个进程
+    a = WorkClaimer(SQLiteClaimStore(path), worker_id='worker-a', lease_seconds=lease_seconds)
+    b = WorkClaimer(SQLiteClaimStore(path), worker_id='worker-b', lease_seconds=lease_seconds)
+    return a, b
+
+
+def test_workers_split_urls(tmp_path):
+    """同一 URL 只能被一个 Worker 认领，其余 URL 由另一个 Worker 认领"""
+    a, b = _claimers(tmp_path)
+    assert a.claim(['u1', 'u2']) == ['u1', 'u2']
+    assert b.claim(['u1', 'u2', 'u3']) == ['u3']
+    # 本 Worker 正在处理的 URL 不会再次认领成功（同一 URL 不处理两次）
+    assert not a.try_claim('u1')
+    assert a.is_held('u1')
+    a.finish('u1', done=False)
+    assert a.try_claim('u1')
+
+
+def test_done_is_never_reclaimed_and_failure_is_released(tmp_path):
+    """完成的 URL 不再被认领；失败释放后其他 Worker 可以重试"""
+    a, b = _claimers(tmp_path)
+    a.claim(['u1', 'u2'])
+    a.finish('u1', done=True)
+    a.finish('u2', done=False)
+    assert b.claim(['u1', 'u2']) == ['u2']
+    assert a.held == set()
+
+
+def test_expired_lease_can_be_taken_over(tmp_path):
+    """Worker 崩溃（租约过期）后其他 Worker 接管，原 Worker 续约时发现租约已失效"""
+    a, b = _claimers(tmp_path, lease_seconds=0)
+    assert a.try_claim('u1')
+    time.sleep(0.01)
+    assert b.try_claim('u1')
+    assert a.renew() == 0
+    assert 'u1' not in a.held
+
+
+def test_renew_and_close(tmp_path):
+    """续约延长租约；close() 释放所有未完成的 URL"""
+    a, b = _claimers(tmp_path)
+    a.claim(['u1', 'u2'])
+    assert a.renew() == 2
+    a.close()
+    assert b.claim(['u1', 'u2']) == ['u1', 'u2']
+
+
+def test_shard_filter_is_stable_and_partitions():
+    """分片按 URL 哈希划分，每个 URL 恰好属于一个分片"""
+    urls = [f"https://example.com/case/{i}" for i in range(50)]
+    for url in urls:
+        assert sum(in_shard(url, index, 3) for index in range(3)) == 1
+    assert all(in_shard(url, 0, 1) for url in urls)
+
+
+class _BrokenStore:
+    def claim(self, urls, worker_id, lease_seconds):
+        raise RuntimeError("function claim_work does not exist")
+
+
+def test_fail_open_when_backend_unavailable():
+    """认领表不可用时放行所有 URL，不影响抓取"""
+    claimer = WorkClaimer(_BrokenStore(), worker_id='w')
+    assert claimer.claim(['u1', 'u2']) == ['u1', 'u2']
+    local = WorkClaimer(None)
+    assert local.claim(['u1']) == ['u1']
+    assert local.claim(['u1']) == []
+
+
+class _FakeRpc:
+    def __init__(self, data):
+        self.data = data
+
+    def execute(self):
+        return self
+
+
+class _FakeSupabase:
+    def __init__(self):
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        return _FakeRpc([{'claimed_url': url} for url in params['p_urls'][:1]])
+
+
+def test_supabase_store_uses_rpc():
+    """Supabase 后端通过 RPC 调用迁移脚本中的函数"""
+    client = _FakeSupabase()
+    claimer = WorkClaimer(SupabaseClaimStore(client), worker_id='w', lease_seconds=30)
+    assert claimer.claim(['u1', 'u2']) == ['u1']
+    claimer.finish('u1', done=True)
+    assert client.calls[0] == ('claim_work', {'p_urls': ['u1', 'u2'], 'p_worker_id': 'w', 'p_lease_seconds': 30})
+    assert client.calls[1] == ('release_work_claims', {'p_urls': ['u1'], 'p_worker_id': 'w', 'p_done': True})
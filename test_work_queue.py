@@ -0,0 +1,85 @@
+"""
+测试优先级工作队列
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+from work_queue import PriorityWorkQueue, parse_published_date, priority_score
+
+NOW = datetime(2026, 1, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def test_parse_published_date_formats():
+    """支持 ISO 8601 和 RFC 2822，无法解析时返回 None"""
+    assert parse_published_date("2026-01-15T10:00:00Z") == datetime(2026, 1, 15, 10, 0, tzinfo=timezone.utc)
+    assert parse_published_date("Thu, 15 Jan 2026 10:00:00 GMT") == datetime(2026, 1, 15, 10, 0, tzinfo=timezone.utc)
+    assert parse_published_date("2026-01-15").tzinfo is not None
+    assert parse_published_date("last week") is None
+    assert parse_published_date(None) is None
+
+
+def test_hotspot_and_freshness_rank_higher():
+    """热点优先；同等条件下新近发布的案例优先"""
+    regular = {'score': 0.9, 'is_hotspot': False}
+    hotspot = {'score': 0.75, 'is_hotspot': True}
+    assert priority_score(hotspot, NOW) > priority_score(regular, NOW)
+
+    fresh = {'score': 0.8, 'published_date': (NOW - timedelta(hours=1)).isoformat()}
+    stale = {'score': 0.8, 'published_date': (NOW - timedelta(days=10)).isoformat()}
+    assert priority_score(fresh, NOW) > priority_score(stale, NOW) > priority_score({'score': 0.8}, NOW)
+
+
+def test_pop_in_priority_order_fifo_on_ties():
+    """按分数从高到低出队，同分按入队顺序"""
+    queue = PriorityWorkQueue(key=lambda item: item['p'])
+    for name, p in [('a', 1), ('b', 3), ('c', 2), ('d', 3)]:
+        queue.push({'name': name, 'p': p})
+    assert [item['name'] for item in queue.drain()] == ['b', 'd', 'c', 'a']
+    assert queue.pop() is None
+
+
+def test_items_pushed_during_drain_preempt():
+    """处理过程中加入的高优先级条目排到剩余低优先级条目前面"""
+    queue = PriorityWorkQueue(key=lambda item: item)
+    for p in (3, 2, 1):
+        queue.push(p)
+    order = []
+    for item in queue.drain():
+        order.append(item)
+        if item == 3:
+            queue.push(10)
+    assert order == [3, 10, 2, 1]
+
+
+def test_drain_defers_when_budget_short():
+    """剩余时间不足以处理下一个条目时停止，低优先级条目留在队列中"""
+    queue = PriorityWorkQueue(key=lambda item: item, default_seconds=30)
+    for p in (1, 2, 3):
+        queue.push(p)
+    assert list(queue.drain(deadline=time.monotonic() + 10)) == []
+    assert len(queue) == 3
+
+    # 实际耗时很短时，估算值随之平滑下降（单个样本不会覆盖初始估计），同样的预算可以处理全部条目
+    queue.record_duration(0.01)
+    assert queue.avg_seconds > 20
+    for _ in range(4):
+        queue.record_duration(0.01)
+    assert list(queue.drain(deadline=time.monotonic() + 10)) == [3, 2, 1]
+
+
+def test_parallelism_extends_capacity():
+    """并发处理时按并发数折算单个条目的耗时"""
+    queue = PriorityWorkQueue(key=lambda item: item, default_seconds=30)
+    queue.push(1)
+    assert list(queue.drain(deadline=time.monotonic() + 20, parallelism=2)) == [1]
+    assert queue.pending() == []
+
+
+def test_drain_limit():
+    """达到数量上限后停止，剩余条目留在队列中"""
+    queue = PriorityWorkQueue(key=lambda item: item)
+    for p in (1, 2, 3):
+        queue.push(p)
+    assert list(queue.drain(limit=2)) == [3, 2]
+    assert queue.pending() == [1]
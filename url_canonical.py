@@ -0,0 +1,322 @@
+"""
+GIFIA - URL 规范化
+同一篇文章经常以不同 URL 出现：跟踪参数（utm_*）、AMP 版本、移动版子域名、结尾斜杠、锚点等，
+check_duplicate 会把它们当成新案例，重复调用 Firecrawl 和 Gemini。
+规范化 URL 只作为去重键（查重、认领、运行日志、水位线），抓取和 source_url 仍使用原始 URL：
+
+- 通用规则：协议和主机名小写、去掉默认端口、锚点、跟踪参数、结尾斜杠和 index 文件名，
+  去掉 www / m / mobile / amp 子域名，去掉 AMP 路径和参数，其余参数按名称排序
+- 站点规则（DOMAIN_RULES）：只保留标识文章的参数（keep_params），或去掉站点特有的参数（drop_params）；
+  Google AMP 缓存等跳转地址还原为原始 URL
+- URL_CANONICAL_RULES（JSON）可覆盖或补充站点规则，如 {"example.com": {"keep_params": ["id"]}}
+
+数据库迁移见 database_canonical_url.sql，已有案例用 python url_canonical.py --backfill 回填；
+迁移前 find_existing_cases / insert_case 自动退回只用 source_url
+"""
+
+import json
+import os
+import re
+import sys
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+
+# 跟踪参数（前缀匹配）
+TRACKING_PARAM_PREFIXES = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ocid', 'cmpid', '_ga', 'ref_src')
+# 表示 AMP 版本的参数（值为空或为 amp 时去掉）
+AMP_PARAMS = ('amp', 'outputtype', 'output', 'amp_js_v', 'usqp')
+# 移动版 / AMP 子域名前缀
+HOST_PREFIXES = ('www.', 'm.', 'mobile.', 'amp.')
+# 目录首页文件名
+INDEX_FILES = ('index.html', 'index.htm', 'index.php', 'default.aspx')
+
+# 站点规则：按主机名后缀匹配（最长后缀优先）
+# - keep_params: 只保留这些参数（空列表表示去掉全部参数）
+# - drop_params: 额外去掉的参数
+DOMAIN_RULES: Dict[str, Dict[str, List[str]]] = {
+    'youtube.com': {'keep_params': ['v']},
+    'reuters.com': {'keep_params': []},
+    'bloomberg.com': {'keep_params': []},
+    'nytimes.com': {'keep_params': []},
+    'wsj.com': {'keep_params': []},
+    'ft.com': {'keep_params': []},
+    'bbc.co.uk': {'keep_params': []},
+    'bbc.com': {'keep_params': []},
+    'cnn.com': {'keep_params': []},
+    'scmp.com': {'keep_params': []},
+    'insurancejournal.com': {'keep_params': []},
+    'justice.gov': {'drop_params': ['cid']},
+}
+
+_GOOGLE_AMP_RE = re.compile(r"^/amp/(?:s/)?(?P<target>.+)$")
+_AMP_CACHE_RE = re.compile(r"^/[cv]/(?:s/)?(?P<target>.+)$")
+
+
+def load_domain_rules() -> Dict[str, Dict[str, List[str]]]:
+    """站点规则（URL_CANONICAL_RULES 环境变量中的 JSON 覆盖默认规则）"""
+    rules = {domain: dict(rule) for domain, rule in DOMAIN_RULES.items()}
+    override = os.getenv("URL_CANONICAL_RULES")
+    if override:
+        try:
+            for domain, rule in json.loads(override).items():
+                rules[domain.lower()] = rule
+        except (ValueError, AttributeError) as e:
+            print(f"⚠️ URL_CANONICAL_RULES 解析失败，使用默认规则: {str(e)}")
+    return rules
+
+
+_RULES = load_domain_rules()
+
+
+def _domain_rule(host: str, rules: Dict[str, Dict[str, List[str]]]) -> Dict[str, List[str]]:
+    for domain in sorted(rules, key=len, reverse=True):
+        if host == domain or host.endswith('.' + domain):
+            return rules[domain]
+    return {}
+
+
+def _is_tracking_param(name: str) -> bool:
+    return name.lower().startswith(TRACKING_PARAM_PREFIXES)
+
+
+def _unwrap_amp_cache(host: str, path: str) -> Optional[str]:
+    """Google AMP 查看器 / AMP 缓存地址还原为原始 URL，不是这类地址时返回 None"""
+    if host.endswith('cdn.ampproject.org'):
+        match = _AMP_CACHE_RE.match(path)
+    elif re.fullmatch(r"(www\.)?google\.[a-z.]+", host):
+        match = _GOOGLE_AMP_RE.match(path)
+    else:
+        return None
+    if not match:
+        return None
+    target = unquote(match.group('target'))
+    return target if '://' in target else f"https://{target}"
+
+
+def _strip_amp_path(path: str) -> str:
+    """去掉 AMP 路径：/amp/xxx、xxx/amp、xxx.amp、xxx.amp.html"""
+    if path.startswith('/amp/'):
+        path = path[4:]
+    path = re.sub(r"/amp/?$", "", path)
+    path = re.sub(r"\.amp(\.html?)?$", r"\1", path)
+    return path or '/'
+
+
+def canonical_url(url: str, rules: Optional[Dict[str, Dict[str, List[str]]]] = None) -> str:
+    """
+    规范化 URL
+
+    参数:
+        url: 原始 URL
+        rules: 站点规则（默认使用 DOMAIN_RULES 与 URL_CANONICAL_RULES 合并后的规则）
+
+    返回:
+        规范化后的 URL；无法解析（如没有协议）时返回去掉首尾空白的原始 URL
+    """
+    url = (url or '').strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    if not parts.scheme or not parts.netloc:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    target = _unwrap_amp_cache(host, parts.path)
+    if target and target != url:
+        return canonical_url(target, rules)
+
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix) and host.count('.') > 1:
+            host = host[len(prefix):]
+            break
+    port = port if port and (scheme, port) not in (('http', 80), ('https', 443)) else None
+    netloc = f"{host}:{port}" if port else host
+
+    path = _strip_amp_path(parts.path or '/')
+    for index_file in INDEX_FILES:
+        if path.lower().endswith('/' + index_file):
+            path = path[:-len(index_file)]
+            break
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+
+    rule = _domain_rule(host, _RULES if rules is None else rules)
+    keep = rule.get('keep_params')
+    drop = {name.lower() for name in rule.get('drop_params', [])}
+    query = []
+    for name, value in parse_qsl(parts.query, keep_blank_values=True):
+        lower = name.lower()
+        if keep is not None and name not in keep:
+            continue
+        if _is_tracking_param(name) or lower in drop:
+            continue
+        if lower in AMP_PARAMS and value.lower() in ('', '1', 'amp', 'true'):
+            continue
+        query.append((name, value))
+    return urlunsplit((scheme, netloc, path, urlencode(sorted(query)), ''))
+
+
+def canonical_or_none(url: Optional[str]) -> Optional[str]:
+    """规范化 URL，空 URL 返回 None（数据库 canonical_url 列唯一，空字符串不能重复写入）"""
+    return (canonical_url(url) or None) if url else None
+
+
+def url_key(result: Dict) -> str:
+    """
+    搜索结果的去重键：Scout 搜索时写入的 'canonical_url'，没有时现场规范化 'url'
+    抓取和 source_url 使用原始 'url'（规范化后的地址不一定能访问），认领、运行日志和本地去重使用此键
+    """
+    return result.get('canonical_url') or canonical_url(result.get('url', ''))
+
+
+# ==================== 数据库查重 / 保存 ====================
+
+# 尚未执行 database_canonical_url.sql 时置为 True：查重只按 source_url，保存时不写 canonical_url
+_canonical_column_missing = False
+
+
+def _is_missing_column_error(error: Exception) -> bool:
+    message = str(error)
+    return 'canonical_url' in message and any(
+        marker in message for marker in ('42703', 'PGRST204', 'does not exist', 'schema cache'))
+
+
+def _mark_column_missing(error: Exception):
+    global _canonical_column_missing
+    if not _canonical_column_missing:
+        print(f"⚠️ fraud_cases.canonical_url 字段不存在，按 source_url 查重（请执行 database_canonical_url.sql）: {str(error)}")
+    _canonical_column_missing = True
+
+
+def _quote(value: str) -> str:
+    """PostgREST or 过滤条件中的值（URL 可能包含逗号和括号）用双引号括起"""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def find_existing_cases(client, url: str, columns: str = 'id') -> List[Dict]:
+    """
+    查找已保存的同一 URL 案例：canonical_url 相同，或 source_url 等于原始 URL / 规范化 URL
+    （回填时留空 canonical_url 的重复案例、用户上传案例只能按 source_url 匹配）
+
+    参数:
+        client: Supabase 客户端
+        url: 原始 URL
+        columns: 返回的字段
+
+    返回:
+        匹配的案例列表；canonical_url 字段不存在（未执行迁移）时只按 source_url 查找
+    """
+    canonical = canonical_url(url)
+    urls = list(dict.fromkeys(value for value in ((url or '').strip(), canonical) if value))
+    if not urls:
+        return []
+    source_filters = [f"source_url.eq.{_quote(value)}" for value in urls]
+    if not _canonical_column_missing:
+        try:
+            result = (client.table('fraud_cases').select(columns)
+                      .or_(','.join([f"canonical_url.eq.{_quote(canonical)}"] + source_filters)).execute())
+            return result.data or []
+        except Exception as e:
+            if not _is_missing_column_error(e):
+                raise
+            _mark_column_missing(e)
+    result = client.table('fraud_cases').select(columns).or_(','.join(source_filters)).execute()
+    return result.data or []
+
+
+def insert_case(client, insert_data: Dict):
+    """
+    写入 fraud_cases；canonical_url 字段不存在（未执行迁移）时去掉该字段再写入
+
+    返回:
+        Supabase 的 insert 响应
+    """
+    if _canonical_column_missing:
+        insert_data = {name: value for name, value in insert_data.items() if name != 'canonical_url'}
+    try:
+        return client.table('fraud_cases').insert(insert_data).execute()
+    except Exception as e:
+        if 'canonical_url' not in insert_data or not _is_missing_column_error(e):
+            raise
+        _mark_column_missing(e)
+        insert_data = {name: value for name, value in insert_data.items() if name != 'canonical_url'}
+        return client.table('fraud_cases').insert(insert_data).execute()
+
+
+# ==================== 数据库回填 ====================
+
+def backfill_canonical_urls(client, batch_size: int = 500, dry_run: bool = False) -> Dict:
+    """
+    为 fraud_cases 中已有的案例回填 canonical_url（需要先执行 database_canonical_url.sql）
+
+    规范化后相同的案例中，id 最小的（最早保存的）获得该 canonical_url，
+    其余视为重复案例，canonical_url 保持为空并输出，由人工确认后删除或合并
+
+    参数:
+        client: Supabase 客户端
+        batch_size: 每次读取的行数
+        dry_run: 只统计不写入
+
+    返回:
+        {'rows': 总行数, 'updated': 更新行数, 'duplicates': [(重复案例 id, 保留的案例 id, source_url)]}
+    """
+    rows = []
+    start = 0
+    while True:
+        page = (client.table('fraud_cases').select('id, source_url, canonical_url').order('id')
+                .range(start, start + batch_size - 1).execute())
+        rows.extend(page.data or [])
+        if len(page.data or []) < batch_size:
+            break
+        start += batch_size
+
+    computed = {row['id']: canonical_or_none(row.get('source_url')) for row in rows}
+    # 已经是最新规范化结果的行先占用对应的 canonical_url
+    owners = {row['canonical_url']: row['id'] for row in rows
+              if row.get('canonical_url') and row['canonical_url'] == computed[row['id']]}
+    updates = []
+    duplicates = []
+    for row in rows:
+        canonical = computed[row['id']]
+        if not canonical or row.get('canonical_url') == canonical:
+            continue
+        owner = owners.setdefault(canonical, row['id'])
+        if owner != row['id']:
+            duplicates.append((row['id'], owner, row.get('source_url')))
+            continue
+        updates.append((row['id'], canonical))
+
+    updated = 0
+    if not dry_run:
+        for row_id, canonical in updates:
+            try:
+                client.table('fraud_cases').update({'canonical_url': canonical}).eq('id', row_id).execute()
+                updated += 1
+            except Exception as e:
+                # 规则变化后，旧的 canonical_url 可能仍被 id 更大的案例占用，再次回填即可
+                print(f"⚠️ 案例 {row_id} 回填失败: {str(e)}")
+    else:
+        updated = len(updates)
+    return {'rows': len(rows), 'updated': updated, 'duplicates': duplicates}
+
+
+def main(argv: List[str]):
+    if "--backfill" not in argv:
+        print("用法: python url_canonical.py --backfill [--dry-run]")
+        return
+    from supabase import create_client
+
+    client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    dry_run = "--dry-run" in argv
+    stats = backfill_canonical_urls(client, dry_run=dry_run)
+    print(f"✅ canonical_url 回填{'（试运行）' if dry_run else ''}: 共 {stats['rows']} 个案例，"
+          f"更新 {stats['updated']} 个，重复 {len(stats['duplicates'])} 个")
+    for row_id, owner, url in stats['duplicates']:
+        print(f"   ⚠️ 案例 {row_id} 与案例 {owner} 重复: {url}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,243 @@
+"""
+GIFIA - LLM 用量计量（Token 与成本）
+记录每次 Gemini / DeepSeek / OpenAI 调用的输入、输出 token 数，按 运行 ID + 阶段 + 模型 汇总，
+存放在 .gifia/llm_usage.db，每次运行结束时输出成本报告
+
+- token 数优先使用服务商返回的用量（Gemini usage_metadata、OpenAI 兼容接口 usage），
+  没有返回用量时（流式输出提前结束、旧版 SDK）按文本长度估算，报告中标注估算比例
+- 阶段（stage）由调用方传入，如 analyst、critic、extract、validate、deidentify
+- 价格为各服务商公开的标准价格（美元 / 百万 token），可用 LLM_PRICES 环境变量覆盖
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from content_reducer import estimate_tokens
+from gifia_state import connect_sqlite, state_path
+
+# ==================== 计量配置 ====================
+
+LLM_USAGE_METERING = os.getenv("LLM_USAGE_METERING", "1") == "1"
+# 用量记录保留天数（超过后自动清理）
+LLM_USAGE_TTL_DAYS = float(os.getenv("LLM_USAGE_TTL_DAYS", "90"))
+
+
+def _default_run_id() -> str:
+    """运行 ID：GIFIA_RUN_ID > GitHub Actions 的 run id + attempt > 启动时间 + 进程号"""
+    run_id = os.getenv("GIFIA_RUN_ID")
+    if run_id:
+        return run_id
+    github_run = os.getenv("GITHUB_RUN_ID")
+    if github_run:
+        return f"gh-{github_run}-{os.getenv('GITHUB_RUN_ATTEMPT', '1')}"
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+
+RUN_ID = _default_run_id()
+
+# 模型价格（美元 / 百万 token）：(输入, 输出)；按模型名包含的关键字匹配，先匹配到的优先
+MODEL_PRICES: List[Tuple[str, Tuple[float, float]]] = [
+    ('gemini-2.5-pro', (1.25, 10.0)),
+    ('gemini-2.5-flash', (0.30, 2.50)),
+    ('gemini-1.5-pro', (1.25, 5.0)),
+    ('gemini-1.5-flash', (0.075, 0.30)),
+    ('gemini-flash', (0.30, 2.50)),
+    ('deepseek-chat', (0.27, 1.10)),
+    ('gpt-4o-mini', (0.15, 0.60)),
+]
+
+
+def load_prices() -> List[Tuple[str, Tuple[float, float]]]:
+    """
+    读取价格表；LLM_PRICES 环境变量（JSON）中的条目优先，
+    如 LLM_PRICES='{"deepseek-chat": [0.27, 1.10]}'
+    """
+    prices = list(MODEL_PRICES)
+    raw = os.getenv("LLM_PRICES")
+    if raw:
+        try:
+            overrides = [(str(key), (float(value[0]), float(value[1]))) for key, value in json.loads(raw).items()]
+            prices = overrides + prices
+        except (ValueError, TypeError, IndexError) as e:
+            print(f"⚠️ [Usage] LLM_PRICES 格式错误，使用默认价格: {str(e)}")
+    return prices
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int,
+                  prices: Optional[List[Tuple[str, Tuple[float, float]]]] = None) -> float:
+    """按价格表估算一次调用的成本（美元）；未知模型返回 0"""
+    name = model.lower()
+    for keyword, (input_price, output_price) in prices if prices is not None else MODEL_PRICES:
+        if keyword.lower() in name:
+            return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    return 0.0
+
+
+# ==================== 服务商用量解析 ====================
+
+def gemini_usage(response) -> Optional[Tuple[int, int]]:
+    """从 Gemini 响应的 usage_metadata 读取 (输入 token, 输出 token)；没有用量时返回 None"""
+    try:
+        metadata = getattr(response, 'usage_metadata', None)
+        prompt_tokens = int(getattr(metadata, 'prompt_token_count', 0) or 0)
+        completion_tokens = int(getattr(metadata, 'candidates_token_count', 0) or 0)
+    except Exception:
+        return None
+    if not prompt_tokens:
+        return None
+    return prompt_tokens, completion_tokens
+
+
+def openai_usage(completion) -> Optional[Tuple[int, int]]:
+    """从 OpenAI 兼容接口（OpenAI、DeepSeek）响应的 usage 读取 (输入 token, 输出 token)"""
+    try:
+        usage = getattr(completion, 'usage', None)
+        prompt_tokens = int(getattr(usage, 'prompt_tokens', 0) or 0)
+        completion_tokens = int(getattr(usage, 'completion_tokens', 0) or 0)
+    except Exception:
+        return None
+    if not prompt_tokens:
+        return None
+    return prompt_tokens, completion_tokens
+
+
+# ==================== 用量存储 ====================
+
+class UsageMeter:
+    """基于 SQLite 的 LLM 用量记录，线程安全；多个 Worker 使用相同的 GIFIA_RUN_ID 时汇总到同一个运行"""
+
+    def __init__(self, path: Optional[str] = None, run_id: Optional[str] = None,
+                 ttl_days: float = LLM_USAGE_TTL_DAYS):
+        self.path = path or state_path('llm_usage.db')
+        self.run_id = run_id or RUN_ID
+        self.ttl_seconds = ttl_days * 86400
+        self.prices = load_prices()
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_usage (
+                    run_id TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    provider TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    prompt_tokens INTEGER NOT NULL,
+                    completion_tokens INTEGER NOT NULL,
+                    estimated INTEGER NOT NULL DEFAULT 0,
+                    cost_usd REAL NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_usage_run ON llm_usage(run_id)")
+            self._conn.execute("DELETE FROM llm_usage WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+
+    def record(self, provider: str, model: str, stage: str, prompt_text: str = "", completion_text: str = "",
+               usage: Optional[Tuple[int, int]] = None) -> Dict:
+        """
+        记录一次调用的用量
+
+        参数:
+            provider: 服务商（gemini / deepseek / openai）
+            model: 模型名称
+            stage: 调用所属的阶段，如 analyst、critic、validate
+            prompt_text / completion_text: 提示词和输出文本，服务商没有返回用量时用于估算
+            usage: 服务商返回的 (输入 token, 输出 token)；None 表示按文本估算
+
+        返回:
+            记录的条目
+        """
+        estimated = usage is None
+        if estimated:
+            usage = (estimate_tokens(prompt_text or ""), estimate_tokens(completion_text or ""))
+        prompt_tokens, completion_tokens = usage
+        entry = {
+            'run_id': self.run_id,
+            'stage': stage,
+            'provider': provider,
+            'model': model,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'estimated': int(estimated),
+            'cost_usd': estimate_cost(model, prompt_tokens, completion_tokens, self.prices),
+            'created_at': time.time(),
+        }
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO llm_usage (run_id, stage, provider, model, prompt_tokens, completion_tokens,
+                                       estimated, cost_usd, created_at)
+                VALUES (:run_id, :stage, :provider, :model, :prompt_tokens, :completion_tokens,
+                        :estimated, :cost_usd, :created_at)
+                """,
+                entry,
+            )
+            self._conn.commit()
+        return entry
+
+    def summary(self, run_id: Optional[str] = None) -> List[Dict]:
+        """按 阶段 + 服务商 + 模型 汇总某次运行的用量（默认本次运行），按成本从高到低排序"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT stage, provider, model, COUNT(*) AS calls,
+                       SUM(prompt_tokens) AS prompt_tokens, SUM(completion_tokens) AS completion_tokens,
+                       SUM(estimated) AS estimated_calls, SUM(cost_usd) AS cost_usd
+                FROM llm_usage WHERE run_id = ?
+                GROUP BY stage, provider, model
+                ORDER BY cost_usd DESC, prompt_tokens + completion_tokens DESC
+                """,
+                (run_id or self.run_id,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+# ==================== 全局实例 ====================
+
+_meter: Optional[UsageMeter] = None
+_meter_lock = threading.Lock()
+
+
+def get_usage_meter() -> Optional[UsageMeter]:
+    """返回进程内共享的用量记录（LLM_USAGE_METERING=0 时返回 None）"""
+    global _meter
+    if not LLM_USAGE_METERING:
+        return None
+    with _meter_lock:
+        if _meter is None:
+            _meter = UsageMeter()
+        return _meter
+
+
+def record_usage(provider: str, model: str, stage: str, prompt_text: str = "", completion_text: str = "",
+                 usage: Optional[Tuple[int, int]] = None):
+    """记录一次调用的用量；计量失败只输出警告，不影响调用结果"""
+    try:
+        meter = get_usage_meter()
+        if meter:
+            meter.record(provider, model, stage, prompt_text, completion_text, usage)
+    except Exception as e:
+        print(f"⚠️ [Usage] 用量记录失败: {str(e)}")
+
+
+def print_usage_report(run_id: Optional[str] = None):
+    """输出本次运行的 token 与成本报告（没有调用记录时不输出）"""
+    meter = _meter
+    if meter is None:
+        return
+    rows = meter.summary(run_id)
+    if not rows:
+        return
+    total_calls = sum(row['calls'] for row in rows)
+    total_cost = sum(row['cost_usd'] for row in rows)
+    estimated = sum(row['estimated_calls'] for row in rows)
+    print(f"💰 LLM 用量（运行 {run_id or meter.run_id}）：{total_calls} 次调用，约 ${total_cost:.4f}")
+    for row in rows:
+        print(f"   [{row['stage']}] {row['provider']} {row['model']}: {row['calls']} 次 | "
+              f"输入 {row['prompt_tokens']} / 输出 {row['completion_tokens']} tokens | ${row['cost_usd']:.4f}")
+    if estimated:
+        print(f"   其中 {estimated} 次调用的 token 数为按文本长度估算")
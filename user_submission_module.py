@@ -4,12 +4,11 @@ GIFIA - 用户上传模块 (User Submission & Gatekeeper)
 """
 
 import os
-import json
-import re
 from typing import Dict, Optional, Tuple
 from datetime import datetime
 import google.generativeai as genai
-from openai import OpenAI
+import ai_engine
+from structured_output import CASE_SCHEMA, JSON_OBJECT_SCHEMA, parse_case, parse_json
 
 # ==================== 环境变量配置 ====================
 
@@ -20,52 +19,18 @@ genai.configure(api_key=GEMINI_API_KEY)
 
 # ==================== AI 分析函数（Failover） ====================
 
-def get_ai_analysis(prompt: str) -> Optional[str]:
-    """通用AI分析函数：优先使用 Gemini，失败后自动切换到 DeepSeek"""
-    # 1) 尝试 Gemini
-    try:
-        models_to_try = [
-            "models/gemini-2.5-flash",
-            "models/gemini-1.5-pro",
-            "models/gemini-flash-latest",
-        ]
-        last_err = None
-        for model_name in models_to_try:
-            try:
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(prompt)
-                text = (response.text or "").strip()
-                if text:
-                    return text
-            except Exception as e:
-                last_err = str(e)
-                if any(k in str(e).lower() for k in ["quota", "rate", "429", "exceeded", "limit"]):
-                    break
-                continue
-        if last_err:
-            print(f"⚠️ Gemini 异常，切换至 DeepSeek...")
-    except Exception as e:
-        print(f"⚠️ Gemini 初始化失败，切换至 DeepSeek...")
-
-    # 2) 尝试 DeepSeek
-    try:
-        if not DEEPSEEK_API_KEY:
-            return None
-        ds_client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com")
-        completion = ds_client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": "你是一位资深保险反欺诈专家，擅长分析保险欺诈、逆选择和滥用案例。"},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.3,
-            max_tokens=3000,
-        )
-        text = (completion.choices[0].message.content or "").strip()
-        return text if text else None
-    except Exception as e:
-        print(f"❌ DeepSeek 失败: {str(e)}")
-        return None
+def get_ai_analysis(prompt: str, stage: str, response_schema: Dict = JSON_OBJECT_SCHEMA) -> Optional[str]:
+    """
+    通用AI分析函数：优先使用 Gemini，失败后自动切换到 DeepSeek（要求输出 JSON 对象）
+    stage 为用量计量中的阶段名称（validate / deidentify / extract）
+    """
+    return ai_engine.get_ai_analysis(
+        prompt,
+        system_prompt="你是一位资深保险反欺诈专家，擅长分析保险欺诈、逆选择和滥用案例。",
+        max_tokens=3000,
+        response_schema=response_schema,
+        stage=stage,
+    )
 
 
 # ==================== 专家准入闸门 ====================
@@ -112,21 +77,12 @@ def validate_submission(content: str) -> Tuple[bool, Dict]:
 """
 
     try:
-        text = get_ai_analysis(prompt)
+        text = get_ai_analysis(prompt, stage="validate")
         if not text:
             return False, {"error": "AI 分析失败"}
         
-        # 清理 JSON
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        text = text.strip()
-        text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
-        
-        result = json.loads(text)
+        # 解析 JSON（自动修复常见格式问题）
+        result = parse_json(text, expect=dict)
         return result.get('is_valid', False), result
         
     except Exception as e:
@@ -180,21 +136,12 @@ def deidentify_pii(content: str) -> Tuple[str, Dict]:
 """
 
     try:
-        text = get_ai_analysis(prompt)
+        text = get_ai_analysis(prompt, stage="deidentify")
         if not text:
             return content, {}  # 如果失败，返回原内容
         
-        # 清理 JSON
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        text = text.strip()
-        text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
-        
-        result = json.loads(text)
+        # 解析 JSON（自动修复常见格式问题）
+        result = parse_json(text, expect=dict)
         return result.get('deidentified_content', content), result.get('pii_found', {})
         
     except Exception as e:
@@ -254,27 +201,12 @@ def extract_case_from_submission(content: str, line_of_business: str) -> Optiona
 """
 
     try:
-        text = get_ai_analysis(prompt)
+        text = get_ai_analysis(prompt, stage="extract", response_schema=CASE_SCHEMA)
         if not text:
             return None
         
-        # 清理 JSON
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        text = text.strip()
-        text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
-        
-        case_data = json.loads(text)
-        
-        # 验证必需字段
-        required_fields = ['Time', 'Region', 'Characters', 'Event', 'Process', 'Result']
-        for field in required_fields:
-            if field not in case_data:
-                case_data[field] = "未知"
+        # 解析 JSON（自动修复常见格式问题），并校验必需字段
+        case_data = parse_case(text)
         
         # 添加元数据
         case_data['Source_URL'] = f"user_submission_{datetime.now().isoformat()}"
@@ -0,0 +1,305 @@
+"""
+GIFIA - 多 Worker 任务认领（租约表）
+多个 Scout 进程或机器同时运行时，每个候选 URL 处理前先在认领表中认领：
+- 同一时间只有一个 Worker 持有某个 URL 的租约
+- 处理完成后标记为 done，其他 Worker 不再处理
+- 处理失败或 Worker 崩溃（租约过期）后，其他 Worker 可以重新认领
+
+后端：
+- Supabase（Postgres）：database_work_claims.sql 中的 claim_work / renew_work_claims / release_work_claims
+- SQLite：同一台机器上多个进程共享 .gifia/work_claims.db（本地运行和测试用）
+"""
+
+import hashlib
+import os
+import socket
+import threading
+import time
+from typing import Any, Iterable, List, Optional, Set
+
+from gifia_state import connect_sqlite, state_path
+
+# ==================== 配置 ====================
+
+# 认领后端：auto（有 Supabase 客户端时用 Supabase，否则 SQLite）/ supabase / sqlite / off
+WORK_CLAIM_BACKEND = os.getenv("WORK_CLAIM_BACKEND", "auto").lower()
+# 租约时长（秒），持有期间由心跳线程每 1/3 租约续约一次
+WORK_CLAIM_LEASE_SECONDS = int(os.getenv("WORK_CLAIM_LEASE_SECONDS", "900"))
+# 静态分片：GIFIA_SHARD_COUNT 个 Worker 各自只处理 URL 哈希落在 GIFIA_SHARD_INDEX 的候选
+GIFIA_SHARD_INDEX = int(os.getenv("GIFIA_SHARD_INDEX", "0"))
+GIFIA_SHARD_COUNT = int(os.getenv("GIFIA_SHARD_COUNT", "1"))
+
+
+def default_worker_id() -> str:
+    """Worker 标识：GIFIA_WORKER_ID 或 主机名:进程号"""
+    return os.getenv("GIFIA_WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+
+
+def in_shard(url: str, shard_index: int = GIFIA_SHARD_INDEX, shard_count: int = GIFIA_SHARD_COUNT) -> bool:
+    """URL 是否属于本 Worker 的分片（按 URL 的 SHA-1 取模，所有 Worker 结果一致）"""
+    if shard_count <= 1:
+        return True
+    digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return int(digest[:8], 16) % shard_count == shard_index
+
+
+# ==================== 后端 ====================
+
+class SQLiteClaimStore:
+    """基于 SQLite 的认领表，同一台机器上的多个进程共享同一个数据库文件"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or state_path('work_claims.db')
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS work_claims (
+                    url TEXT PRIMARY KEY,
+                    worker_id TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'claimed',
+                    lease_expires_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+
+    def claim(self, urls: List[str], worker_id: str, lease_seconds: int) -> List[str]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM work_claims WHERE status = 'done' AND updated_at < ?",
+                               (now - 7 * 86400,))
+            # 单个写事务内完成认领和读取，多个进程之间由 SQLite 写锁串行化
+            self._conn.executemany(
+                """
+                INSERT INTO work_claims (url, worker_id, status, lease_expires_at, updated_at)
+                VALUES (?, ?, 'claimed', ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    worker_id = excluded.worker_id, status = 'claimed',
+                    lease_expires_at = excluded.lease_expires_at, updated_at = excluded.updated_at
+                WHERE work_claims.status != 'done'
+                  AND (work_claims.lease_expires_at < excluded.updated_at OR work_claims.worker_id = excluded.worker_id)
+                """,
+                [(url, worker_id, now + lease_seconds, now) for url in dict.fromkeys(urls)],
+            )
+            placeholders = ','.join('?' * len(urls))
+            rows = self._conn.execute(
+                f"SELECT url FROM work_claims WHERE url IN ({placeholders}) AND worker_id = ? AND status = 'claimed'",
+                (*urls, worker_id),
+            ).fetchall()
+            self._conn.commit()
+        return [row['url'] for row in rows]
+
+    def renew(self, urls: List[str], worker_id: str, lease_seconds: int) -> List[str]:
+        now = time.time()
+        placeholders = ','.join('?' * len(urls))
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE work_claims SET lease_expires_at = ?, updated_at = ? "
+                f"WHERE url IN ({placeholders}) AND worker_id = ? AND status = 'claimed'",
+                (now + lease_seconds, now, *urls, worker_id),
+            )
+            rows = self._conn.execute(
+                f"SELECT url FROM work_claims WHERE url IN ({placeholders}) AND worker_id = ? AND status = 'claimed'",
+                (*urls, worker_id),
+            ).fetchall()
+            self._conn.commit()
+        return [row['url'] for row in rows]
+
+    def release(self, urls: List[str], worker_id: str, done: bool):
+        now = time.time()
+        placeholders = ','.join('?' * len(urls))
+        with self._lock:
+            if done:
+                self._conn.execute(
+                    f"UPDATE work_claims SET status = 'done', lease_expires_at = ?, updated_at = ? "
+                    f"WHERE url IN ({placeholders}) AND worker_id = ?",
+                    (now, now, *urls, worker_id),
+                )
+            else:
+                self._conn.execute(
+                    f"DELETE FROM work_claims WHERE url IN ({placeholders}) AND worker_id = ? AND status = 'claimed'",
+                    (*urls, worker_id),
+                )
+            self._conn.commit()
+
+
+class SupabaseClaimStore:
+    """基于 Supabase（Postgres）RPC 的认领表，跨机器共享（需先执行 database_work_claims.sql）"""
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    @staticmethod
+    def _urls(data: Any) -> List[str]:
+        urls = []
+        for row in data or []:
+            urls.append(row.get('claimed_url') if isinstance(row, dict) else row)
+        return [url for url in urls if url]
+
+    def claim(self, urls: List[str], worker_id: str, lease_seconds: int) -> List[str]:
+        result = self.client.rpc('claim_work', {
+            'p_urls': urls, 'p_worker_id': worker_id, 'p_lease_seconds': lease_seconds,
+        }).execute()
+        return self._urls(result.data)
+
+    def renew(self, urls: List[str], worker_id: str, lease_seconds: int) -> List[str]:
+        result = self.client.rpc('renew_work_claims', {
+            'p_urls': urls, 'p_worker_id': worker_id, 'p_lease_seconds': lease_seconds,
+        }).execute()
+        return self._urls(result.data)
+
+    def release(self, urls: List[str], worker_id: str, done: bool):
+        self.client.rpc('release_work_claims', {
+            'p_urls': urls, 'p_worker_id': worker_id, 'p_done': done,
+        }).execute()
+
+
+# ==================== 认领器 ====================
+
+class WorkClaimer:
+    """
+    Worker 侧的认领器，线程安全
+
+    用法:
+        claimer = get_work_claimer(supabase)
+        if claimer.try_claim(url):
+            try:
+                ...处理...
+            finally:
+                claimer.finish(url, done=保存成功)
+
+    认领后端不可用（例如未执行迁移脚本）时放行所有 URL，只打印一次警告，不影响抓取
+    """
+
+    def __init__(self, store: Optional[Any], worker_id: Optional[str] = None,
+                 lease_seconds: int = WORK_CLAIM_LEASE_SECONDS):
+        self.store = store
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.held: Set[str] = set()
+        self._lock = threading.Lock()
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._warned = False
+
+    def _fail_open(self, action: str, error: Exception):
+        if not self._warned:
+            self._warned = True
+            print(f"⚠️ [Claims] 认领表{action}失败，本次运行不做跨 Worker 去重: {str(error)[:120]}")
+
+    def claim(self, urls: Iterable[str]) -> List[str]:
+        """
+        批量认领，返回本 Worker 认领成功的 URL（保持输入顺序，已按分片过滤）
+        本 Worker 正在处理的 URL 不会再次认领成功（认领表允许同一 Worker 重复认领，进程内由 held 去重）
+        """
+        urls = [url for url in dict.fromkeys(urls) if url and in_shard(url)]
+        with self._lock:
+            # 先在进程内占位，同一 Worker 的多个线程不会同时认领同一 URL
+            urls = [url for url in urls if url not in self.held]
+            self.held.update(urls)
+        if not urls or self.store is None:
+            return urls
+        try:
+            claimed = set(self.store.claim(urls, self.worker_id, self.lease_seconds))
+        except Exception as e:
+            self._fail_open('认领', e)
+            return urls
+        with self._lock:
+            self.held.difference_update(set(urls) - claimed)
+        return [url for url in urls if url in claimed]
+
+    def is_held(self, url: str) -> bool:
+        """本 Worker 是否正在处理该 URL"""
+        with self._lock:
+            return url in self.held
+
+    def try_claim(self, url: str) -> bool:
+        """认领单个 URL"""
+        return bool(self.claim([url]))
+
+    def finish(self, url: str, done: bool):
+        """
+        结束对 URL 的处理
+
+        参数:
+            done: True 表示处理完成（其他 Worker 不再处理），False 表示放弃（其他 Worker 可重试）
+        """
+        with self._lock:
+            if url not in self.held:
+                return
+            self.held.discard(url)
+        if self.store is None:
+            return
+        try:
+            self.store.release([url], self.worker_id, done)
+        except Exception as e:
+            self._fail_open('释放', e)
+
+    def renew(self) -> int:
+        """为所有持有的 URL 续约，返回续约成功的数量"""
+        with self._lock:
+            urls = list(self.held)
+        if not urls or self.store is None:
+            return 0
+        try:
+            renewed = set(self.store.renew(urls, self.worker_id, self.lease_seconds))
+        except Exception as e:
+            self._fail_open('续约', e)
+            return 0
+        lost = set(urls) - renewed
+        if lost:
+            print(f"⚠️ [Claims] {len(lost)} 个 URL 的租约已失效（可能已被其他 Worker 接管）")
+            with self._lock:
+                self.held -= lost
+        return len(renewed)
+
+    def start_heartbeat(self):
+        """启动后台续约线程（每 1/3 租约续约一次）"""
+        if self._heartbeat is not None or self.store is None:
+            return
+
+        def beat():
+            while not self._stop_event.wait(max(1.0, self.lease_seconds / 3)):
+                self.renew()
+
+        self._heartbeat = threading.Thread(target=beat, name='work-claims-heartbeat', daemon=True)
+        self._heartbeat.start()
+
+    def close(self):
+        """停止续约并释放所有仍持有的 URL（未完成，其他 Worker 可以重试）"""
+        self._stop_event.set()
+        with self._lock:
+            urls = list(self.held)
+            self.held.clear()
+        if urls and self.store is not None:
+            try:
+                self.store.release(urls, self.worker_id, False)
+            except Exception as e:
+                self._fail_open('释放', e)
+
+
+def get_work_claimer(supabase_client: Any = None, worker_id: Optional[str] = None) -> WorkClaimer:
+    """
+    按 WORK_CLAIM_BACKEND 创建认领器并启动续约线程
+
+    参数:
+        supabase_client: Supabase 客户端（auto 模式下有客户端时使用 Supabase 认领表）
+        worker_id: Worker 标识（默认 GIFIA_WORKER_ID 或 主机名:进程号）
+    """
+    backend = WORK_CLAIM_BACKEND
+    if backend == 'auto':
+        backend = 'supabase' if supabase_client is not None else 'sqlite'
+
+    if backend == 'supabase' and supabase_client is not None:
+        store = SupabaseClaimStore(supabase_client)
+    elif backend == 'sqlite':
+        store = SQLiteClaimStore()
+    else:
+        store = None
+
+    claimer = WorkClaimer(store, worker_id=worker_id)
+    claimer.start_heartbeat()
+    if GIFIA_SHARD_COUNT > 1:
+        print(f"🧩 [Claims] Worker {claimer.worker_id} 负责分片 {GIFIA_SHARD_INDEX + 1}/{GIFIA_SHARD_COUNT}")
+    return claimer
@@ -0,0 +1,136 @@
+"""
+GIFIA - 优先级工作队列
+按优先级分数处理候选案例：热点案例、Tavily 高分、新近发布的案例优先，
+运行时间预算不足时，低优先级条目被推迟到下一次运行，保证高关注度案例尽快发布
+"""
+
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# ==================== 优先级分数配置 ====================
+
+HOTSPOT_WEIGHT = float(os.getenv("PRIORITY_HOTSPOT_WEIGHT", "1.0"))
+SCORE_WEIGHT = float(os.getenv("PRIORITY_SCORE_WEIGHT", "1.0"))
+FRESHNESS_WEIGHT = float(os.getenv("PRIORITY_FRESHNESS_WEIGHT", "0.8"))
+# 新鲜度半衰期（小时）：发布 24 小时后新鲜度分数减半
+FRESHNESS_HALF_LIFE_HOURS = float(os.getenv("PRIORITY_FRESHNESS_HALF_LIFE_HOURS", "24"))
+# 没有历史数据时，每个案例的预估处理时间（秒）
+DEFAULT_SECONDS_PER_ITEM = float(os.getenv("ESTIMATED_SECONDS_PER_CASE", "60"))
+# 处理耗时指数移动平均中新样本的权重（初始值来自历史估计，不被第一个样本直接覆盖）
+DURATION_ALPHA = 0.3
+
+
+def parse_published_date(value: Any) -> Optional[datetime]:
+    """解析 Tavily 的 published_date（ISO 8601 或 RFC 2822），失败返回 None"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        text = str(value).strip()
+        try:
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            try:
+                parsed = parsedate_to_datetime(text)
+            except (TypeError, ValueError):
+                return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def priority_score(item: Dict, now: Optional[datetime] = None) -> float:
+    """
+    计算候选案例的优先级分数（越大越优先）
+
+    分数 = 热点权重 × is_hotspot + 分数权重 × Tavily score + 新鲜度权重 × 2^(-发布小时数 / 半衰期)
+    没有发布时间的条目新鲜度记为 0
+    """
+    now = now or datetime.now(timezone.utc)
+    score = HOTSPOT_WEIGHT if item.get('is_hotspot') else 0.0
+    score += SCORE_WEIGHT * float(item.get('score') or 0)
+
+    published = parse_published_date(item.get('published_date'))
+    if published:
+        age_hours = max(0.0, (now - published).total_seconds() / 3600)
+        score += FRESHNESS_WEIGHT * math.pow(2, -age_hours / FRESHNESS_HALF_LIFE_HOURS)
+    return score
+
+
+class PriorityWorkQueue:
+    """
+    线程安全的优先级队列
+
+    - push(): 加入条目（可以在处理过程中继续加入，高优先级条目会插队）
+    - drain(): 按优先级依次取出条目；剩余时间不足以处理下一个条目时停止，
+      未处理的低优先级条目留在队列中（deferred）
+    - record_duration(): 记录实际处理耗时，用于估算剩余时间能处理多少条目
+    """
+
+    def __init__(self, key: Optional[Callable[[Any], float]] = None, default_seconds: float = DEFAULT_SECONDS_PER_ITEM):
+        self._key = key or priority_score
+        self._heap: List = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.avg_seconds = default_seconds
+
+    def push(self, item: Any, score: Optional[float] = None) -> float:
+        """加入条目，返回其优先级分数"""
+        if score is None:
+            score = self._key(item)
+        with self._lock:
+            heapq.heappush(self._heap, (-score, next(self._counter), item))
+        return score
+
+    def pop(self) -> Optional[Any]:
+        """取出优先级最高的条目，队列为空返回 None"""
+        with self._lock:
+            if not self._heap:
+                return None
+            return heapq.heappop(self._heap)[2]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._heap)
+
+    def record_duration(self, seconds: float):
+        """记录一个条目的实际处理耗时（以 default_seconds 为初始值的指数移动平均）"""
+        with self._lock:
+            self.avg_seconds = DURATION_ALPHA * seconds + (1 - DURATION_ALPHA) * self.avg_seconds
+
+    def drain(self, deadline: Optional[float] = None, parallelism: int = 1,
+              limit: Optional[int] = None) -> Iterator[Any]:
+        """
+        按优先级取出条目，直到队列为空、时间预算不足或达到数量上限
+
+        参数:
+            deadline: time.monotonic() 截止时间，None 表示不限时
+            parallelism: 并发处理的条目数（用于估算剩余时间内能完成多少条目）
+            limit: 最多取出的条目数，None 表示不限
+        """
+        taken = 0
+        while limit is None or taken < limit:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining < self.avg_seconds / max(1, parallelism):
+                    if len(self):
+                        print(f"⏱️  [Queue] 剩余时间 {max(0, remaining):.0f}s 不足，推迟 {len(self)} 个低优先级条目")
+                    return
+            item = self.pop()
+            if item is None:
+                return
+            taken += 1
+            yield item
+
+    def pending(self) -> List[Any]:
+        """按优先级顺序返回队列中剩余的条目（不取出）"""
+        with self._lock:
+            return [entry[2] for entry in sorted(self._heap)]